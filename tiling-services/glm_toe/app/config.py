@@ -0,0 +1,48 @@
+"""
+GLM TOE Shared Configuration
+Environment settings read by both the tile server (app.main) and the
+standalone ingest worker (app.ingest_worker), so the two processes decode,
+fetch, index and retain granules the same way.
+"""
+
+import os
+from typing import Dict
+
+# Grid
+GLM_USE_ABI_GRID = os.environ.get('GLM_USE_ABI_GRID', 'true').lower() == 'true'
+GLM_ABI_LON0 = float(os.environ.get('GLM_ABI_LON0', '-75.0'))
+
+# S3 sources
+GLM_S3_BUCKET = os.environ.get('GLM_S3_BUCKET', 'noaa-goes18')
+GLM_S3_POLL_INTERVAL = int(os.environ.get('GLM_S3_POLL_INTERVAL', '60'))
+GLM_S3_PREDICTIVE_POLL = os.environ.get('GLM_S3_PREDICTIVE_POLL', 'true').lower() == 'true'  # Poll when the next granule is due
+GLM_S3_NOTIFICATIONS = os.environ.get('GLM_S3_NOTIFICATIONS', '')  # SQS queue URL, file:<path> or memory:
+GLM_S3_RECONCILE_INTERVAL = int(os.environ.get('GLM_S3_RECONCILE_INTERVAL', '300'))  # Fallback poll with notifications
+GLM_S3_GET_TIMEOUT = float(os.environ.get('GLM_S3_GET_TIMEOUT', '15'))  # Deadline of one granule GET
+GLM_S3_DOWNLOAD_DEADLINE = float(os.environ.get('GLM_S3_DOWNLOAD_DEADLINE', '60'))  # All tries of one granule
+GLM_S3_GET_RETRIES = int(os.environ.get('GLM_S3_GET_RETRIES', '3'))
+GLM_S3_HEDGE = os.environ.get('GLM_S3_HEDGE', 'true').lower() == 'true'  # Duplicate GETs slower than the p95
+GLM_S3_VERIFY = os.environ.get('GLM_S3_VERIFY', 'true').lower() == 'true'  # Check size/MD5 against head_object
+GLM_S3_POOL_SIZE = int(os.environ.get('GLM_S3_POOL_SIZE', '32'))  # Pooled S3 connections per host
+GLM_S3_TCP_KEEPALIVE = os.environ.get('GLM_S3_TCP_KEEPALIVE', 'true').lower() == 'true'
+GLM_S3_IDLE_TIMEOUT = float(os.environ.get('GLM_S3_IDLE_TIMEOUT', '60'))  # Idle seconds before s3fs closes a connection
+
+# Event store
+GLM_EVENT_INDEX_BUCKET_SECONDS = int(os.environ.get('GLM_EVENT_INDEX_BUCKET_SECONDS', '60'))
+GLM_EVENT_RETENTION_HOURS = float(os.environ.get('GLM_EVENT_RETENTION_HOURS', '24'))  # Events and granules kept
+GLM_SHARED_STORE_DIR = os.environ.get('GLM_SHARED_STORE_DIR', '')
+GLM_MEMORY_BUDGET_MB = int(os.environ.get('GLM_MEMORY_BUDGET_MB', '0'))  # 0 reports usage without enforcing
+
+
+def s3_fetcher_options() -> Dict:
+    """GLMS3Fetcher keyword arguments from the GLM_S3_* settings"""
+    return {
+        'download_deadline': GLM_S3_DOWNLOAD_DEADLINE,
+        'request_timeout': GLM_S3_GET_TIMEOUT,
+        'download_retries': GLM_S3_GET_RETRIES,
+        'hedge_downloads': GLM_S3_HEDGE,
+        'verify_downloads': GLM_S3_VERIFY,
+        'pool_size': GLM_S3_POOL_SIZE,
+        'tcp_keepalive': GLM_S3_TCP_KEEPALIVE,
+        'idle_timeout': GLM_S3_IDLE_TIMEOUT
+    }
@@ -0,0 +1,332 @@
+"""
+GLM Spatio-Temporal Event Index
+Columnar event store bucketed by time, with each bucket sorted by Morton
+code at a fine Web Mercator pixel level. "Events in tile (z, x, y) within
+window W" becomes a handful of binary searches instead of a scan.
+"""
+
+import logging
+import math
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .glm_processor import GLMEvent
+from .mercator_pyramid import (
+    MAX_MERCATOR_LAT,
+    PointIndex,
+    lonlat_to_mercator_pixels,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def datetime_to_ms(value: datetime) -> int:
+    """Naive-UTC (or aware) datetime to epoch milliseconds"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp() * 1000)
+
+
+class EventIndex:
+    """
+    Time-bucketed, Morton-sorted event store
+    Buckets are immutable PointIndex objects replaced copy-on-write, so
+    render threads can query a snapshot while ingest adds new events.
+    """
+
+    def __init__(self, bucket_seconds: int = 60, level: int = 28):
+        self.bucket_ms = int(bucket_seconds * 1000)
+        self.level = level
+        self._buckets: Dict[int, PointIndex] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return sum(len(b) for b in self._snapshot().values())
+
+    @classmethod
+    def from_buckets(cls, buckets: Dict[int, PointIndex], bucket_ms: int, level: int) -> 'EventIndex':
+        """Index over existing buckets (keyed by bucket id), e.g. a published snapshot"""
+        index = cls(level=level)
+        index.bucket_ms = int(bucket_ms)
+        index._buckets = dict(buckets)
+        return index
+
+    def _snapshot(self) -> Dict[int, PointIndex]:
+        with self._lock:
+            return dict(self._buckets)
+
+    def buckets(self) -> List[Tuple[int, PointIndex]]:
+        """Current (bucket id, PointIndex) pairs in time order; buckets are never mutated in place"""
+        return sorted(self._snapshot().items())
+
+    def add(self, lats: np.ndarray, lons: np.ndarray, energy_fj: np.ndarray,
+            times_ms: np.ndarray) -> int:
+        """Add events (energy in fJ, times in epoch ms); returns the number indexed"""
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        energy_fj = np.asarray(energy_fj, dtype=np.float64)
+        times_ms = np.asarray(times_ms, dtype=np.int64)
+
+        valid = (
+            (lats >= -90.0) & (lats <= 90.0) &
+            (lons >= -180.0) & (lons <= 180.0) &
+            (energy_fj > 0)
+        )
+        if not valid.all():
+            lats, lons, energy_fj, times_ms = lats[valid], lons[valid], energy_fj[valid], times_ms[valid]
+        if energy_fj.size == 0:
+            return 0
+
+        bucket_ids = times_ms // self.bucket_ms
+        for bucket_id in np.unique(bucket_ids):
+            mask = bucket_ids == bucket_id
+            part = PointIndex(lats[mask], lons[mask], energy_fj[mask],
+                              level=self.level, times=times_ms[mask])
+            with self._lock:
+                existing = self._buckets.get(int(bucket_id))
+                self._buckets[int(bucket_id)] = part if existing is None else existing.merge(part)
+
+        return int(energy_fj.size)
+
+    def add_events(self, events: List[GLMEvent]) -> int:
+        """Add GLMEvent objects to the index"""
+        n = len(events)
+        if n == 0:
+            return 0
+        return self.add(
+            np.fromiter((e.lat for e in events), dtype=np.float64, count=n),
+            np.fromiter((e.lon for e in events), dtype=np.float64, count=n),
+            np.fromiter((e.energy_fj for e in events), dtype=np.float64, count=n),
+            np.fromiter((datetime_to_ms(e.timestamp) for e in events), dtype=np.int64, count=n)
+        )
+
+    def prune(self, cutoff: datetime) -> int:
+        """Drop events older than cutoff; returns the number removed"""
+        cutoff_ms = datetime_to_ms(cutoff)
+        cutoff_bucket = cutoff_ms // self.bucket_ms
+        removed = 0
+        with self._lock:
+            for bucket_id in list(self._buckets):
+                bucket = self._buckets[bucket_id]
+                if bucket_id < cutoff_bucket:
+                    removed += len(bucket)
+                    del self._buckets[bucket_id]
+                elif bucket_id == cutoff_bucket:
+                    keep = bucket.times >= cutoff_ms
+                    removed += int((~keep).sum())
+                    if keep.any():
+                        self._buckets[bucket_id] = bucket.select(keep)
+                    else:
+                        del self._buckets[bucket_id]
+        return removed
+
+    def clear(self):
+        """Remove every event"""
+        with self._lock:
+            self._buckets.clear()
+
+    def _window_buckets(self, start: datetime, end: datetime) -> List[Tuple[PointIndex, Optional[Tuple[int, int]]]]:
+        """
+        Buckets overlapping [start, end]
+        Each comes with the (start_ms, end_ms) bounds to filter on when the
+        bucket is only partially inside the window, or None when fully inside.
+        """
+        return self._window_buckets_ms(datetime_to_ms(start), datetime_to_ms(end))
+
+    def _window_buckets_ms(self, start_ms: int, end_ms: int) -> List[Tuple[PointIndex, Optional[Tuple[int, int]]]]:
+        first, last = start_ms // self.bucket_ms, end_ms // self.bucket_ms
+        out = []
+        for bucket_id, bucket in sorted(self._snapshot().items()):
+            if bucket_id < first or bucket_id > last:
+                continue
+            bucket_start = bucket_id * self.bucket_ms
+            fully_inside = bucket_start >= start_ms and bucket_start + self.bucket_ms - 1 <= end_ms
+            out.append((bucket, None if fully_inside else (start_ms, end_ms)))
+        return out
+
+    @staticmethod
+    def _time_mask(bucket: PointIndex, i0: int, i1: int,
+                   bounds: Optional[Tuple[int, int]]) -> Optional[np.ndarray]:
+        if bounds is None:
+            return None
+        times = bucket.times[i0:i1]
+        return (times >= bounds[0]) & (times <= bounds[1])
+
+    def count(self, start: datetime, end: datetime, z: int, x: int, y: int, n: int = 1) -> int:
+        """Number of events in the tile (or n x n metatile) envelope within the window"""
+        total = 0
+        for bucket, bounds in self._window_buckets(start, end):
+            i0, i1 = bucket.tile_range(z, x, y, n)
+            mask = self._time_mask(bucket, i0, i1, bounds)
+            total += (i1 - i0) if mask is None else int(mask.sum())
+        return total
+
+    def tile_points(self, start: datetime, end: datetime, z: int, x: int, y: int,
+                    tile_size: int = 256, n: int = 1) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Block-relative pixel coordinates and TOE (fJ) of the events in a tile envelope"""
+        return self._tile_points_ms(datetime_to_ms(start), datetime_to_ms(end), z, x, y, tile_size, n)
+
+    def _tile_points_ms(self, start_ms: int, end_ms: int, z: int, x: int, y: int,
+                        tile_size: int = 256, n: int = 1) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        pxs, pys, vals = [], [], []
+        for bucket, bounds in self._window_buckets_ms(start_ms, end_ms):
+            i0, i1 = bucket.tile_range(z, x, y, n)
+            if i0 == i1:
+                continue
+            px, py, values = bucket.block_pixels(z, x, y, i0, i1, tile_size=tile_size, n=n)
+            mask = self._time_mask(bucket, i0, i1, bounds)
+            if mask is not None:
+                px, py, values = px[mask], py[mask], values[mask]
+            pxs.append(px)
+            pys.append(py)
+            vals.append(values)
+
+        if not vals:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+        return np.concatenate(pxs), np.concatenate(pys), np.concatenate(vals)
+
+    def tile_frames(self, z: int, x: int, y: int, first_end: datetime, frames: int,
+                    step: timedelta, window: timedelta, tile_size: int = 256) -> Iterator[np.ndarray]:
+        """
+        TOE arrays for consecutive windows ending at first_end + k * step
+        Time is cut into slices of gcd(step, window); each slice of the tile
+        is binned once, and every frame adds the slices entering its window
+        and subtracts those leaving it instead of re-aggregating.
+        """
+        step_ms = int(step.total_seconds() * 1000)
+        window_ms = int(window.total_seconds() * 1000)
+        if step_ms <= 0 or window_ms <= 0:
+            raise ValueError("step and window must be positive")
+        slice_ms = math.gcd(step_ms, window_ms)
+        per_step, per_window = step_ms // slice_ms, window_ms // slice_ms
+        origin = datetime_to_ms(first_end) - window_ms
+
+        size = tile_size * tile_size
+        sums = np.zeros(size, dtype=np.float64)
+        counts = np.zeros(size, dtype=np.int64)
+        partials: Dict[int, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+
+        def apply(j: int, sign: int):
+            if sign > 0:
+                # Slice j covers (origin + j * slice_ms, origin + (j + 1) * slice_ms]
+                lo = origin + j * slice_ms + 1
+                px, py, values = self._tile_points_ms(lo, lo + slice_ms - 1, z, x, y, tile_size)
+                cells, inverse = np.unique(py * tile_size + px, return_inverse=True)
+                partials[j] = (cells, np.bincount(inverse, weights=values), np.bincount(inverse))
+            cells, slice_sums, slice_counts = partials.pop(j) if sign < 0 else partials[j]
+            sums[cells] += sign * slice_sums
+            counts[cells] += sign * slice_counts
+
+        current: set = set()
+        for k in range(frames):
+            wanted = set(range(k * per_step, k * per_step + per_window))
+            for j in sorted(current - wanted):
+                apply(j, -1)
+            for j in sorted(wanted - current):
+                apply(j, +1)
+            current = wanted
+            # Counts are exact, so cells emptied by subtraction are exactly zero
+            frame = np.where(counts > 0, sums, 0.0)
+            yield frame.reshape(tile_size, tile_size).astype(np.float32)
+
+    def window_points(self, start: datetime, end: datetime) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Pixel coordinates (at the index level) and TOE (fJ) of every event in the window"""
+        pxs, pys, vals = [], [], []
+        for bucket, bounds in self._window_buckets(start, end):
+            if bounds is None:
+                pxs.append(bucket.px)
+                pys.append(bucket.py)
+                vals.append(bucket.values)
+            else:
+                mask = (bucket.times >= bounds[0]) & (bucket.times <= bounds[1])
+                pxs.append(bucket.px[mask])
+                pys.append(bucket.py[mask])
+                vals.append(bucket.values[mask])
+
+        if not vals:
+            return np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.float64)
+        return np.concatenate(pxs), np.concatenate(pys), np.concatenate(vals)
+
+    def window_events(self, start: datetime, end: datetime) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(lats, lons, energy_fj) of every event in the window, for grid aggregation"""
+        px, py, values = self.window_points(start, end)
+        lon, lat = self._pixels_to_lonlat(px.astype(np.float64), py.astype(np.float64))
+        return lat, lon, values
+
+    def bbox_events(self, lon_min: float, lat_min: float, lon_max: float, lat_max: float,
+                    start: datetime, end: datetime, limit: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """
+        Events inside a lon/lat box within the window
+        The box is covered by at most 3 x 3 tiles at a zoom matched to its
+        size; each tile is a range lookup followed by an exact pixel test.
+        """
+        (px0, px1), (py1, py0) = (
+            lonlat_to_mercator_pixels(np.array([lon_min, lon_max]), np.array([lat_min, lat_max]), self.level)
+        )
+        px0, px1, py0, py1 = int(px0), int(px1), int(py0), int(py1)
+
+        span = max(px1 - px0, py1 - py0, 1)
+        zoom = max(0, min(self.level, self.level - math.ceil(math.log2(span))))
+        shift = self.level - zoom
+
+        lons, lats, values, times = [], [], [], []
+        for bucket, bounds in self._window_buckets(start, end):
+            for ty in range(py0 >> shift, (py1 >> shift) + 1):
+                for tx in range(px0 >> shift, (px1 >> shift) + 1):
+                    i0, i1 = bucket.tile_range(zoom, tx, ty)
+                    if i0 == i1:
+                        continue
+                    px = bucket.px[i0:i1].astype(np.int64)
+                    py = bucket.py[i0:i1].astype(np.int64)
+                    mask = (px >= px0) & (px <= px1) & (py >= py0) & (py <= py1)
+                    time_mask = self._time_mask(bucket, i0, i1, bounds)
+                    if time_mask is not None:
+                        mask &= time_mask
+                    if not mask.any():
+                        continue
+                    lon, lat = self._pixels_to_lonlat(px[mask], py[mask])
+                    lons.append(lon)
+                    lats.append(lat)
+                    values.append(bucket.values[i0:i1][mask])
+                    times.append(bucket.times[i0:i1][mask])
+
+        result = {
+            'lon': np.concatenate(lons) if lons else np.zeros(0),
+            'lat': np.concatenate(lats) if lats else np.zeros(0),
+            'energy_fj': np.concatenate(values) if values else np.zeros(0),
+            'time_ms': np.concatenate(times) if times else np.zeros(0, dtype=np.int64),
+        }
+        if limit is not None:
+            order = np.argsort(result['time_ms'], kind='stable')[::-1][:limit]
+            result = {k: v[order] for k, v in result.items()}
+        return result
+
+    def _pixels_to_lonlat(self, px: np.ndarray, py: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Pixel centers at the index level back to WGS84"""
+        size = float(2 ** self.level)
+        lon = (px + 0.5) / size * 360.0 - 180.0
+        lat = np.degrees(np.arctan(np.sinh(np.pi * (1.0 - 2.0 * (py + 0.5) / size))))
+        return lon, np.clip(lat, -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(b.nbytes for b in self._snapshot().values())
+
+    def get_stats(self) -> Dict:
+        """Size and time coverage of the index"""
+        buckets = self._snapshot()
+        if not buckets:
+            return {'events': 0, 'buckets': 0, 'bucket_seconds': self.bucket_ms // 1000, 'nbytes': 0}
+        first, last = min(buckets), max(buckets)
+        return {
+            'events': sum(len(b) for b in buckets.values()),
+            'buckets': len(buckets),
+            'bucket_seconds': self.bucket_ms // 1000,
+            'level': self.level,
+            'oldest_bucket': datetime.utcfromtimestamp(first * self.bucket_ms / 1000).isoformat(),
+            'newest_bucket': datetime.utcfromtimestamp(last * self.bucket_ms / 1000).isoformat(),
+            'nbytes': sum(b.nbytes for b in buckets.values())
+        }
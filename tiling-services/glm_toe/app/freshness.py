@@ -0,0 +1,142 @@
+"""
+GLM TOE Data Freshness Tracking
+Follows each granule from its creation time (the c... field of the GLM
+filename) through listed -> downloaded -> decoded -> aggregated ->
+(published, for shared-store readers) -> first tile served, so the age
+of the lightning on the map can be measured stage by stage.
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from .event_index import datetime_to_ms
+from .metrics import REGISTRY, Histogram
+
+STAGES = ('listed', 'downloaded', 'decoded', 'aggregated', 'published', 'served')
+
+# Seconds from granule creation; GLM granules are produced every 20 s
+FRESHNESS_BUCKETS = (1, 2, 5, 10, 15, 20, 30, 45, 60, 90, 120, 180, 300, 600, 1800, 3600)
+
+FRESHNESS_LAG = REGISTRY.register(Histogram(
+    'glm_freshness_lag_seconds',
+    'Seconds from granule creation until it reached each pipeline stage',
+    ['stage'],
+    buckets=FRESHNESS_BUCKETS
+))
+
+_CREATION_RE = re.compile(r'_c(\d{4})(\d{3})(\d{2})(\d{2})(\d{2})')
+
+
+def granule_creation_time(key: str) -> Optional[datetime]:
+    """
+    Creation time (naive UTC) from a GLM granule key or path, or None
+    Strict counterpart of GLMDataProcessor.parse_granule_filename, which
+    falls back to "now" and would report a zero lag.
+    """
+    match = _CREATION_RE.search(key.rsplit('/', 1)[-1])
+    if match is None:
+        return None
+    year, doy, hour, minute, second = (int(g) for g in match.groups())
+    return datetime(year, 1, 1) + timedelta(days=doy - 1, hours=hour, minutes=minute, seconds=second)
+
+
+class FreshnessTracker:
+    """
+    Per-granule stage timestamps for the most recent max_tracked granules
+    Each stage is recorded once per granule; its lag from creation goes to
+    the glm_freshness_lag_seconds histogram.
+    """
+
+    def __init__(self, max_tracked: int = 512, clock: Callable[[], float] = time.time):
+        self.max_tracked = max_tracked
+        self._clock = clock
+        self._granules: "OrderedDict[str, Dict[str, float]]" = OrderedDict()
+        self._unserved: List[str] = []
+        self._lock = threading.Lock()
+
+    def mark(self, key: str, stage: str, created: Optional[datetime] = None, at: Optional[float] = None):
+        """
+        Record that granule key reached stage now, or at the given clock time
+        Ignored for keys without a creation time.
+        """
+        if stage not in STAGES:
+            raise ValueError(f"Unknown freshness stage: {stage}")
+        now = self._clock() if at is None else at
+        with self._lock:
+            record = self._granules.get(key)
+            if record is None:
+                created = created or granule_creation_time(key)
+                if created is None:
+                    return
+                record = {'created': datetime_to_ms(created) / 1000.0}
+                self._granules[key] = record
+                while len(self._granules) > self.max_tracked:
+                    self._granules.popitem(last=False)
+            if stage in record:
+                return
+            # A reader's granule is both aggregated (by the owner) and published; it is served once
+            if stage in ('aggregated', 'published') and 'aggregated' not in record and 'published' not in record:
+                self._unserved.append(key)
+            record[stage] = now
+        FRESHNESS_LAG.labels(stage).observe(max(0.0, now - record['created']))
+
+    def mark_served(self) -> int:
+        """A tile was served: every aggregated granule not yet served now is"""
+        if not self._unserved:
+            return 0
+        with self._lock:
+            keys, self._unserved = self._unserved, []
+        for key in keys:
+            self.mark(key, 'served')
+        return len(keys)
+
+    def records(self, keys: Iterable[str]) -> Dict[str, Dict[str, float]]:
+        """Creation and stage times of the tracked granules among keys"""
+        with self._lock:
+            return {key: dict(self._granules[key]) for key in keys if key in self._granules}
+
+    def restore(self, key: str, record: Dict[str, float]):
+        """Record the stages another process saw for granule key (one entry of records())"""
+        created = datetime.utcfromtimestamp(record['created']) if 'created' in record else None
+        for stage in STAGES:
+            if stage in record:
+                self.mark(key, stage, created, at=record[stage])
+
+    def get_stats(self) -> Dict:
+        """Current lag plus recent per-stage lag percentiles"""
+        now = self._clock()
+        with self._lock:
+            records = list(self._granules.items())
+
+        lags: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+        for _, record in records:
+            for stage in STAGES:
+                if stage in record:
+                    lags[stage].append(record[stage] - record['created'])
+
+        served = [(record['created'], key, record) for key, record in records if 'served' in record]
+        latest = max(served, key=lambda item: item[0]) if served else None
+        return {
+            'tracked': len(records),
+            'latest_served_granule': latest[1] if latest else None,
+            # Age of the newest lightning visible on the map
+            'current_lag_seconds': round(now - latest[0], 3) if latest else None,
+            'latest_stage_lag_seconds': {
+                stage: round(latest[2][stage] - latest[0], 3) for stage in STAGES if stage in latest[2]
+            } if latest else None,
+            'lag_seconds': {
+                stage: {
+                    'count': len(values),
+                    'p50': round(float(np.percentile(values, 50)), 3),
+                    'p95': round(float(np.percentile(values, 95)), 3),
+                    'max': round(max(values), 3)
+                }
+                for stage, values in lags.items() if values
+            }
+        }
@@ -6,7 +6,7 @@ as specified in the documentation.
 
 import os
 import logging
-from typing import List, Dict, Tuple, Optional, Union
+from typing import Callable, List, Dict, Tuple, Optional, Union
 from datetime import datetime, timedelta
 import numpy as np
 import xarray as xr
@@ -17,6 +17,8 @@ from dataclasses import dataclass
 from pyproj import CRS, Transformer
 import math
 
+from .metrics import stage_timer, timed
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -65,6 +67,9 @@ class GLMDataProcessor:
         # Quality control settings
         self.require_qc = False
         
+        # Downloads s3:// URLs to a local path (raising on failure); fsspec when unset
+        self.s3_download: Optional[Callable[[str, str], None]] = None
+        
     def _setup_transformers(self):
         """Setup coordinate transformation systems"""
         # WGS84 to Web Mercator (EPSG:3857) for tile rendering
@@ -151,10 +156,13 @@ class GLMDataProcessor:
                 'creation_time': now
             }
     
-    def read_glm_granule(self, file_path: str) -> GLMGranule:
+    def read_glm_granule(self, file_path: str,
+                         on_stage: Optional[Callable[[str], None]] = None) -> GLMGranule:
         """
         Read GLM L2 granule and extract all events
         Implements the NetCDF4 reading logic from documentation
+        on_stage, if given, is called with 'downloaded' and 'decoded' as the
+        granule reaches each step (freshness tracking).
         """
         try:
             # Parse filename metadata
@@ -163,25 +171,28 @@ class GLMDataProcessor:
             # Open dataset
             if file_path.startswith('s3://'):
                 # Handle S3 files
-                fs = fsspec.filesystem('s3', anon=True)
-                with fs.open(file_path, 'rb') as src, \
-                     tempfile.NamedTemporaryFile(delete=False, suffix='.nc') as tmp:
-                    shutil.copyfileobj(src, tmp)
-                    tmp_path = tmp.name
+                with stage_timer('s3_download'):
+                    tmp_path = self._download_s3(file_path)
+                if on_stage:
+                    on_stage('downloaded')
                 
                 try:
-                    ds = xr.open_dataset(tmp_path, engine='netcdf4')
+                    with stage_timer('netcdf_open'):
+                        ds = xr.open_dataset(tmp_path, engine='netcdf4')
                     events = self._extract_events_from_dataset(ds, file_path)
                 finally:
                     ds.close()
                     os.remove(tmp_path)
             else:
                 # Handle local files
-                ds = xr.open_dataset(file_path, engine='netcdf4')
+                with stage_timer('netcdf_open'):
+                    ds = xr.open_dataset(file_path, engine='netcdf4')
                 try:
                     events = self._extract_events_from_dataset(ds, file_path)
                 finally:
                     ds.close()
+            if on_stage:
+                on_stage('decoded')
             
             return GLMGranule(
                 path=file_path,
@@ -196,6 +207,23 @@ class GLMDataProcessor:
             logger.error(f"Failed to read GLM granule {file_path}: {e}")
             raise
     
+    def _download_s3(self, url: str) -> str:
+        """Copy an s3:// granule to a temporary file and return its path"""
+        fd, tmp_path = tempfile.mkstemp(suffix='.nc')
+        os.close(fd)
+        try:
+            if self.s3_download is not None:
+                self.s3_download(url, tmp_path)
+            else:
+                fs = fsspec.filesystem('s3', anon=True)
+                with fs.open(url, 'rb') as src, open(tmp_path, 'wb') as dst:
+                    shutil.copyfileobj(src, dst)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+        return tmp_path
+    
+    @timed('extract')
     def _extract_events_from_dataset(self, ds: xr.Dataset, src_path: str) -> List[GLMEvent]:
         """
         Extract GLM events from xarray dataset
@@ -206,10 +234,10 @@ class GLMDataProcessor:
         try:
             # Extract coordinate and energy variables
             # Try multiple possible variable names per documentation
-            lat_var = ds.get('event_lat') or ds.get('event_latitude') or ds.get('lat')
-            lon_var = ds.get('event_lon') or ds.get('event_longitude') or ds.get('lon')
-            energy_var = ds.get('event_energy') or ds.get('event_energy_j') or ds.get('energy')
-            qc_var = ds.get('event_quality_flag') or ds.get('event_quality') or ds.get('event_data_quality')
+            lat_var = self._first_variable(ds, ('event_lat', 'event_latitude', 'lat'))
+            lon_var = self._first_variable(ds, ('event_lon', 'event_longitude', 'lon'))
+            energy_var = self._first_variable(ds, ('event_energy', 'event_energy_j', 'energy'))
+            qc_var = self._first_variable(ds, ('event_quality_flag', 'event_quality', 'event_data_quality'))
             
             if lat_var is None or lon_var is None or energy_var is None:
                 logger.warning(f"Missing required variables in {src_path}")
@@ -267,6 +295,14 @@ class GLMDataProcessor:
         
         return events
     
+    @staticmethod
+    def _first_variable(ds: xr.Dataset, names: Tuple[str, ...]) -> Optional[xr.DataArray]:
+        """First of names present in the dataset (DataArrays have no truth value)"""
+        for name in names:
+            if name in ds.variables:
+                return ds[name]
+        return None
+    
     def _parse_time_variables(self, ds: xr.Dataset, src_path: str) -> Dict:
         """
         Parse time variables from GLM dataset
@@ -279,6 +315,14 @@ class GLMDataProcessor:
         }
         
         try:
+            # xarray has already decoded CF "<units> since <epoch>" times (as in
+            # operational files) to absolute datetime64 values
+            for name in ('event_time', 'event_time_offset'):
+                if name in ds.variables and np.issubdtype(ds[name].dtype, np.datetime64):
+                    time_info['base_ms'] = 0
+                    time_info['offsets'] = ds[name].astype('datetime64[ms]').astype('int64').astype('float64')
+                    return time_info
+            
             # Try event_time with reference
             if 'event_time' in ds.variables:
                 v = ds['event_time']
@@ -334,8 +378,8 @@ class GLMDataProcessor:
                         units = str(v.attrs.get('units', '')).lower()
                         
                         # Determine scale factor
-                        scale = 1.0  # Default to seconds
-                        for unit, mult in (('microsecond', 1e-3), ('millisecond', 1.0), ('second', 1.0)):
+                        scale = 1000.0  # Default to seconds
+                        for unit, mult in (('microsecond', 1e-3), ('millisecond', 1.0), ('second', 1000.0)):
                             if unit in units:
                                 scale = mult
                                 break
@@ -370,22 +414,36 @@ class GLMDataProcessor:
             end_time = datetime.utcnow()
         start_time = end_time - timedelta(minutes=time_window_minutes)
         
-        # Filter events by time window
+        # Filter events by time window, coordinates and energy
         window_events = [
-            e for e in events 
+            e for e in events
             if start_time <= e.timestamp <= end_time
+            and -90.0 <= e.lat <= 90.0 and -180.0 <= e.lon <= 180.0
+            and e.energy_j > 0
         ]
         
-        if not window_events:
+        n = len(window_events)
+        lats = np.fromiter((e.lat for e in window_events), dtype=np.float64, count=n)
+        lons = np.fromiter((e.lon for e in window_events), dtype=np.float64, count=n)
+        energy_fj = np.fromiter((e.energy_fj for e in window_events), dtype=np.float64, count=n)
+        return self.aggregate_toe_arrays(lats, lons, energy_fj)
+    
+    @timed('aggregate')
+    def aggregate_toe_arrays(self, lats: np.ndarray, lons: np.ndarray, energy_fj: np.ndarray) -> np.ndarray:
+        """
+        Aggregate columnar events (e.g. an event index window) to the TOE grid
+        Cells hold the summed energy in joules, as aggregate_toe_grid does.
+        """
+        if np.asarray(energy_fj).size == 0:
             return np.zeros((1, 1), dtype=np.float32)
         
-        # Create grid
+        energy_j = np.asarray(energy_fj, dtype=np.float64) * 1e-15
         if self.use_abi_grid:
-            return self._aggregate_to_abi_grid(window_events)
-        else:
-            return self._aggregate_to_geodetic_grid(window_events)
+            return self._aggregate_arrays_to_abi_grid(lats, lons, energy_j)
+        return self._aggregate_arrays_to_geodetic_grid(lats, lons, energy_j)
     
-    def _aggregate_to_abi_grid(self, events: List[GLMEvent]) -> np.ndarray:
+    def _aggregate_arrays_to_abi_grid(self, lats: np.ndarray, lons: np.ndarray,
+                                      energy_j: np.ndarray) -> np.ndarray:
         """Aggregate to ABI fixed grid (~2km cells)"""
         # Define grid bounds (approximate CONUS coverage)
         grid_bounds = {
@@ -402,30 +460,21 @@ class GLMDataProcessor:
         # Initialize grid
         grid = np.zeros((ny, nx), dtype=np.float32)
         
-        # Aggregate events
-        for event in events:
-            try:
-                # Transform to ABI coordinates
-                x, y = self.wgs84_to_abi.transform(event.lon, event.lat)
-                
-                if not (math.isfinite(x) and math.isfinite(y)):
-                    continue
-                
-                # Calculate grid indices
-                ix = int((x - grid_bounds['x_min']) / self.grid_cell_size_m)
-                iy = int((y - grid_bounds['y_min']) / self.grid_cell_size_m)
-                
-                # Check bounds
-                if 0 <= ix < nx and 0 <= iy < ny:
-                    grid[iy, ix] += event.energy_j
-                    
-            except Exception as e:
-                logger.warning(f"Error processing event for ABI grid: {e}")
-                continue
+        # Transform to ABI coordinates; points off the disk come back non-finite
+        x, y = self.wgs84_to_abi.transform(np.asarray(lons, dtype=np.float64), np.asarray(lats, dtype=np.float64))
+        x, y = np.asarray(x), np.asarray(y)
+        finite = np.isfinite(x) & np.isfinite(y)
+        
+        # Calculate grid indices and check bounds
+        ix = np.floor((x[finite] - grid_bounds['x_min']) / self.grid_cell_size_m).astype(np.int64)
+        iy = np.floor((y[finite] - grid_bounds['y_min']) / self.grid_cell_size_m).astype(np.int64)
+        inside = (ix >= 0) & (ix < nx) & (iy >= 0) & (iy < ny)
+        np.add.at(grid, (iy[inside], ix[inside]), energy_j[finite][inside])
         
         return grid
     
-    def _aggregate_to_geodetic_grid(self, events: List[GLMEvent]) -> np.ndarray:
+    def _aggregate_arrays_to_geodetic_grid(self, lats: np.ndarray, lons: np.ndarray,
+                                           energy_j: np.ndarray) -> np.ndarray:
         """Aggregate to geodetic grid (~2km cells at mid-latitudes)"""
         # Define grid bounds (global coverage)
         lat_min, lat_max = -90.0, 90.0
@@ -441,23 +490,21 @@ class GLMDataProcessor:
         # Initialize grid
         grid = np.zeros((nlat, nlon), dtype=np.float32)
         
-        # Aggregate events
-        for event in events:
-            try:
-                # Calculate grid indices
-                ilat = int((event.lat - lat_min) / cell_size_deg)
-                ilon = int((event.lon - lon_min) / cell_size_deg)
-                
-                # Check bounds
-                if 0 <= ilat < nlat and 0 <= ilon < nlon:
-                    grid[ilat, ilon] += event.energy_j
-                    
-            except Exception as e:
-                logger.warning(f"Error processing event for geodetic grid: {e}")
-                continue
+        # Calculate grid indices and check bounds
+        ilat = np.floor((np.asarray(lats, dtype=np.float64) - lat_min) / cell_size_deg).astype(np.int64)
+        ilon = np.floor((np.asarray(lons, dtype=np.float64) - lon_min) / cell_size_deg).astype(np.int64)
+        inside = (ilat >= 0) & (ilat < nlat) & (ilon >= 0) & (ilon < nlon)
+        np.add.at(grid, (ilat[inside], ilon[inside]), energy_j[inside])
         
         return grid
     
+    def dense_grid_nbytes(self) -> int:
+        """Bytes of the float32 grid aggregate_toe_grid allocates for a non-empty window"""
+        if self.use_abi_grid:
+            nx = ny = int(10000000 / self.grid_cell_size_m)
+            return nx * ny * 4
+        return int(180.0 / 0.018) * int(360.0 / 0.018) * 4
+    
     def get_grid_metadata(self) -> Dict:
         """Get metadata about the current grid configuration"""
         return {
@@ -0,0 +1,176 @@
+"""
+GLM TOE Granule Ingest
+The one ingest path of both the tile server (inline ingest) and the
+standalone ingest worker: skip granules already ingested, decode the rest
+while recording their freshness stages, add their events to the event
+index and register their metadata. Retention pruning and memory-budget
+eviction of the index and the granule registry live here too, so both
+processes keep the same window of data.
+"""
+
+import logging
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from typing import Callable, Collection, Dict, Iterable, List, Optional, Set, Tuple
+
+from .event_index import EventIndex
+from .freshness import FreshnessTracker
+from .glm_processor import GLMDataProcessor, GLMGranule
+from .memory import object_bytes
+from .metrics import REGISTRY, Counter, stage_timer
+from .s3_fetcher import granule_end_time, granule_start_time
+
+logger = logging.getLogger(__name__)
+
+GRANULES_INGESTED = REGISTRY.register(Counter(
+    'glm_granules_ingested_total', 'Granules decoded and indexed', ['source']
+))
+GRANULE_FAILURES = REGISTRY.register(Counter(
+    'glm_granule_failures_total', 'Granules that failed to download or decode', ['source']
+))
+EVENTS_INGESTED = REGISTRY.register(Counter(
+    'glm_events_ingested_total', 'Events added to the event index', ['source']
+))
+
+
+@dataclass
+class IngestBatch:
+    """Outcome of one index_granules call"""
+    processed: int = 0
+    failed: int = 0
+    events: int = 0
+    latest: Optional[datetime] = None  # End time of the newest granule indexed
+    created: List[Tuple[str, datetime]] = field(default_factory=list)  # (key, creation time) per granule
+
+    def counts(self) -> Dict[str, int]:
+        return {"processed": self.processed, "failed": self.failed, "events": self.events}
+
+
+def decode_granules(processor: GLMDataProcessor, keys: Iterable[str], source: str,
+                    locate: Callable[[str], str] = lambda key: key,
+                    freshness: Optional[FreshnessTracker] = None,
+                    skip: Collection[str] = ()) -> Tuple[List[Tuple[str, GLMGranule]], int]:
+    """
+    Download and decode granules not in skip; returns (key, granule) pairs and the failure count
+    Touches no shared state, so it can run on a worker thread while tiles
+    are served. locate maps a key to the path (or s3:// URL) read. A
+    granule that fails is logged and counted, and is tried again when
+    listed again.
+    """
+    mark = freshness.mark if freshness is not None else lambda key, stage, created=None: None
+    decoded, failed = [], 0
+
+    for key in keys:
+        if key in skip:
+            continue
+        mark(key, 'listed')
+        try:
+            granule = processor.read_glm_granule(
+                locate(key),
+                on_stage=lambda stage, key=key: mark(key, stage)
+            )
+        except Exception as e:
+            logger.error(f"Failed to process {source} granule {key}: {e}")
+            GRANULE_FAILURES.labels(source).inc()
+            failed += 1
+            continue
+        decoded.append((key, granule))
+
+    return decoded, failed
+
+
+def add_granules(index: EventIndex, registry: Dict[str, GLMGranule],
+                 decoded: Iterable[Tuple[str, GLMGranule]], source: str, failed: int = 0) -> IngestBatch:
+    """
+    Add decoded granules' events to index and register their metadata
+    Granules registered meanwhile (by a concurrent ingest) are skipped.
+    """
+    batch = IngestBatch(failed=failed)
+
+    for key, granule in decoded:
+        if key in registry:
+            continue
+        # Register granule (its events are held once, in the index)
+        registry[key] = replace(granule, events=[])
+        with stage_timer('index'):
+            index.add_events(granule.events)
+        GRANULES_INGESTED.labels(source).inc()
+        EVENTS_INGESTED.labels(source).inc(len(granule.events))
+
+        batch.processed += 1
+        batch.events += len(granule.events)
+        batch.created.append((key, granule.creation_time))
+        if batch.latest is None or granule.end_time > batch.latest:
+            batch.latest = granule.end_time
+
+    return batch
+
+
+def index_granules(processor: GLMDataProcessor, index: EventIndex, registry: Dict[str, GLMGranule],
+                   keys: Iterable[str], source: str, locate: Callable[[str], str] = lambda key: key,
+                   freshness: Optional[FreshnessTracker] = None, skip: Collection[str] = ()) -> IngestBatch:
+    """Decode granules not in registry or skip, then index and register them"""
+    keys = [key for key in keys if key not in registry]
+    decoded, failed = decode_granules(processor, keys, source, locate, freshness, skip)
+    return add_granules(index, registry, decoded, source, failed)
+
+
+def granule_from_key(key: str, fallback: Optional[datetime] = None) -> Optional[GLMGranule]:
+    """
+    Metadata-only granule rebuilt from the times in a GLM key
+    Keys without times (local files) get fallback as their times; None when
+    there is neither.
+    """
+    start, end = granule_start_time(key), granule_end_time(key)
+    if start is None or end is None:
+        start = end = fallback
+    if end is None:
+        return None
+    name = key.rsplit('/', 1)[-1]
+    satellite = name.split('_')[2] if name.count('_') >= 2 else ''
+    return GLMGranule(path=key, satellite=satellite, start_time=start, end_time=end,
+                      creation_time=end, events=[])
+
+
+def prune_granules(index: EventIndex, registry: Dict[str, GLMGranule], cutoff: datetime) -> int:
+    """Drop events and registered granules older than cutoff; returns the granules dropped"""
+    expired = [key for key, granule in list(registry.items()) if granule.end_time < cutoff]
+    for key in expired:
+        del registry[key]
+    index.prune(cutoff)
+    return len(expired)
+
+
+def prune_granule_keys(keys: Set[str], cutoff: datetime) -> int:
+    """Drop granule keys whose key end time is older than cutoff; returns the keys dropped"""
+    expired = [key for key in keys if (granule_end_time(key) or cutoff) < cutoff]
+    keys.difference_update(expired)
+    return len(expired)
+
+
+def oldest_buckets_cutoff(index: EventIndex, nbytes: int) -> Optional[datetime]:
+    """
+    Cutoff that drops whole index buckets, oldest first, releasing about nbytes
+    The newest bucket is always kept; None when there is nothing to drop.
+    """
+    buckets = index.buckets()
+    if len(buckets) < 2:
+        return None
+
+    estimate = 0
+    cutoff_bucket = None
+    for bucket_id, bucket in buckets[:-1]:
+        estimate += bucket.nbytes
+        cutoff_bucket = bucket_id + 1
+        if estimate >= nbytes:
+            break
+    return datetime.utcfromtimestamp(cutoff_bucket * index.bucket_ms / 1000)
+
+
+def registry_nbytes(registry: Dict[str, GLMGranule]) -> int:
+    """Bytes held by a granule registry (metadata only)"""
+    granules = list(registry.items())
+    if not granules:
+        return 0
+    key, granule = granules[0]
+    return len(granules) * (object_bytes(granule) + len(key) + 100)
@@ -0,0 +1,263 @@
+"""
+GLM TOE Ingest Worker
+Standalone process that polls S3, decodes granules and indexes their
+events, then publishes immutable versioned snapshots to the shared event
+store. Tile servers started with GLM_INGEST_MODE=external only map those
+snapshots, so ingest bursts never run on their event loop and the two
+sides scale and deploy independently.
+
+Usage:
+    python -m app.ingest_worker              # poll S3 forever
+    python -m app.ingest_worker --once       # one poll, publish, exit
+    python -m app.ingest_worker --files a.nc b.nc
+"""
+
+import argparse
+import asyncio
+import logging
+import signal
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from .config import (
+    GLM_USE_ABI_GRID, GLM_ABI_LON0, GLM_S3_BUCKET, GLM_S3_POLL_INTERVAL, GLM_S3_PREDICTIVE_POLL,
+    GLM_S3_NOTIFICATIONS, GLM_S3_RECONCILE_INTERVAL, GLM_EVENT_INDEX_BUCKET_SECONDS,
+    GLM_EVENT_RETENTION_HOURS, GLM_SHARED_STORE_DIR, GLM_MEMORY_BUDGET_MB, s3_fetcher_options
+)
+from .event_index import EventIndex
+from .freshness import FreshnessTracker
+from .glm_processor import GLMDataProcessor, GLMGranule
+from .granule_ingest import (
+    IngestBatch, granule_from_key, index_granules, oldest_buckets_cutoff, prune_granules, registry_nbytes
+)
+from .memory import MemoryBudget
+from .notifications import NotificationConsumer, NotificationSource, make_notification_source
+from .shared_store import SharedEventStore, default_shared_dir
+
+logger = logging.getLogger(__name__)
+
+
+class IngestWorker:
+    """
+    Owns the event index and publishes it after every ingest
+    Holds the shared store's owner lock for its lifetime, so at most one
+    worker (or inline-ingest tile server) publishes to a directory.
+    Granules go through the tile server's ingest path (granule_ingest), and
+    events and granules are kept for the same retention window and memory
+    budget.
+    """
+
+    def __init__(self, store: SharedEventStore, processor: GLMDataProcessor, fetcher=None,
+                 bucket_name: str = GLM_S3_BUCKET,
+                 bucket_seconds: int = GLM_EVENT_INDEX_BUCKET_SECONDS,
+                 retention: timedelta = timedelta(hours=GLM_EVENT_RETENTION_HOURS),
+                 memory_budget_mb: int = GLM_MEMORY_BUDGET_MB,
+                 notifications: Optional[NotificationSource] = None,
+                 reconcile_interval: float = GLM_S3_RECONCILE_INTERVAL):
+        self.store = store
+        self.processor = processor
+        self.fetcher = fetcher
+        self.bucket_name = bucket_name
+        self.retention = retention
+        self.reconcile_interval = reconcile_interval
+        self.index = EventIndex(bucket_seconds=bucket_seconds)
+        self.granules: Dict[str, GLMGranule] = {}
+        self.ingest_epoch: Optional[datetime] = None
+        self.ingest_epoch_seq = 0
+        self.ingest_epoch_wall: Optional[float] = None
+        self._lock = threading.Lock()  # Notification batches and reconcile polls ingest from different threads
+        self.freshness = FreshnessTracker()  # Stage times travel to readers in each manifest
+
+        self.notifications = None
+        if notifications is not None:
+            self.notifications = NotificationConsumer(notifications, bucket_name, self.notified_ingest)
+
+        # Eviction order: the oldest events, then nothing (the registry is small)
+        self.memory = MemoryBudget(max_bytes=memory_budget_mb * 1024 * 1024)
+        self.memory.register('event_store', lambda: self.index.nbytes, self.evict_oldest_events)
+        self.memory.register('granule_registry', lambda: registry_nbytes(self.granules))
+
+    def start(self):
+        """Take the owner lock and continue from the last published snapshot"""
+        if not self.store.acquire_ownership():
+            raise RuntimeError(f"Another process owns the shared event store in {self.store.directory}")
+        snapshot = self.store.refresh(force=True)
+        if snapshot:
+            self.index = snapshot.index
+            self.ingest_epoch = snapshot.ingest_epoch
+            self.ingest_epoch_seq = snapshot.ingest_epoch_seq
+            self.ingest_epoch_wall = snapshot.ingest_epoch_wall
+            for key in snapshot.granules:
+                granule = granule_from_key(key, self.ingest_epoch)
+                if granule is not None:
+                    self.granules[key] = granule
+            logger.info(f"Resumed from shared snapshot version {snapshot.version}: {len(self.index)} events")
+        if self.fetcher is not None:
+            self.fetcher.resume_after(self.bucket_name, self.granules.keys())
+
+    def ingest(self, keys: Iterable[str], source: str, locate=lambda key: key) -> IngestBatch:
+        """Decode and index granules not seen before, then publish once if any were"""
+        with self._lock:
+            batch = index_granules(
+                self.processor, self.index, self.granules, keys, source, locate, freshness=self.freshness
+            )
+            for key, created in batch.created:
+                self.freshness.mark(key, 'aggregated', created)
+            if batch.processed:
+                self.commit(batch.latest)
+        return batch
+
+    def ingest_paths(self, paths: Iterable[str], keys: Optional[Iterable[str]] = None) -> int:
+        """
+        Decode and index granules, then publish once; returns events indexed
+        keys (default: the paths) identify granules that were already ingested.
+        """
+        paths = list(paths)
+        keys = list(keys) if keys is not None else paths
+        locations = dict(zip(keys, paths))
+        batch = self.ingest(keys, 'file', locations.get)
+        logger.info(f"Processed {batch.processed} files, {batch.events} events")
+        return batch.events
+
+    def poll_s3(self, hours_back: int = 1, max_granules: int = 15) -> int:
+        """List granules after the cursor, ingest the ones not seen yet and commit the cursor"""
+        if self.fetcher is None:
+            return 0
+        listed = self.fetcher.list_new_granules(self.bucket_name, hours_back=hours_back, max_granules=max_granules)
+        if not listed:
+            return 0
+        if self.notifications is not None:
+            self.notifications.record_reconciled([key for key in listed if key not in self.granules])
+        batch = self.ingest(listed, 's3', self.s3_url)
+        done = {key for key, _ in batch.created} | self.granules.keys()
+        self.fetcher.commit_cursor(self.bucket_name, [key for key in listed if key in done])
+        return batch.events
+
+    async def notified_ingest(self, keys: List[str]) -> Dict[str, int]:
+        """Ingest granules announced by object-created notifications, off the consumer's event loop"""
+        batch = await asyncio.get_running_loop().run_in_executor(None, self.ingest, keys, 'notification', self.s3_url)
+        logger.info(f"Ingested {batch.processed} notified granules, {batch.events} events")
+        return batch.counts()
+
+    def s3_url(self, key: str) -> str:
+        return f"s3://{self.bucket_name}/{key}"
+
+    def commit(self, data_time: Optional[datetime]):
+        """Advance the ingest epoch, drop expired and over-budget events and publish a new snapshot"""
+        if data_time is not None and (self.ingest_epoch is None or data_time > self.ingest_epoch):
+            self.ingest_epoch = data_time
+        self.ingest_epoch_seq += 1
+        self.ingest_epoch_wall = time.time()
+        prune_granules(self.index, self.granules, datetime.utcnow() - self.retention)
+        self.memory.enforce()
+        version = self.store.publish(
+            self.index, self.ingest_epoch, self.ingest_epoch_seq, self.ingest_epoch_wall,
+            granules=self.granules.keys(), freshness=self.freshness.records(self.granules.keys())
+        )
+        logger.info(f"Published version {version}: epoch {self.ingest_epoch_seq} at {self.ingest_epoch}, "
+                    f"{len(self.index)} events")
+
+    def evict_oldest_events(self, nbytes: int) -> int:
+        """Drop whole index buckets, oldest first, until about nbytes are released"""
+        cutoff_time = oldest_buckets_cutoff(self.index, nbytes)
+        if cutoff_time is None:
+            return 0
+        before = self.index.nbytes
+        prune_granules(self.index, self.granules, cutoff_time)
+        logger.warning(f"Memory budget: dropped events before {cutoff_time.isoformat()}")
+        return before - self.index.nbytes
+
+    def run(self, interval: float = GLM_S3_POLL_INTERVAL, stop: Optional[threading.Event] = None,
+            predictive: bool = GLM_S3_PREDICTIVE_POLL):
+        """
+        Poll S3 until stop is set
+        Predictive polling waits until the next granule is due, at most
+        interval seconds; otherwise polls every interval seconds. With
+        notifications, messages drive ingest and the poll only reconciles
+        every reconcile_interval seconds.
+        """
+        stop = stop or threading.Event()
+        if self.notifications is not None:
+            asyncio.run(self._run_notified(stop))
+            return
+        logger.info(f"Polling {self.bucket_name} {'when granules are due, at most ' if predictive else ''}"
+                    f"every {interval}s")
+        while not stop.is_set():
+            try:
+                self.poll_s3()
+            except Exception as e:
+                logger.error(f"Error in ingest poll: {e}")
+            delay = interval
+            if predictive and self.fetcher is not None:
+                delay = self.fetcher.next_poll_delay(self.bucket_name, interval)
+            stop.wait(delay)
+
+    async def _run_notified(self, stop: threading.Event):
+        """Consume notifications, reconciling with a poll, until stop is set"""
+        loop = asyncio.get_running_loop()
+        consumer = asyncio.create_task(self.notifications.run())
+        try:
+            while not stop.is_set():
+                try:
+                    await loop.run_in_executor(None, self.poll_s3)
+                except Exception as e:
+                    logger.error(f"Error in reconciliation poll: {e}")
+                await loop.run_in_executor(None, stop.wait, self.reconcile_interval)
+        finally:
+            consumer.cancel()
+            self.notifications.source.close()
+
+    def close(self):
+        self.store.close()
+
+
+def main(argv: Optional[List[str]] = None):
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description="GLM TOE ingest worker")
+    parser.add_argument('--store-dir', default=GLM_SHARED_STORE_DIR or default_shared_dir(),
+                        help="Shared event store directory (GLM_SHARED_STORE_DIR)")
+    parser.add_argument('--bucket', default=GLM_S3_BUCKET, help="S3 bucket to poll (GLM_S3_BUCKET)")
+    parser.add_argument('--interval', type=float, default=GLM_S3_POLL_INTERVAL,
+                        help="Seconds between polls, or the longest wait when predictive (GLM_S3_POLL_INTERVAL)")
+    parser.add_argument('--once', action='store_true', help="Poll once, publish and exit")
+    parser.add_argument('--files', nargs='+', help="Ingest these granule files instead of polling")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    processor = GLMDataProcessor(use_abi_grid=GLM_USE_ABI_GRID, abi_lon0=GLM_ABI_LON0)
+    fetcher = None
+    if not args.files:
+        from .s3_fetcher import GLMS3Fetcher
+        fetcher = GLMS3Fetcher(**s3_fetcher_options())
+        processor.s3_download = fetcher.download_url
+
+    worker = IngestWorker(
+        SharedEventStore(args.store_dir),
+        processor,
+        fetcher=fetcher,
+        bucket_name=args.bucket,
+        notifications=make_notification_source(GLM_S3_NOTIFICATIONS) if fetcher is not None else None
+    )
+    worker.start()
+    try:
+        if args.files:
+            worker.ingest_paths(args.files)
+        elif args.once:
+            worker.poll_s3()
+        else:
+            stop = threading.Event()
+            signal.signal(signal.SIGTERM, lambda *_: stop.set())
+            signal.signal(signal.SIGINT, lambda *_: stop.set())
+            worker.run(args.interval, stop)
+    finally:
+        worker.close()
+
+
+if __name__ == "__main__":
+    main()
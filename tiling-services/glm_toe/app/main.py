@@ -7,19 +7,47 @@ as specified in the documentation.
 import os
 import logging
 import asyncio
-from typing import List, Optional, Dict, Any
-from datetime import datetime, timedelta
+from typing import List, Optional, Dict, Any, Tuple, Callable
+from datetime import datetime, timedelta, timezone
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import time
+import threading
+import bisect
 
-from fastapi import FastAPI, Response, HTTPException, Query, BackgroundTasks
+from fastapi import FastAPI, Response, HTTPException, Query, Header, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import uvicorn
+import httpx
+import numpy as np
 
 from .glm_processor import GLMDataProcessor, GLMEvent, GLMGranule
 from .tile_renderer import TOETileRenderer
-from .s3_fetcher import GLMS3Fetcher
+from .event_index import EventIndex
+from .mercator_pyramid import MercatorPyramid, lonlat_to_mercator_pixels
+from .render_pool import RenderPool, RenderPoolSaturated
+from .tile_cache import TileCache
+from .metrics import (
+    REGISTRY, CONTENT_TYPE, CallbackMetric, Counter, stage_timer, begin_request_timing, current_request_timing
+)
+from .profiler import SamplingProfiler, format_collapsed
+from .freshness import FreshnessTracker
+from .memory import MemoryBudget, MemoryBudgetExceeded
+from .replay import GranuleReplayer, VirtualClock, list_granules
+from .notifications import NotificationConsumer, make_notification_source
+from .tile_store import DiskTileStore
+from .shared_store import SharedEventStore, SharedSnapshot, default_shared_dir
+from .s3_fetcher import GLMS3Fetcher, granule_end_time, granule_start_time
+from .config import (
+    GLM_USE_ABI_GRID, GLM_ABI_LON0, GLM_S3_BUCKET, GLM_S3_POLL_INTERVAL, GLM_S3_PREDICTIVE_POLL,
+    GLM_S3_NOTIFICATIONS, GLM_S3_RECONCILE_INTERVAL, GLM_EVENT_INDEX_BUCKET_SECONDS,
+    GLM_EVENT_RETENTION_HOURS, GLM_SHARED_STORE_DIR, GLM_MEMORY_BUDGET_MB, s3_fetcher_options
+)
+from .granule_ingest import (
+    GRANULES_INGESTED, GRANULE_FAILURES, EVENTS_INGESTED, add_granules, decode_granules,
+    oldest_buckets_cutoff, prune_granule_keys, prune_granules, registry_nbytes
+)
 
 # Configure logging
 logging.basicConfig(
@@ -50,25 +78,67 @@ app.add_middleware(
     allow_origins=get_allowed_origins(),
     allow_credentials=False,  # Don't allow credentials for tile service
     allow_methods=["GET", "HEAD", "OPTIONS"],
-    allow_headers=["Content-Type", "X-Requested-With"],
+    allow_headers=["Content-Type", "X-Requested-With", "If-None-Match", "X-Debug-Timing"],
+    expose_headers=[
+        "ETag", "Server-Timing",
+        "X-Render-Path", "X-TOE-Encoding", "X-TOE-Log-Min", "X-TOE-Log-Max", "X-TOE-Units",
+        "X-Anim-Frames", "X-Anim-Start", "X-Anim-Step", "X-Anim-Frame-Ms"
+    ],
 )
 
 # Configuration from environment variables
-GLM_USE_ABI_GRID = os.environ.get('GLM_USE_ABI_GRID', 'true').lower() == 'true'
-GLM_ABI_LON0 = float(os.environ.get('GLM_ABI_LON0', '-75.0'))
-GLM_TILE_CACHE_SIZE = int(os.environ.get('GLM_TILE_CACHE_SIZE', '128'))
+GLM_TILE_CACHE_MB = int(os.environ.get('GLM_TILE_CACHE_MB', '256'))
+GLM_TILE_CACHE_LIVE_TTL = int(os.environ.get('GLM_TILE_CACHE_LIVE_TTL', '600'))
+GLM_TILE_CACHE_HISTORICAL_TTL = int(os.environ.get('GLM_TILE_CACHE_HISTORICAL_TTL', '86400'))
+GLM_GRANULE_CADENCE_SECONDS = int(os.environ.get('GLM_GRANULE_CADENCE_SECONDS', '20'))
+GLM_COVERAGE_GAP_SECONDS = float(os.environ.get('GLM_COVERAGE_GAP_SECONDS', '1'))  # Largest gap between contiguous granules
+GLM_TILE_STORE_PATH = os.environ.get('GLM_TILE_STORE_PATH', '')
+GLM_TILE_STORE_MB = int(os.environ.get('GLM_TILE_STORE_MB', '2048'))
 GLM_S3_POLL_ENABLED = os.environ.get('GLM_S3_POLL_ENABLED', 'false').lower() == 'true'
-GLM_S3_POLL_INTERVAL = int(os.environ.get('GLM_S3_POLL_INTERVAL', '60'))
-GLM_S3_BUCKET = os.environ.get('GLM_S3_BUCKET', 'noaa-goes18')
+GLM_PYRAMID_MAX_ZOOM = int(os.environ.get('GLM_PYRAMID_MAX_ZOOM', '5'))
+GLM_PYRAMID_CACHE_SIZE = int(os.environ.get('GLM_PYRAMID_CACHE_SIZE', '4'))
+GLM_METATILE_SIZE = int(os.environ.get('GLM_METATILE_SIZE', '8'))
+GLM_TILE_ENCODE_WORKERS = int(os.environ.get('GLM_TILE_ENCODE_WORKERS', '4'))
+GLM_POINT_RENDER_MIN_ZOOM = int(os.environ.get('GLM_POINT_RENDER_MIN_ZOOM', '10'))
+GLM_POINT_RENDER_MAX_EVENTS = int(os.environ.get('GLM_POINT_RENDER_MAX_EVENTS', '2000'))
+GLM_RENDER_WORKERS = int(os.environ.get('GLM_RENDER_WORKERS', '4'))
+GLM_RENDER_QUEUE_LIMIT = int(os.environ.get('GLM_RENDER_QUEUE_LIMIT', '64'))
+GLM_DATA_TILE_LOG_MIN = float(os.environ.get('GLM_DATA_TILE_LOG_MIN', '-1.0'))
+GLM_DATA_TILE_LOG_MAX = float(os.environ.get('GLM_DATA_TILE_LOG_MAX', '6.0'))
+GLM_EVENTS_QUERY_LIMIT = int(os.environ.get('GLM_EVENTS_QUERY_LIMIT', '10000'))
+GLM_ANIM_MAX_FRAMES = int(os.environ.get('GLM_ANIM_MAX_FRAMES', '60'))
+GLM_SHARED_STORE_POLL_MS = int(os.environ.get('GLM_SHARED_STORE_POLL_MS', '250'))
+GLM_INGEST_MODE = os.environ.get('GLM_INGEST_MODE', 'inline').lower()  # inline, or external (app.ingest_worker)
+GLM_DEBUG_TIMING_ENABLED = os.environ.get('GLM_DEBUG_TIMING_ENABLED', 'false').lower() == 'true'
+GLM_PROFILER_ENABLED = os.environ.get('GLM_PROFILER_ENABLED', 'false').lower() == 'true'
+GLM_PROFILER_MAX_SECONDS = int(os.environ.get('GLM_PROFILER_MAX_SECONDS', '60'))
+GLM_MEMORY_CHECK_SECONDS = float(os.environ.get('GLM_MEMORY_CHECK_SECONDS', '5'))
+GLM_REPLAY_DIR = os.environ.get('GLM_REPLAY_DIR', '')  # Replay archived granules instead of polling S3
+GLM_REPLAY_SPEEDUP = float(os.environ.get('GLM_REPLAY_SPEEDUP', '60'))
+GLM_REPLAY_PROBE_ZOOMS = [int(z) for z in os.environ.get('GLM_REPLAY_PROBE_ZOOMS', '4,7,10').split(',') if z]
+
+# Deepest zoom served by the tile endpoints
+MAX_TILE_ZOOM = 20
 
 # Global state
-_events: List[GLMEvent] = []
-_ingested_granules: Dict[str, GLMGranule] = {}
+_ingested_granules: Dict[str, GLMGranule] = {}  # Granule metadata only; events live in _event_index
 _processor: Optional[GLMDataProcessor] = None
 _renderer: Optional[TOETileRenderer] = None
 _s3_fetcher: Optional[GLMS3Fetcher] = None
+_tile_store: Optional[DiskTileStore] = None  # Shared on-disk tier for immutable tiles
+_shared_store: Optional[SharedEventStore] = None  # Event store shared by all workers on the host
+_shared_granules: set = set()  # Granule keys ingested by the shared store owner
+_events_version = 0  # Bumped whenever events are dropped or a snapshot is adopted
+_ingest_epoch: Optional[datetime] = None  # Timestamp of the latest ingested granule
+_ingest_epoch_seq = 0  # Bumped whenever an ingest adds events
+_ingest_epoch_wall: Optional[float] = None  # Wall clock (time.time()) of the last epoch advance
+_granule_coverage: Optional[List[Tuple[datetime, datetime]]] = None  # Merged spans of ingested granules
+_clock: Optional[VirtualClock] = None  # Replay clock; "now" is the wall clock when None
+_replayer: Optional[GranuleReplayer] = None
+_notifications: Optional[NotificationConsumer] = None
+_notification_task: Optional[asyncio.Task] = None
 
-# LRU cache for rendered tiles
+# Count-bounded LRU cache (pyramids)
 class LRUCache:
     def __init__(self, max_items: int = 128):
         self.max_items = max_items
@@ -92,7 +162,72 @@ class LRUCache:
         
         self.cache[key] = value
 
-_tile_cache = LRUCache(max_items=GLM_TILE_CACHE_SIZE)
+# Byte-budgeted cache for encoded tiles (image, data and animation)
+_tile_cache = TileCache(max_bytes=GLM_TILE_CACHE_MB * 1024 * 1024)
+
+# Low-zoom Mercator pyramids, keyed by time window and event version
+_pyramid_cache = LRUCache(max_items=GLM_PYRAMID_CACHE_SIZE)
+_pyramid_lock = threading.Lock()
+
+# Time-bucketed, Morton-sorted event store behind every render path and query
+_event_index = EventIndex(bucket_seconds=GLM_EVENT_INDEX_BUCKET_SECONDS)
+
+# CPU-bound render work runs here, off the event loop
+_render_pool = RenderPool(max_workers=GLM_RENDER_WORKERS, max_queue=GLM_RENDER_QUEUE_LIMIT)
+
+# Granule downloads and decodes run here, one batch at a time, off the event loop
+_ingest_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='glm-ingest')
+
+# Metatile renders in flight, so concurrent neighbours share one render
+_inflight_metatiles: Dict[str, asyncio.Future] = {}
+
+# Granule creation -> first tile served
+_freshness = FreshnessTracker()
+
+# On-demand stack sampling (GET /admin/profile)
+_profiler = SamplingProfiler()
+
+# Global memory budget; components are evicted in registration order
+_memory = MemoryBudget(max_bytes=GLM_MEMORY_BUDGET_MB * 1024 * 1024)
+
+# Prometheus metrics (stage latencies live in metrics.STAGE_SECONDS)
+TILE_RESPONSES = REGISTRY.register(Counter(
+    'glm_tile_responses_total', 'Tile responses by kind (tile, data, anim), cache tier and status',
+    ['kind', 'cache', 'status']
+))
+REGISTRY.register(CallbackMetric(
+    'glm_events_indexed', 'Events currently held by the event index', lambda: len(_event_index)
+))
+REGISTRY.register(CallbackMetric(
+    'glm_ingest_epoch_sequence', 'Ingest epoch sequence number', lambda: _ingest_epoch_seq
+))
+REGISTRY.register(CallbackMetric(
+    'glm_tile_cache_bytes', 'Bytes held by the tile cache', lambda: _tile_cache.bytes
+))
+REGISTRY.register(CallbackMetric(
+    'glm_tile_cache_entries', 'Entries held by the tile cache', lambda: len(_tile_cache)
+))
+REGISTRY.register(CallbackMetric(
+    'glm_tile_cache_operations_total', 'Tile cache lookups and removals by outcome',
+    lambda: {(outcome,): getattr(_tile_cache, outcome)
+             for outcome in ('hits', 'misses', 'inserts', 'evictions', 'expirations', 'rejected')},
+    labelnames=['outcome'], kind='counter'
+))
+REGISTRY.register(CallbackMetric(
+    'glm_memory_bytes', 'Bytes held by each accounted component',
+    lambda: {(name,): nbytes for name, nbytes in _memory.usage().items()},
+    labelnames=['component']
+))
+REGISTRY.register(CallbackMetric(
+    'glm_render_queue_depth', 'Render jobs waiting for a worker', lambda: _render_pool.queued
+))
+REGISTRY.register(CallbackMetric(
+    'glm_render_active', 'Render jobs running', lambda: _render_pool.active
+))
+REGISTRY.register(CallbackMetric(
+    'glm_render_rejected_total', 'Render jobs rejected because the queue was full',
+    lambda: _render_pool.rejected, kind='counter'
+))
 
 # Pydantic models
 class Event(BaseModel):
@@ -123,9 +258,13 @@ class TileRequest(BaseModel):
 @app.on_event("startup")
 async def startup_event():
     """Initialize the service on startup"""
-    global _processor, _renderer, _s3_fetcher
+    global _processor, _renderer, _s3_fetcher, _tile_store, _shared_store, _clock, _replayer, _freshness
     
     try:
+        # Metatiles are aligned NxN blocks of the 2^z x 2^z tile grid
+        if GLM_METATILE_SIZE < 1 or GLM_METATILE_SIZE & (GLM_METATILE_SIZE - 1):
+            raise ValueError(f"GLM_METATILE_SIZE must be a power of two >= 1, got {GLM_METATILE_SIZE}")
+        
         # Initialize GLM processor
         _processor = GLMDataProcessor(
             use_abi_grid=GLM_USE_ABI_GRID,
@@ -133,26 +272,86 @@ async def startup_event():
         )
         
         # Initialize tile renderer
-        _renderer = TOETileRenderer(tile_size=256)
+        _renderer = TOETileRenderer(tile_size=256, encode_workers=GLM_TILE_ENCODE_WORKERS)
         _renderer.set_transformers(
             _processor.wgs84_crs,
             _processor.web_mercator_crs,
             _processor.wgs84_to_web_mercator
         )
         
-        # Initialize S3 fetcher
-        _s3_fetcher = GLMS3Fetcher()
+        # Initialize S3 fetcher; granule reads go through its hedged, retried downloads
+        _s3_fetcher = GLMS3Fetcher(**s3_fetcher_options())
+        _processor.s3_download = _s3_fetcher.download_url
+        
+        # Open the shared disk tier (every worker on the host uses the same file)
+        if GLM_TILE_STORE_PATH and _tile_store is None:
+            _tile_store = DiskTileStore(GLM_TILE_STORE_PATH, max_bytes=GLM_TILE_STORE_MB * 1024 * 1024)
+            logger.info(f"Disk tile store at {GLM_TILE_STORE_PATH} ({GLM_TILE_STORE_MB} MB cap)")
+        
+        # Join the shared event store: one process owns ingest, the rest map its snapshots.
+        # With external ingest every server worker is a read-only reader.
+        if (GLM_SHARED_STORE_DIR or GLM_INGEST_MODE == 'external') and _shared_store is None:
+            store_dir = GLM_SHARED_STORE_DIR or default_shared_dir()
+            _shared_store = SharedEventStore(store_dir)
+            owner = GLM_INGEST_MODE != 'external' and _shared_store.acquire_ownership()
+            snapshot = _shared_store.refresh(force=True)
+            if snapshot:
+                adopt_shared_snapshot(snapshot, track_freshness=False)
+            if not owner:
+                asyncio.create_task(shared_store_sync_task())
+            logger.info(f"Shared event store at {store_dir} as {'owner' if owner else 'reader'}")
         
         logger.info("GLM TOE Service initialized successfully")
         
-        # Start S3 polling if enabled
-        if GLM_S3_POLL_ENABLED:
-            asyncio.create_task(s3_polling_task())
+        # Replay archived granules on a virtual clock; replaces S3 polling
+        if GLM_REPLAY_DIR and _replayer is None:
+            if not is_ingest_owner():
+                logger.warning("GLM_REPLAY_DIR ignored: this worker does not own ingest")
+            else:
+                granules = list_granules(GLM_REPLAY_DIR)
+                if granules:
+                    _clock = VirtualClock(granules[0][0], GLM_REPLAY_SPEEDUP)
+                    _freshness = FreshnessTracker(clock=_clock.timestamp)
+                    _replayer = GranuleReplayer(granules, _clock, replay_ingest, probe=probe_live_tiles)
+                    asyncio.create_task(_replayer.run())
+                    logger.info(f"Replaying {len(granules)} granules from {GLM_REPLAY_DIR} at {GLM_REPLAY_SPEEDUP}x")
+                else:
+                    logger.warning(f"No granules to replay in {GLM_REPLAY_DIR}")
+        
+        # Start S3 notifications or polling if enabled (only the ingest owner ingests)
+        elif is_ingest_owner():
+            start_s3_ingest()
+        
+        if _memory.max_bytes:
+            asyncio.create_task(memory_budget_task())
+            logger.info(f"Memory budget {GLM_MEMORY_BUDGET_MB} MB")
             
     except Exception as e:
         logger.error(f"Failed to initialize service: {e}")
         raise
 
+# Shutdown event
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release renderer resources on shutdown"""
+    global _tile_store, _shared_store, _notifications, _notification_task
+    
+    if _notification_task:
+        _notification_task.cancel()
+        _notification_task = None
+    if _notifications:
+        _notifications.source.close()
+        _notifications = None
+    if _renderer:
+        _renderer.close()
+    _render_pool.shutdown()
+    if _tile_store:
+        _tile_store.close()
+        _tile_store = None
+    if _shared_store:
+        _shared_store.close()
+        _shared_store = None
+
 # Health check endpoint
 @app.get("/health")
 async def health_check():
@@ -161,14 +360,61 @@ async def health_check():
         "status": "healthy",
         "service": "GLM TOE Service",
         "version": "1.0.0",
-        "events_count": len(_events),
-        "granules_count": len(_ingested_granules),
-        "cache_size": len(_tile_cache.cache),
+        "events_count": len(_event_index),
+        "granules_count": len(_ingested_granules) or len(_shared_granules),
+        "cache_size": len(_tile_cache),
+        "render_queue_depth": _render_pool.queued,
         "processor_ready": _processor is not None,
         "renderer_ready": _renderer is not None,
         "s3_fetcher_ready": _s3_fetcher is not None
     }
 
+# Metrics endpoint
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics for this worker process"""
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
+
+# Sampling profiler endpoint
+@app.get("/admin/profile")
+async def capture_profile(
+    seconds: float = Query(10.0, description="Capture duration in seconds"),
+    hz: int = Query(100, description="Samples per second")
+):
+    """
+    Sample every thread of this worker and return collapsed stacks
+    The output feeds flamegraph.pl or speedscope directly.
+    """
+    if not GLM_PROFILER_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiler is disabled (GLM_PROFILER_ENABLED)")
+    if not 0 < seconds <= GLM_PROFILER_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be in (0, {GLM_PROFILER_MAX_SECONDS}]")
+    if not 1 <= hz <= 1000:
+        raise HTTPException(status_code=400, detail="hz must be between 1 and 1000")
+    
+    try:
+        # Sample from a thread of its own so the event loop keeps serving (and is sampled)
+        stacks = await asyncio.get_running_loop().run_in_executor(None, _profiler.capture, seconds, 1.0 / hz)
+    except Exception as e:
+        logger.error(f"Error capturing profile: {e}")
+        raise HTTPException(status_code=500, detail=f"Profile capture failed: {str(e)}")
+    if stacks is None:
+        raise HTTPException(status_code=409, detail="A profile capture is already running")
+    
+    return Response(
+        content=format_collapsed(stacks),
+        media_type="text/plain",
+        headers={"Content-Disposition": f'attachment; filename="glm-toe-{os.getpid()}-{int(time.time())}.folded"'}
+    )
+
+# Replay progress endpoint
+@app.get("/replay/status")
+async def replay_status():
+    """Replay progress, sustained ingest rate and live-tile latency"""
+    if _replayer is None:
+        raise HTTPException(status_code=404, detail="No replay running (GLM_REPLAY_DIR)")
+    return _replayer.get_stats()
+
 # Service status endpoint
 @app.get("/status")
 async def service_status():
@@ -178,11 +424,25 @@ async def service_status():
     
     return {
         "processor_config": _processor.get_grid_metadata(),
-        "events_count": len(_events),
-        "granules_count": len(_ingested_granules),
-        "cache_stats": {
-            "size": len(_tile_cache.cache),
-            "max_size": _tile_cache.max_items
+        "events_count": len(_event_index),
+        "granules_count": len(_ingested_granules) or len(_shared_granules),
+        "cache_stats": _tile_cache.get_stats(),
+        "tile_store": _tile_store.get_stats() if _tile_store else None,
+        "shared_store": _shared_store.get_stats() if _shared_store else None,
+        "freshness": _freshness.get_stats(),
+        "memory": _memory.get_stats(),
+        "replay": _replayer.get_stats() if _replayer else None,
+        "notifications": _notifications.get_stats() if _notifications else None,
+        "render_pool": _render_pool.get_stats(),
+        "event_index": _event_index.get_stats(),
+        "ingest_epoch": {
+            "timestamp": _ingest_epoch.isoformat() if _ingest_epoch else None,
+            "sequence": _ingest_epoch_seq
+        },
+        "pyramid_stats": {
+            "max_zoom": GLM_PYRAMID_MAX_ZOOM,
+            "cached": len(_pyramid_cache.cache),
+            "nbytes": get_pyramid_cache_nbytes()
         },
         "s3_status": _s3_fetcher.get_available_buckets() if _s3_fetcher else None
     }
@@ -196,7 +456,10 @@ async def get_tile(
     window: Optional[str] = Query(None, description="Time window (e.g., 1m, 5m, 300s)"),
     t: Optional[str] = Query(None, description="End time ISO8601 (UTC)"),
     qc: bool = Query(False, description="Enable quality filtering"),
-    grid_type: str = Query("auto", description="Grid type: auto, abi, geodetic")
+    grid_type: str = Query("auto", deprecated=True,
+                           description="Ignored: tiles are rendered from the configured grid (GLM_USE_ABI_GRID)"),
+    if_none_match: Optional[str] = Header(None),
+    x_debug_timing: Optional[str] = Header(None)
 ):
     """
     Get TOE heatmap tile
@@ -204,62 +467,301 @@ async def get_tile(
     """
     if not _processor or not _renderer:
         raise HTTPException(status_code=503, detail="Service not initialized")
+    validate_tile(z, x, y)
+    if GLM_DEBUG_TIMING_ENABLED and x_debug_timing:
+        begin_request_timing()
     
     try:
         # Parse time window
         window_minutes = parse_time_window(window)
         
-        # Parse end time
-        end_time = parse_end_time(t)
+        # Parse end time; "now" is pinned to the latest ingested data
+        end_time, time_token = resolve_end_time(t)
         
         # Create cache key
-        cache_key = f"{z}/{x}/{y}?w={window_minutes}&t={end_time.isoformat() if end_time else 'now'}&qc={int(qc)}&g={grid_type}"
-        
-        # Check cache
-        cached_tile = _tile_cache.get(cache_key)
-        if cached_tile:
-            return Response(
-                content=cached_tile,
-                media_type="image/png",
-                headers={"X-Cache": "HIT", "X-Tile-Info": f"z{z}x{x}y{y}"}
-            )
+        immutable = is_complete_window(t, *window_bounds(window_minutes, end_time))
+        cache_token = cache_time_token(time_token, immutable)
+        cache_key = tile_cache_key(z, x, y, window_minutes, cache_token, qc)
         
-        # Generate tile
-        tile_data = await generate_tile(z, x, y, window_minutes, end_time, qc, grid_type)
+        # Check cache; a matching If-None-Match is answered without the renderer
+        cached = lookup_tile(cache_key)
+        if cached:
+            cached_tile, etag = cached
+            return tile_response(cached_tile, "image/png", etag, {
+                "X-Cache": "HIT",
+                "X-Tile-Info": f"z{z}x{x}y{y}",
+                "Cache-Control": tile_cache_control(t, *window_bounds(window_minutes, end_time))
+            }, if_none_match, live=is_current_epoch(time_token))
         
-        # Cache tile
-        _tile_cache.set(cache_key, tile_data)
+        # Immutable tiles may already be on disk (rendered earlier or by another worker)
+        stored = await read_through_disk(cache_key, immutable, tile_cache_ttl(immutable))
+        if stored:
+            return tile_response(stored[0], "image/png", stored[1], {
+                "X-Cache": "DISK",
+                "X-Tile-Info": f"z{z}x{x}y{y}",
+                "Cache-Control": tile_cache_control(t, *window_bounds(window_minutes, end_time))
+            }, if_none_match, live=is_current_epoch(time_token))
         
         # Set response headers
         headers = {
             "X-Cache": "MISS",
             "X-Tile-Info": f"z{z}x{x}y{y}",
-            "X-Time-Window": f"{window_minutes}m",
-            "X-Grid-Type": grid_type
+            "X-Time-Window": f"{window_minutes}m"
         }
         
-        if end_time:
-            headers["Cache-Control"] = "public, max-age=300"
+        # Sparse high-zoom tiles take the indexed point path
+        point_tile = None
+        if z >= GLM_POINT_RENDER_MIN_ZOOM:
+            event_count, point_tile = await _render_pool.run(
+                _render_point_tile_if_sparse, z, x, y, window_minutes, end_time, qc
+            )
+            headers["X-Render-Path"] = render_path_header(
+                "point" if point_tile is not None else "grid", event_count
+            )
+        else:
+            headers["X-Render-Path"] = render_path_header("grid")
         
-        return Response(
-            content=tile_data,
-            media_type="image/png",
-            headers=headers
-        )
+        if point_tile is not None:
+            tile_data = point_tile
+            etag = store_tile(cache_key, tile_data, immutable)
+        elif GLM_METATILE_SIZE > 1:
+            # Render the whole metatile and cache every tile in it
+            n, tiles = await generate_metatile(z, x, y, window_minutes, end_time, qc)
+            for (tx, ty), data in tiles.items():
+                tag = store_tile(tile_cache_key(z, tx, ty, window_minutes, cache_token, qc), data, immutable)
+                if (tx, ty) == (x, y):
+                    etag = tag
+            tile_data = tiles[(x, y)]
+            headers["X-Metatile"] = f"{n}x{n}"
+        else:
+            # Generate tile
+            tile_data = await generate_tile(z, x, y, window_minutes, end_time, qc)
+            
+            # Cache tile
+            etag = store_tile(cache_key, tile_data, immutable)
         
+        headers["Cache-Control"] = tile_cache_control(t, *window_bounds(window_minutes, end_time))
+        return tile_response(tile_data, "image/png", etag, headers, if_none_match, live=is_current_epoch(time_token))
+        
+    except (RenderPoolSaturated, MemoryBudgetExceeded) as e:
+        logger.warning(f"Rejected tile {z}/{x}/{y}: {e}")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         logger.error(f"Error generating tile {z}/{x}/{y}: {e}")
         raise HTTPException(status_code=500, detail=f"Tile generation failed: {str(e)}")
 
+# Raw data tile endpoint
+@app.get("/tiles/{z}/{x}/{y}/data.png")
+async def get_data_tile(
+    z: int,
+    x: int,
+    y: int,
+    window: Optional[str] = Query(None, description="Time window (e.g., 1m, 5m, 300s)"),
+    t: Optional[str] = Query(None, description="End time ISO8601 (UTC)"),
+    qc: bool = Query(False, description="Enable quality filtering"),
+    bits: int = Query(16, description="Quantization depth: 8 or 16"),
+    format: str = Query("png", description="Encoding: png or bin"),
+    if_none_match: Optional[str] = Header(None)
+):
+    """
+    Get raw TOE data tile for client-side colorization
+    Values are log10-quantized femtojoules; one cached data tile serves
+    every color ramp, threshold and opacity on the client.
+    """
+    if not _processor or not _renderer:
+        raise HTTPException(status_code=503, detail="Service not initialized")
+    validate_tile(z, x, y)
+    if bits not in (8, 16):
+        raise HTTPException(status_code=400, detail="bits must be 8 or 16")
+    if format not in ("png", "bin"):
+        raise HTTPException(status_code=400, detail="format must be png or bin")
+    
+    try:
+        window_minutes = parse_time_window(window)
+        end_time, time_token = resolve_end_time(t)
+        immutable = is_complete_window(t, *window_bounds(window_minutes, end_time))
+        
+        cache_key = (
+            f"data/{z}/{x}/{y}?w={window_minutes}&t={cache_time_token(time_token, immutable)}"
+            f"&qc={int(qc)}&b={bits}&f={format}"
+        )
+        
+        headers = {
+            "X-Tile-Info": f"z{z}x{x}y{y}",
+            "X-Time-Window": f"{window_minutes}m",
+            "X-TOE-Encoding": f"log10-uint{bits}",
+            "X-TOE-Log-Min": str(GLM_DATA_TILE_LOG_MIN),
+            "X-TOE-Log-Max": str(GLM_DATA_TILE_LOG_MAX),
+            "X-TOE-Units": "fJ"
+        }
+        media_type = "image/png" if format == "png" else "application/octet-stream"
+        
+        headers["Cache-Control"] = tile_cache_control(t, *window_bounds(window_minutes, end_time))
+        
+        cached = lookup_tile(cache_key)
+        if cached:
+            headers["X-Cache"] = "HIT"
+            return tile_response(cached[0], media_type, cached[1], headers, if_none_match, kind="data", live=is_current_epoch(time_token))
+        
+        stored = await read_through_disk(cache_key, immutable, tile_cache_ttl(immutable))
+        if stored:
+            headers["X-Cache"] = "DISK"
+            return tile_response(stored[0], media_type, stored[1], headers, if_none_match, kind="data", live=is_current_epoch(time_token))
+        
+        tile_data = await _render_pool.run(
+            _render_data_tile, z, x, y, window_minutes, end_time, qc, format, bits
+        )
+        etag = store_tile(cache_key, tile_data, immutable)
+        
+        headers["X-Cache"] = "MISS"
+        return tile_response(tile_data, media_type, etag, headers, if_none_match, kind="data", live=is_current_epoch(time_token))
+        
+    except RenderPoolSaturated as e:
+        logger.warning(f"Rejected data tile {z}/{x}/{y}: {e}")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except Exception as e:
+        logger.error(f"Error generating data tile {z}/{x}/{y}: {e}")
+        raise HTTPException(status_code=500, detail=f"Data tile generation failed: {str(e)}")
+
+# Animation endpoint
+ANIM_MEDIA_TYPES = {"png": "image/apng", "webp": "image/webp", "sprite": "image/png"}
+
+@app.get("/tiles/{z}/{x}/{y}/anim")
+async def get_anim_tile(
+    z: int,
+    x: int,
+    y: int,
+    start: Optional[str] = Query(None, description="End time of the first frame, ISO8601 (UTC)"),
+    end: Optional[str] = Query(None, description="End time of the last frame, ISO8601 (UTC)"),
+    step: Optional[str] = Query("1m", description="Time between frames (e.g., 1m, 5m)"),
+    window: Optional[str] = Query(None, description="Time window of each frame (e.g., 1m, 5m)"),
+    fps: float = Query(4.0, description="Playback rate in frames per second"),
+    format: str = Query("png", description="Encoding: png (APNG), webp or sprite"),
+    if_none_match: Optional[str] = Header(None)
+):
+    """
+    Get a time-lapse of tile z/x/y as one animated image
+    Frames share per-slice partial grids, so N frames cost one pass over
+    the events in the tile rather than N full aggregations.
+    """
+    if not _processor or not _renderer:
+        raise HTTPException(status_code=503, detail="Service not initialized")
+    validate_tile(z, x, y)
+    if format not in ANIM_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="format must be png, webp or sprite")
+    if not 0 < fps <= 60:
+        raise HTTPException(status_code=400, detail="fps must be in (0, 60]")
+    
+    window_minutes = parse_time_window(window)
+    step_minutes = parse_time_window(step)
+    require_time(end, "end")
+    end_time, time_token = resolve_end_time(end)
+    start_time = require_time(start, "start") or end_time - timedelta(minutes=step_minutes * 11)
+    if start_time > end_time:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    frames = int((end_time - start_time) // timedelta(minutes=step_minutes)) + 1
+    if frames > GLM_ANIM_MAX_FRAMES:
+        raise HTTPException(status_code=400, detail=f"Animation would have {frames} frames (max {GLM_ANIM_MAX_FRAMES})")
+    
+    try:
+        frame_ms = int(round(1000 / fps))
+        immutable = is_complete_window(end, start_time - timedelta(minutes=window_minutes), end_time)
+        cache_key = (
+            f"anim/{z}/{x}/{y}?t={cache_time_token(time_token, immutable)}&s={start_time.isoformat()}&n={frames}&st={step_minutes}"
+            f"&w={window_minutes}&fps={frame_ms}&f={format}"
+        )
+        headers = {
+            "X-Tile-Info": f"z{z}x{x}y{y}",
+            "X-Time-Window": f"{window_minutes}m",
+            "X-Anim-Frames": str(frames),
+            "X-Anim-Start": start_time.isoformat(),
+            "X-Anim-Step": f"{step_minutes}m",
+            "X-Anim-Frame-Ms": str(frame_ms),
+            "Cache-Control": tile_cache_control(end, start_time - timedelta(minutes=window_minutes), end_time)
+        }
+        
+        cached = lookup_tile(cache_key)
+        if cached:
+            headers["X-Cache"] = "HIT"
+            return tile_response(cached[0], ANIM_MEDIA_TYPES[format], cached[1], headers, if_none_match, kind="anim", live=is_current_epoch(time_token))
+        
+        stored = await read_through_disk(cache_key, immutable, tile_cache_ttl(immutable))
+        if stored:
+            headers["X-Cache"] = "DISK"
+            return tile_response(stored[0], ANIM_MEDIA_TYPES[format], stored[1], headers, if_none_match, kind="anim", live=is_current_epoch(time_token))
+        
+        data = await _render_pool.run(
+            _render_animation, z, x, y, start_time, frames, step_minutes, window_minutes, format, frame_ms
+        )
+        etag = store_tile(cache_key, data, immutable)
+        
+        headers["X-Cache"] = "MISS"
+        return tile_response(data, ANIM_MEDIA_TYPES[format], etag, headers, if_none_match, kind="anim", live=is_current_epoch(time_token))
+        
+    except RenderPoolSaturated as e:
+        logger.warning(f"Rejected animation {z}/{x}/{y}: {e}")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except Exception as e:
+        logger.error(f"Error generating animation {z}/{x}/{y}: {e}")
+        raise HTTPException(status_code=500, detail=f"Animation generation failed: {str(e)}")
+
+# Event query endpoint
+@app.get("/events")
+async def query_events(
+    bbox: str = Query(..., description="Bounding box: minlon,minlat,maxlon,maxlat"),
+    window: Optional[str] = Query(None, description="Time window (e.g., 1m, 5m, 300s)"),
+    t: Optional[str] = Query(None, description="End time ISO8601 (UTC)"),
+    limit: int = Query(1000, description="Maximum events returned (newest first)")
+):
+    """Get events inside a bounding box from the spatio-temporal index"""
+    try:
+        lon_min, lat_min, lon_max, lat_max = (float(v) for v in bbox.split(','))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bbox must be minlon,minlat,maxlon,maxlat")
+    if lon_min > lon_max or lat_min > lat_max:
+        raise HTTPException(status_code=400, detail="bbox min must not exceed max")
+    if not 1 <= limit <= GLM_EVENTS_QUERY_LIMIT:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {GLM_EVENTS_QUERY_LIMIT}")
+
+    try:
+        window_minutes = parse_time_window(window)
+        start, end = window_bounds(window_minutes, resolve_end_time(t)[0])
+
+        found = await _render_pool.run(
+            _event_index.bbox_events, lon_min, lat_min, lon_max, lat_max, start, end, limit
+        )
+        return {
+            "bbox": [lon_min, lat_min, lon_max, lat_max],
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "count": int(found['energy_fj'].size),
+            "events": [
+                {
+                    "lat": round(float(lat), 6),
+                    "lon": round(float(lon), 6),
+                    "energy_fj": float(energy),
+                    "timestamp": datetime.utcfromtimestamp(ms / 1000).isoformat()
+                }
+                for lat, lon, energy, ms in zip(found['lat'], found['lon'], found['energy_fj'], found['time_ms'])
+            ]
+        }
+
+    except RenderPoolSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except Exception as e:
+        logger.error(f"Error querying events: {e}")
+        raise HTTPException(status_code=500, detail=f"Event query failed: {str(e)}")
+
 # Event ingestion endpoint
 @app.post("/ingest")
 async def ingest_events(events: List[Event]):
     """Ingest GLM events"""
     if not _processor:
         raise HTTPException(status_code=503, detail="Service not initialized")
+    require_ingest_owner()
     
     try:
-        count = 0
+        new_events = []
         for event_data in events:
             # Validate coordinates
             if not (-90 <= event_data.lat <= 90 and -180 <= event_data.lon <= 180):
@@ -274,18 +776,26 @@ async def ingest_events(events: List[Event]):
                 lat=event_data.lat,
                 lon=event_data.lon,
                 energy_j=event_data.energy_j,
-                timestamp=event_data.timestamp or datetime.utcnow(),
+                timestamp=event_data.timestamp or service_now(),
                 quality_flag=event_data.quality_flag
             )
             
-            _events.append(event)
-            count += 1
+            new_events.append(event)
+        
+        count = len(new_events)
+        with stage_timer('index'):
+            _event_index.add_events(new_events)
+        EVENTS_INGESTED.labels("api").inc(count)
+        if new_events:
+            advance_ingest_epoch(max(event.timestamp for event in new_events))
         
         # Prune old events
         prune_old_events()
+        _memory.enforce()
+        publish_shared_snapshot()
         
         logger.info(f"Ingested {count} events")
-        return {"status": "success", "ingested": count, "total_events": len(_events)}
+        return {"status": "success", "ingested": count, "total_events": len(_event_index)}
         
     except Exception as e:
         logger.error(f"Error ingesting events: {e}")
@@ -297,40 +807,16 @@ async def ingest_files(request: IngestFilesRequest):
     """Ingest GLM granules from files or S3"""
     if not _processor:
         raise HTTPException(status_code=503, detail="Service not initialized")
+    require_ingest_owner()
     
     try:
-        total_events = 0
-        processed_files = 0
-        
-        for file_path in request.paths:
-            try:
-                # Read granule
-                granule = _processor.read_glm_granule(file_path)
-                
-                # Store granule
-                _ingested_granules[file_path] = granule
-                
-                # Add events
-                for event in granule.events:
-                    _events.append(event)
-                
-                total_events += len(granule.events)
-                processed_files += 1
-                
-                logger.info(f"Processed {file_path}: {len(granule.events)} events")
-                
-            except Exception as e:
-                logger.error(f"Failed to process {file_path}: {e}")
-                continue
-        
-        # Prune old events
-        prune_old_events()
+        result = await ingest_granules(request.paths, "file")
         
-        logger.info(f"Processed {processed_files} files, total events: {total_events}")
+        logger.info(f"Processed {result['processed']} files, total events: {result['events']}")
         return {
             "status": "success",
-            "processed_files": processed_files,
-            "total_events": total_events,
+            "processed_files": result['processed'],
+            "total_events": result['events'],
             "total_files": len(request.paths)
         }
         
@@ -348,6 +834,7 @@ async def ingest_from_s3(
     """Ingest GLM granules from S3"""
     if not _s3_fetcher:
         raise HTTPException(status_code=503, detail="S3 fetcher not available")
+    require_ingest_owner()
     
     try:
         # Get latest granules
@@ -360,41 +847,13 @@ async def ingest_from_s3(
         if not granule_keys:
             return {"status": "no_granules", "message": "No granules found"}
         
-        # Process granules
-        total_events = 0
-        processed_granules = 0
-        
-        for key in granule_keys:
-            try:
-                # Skip if already processed
-                if key in _ingested_granules:
-                    continue
-                
-                # Read granule directly from S3
-                granule = _processor.read_glm_granule(f"s3://{bucket_name}/{key}")
-                
-                # Store granule
-                _ingested_granules[key] = granule
-                
-                # Add events
-                for event in granule.events:
-                    _events.append(event)
-                
-                total_events += len(granule.events)
-                processed_granules += 1
-                
-            except Exception as e:
-                logger.error(f"Failed to process S3 granule {key}: {e}")
-                continue
-        
-        # Prune old events
-        prune_old_events()
+        result = await ingest_granules(granule_keys, "s3", lambda key: f"s3://{bucket_name}/{key}")
         
-        logger.info(f"Processed {processed_granules} S3 granules, total events: {total_events}")
+        logger.info(f"Processed {result['processed']} S3 granules, total events: {result['events']}")
         return {
             "status": "success",
-            "processed_granules": processed_granules,
-            "total_events": total_events,
+            "processed_granules": result['processed'],
+            "total_events": result['events'],
             "bucket": bucket_name,
             "time_window_hours": hours_back
         }
@@ -403,6 +862,58 @@ async def ingest_from_s3(
         logger.error(f"Error ingesting from S3: {e}")
         raise HTTPException(status_code=500, detail=f"S3 ingestion failed: {str(e)}")
 
+async def ingest_granules(keys: List[str], source: str,
+                          locate: Callable[[str], str] = lambda key: key) -> Dict[str, int]:
+    """
+    Ingest granules not seen before, then advance the epoch, prune and publish
+    Shared by the S3 poller, notifications, replay and file ingest; locate
+    maps a key to the path read. Downloads and decodes run on the ingest
+    thread so tiles keep being served; indexing and publishing run back on
+    the event loop. Returns counts of processed and failed granules and
+    ingested events.
+    """
+    new_keys = [key for key in keys if key not in _ingested_granules and key not in _shared_granules]
+    decoded, failed = await asyncio.get_running_loop().run_in_executor(
+        _ingest_executor, decode_granules, _processor, new_keys, source, locate, _freshness
+    )
+    batch = add_granules(_event_index, _ingested_granules, decoded, source, failed)
+    if batch.processed:
+        advance_ingest_epoch(batch.latest)
+    
+    for key, created in batch.created:
+        _freshness.mark(key, 'aggregated', created)
+    
+    # Prune old events
+    prune_old_events()
+    _memory.enforce()
+    publish_shared_snapshot()
+    
+    return batch.counts()
+
+async def replay_ingest(paths: List[str]) -> Dict[str, int]:
+    """Replay batch: the S3 poller's ingest path, reading local files"""
+    result = await ingest_granules(paths, "replay")
+    logger.info(f"Replayed {result['processed']} granules, total events: {result['events']}")
+    return result
+
+async def probe_live_tiles() -> List[float]:
+    """Request live tiles over the newest lightning, one per probe zoom; returns latencies in seconds"""
+    end = live_end_time()
+    newest = _event_index.bbox_events(-180.0, -90.0, 180.0, 90.0, end - timedelta(minutes=1), end, limit=1)
+    if newest['lat'].size == 0:
+        return []
+    
+    latencies = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://replay") as client:
+        for z in GLM_REPLAY_PROBE_ZOOMS:
+            px, py = lonlat_to_mercator_pixels(newest['lon'][:1], newest['lat'][:1], z)
+            start = time.perf_counter()
+            response = await client.get(f"/tiles/{z}/{int(px[0])}/{int(py[0])}.png")
+            if response.status_code == 200:
+                latencies.append(time.perf_counter() - start)
+    return latencies
+
 # S3 status endpoint
 @app.get("/s3/status")
 async def s3_status():
@@ -412,7 +923,11 @@ async def s3_status():
     
     return {
         "buckets": _s3_fetcher.get_available_buckets(),
-        "default_bucket": GLM_S3_BUCKET
+        "default_bucket": GLM_S3_BUCKET,
+        "listing": _s3_fetcher.get_listing_stats(),
+        "arrivals": _s3_fetcher.get_arrival_stats(),
+        "downloads": _s3_fetcher.get_download_stats(),
+        "connections": _s3_fetcher.get_connection_stats()
     }
 
 # Grid information endpoint
@@ -426,10 +941,17 @@ async def grid_info():
         "grid_config": _processor.get_grid_metadata(),
         "grid_bounds": get_grid_bounds(),
         "tile_size": 256,
-        "supported_zoom_levels": list(range(0, 21))  # 0-20
+        "supported_zoom_levels": list(range(0, MAX_TILE_ZOOM + 1))
     }
 
 # Utility functions
+def validate_tile(z: int, x: int, y: int):
+    """Reject tile coordinates outside the supported pyramid with 400"""
+    if not 0 <= z <= MAX_TILE_ZOOM:
+        raise HTTPException(status_code=400, detail=f"z must be between 0 and {MAX_TILE_ZOOM}")
+    if not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise HTTPException(status_code=400, detail=f"x and y must be between 0 and {2 ** z - 1} at zoom {z}")
+
 def parse_time_window(window_str: Optional[str]) -> int:
     """Parse time window string to minutes"""
     if not window_str:
@@ -456,18 +978,25 @@ def parse_time_window(window_str: Optional[str]) -> int:
         return 5  # Default fallback
 
 def parse_end_time(time_str: Optional[str]) -> Optional[datetime]:
-    """Parse end time string to datetime"""
+    """Parse end time string to naive UTC datetime (offsets are converted)"""
     if not time_str:
         return None
     
     try:
         if time_str.endswith('Z'):
-            return datetime.fromisoformat(time_str.replace('Z', '+00:00'))
+            return naive_utc(datetime.fromisoformat(time_str.replace('Z', '+00:00')))
         else:
-            return datetime.fromisoformat(time_str)
+            return naive_utc(datetime.fromisoformat(time_str))
     except ValueError:
         return None
 
+def require_time(time_str: Optional[str], name: str) -> Optional[datetime]:
+    """Parse an optional time parameter, rejecting one that is given but not ISO8601 with 400"""
+    when = parse_end_time(time_str)
+    if time_str and when is None:
+        raise HTTPException(status_code=400, detail=f"{name} must be an ISO8601 time")
+    return when
+
 def get_grid_bounds() -> Dict[str, Any]:
     """Get grid bounds for current configuration"""
     if GLM_USE_ABI_GRID:
@@ -491,35 +1020,42 @@ def get_grid_bounds() -> Dict[str, Any]:
         }
 
 async def generate_tile(z: int, x: int, y: int, window_minutes: int, 
-                       end_time: Optional[datetime], qc: bool, grid_type: str) -> bytes:
-    """Generate tile from current events"""
+                       end_time: Optional[datetime], qc: bool) -> bytes:
+    """Generate tile from current events on the render pool"""
     if not _processor or not _renderer:
         raise HTTPException(status_code=503, detail="Service not initialized")
     
+    return await _render_pool.run(_render_tile, z, x, y, window_minutes, end_time, qc)
+
+def _render_tile(z: int, x: int, y: int, window_minutes: int,
+                 end_time: Optional[datetime], qc: bool) -> bytes:
+    """Render a single tile (runs on the render pool)"""
     try:
-        # Determine actual grid type
-        if grid_type == "auto":
-            actual_grid_type = "abi" if GLM_USE_ABI_GRID else "geodetic"
-        else:
-            actual_grid_type = grid_type
-        
-        # Aggregate events to TOE grid
-        toe_grid = _processor.aggregate_toe_grid(
-            events=_events,
-            time_window_minutes=window_minutes,
-            end_time=end_time
-        )
+        # Low zooms are served from the pooled Mercator pyramid
+        if z <= GLM_PYRAMID_MAX_ZOOM:
+            pyramid = get_mercator_pyramid(window_minutes, end_time, qc)
+            return _renderer.render_pyramid_tile(pyramid, z, x, y)
         
-        # Get grid bounds
-        grid_bounds = get_grid_bounds()
+        # The processor aggregates to the configured grid; render it as that grid
+        actual_grid_type = "abi" if GLM_USE_ABI_GRID else "geodetic"
         
-        # Render tile
-        tile_data = _renderer.render_tile_from_grid(
-            toe_grid=toe_grid,
-            grid_bounds=grid_bounds,
-            z=z, x=x, y=y,
-            grid_type=actual_grid_type
-        )
+        # The dense grid is accounted while it exists; only caches are evicted from here
+        with _memory.reserve('render_grids', _processor.dense_grid_nbytes(), only=('tile_cache', 'grid_cache')):
+            # Aggregate the window's events to the TOE grid
+            with stage_timer('window_slice'):
+                lats, lons, energy_fj = _event_index.window_events(*window_bounds(window_minutes, end_time))
+            toe_grid = _processor.aggregate_toe_arrays(lats, lons, energy_fj)
+            
+            # Get grid bounds
+            grid_bounds = get_grid_bounds()
+            
+            # Render tile
+            tile_data = _renderer.render_tile_from_grid(
+                toe_grid=toe_grid,
+                grid_bounds=grid_bounds,
+                z=z, x=x, y=y,
+                grid_type=actual_grid_type
+            )
         
         return tile_data
         
@@ -527,22 +1063,512 @@ async def generate_tile(z: int, x: int, y: int, window_minutes: int,
         logger.error(f"Error generating tile: {e}")
         raise
 
+async def generate_metatile(z: int, x: int, y: int, window_minutes: int,
+                            end_time: Optional[datetime], qc: bool) -> Tuple[int, Dict[Tuple[int, int], bytes]]:
+    """
+    Render the metatile containing tile z/x/y in one gather
+    Returns the metatile size and PNG bytes keyed by absolute (x, y)
+    """
+    if not _processor or not _renderer:
+        raise HTTPException(status_code=503, detail="Service not initialized")
+    
+    n = min(GLM_METATILE_SIZE, 2 ** z)
+    mx, my = x // n, y // n
+    key = f"{z}/{mx}/{my}/{n}?w={window_minutes}&t={end_time.isoformat() if end_time else 'now'}&qc={int(qc)}&v={_events_version}"
+    
+    # Join a render of the same metatile that is already in flight
+    future = _inflight_metatiles.get(key)
+    if future is None:
+        future = asyncio.ensure_future(
+            _render_pool.run(_render_metatile, z, mx, my, n, window_minutes, end_time, qc)
+        )
+        _inflight_metatiles[key] = future
+        future.add_done_callback(lambda _: _inflight_metatiles.pop(key, None))
+    
+    tiles = await asyncio.shield(future)
+    return n, tiles
+
+def _render_metatile(z: int, mx: int, my: int, n: int, window_minutes: int,
+                     end_time: Optional[datetime], qc: bool) -> Dict[Tuple[int, int], bytes]:
+    """Render an n x n metatile (runs on the render pool)"""
+    toe_block = compute_block_toe(z, mx, my, n, window_minutes, end_time, qc)
+    tiles = _renderer.render_metatile(toe_block, n)
+    return {(mx * n + dx, my * n + dy): data for (dx, dy), data in tiles.items()}
+
+def _render_data_tile(z: int, x: int, y: int, window_minutes: int,
+                      end_time: Optional[datetime], qc: bool, fmt: str, bits: int) -> bytes:
+    """Compute and encode a raw data tile (runs on the render pool)"""
+    toe = compute_tile_toe(z, x, y, window_minutes, end_time, qc)
+    return _renderer.encode_data_tile(
+        toe,
+        fmt=fmt,
+        bits=bits,
+        log_min=GLM_DATA_TILE_LOG_MIN,
+        log_max=GLM_DATA_TILE_LOG_MAX
+    )
+
+def _render_animation(z: int, x: int, y: int, start_time: datetime, frames: int,
+                      step_minutes: int, window_minutes: int, fmt: str, frame_ms: int) -> bytes:
+    """Build incremental frames for tile z/x/y and encode them (runs on the render pool)"""
+    toe_frames = _event_index.tile_frames(
+        z, x, y,
+        first_end=start_time,
+        frames=frames,
+        step=timedelta(minutes=step_minutes),
+        window=timedelta(minutes=window_minutes),
+        tile_size=_renderer.tile_size
+    )
+    return _renderer.render_animation(toe_frames, fmt=fmt, frame_ms=frame_ms)
+
+def tile_cache_key(z: int, x: int, y: int, window_minutes: int, time_token: str, qc: bool) -> str:
+    """Cache key for a rendered image tile (time_token from resolve_end_time)"""
+    return f"{z}/{x}/{y}?w={window_minutes}&t={time_token}&qc={int(qc)}"
+
+def compute_block_toe(z: int, mx: int, my: int, n: int, window_minutes: int,
+                      end_time: Optional[datetime], qc: bool):
+    """TOE values (fJ) for every pixel of the n x n metatile (mx, my) at zoom z"""
+    if z <= GLM_PYRAMID_MAX_ZOOM:
+        return get_mercator_pyramid(window_minutes, end_time, qc).block(z, mx, my, n)
+    
+    # Only the events inside the block envelope are binned
+    size = _renderer.tile_size * n
+    start, end = window_bounds(window_minutes, end_time)
+    with stage_timer('window_slice'):
+        px, py, values = _event_index.tile_points(start, end, z, mx, my, tile_size=_renderer.tile_size, n=n)
+    with stage_timer('aggregate'):
+        flat = np.bincount(py * size + px, weights=values, minlength=size * size)
+        return flat.reshape(size, size).astype(np.float32)
+
+def compute_tile_toe(z: int, x: int, y: int, window_minutes: int,
+                     end_time: Optional[datetime], qc: bool):
+    """TOE values (fJ) for every pixel of tile z/x/y"""
+    return compute_block_toe(z, x, y, 1, window_minutes, end_time, qc)
+
+def get_mercator_pyramid(window_minutes: int, end_time: Optional[datetime], qc: bool):
+    """Get (or build once) the Mercator pyramid for a time window"""
+    key = f"w={window_minutes}&t={end_time.isoformat() if end_time else 'now'}&qc={int(qc)}&v={_events_version}"
+    
+    # Render workers share pyramids; build each one only once
+    with _pyramid_lock:
+        pyramid = _pyramid_cache.get(key)
+        if pyramid is None:
+            start, end = window_bounds(window_minutes, end_time)
+            with stage_timer('window_slice'):
+                px, py, values = _event_index.window_points(start, end)
+            with stage_timer('pyramid_build'):
+                pyramid = MercatorPyramid.build_from_pixels(
+                    px, py, _event_index.level, values,
+                    max_zoom=GLM_PYRAMID_MAX_ZOOM,
+                    tile_size=_renderer.tile_size
+                )
+            _pyramid_cache.set(key, pyramid)
+            logger.info(f"Built Mercator pyramid {key}: {pyramid.event_count} events, {pyramid.nbytes} bytes")
+    
+    return pyramid
+
+def _render_point_tile_if_sparse(z: int, x: int, y: int, window_minutes: int,
+                                 end_time: Optional[datetime], qc: bool) -> Tuple[int, Optional[bytes]]:
+    """
+    Count events in the tile envelope and point-render the tile if sparse
+    Returns the event count and PNG bytes, or None when the grid path should be used
+    """
+    start, end = window_bounds(window_minutes, end_time)
+    event_count = _event_index.count(start, end, z, x, y)
+    if event_count > GLM_POINT_RENDER_MAX_EVENTS:
+        return event_count, None
+    
+    px, py, values = _event_index.tile_points(start, end, z, x, y, tile_size=_renderer.tile_size)
+    return event_count, _renderer.render_points_tile(px, py, values)
+
+def render_path_header(path: str, event_count: Optional[int] = None) -> str:
+    """X-Render-Path value: chosen strategy plus the thresholds that chose it"""
+    parts = [path]
+    if event_count is not None:
+        parts.append(f"events={event_count}")
+    parts.append(f"max_events={GLM_POINT_RENDER_MAX_EVENTS}")
+    parts.append(f"min_zoom={GLM_POINT_RENDER_MIN_ZOOM}")
+    return "; ".join(parts)
+
+def window_bounds(window_minutes: int, end_time: Optional[datetime]) -> Tuple[datetime, datetime]:
+    """Inclusive (start, end) of a time window ending at end_time (default: live end time)"""
+    end = end_time or live_end_time()
+    return end - timedelta(minutes=window_minutes), end
+
+def live_end_time() -> datetime:
+    """End time used for "now": the ingest epoch, or the wall clock before any data"""
+    return _ingest_epoch or service_now()
+
+def service_now() -> datetime:
+    """Current time (naive UTC): the replay clock while replaying, else the wall clock"""
+    return _clock.now() if _clock is not None else datetime.utcnow()
+
+def resolve_end_time(time_str: Optional[str]) -> Tuple[datetime, str]:
+    """
+    Concrete end time plus the token that identifies it in cache keys
+    Explicit times key on their ISO value. Implicit "now" keys on the ingest
+    epoch, so live keys roll forward exactly when new data arrives.
+    """
+    end_time = parse_end_time(time_str)
+    if end_time is not None:
+        return end_time, end_time.isoformat()
+    return live_end_time(), f"epoch-{_ingest_epoch_seq}"
+
+def cache_time_token(time_token: str, complete: bool) -> str:
+    """
+    Time token for the cache key of a window (time_token from resolve_end_time)
+    An explicit time whose window is not complete yet also keys on the ingest
+    epoch: its tile changes as granules arrive, so it is evicted with the
+    live tiles when the epoch advances.
+    """
+    if complete or time_token.startswith("epoch-"):
+        return time_token
+    return f"{time_token}@epoch-{_ingest_epoch_seq}"
+
+def tile_cache_ttl(immutable: bool) -> int:
+    """Cache TTL (seconds): long for complete windows, short for live and incomplete ones"""
+    return GLM_TILE_CACHE_HISTORICAL_TTL if immutable else GLM_TILE_CACHE_LIVE_TTL
+
+def live_update_interval() -> int:
+    """Seconds between expected epoch advances (granule cadence, or the fixed S3 poll interval)"""
+    if GLM_S3_POLL_ENABLED and not GLM_S3_PREDICTIVE_POLL and not GLM_S3_NOTIFICATIONS:
+        return max(GLM_GRANULE_CADENCE_SECONDS, GLM_S3_POLL_INTERVAL)
+    return GLM_GRANULE_CADENCE_SECONDS
+
+def naive_utc(when: datetime) -> datetime:
+    """when as naive UTC (aware times are converted, naive ones are taken as UTC)"""
+    if when.tzinfo is not None:
+        return when.astimezone(timezone.utc).replace(tzinfo=None)
+    return when
+
+def granule_coverage() -> List[Tuple[datetime, datetime]]:
+    """
+    Time spans covered by contiguous ingested granules, oldest first
+    Granules whose start is within GLM_COVERAGE_GAP_SECONDS of the previous
+    end are merged into one span. Rebuilt after each change to the registry.
+    """
+    global _granule_coverage
+    
+    if _granule_coverage is None:
+        spans = [(g.start_time, g.end_time) for g in list(_ingested_granules.values())]
+        for key in _shared_granules.difference(_ingested_granules):
+            start, end = granule_start_time(key), granule_end_time(key)
+            if start is not None and end is not None:
+                spans.append((start, end))
+        
+        gap = timedelta(seconds=GLM_COVERAGE_GAP_SECONDS)
+        merged: List[Tuple[datetime, datetime]] = []
+        for start, end in sorted(spans):
+            if merged and start - merged[-1][1] <= gap:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        _granule_coverage = merged
+    return _granule_coverage
+
+def invalidate_granule_coverage():
+    """Rebuild granule_coverage() on next use (granules were added or dropped)"""
+    global _granule_coverage
+    _granule_coverage = None
+
+def is_window_covered(start: datetime, end: datetime) -> bool:
+    """True when one contiguous run of ingested granules spans [start, end]"""
+    start, end = naive_utc(start), naive_utc(end)
+    coverage = granule_coverage()
+    i = bisect.bisect_right(coverage, (start, datetime.max)) - 1
+    return i >= 0 and coverage[i][0] <= start and end <= coverage[i][1]
+
+def is_complete_window(time_str: Optional[str], start: datetime, end: datetime) -> bool:
+    """
+    True when the data window [start, end] can no longer change
+    The window must end at an explicit time before the ingest epoch and be
+    covered by contiguous ingested granules: a gap may still be filled by a
+    late or retried granule, and data before the oldest granule is unknown.
+    """
+    if not time_str or _ingest_epoch is None:
+        return False
+    return naive_utc(end) < _ingest_epoch and is_window_covered(start, end)
+
+def tile_cache_control(time_str: Optional[str], start: datetime, end: datetime) -> str:
+    """
+    Cache-Control for a tile over the data window [start, end]
+    Complete windows are immutable. Live tiles may be reused until the next
+    granule is due, then served stale for one more interval while the
+    client revalidates.
+    """
+    if is_complete_window(time_str, start, end):
+        return f"public, max-age={GLM_TILE_CACHE_HISTORICAL_TTL}, immutable"
+    
+    interval = live_update_interval()
+    elapsed = time.time() - _ingest_epoch_wall if _ingest_epoch_wall else 0.0
+    max_age = int(min(interval, max(1, interval - elapsed)))
+    return f"public, max-age={max_age}, stale-while-revalidate={interval}"
+
+def store_tile(cache_key: str, data: bytes, immutable: bool) -> str:
+    """Cache an encoded tile in memory, queue immutable tiles for the disk tier; returns the ETag"""
+    etag = _tile_cache.set(cache_key, data, ttl=tile_cache_ttl(immutable))
+    if immutable and _tile_store is not None:
+        _tile_store.put(cache_key, data, etag)
+    return etag
+
+def lookup_tile(cache_key: str) -> Optional[Tuple[bytes, str]]:
+    """Memory cache lookup, timed as the cache_lookup stage"""
+    with stage_timer('cache_lookup'):
+        return _tile_cache.get_entry(cache_key)
+
+async def read_through_disk(cache_key: str, immutable: bool, ttl: int) -> Optional[Tuple[bytes, str]]:
+    """Disk tier lookup for immutable tiles; hits are promoted into the memory cache"""
+    if not immutable or _tile_store is None:
+        return None
+    with stage_timer('disk_lookup'):
+        stored = await asyncio.get_running_loop().run_in_executor(None, _tile_store.get, cache_key)
+    if stored is not None:
+        _tile_cache.set(cache_key, stored[0], ttl=ttl, etag=stored[1])
+    return stored
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match comparison (weak, per RFC 9110)"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate == '*' or candidate.removeprefix('W/') == etag:
+            return True
+    return False
+
+def tile_response(content: bytes, media_type: str, etag: str, headers: Dict[str, str],
+                  if_none_match: Optional[str], kind: str = "tile", live: bool = False) -> Response:
+    """
+    Tile response with its ETag, or 304 Not Modified when the client already has it
+    Only live tiles of the current ingest epoch show the newest granules, so
+    only they mark pending granules served.
+    """
+    headers["ETag"] = etag
+    if live:
+        _freshness.mark_served()
+    timing = current_request_timing()
+    if timing is not None:
+        headers["Server-Timing"] = timing.server_timing()
+        headers["Timing-Allow-Origin"] = "*"
+    if etag_matches(if_none_match, etag):
+        TILE_RESPONSES.labels(kind, headers.get("X-Cache", ""), "304").inc()
+        return Response(status_code=304, headers=headers)
+    TILE_RESPONSES.labels(kind, headers.get("X-Cache", ""), "200").inc()
+    return Response(content=content, media_type=media_type, headers=headers)
+
+def advance_ingest_epoch(data_time: Optional[datetime]):
+    """
+    Record newly ingested data and evict tiles cached for older epochs
+    data_time is the end of the newest granule (or newest event) ingested.
+    """
+    global _ingest_epoch, _ingest_epoch_seq, _ingest_epoch_wall
+    
+    if data_time is not None and (_ingest_epoch is None or data_time > _ingest_epoch):
+        _ingest_epoch = data_time
+    _ingest_epoch_seq += 1
+    _ingest_epoch_wall = time.time()
+    invalidate_granule_coverage()
+    
+    evicted = evict_stale_live_tiles()
+    logger.info(f"Ingest epoch {_ingest_epoch_seq} at {_ingest_epoch}, evicted {evicted} live tiles")
+
+def is_current_epoch(time_token: str) -> bool:
+    """True for the cache token of a live tile at the current ingest epoch"""
+    return time_token == f"epoch-{_ingest_epoch_seq}"
+
+def evict_stale_live_tiles() -> int:
+    """Drop cached live and incomplete-window tiles keyed to any epoch but the current one"""
+    current = f"epoch-{_ingest_epoch_seq}&"
+    return _tile_cache.remove_where(lambda key: "epoch-" in key and current not in key)
+
+def is_ingest_owner() -> bool:
+    """True unless this worker only reads a shared event store owned by another process"""
+    return _shared_store is None or _shared_store.is_owner
+
+def require_ingest_owner():
+    """Reject ingest on a worker that serves another process's shared event store"""
+    if not is_ingest_owner():
+        raise HTTPException(
+            status_code=409,
+            detail="This worker serves a shared event store read-only; ingest runs in the owner process"
+                   + (" (app.ingest_worker)" if GLM_INGEST_MODE == 'external' else "")
+        )
+
+def publish_shared_snapshot():
+    """Publish the event index and ingest epoch to the other workers (owner only)"""
+    if _shared_store is None or not _shared_store.is_owner:
+        return
+    try:
+        with stage_timer('publish'):
+            granules = _shared_granules.union(_ingested_granules)
+            version = _shared_store.publish(
+                _event_index, _ingest_epoch, _ingest_epoch_seq, _ingest_epoch_wall,
+                granules=granules, freshness=_freshness.records(granules)
+            )
+        logger.info(f"Published shared event store version {version}")
+    except OSError as e:
+        logger.error(f"Failed to publish shared event store: {e}")
+
+def adopt_shared_snapshot(snapshot: SharedSnapshot, track_freshness: bool = True):
+    """
+    Serve a published snapshot: swap in its index and follow its ingest epoch
+    Granules new in this snapshot take the owner's stage times and are
+    marked published for freshness tracking (skipped for the backlog loaded
+    at startup).
+    """
+    global _event_index, _ingest_epoch, _ingest_epoch_seq, _ingest_epoch_wall, _shared_granules
+    
+    _event_index = snapshot.index
+    if track_freshness:
+        for key in set(snapshot.granules).difference(_shared_granules):
+            if key in snapshot.freshness:
+                _freshness.restore(key, snapshot.freshness[key])
+            _freshness.mark(key, 'published')
+    _shared_granules = set(snapshot.granules)
+    _ingest_epoch = snapshot.ingest_epoch
+    _ingest_epoch_seq = snapshot.ingest_epoch_seq
+    _ingest_epoch_wall = snapshot.ingest_epoch_wall
+    invalidate_granule_coverage()
+    evict_stale_live_tiles()
+    mark_events_changed()
+
+def get_pyramid_cache_nbytes() -> int:
+    """Bytes held by cached pyramids"""
+    with _pyramid_lock:
+        return sum(p.nbytes for p in _pyramid_cache.cache.values())
+
+def mark_events_changed():
+    """Invalidate state derived from the event index (pyramids)"""
+    global _events_version
+    _events_version += 1
+    
+    # Pyramids are keyed by version, so older ones can never be hit again
+    with _pyramid_lock:
+        _pyramid_cache.cache.clear()
+
 def prune_old_events():
     """Remove events older than the maximum time window"""
-    global _events
-    
-    if not _events:
+    if not len(_event_index) and not _ingested_granules:
         return
     
-    # Keep events from last 24 hours
-    cutoff_time = datetime.utcnow() - timedelta(hours=24)
+    # Keep events from the retention window
+    drop_events_before(service_now() - timedelta(hours=GLM_EVENT_RETENTION_HOURS))
+    
+    logger.info(f"Pruned events, remaining: {len(_event_index)}")
+
+def drop_events_before(cutoff_time: datetime):
+    """Remove events (and registered granules) older than cutoff_time"""
+    prune_granules(_event_index, _ingested_granules, cutoff_time)
+    prune_granule_keys(_shared_granules, cutoff_time)
+    invalidate_granule_coverage()
+    mark_events_changed()
+
+def event_store_nbytes() -> int:
+    """Bytes held by the event index"""
+    return _event_index.nbytes
+
+def granule_registry_nbytes() -> int:
+    """Bytes held by the granule registry (metadata only)"""
+    return registry_nbytes(_ingested_granules)
+
+def evict_pyramids(nbytes: int) -> int:
+    """Drop least recently used pyramids until nbytes are released"""
+    released = 0
+    with _pyramid_lock:
+        while _pyramid_cache.cache and released < nbytes:
+            _, pyramid = _pyramid_cache.cache.popitem(last=False)
+            released += pyramid.nbytes
+    return released
+
+def evict_oldest_events(nbytes: int) -> int:
+    """
+    Drop whole index buckets, oldest first, until about nbytes are released
+    The newest bucket is always kept. Readers of the shared store hold the
+    owner's snapshot and never evict events themselves.
+    """
+    if not is_ingest_owner():
+        return 0
+    cutoff_time = oldest_buckets_cutoff(_event_index, nbytes)
+    if cutoff_time is None:
+        return 0
     
-    _events = [
-        event for event in _events
-        if event.timestamp >= cutoff_time
-    ]
+    before = event_store_nbytes()
+    drop_events_before(cutoff_time)
+    logger.warning(f"Memory budget: dropped events before {cutoff_time.isoformat()}")
+    return before - event_store_nbytes()
+
+# Eviction order: tiles, then grids, then the oldest events
+_memory.register('tile_cache', lambda: _tile_cache.bytes, _tile_cache.shrink)
+_memory.register('grid_cache', get_pyramid_cache_nbytes, evict_pyramids)
+_memory.register('render_grids', lambda: _memory.reserved('render_grids'))
+_memory.register('event_store', event_store_nbytes, evict_oldest_events)
+_memory.register('granule_registry', granule_registry_nbytes)
+
+async def memory_budget_task():
+    """Background task keeping the process inside GLM_MEMORY_BUDGET_MB"""
+    while True:
+        try:
+            await asyncio.sleep(GLM_MEMORY_CHECK_SECONDS)
+            released = _memory.enforce()
+            if 'event_store' in released:
+                publish_shared_snapshot()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error enforcing memory budget: {e}")
+
+async def poll_s3(bucket_name: str = GLM_S3_BUCKET, max_granules: int = 15) -> Dict[str, int]:
+    """
+    List granules after the bucket's StartAfter cursor and ingest them
+    The cursor then moves over the keys now ingested, stopping before any
+    that failed so the next poll retries them. Listing and cursor commits
+    run on the ingest thread, like the decodes, so tiles keep being served.
+    """
+    loop = asyncio.get_running_loop()
+    keys = await loop.run_in_executor(_ingest_executor, _s3_fetcher.list_new_granules, bucket_name, 1, max_granules)
+    if not keys:
+        return {"processed": 0, "failed": 0, "events": 0}
+    if _notifications is not None:
+        _notifications.record_reconciled(
+            [key for key in keys if key not in _ingested_granules and key not in _shared_granules]
+        )
+    result = await ingest_granules(keys, "s3", lambda key: f"s3://{bucket_name}/{key}")
+    done = [key for key in keys if key in _ingested_granules or key in _shared_granules]
+    await loop.run_in_executor(_ingest_executor, _s3_fetcher.commit_cursor, bucket_name, done)
+    logger.info(f"Polled {len(keys)} new S3 granules, processed {result['processed']}, "
+                f"total events: {result['events']}")
+    return result
+
+async def notified_ingest(keys: List[str]) -> Dict[str, int]:
+    """Ingest granules announced by object-created notifications"""
+    result = await ingest_granules(keys, "notification", lambda key: f"s3://{GLM_S3_BUCKET}/{key}")
+    logger.info(f"Ingested {result['processed']} notified granules, total events: {result['events']}")
+    return result
+
+def start_s3_ingest():
+    """
+    Start the ingest owner's S3 sources
+    With GLM_S3_NOTIFICATIONS, messages drive ingest and a slow poll
+    reconciles anything they missed; otherwise poll if enabled.
+    """
+    global _notifications, _notification_task
     
-    logger.info(f"Pruned events, remaining: {len(_events)}")
+    if GLM_S3_NOTIFICATIONS:
+        if _notifications is None:
+            _notifications = NotificationConsumer(
+                make_notification_source(GLM_S3_NOTIFICATIONS), GLM_S3_BUCKET, notified_ingest
+            )
+        _notification_task = asyncio.create_task(_notifications.run())
+        asyncio.create_task(s3_polling_task())
+    elif GLM_S3_POLL_ENABLED:
+        asyncio.create_task(s3_polling_task())
+
+def next_s3_poll_delay() -> float:
+    """Seconds to the next S3 poll: just after the next granule should land, at most GLM_S3_POLL_INTERVAL"""
+    if _notifications is not None:
+        return GLM_S3_RECONCILE_INTERVAL
+    if not GLM_S3_PREDICTIVE_POLL:
+        return GLM_S3_POLL_INTERVAL
+    return _s3_fetcher.next_poll_delay(GLM_S3_BUCKET, GLM_S3_POLL_INTERVAL)
 
 async def s3_polling_task():
     """Background task for S3 polling"""
@@ -550,23 +1576,50 @@ async def s3_polling_task():
         return
     
     logger.info(f"Starting S3 polling for bucket {GLM_S3_BUCKET}")
+    _s3_fetcher.resume_after(GLM_S3_BUCKET, _ingested_granules.keys() | _shared_granules)
     
     while True:
         try:
-            # Poll for new granules
-            await ingest_from_s3(
-                bucket_name=GLM_S3_BUCKET,
-                hours_back=1,
-                max_granules=5
-            )
+            # Poll for granules published since the last poll
+            await poll_s3(GLM_S3_BUCKET)
             
-            # Wait for next poll
-            await asyncio.sleep(GLM_S3_POLL_INTERVAL)
+            # Wait until the next granule is due (or the fixed interval)
+            await asyncio.sleep(next_s3_poll_delay())
             
         except Exception as e:
             logger.error(f"Error in S3 polling: {e}")
             await asyncio.sleep(GLM_S3_POLL_INTERVAL)
 
+async def shared_store_sync_task():
+    """
+    Background task for workers reading the shared event store
+    Snapshots are swapped in on the event loop; the index is replaced
+    before the epoch, so a tile cached under an epoch key never holds
+    older data than that epoch.
+    """
+    logger.info(f"Following shared event store in {_shared_store.directory}")
+    
+    while _shared_store is not None:
+        try:
+            # Take over ingest if the owner process has exited (inline ingest only)
+            if GLM_INGEST_MODE != 'external' and _shared_store.acquire_ownership():
+                snapshot = _shared_store.refresh(force=True)
+                if snapshot:
+                    adopt_shared_snapshot(snapshot)
+                logger.info("Promoted to shared event store owner")
+                start_s3_ingest()
+                return
+            
+            snapshot = _shared_store.refresh()
+            if snapshot:
+                adopt_shared_snapshot(snapshot)
+                logger.info(f"Loaded shared event store version {snapshot.version}: {len(snapshot.index)} events")
+            
+        except Exception as e:
+            logger.error(f"Error syncing shared event store: {e}")
+        
+        await asyncio.sleep(GLM_SHARED_STORE_POLL_MS / 1000)
+
 # Main entry point
 if __name__ == "__main__":
     uvicorn.run(
@@ -0,0 +1,173 @@
+"""
+GLM TOE Memory Accounting
+Tracks the bytes held by each large in-process structure (event store,
+granule registry, pyramid grids, grids being rendered, tile cache) and
+enforces one global budget over their sum. When the total goes over
+budget, components are asked to release memory in registration order
+(cheapest to rebuild first) until it is back under the low watermark.
+"""
+
+import logging
+import os
+import sys
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+def process_rss_bytes() -> Optional[int]:
+    """Resident set size of this process, or None where /proc is unavailable"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def object_bytes(obj) -> int:
+    """
+    Shallow size of an object plus its attribute values
+    Used to estimate per-item costs of Python object lists (events, granules).
+    """
+    size = sys.getsizeof(obj)
+    attrs = getattr(obj, '__dict__', None)
+    if attrs is not None:
+        size += sys.getsizeof(attrs) + sum(sys.getsizeof(value) for value in attrs.values())
+    return size
+
+
+class MemoryBudgetExceeded(Exception):
+    """A reservation does not fit in the budget even after eviction"""
+
+
+class _Component:
+    __slots__ = ('name', 'measure', 'evict', 'evicted_bytes', 'evictions')
+
+    def __init__(self, name: str, measure: Callable[[], int], evict: Optional[Callable[[int], int]]):
+        self.name = name
+        self.measure = measure
+        self.evict = evict
+        self.evicted_bytes = 0
+        self.evictions = 0
+
+
+class MemoryBudget:
+    """
+    Byte accounting across registered components with ordered eviction
+    measure() returns a component's current bytes; evict(nbytes) should
+    release at least nbytes if it can and return the bytes released.
+    max_bytes of 0 reports usage without enforcing anything.
+    """
+
+    def __init__(self, max_bytes: int, low_watermark: float = 0.9):
+        self.max_bytes = max(0, int(max_bytes))
+        self.low_watermark = low_watermark
+        self._components: List[_Component] = []
+        self._reserved: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._enforce_lock = threading.Lock()
+
+        # Counters
+        self.enforcements = 0
+        self.over_budget = 0
+
+    def register(self, name: str, measure: Callable[[], int],
+                 evict: Optional[Callable[[int], int]] = None):
+        """Track a component; evictable ones are evicted in registration order"""
+        self._components.append(_Component(name, measure, evict))
+
+    @contextmanager
+    def reserve(self, name: str, nbytes: int, only: Optional[Sequence[str]] = None):
+        """
+        Count nbytes of transient memory (e.g. a dense grid being rendered)
+        under component name for the duration of the with-block
+        Makes room first (evicting only the components in only, if given) and
+        raises MemoryBudgetExceeded when nbytes still does not fit.
+        """
+        with self._enforce_lock:
+            if self.max_bytes:
+                self._enforce_locked(only, incoming=nbytes)
+                used = sum(self.usage().values())
+                if used + nbytes > self.max_bytes:
+                    raise MemoryBudgetExceeded(
+                        f"{name} needs {nbytes} bytes; {used} of {self.max_bytes} already in use"
+                    )
+            with self._lock:
+                self._reserved[name] = self._reserved.get(name, 0) + nbytes
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._reserved[name] -= nbytes
+
+    def reserved(self, name: str) -> int:
+        return self._reserved.get(name, 0)
+
+    def usage(self) -> Dict[str, int]:
+        """Current bytes by component"""
+        usage = {}
+        for component in self._components:
+            try:
+                usage[component.name] = int(component.measure())
+            except Exception as e:
+                logger.error(f"Error measuring {component.name}: {e}")
+                usage[component.name] = 0
+        return usage
+
+    def enforce(self, only: Optional[Sequence[str]] = None) -> Dict[str, int]:
+        """
+        Evict down to low_watermark * max_bytes if over budget
+        only restricts eviction to the named components (e.g. those safe to
+        evict from a render thread). Returns bytes released by component.
+        """
+        if not self.max_bytes:
+            return {}
+        with self._enforce_lock:
+            return self._enforce_locked(only)
+
+    def _enforce_locked(self, only: Optional[Sequence[str]], incoming: int = 0) -> Dict[str, int]:
+        total = sum(self.usage().values()) + incoming
+        if total <= self.max_bytes:
+            return {}
+
+        self.enforcements += 1
+        excess = total - int(self.max_bytes * self.low_watermark)
+        released: Dict[str, int] = {}
+        for component in self._components:
+            if excess <= 0:
+                break
+            if component.evict is None or (only is not None and component.name not in only):
+                continue
+            try:
+                freed = int(component.evict(excess))
+            except Exception as e:
+                logger.error(f"Error evicting {component.name}: {e}")
+                continue
+            if freed > 0:
+                component.evicted_bytes += freed
+                component.evictions += 1
+                released[component.name] = freed
+                excess -= freed
+
+        if excess > 0:
+            self.over_budget += 1
+        logger.warning(
+            f"Memory budget: {total} of {self.max_bytes} bytes wanted, released "
+            f"{sum(released.values())} ({released})"
+        )
+        return released
+
+    def get_stats(self) -> Dict:
+        """Bytes by component, budget and eviction counters"""
+        usage = self.usage()
+        return {
+            'budget_bytes': self.max_bytes or None,
+            'used_bytes': sum(usage.values()),
+            'rss_bytes': process_rss_bytes(),
+            'components': usage,
+            'enforcements': self.enforcements,
+            'over_budget': self.over_budget,
+            'evicted_bytes': {c.name: c.evicted_bytes for c in self._components if c.evict is not None}
+        }
@@ -0,0 +1,339 @@
+"""
+GLM TOE Web Mercator Pyramid
+Aggregates TOE once into a sparse Web Mercator raster at the finest served
+zoom and builds coarser levels by sum/max pooling, so low-zoom tiles are a
+slice of a small sorted array instead of a walk over the full grid.
+"""
+
+import logging
+import math
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Web Mercator latitude limit (square world)
+MAX_MERCATOR_LAT = 85.05112878
+
+_U64 = np.uint64
+_MORTON_MASKS = (
+    (_U64(16), _U64(0x0000FFFF0000FFFF)),
+    (_U64(8), _U64(0x00FF00FF00FF00FF)),
+    (_U64(4), _U64(0x0F0F0F0F0F0F0F0F)),
+    (_U64(2), _U64(0x3333333333333333)),
+    (_U64(1), _U64(0x5555555555555555)),
+)
+_COMPACT_MASKS = (
+    (_U64(1), _U64(0x3333333333333333)),
+    (_U64(2), _U64(0x0F0F0F0F0F0F0F0F)),
+    (_U64(4), _U64(0x00FF00FF00FF00FF)),
+    (_U64(8), _U64(0x0000FFFF0000FFFF)),
+    (_U64(16), _U64(0x00000000FFFFFFFF)),
+)
+
+
+def _part1by1(v: np.ndarray) -> np.ndarray:
+    """Spread the low 32 bits of v so there is a zero bit between each bit"""
+    v = np.asarray(v).astype(np.uint64) & _U64(0xFFFFFFFF)
+    for shift, mask in _MORTON_MASKS:
+        v = (v | (v << shift)) & mask
+    return v
+
+
+def _compact1by1(v: np.ndarray) -> np.ndarray:
+    """Inverse of _part1by1: gather every other bit of v"""
+    v = np.asarray(v).astype(np.uint64) & _U64(0x5555555555555555)
+    for shift, mask in _COMPACT_MASKS:
+        v = (v | (v >> shift)) & mask
+    return v
+
+
+def morton_encode(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Interleave x/y pixel (or tile) coordinates into Morton (Z-order) codes"""
+    return _part1by1(x) | (_part1by1(y) << _U64(1))
+
+
+def morton_decode(codes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Split Morton codes back into x/y coordinates"""
+    codes = np.asarray(codes).astype(np.uint64)
+    return _compact1by1(codes), _compact1by1(codes >> _U64(1))
+
+
+def lonlat_to_mercator_pixels(lons: np.ndarray, lats: np.ndarray,
+                              level: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Convert WGS84 coordinates to integer Web Mercator pixel coordinates
+    at a pixel level (2**level pixels across the world)
+    """
+    size = float(2 ** level)
+    lons = np.asarray(lons, dtype=np.float64)
+    lats = np.clip(np.asarray(lats, dtype=np.float64), -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT)
+
+    world_x = (lons + 180.0) / 360.0 * size
+    sin_lat = np.sin(np.radians(lats))
+    world_y = (0.5 - np.log((1.0 + sin_lat) / (1.0 - sin_lat)) / (4.0 * math.pi)) * size
+
+    max_px = 2 ** level - 1
+    px = np.clip(np.floor(world_x), 0, max_px).astype(np.uint64)
+    py = np.clip(np.floor(world_y), 0, max_px).astype(np.uint64)
+    return px, py
+
+
+@dataclass
+class PyramidLevel:
+    """Sparse TOE raster for one tile zoom, sorted by pixel Morton code"""
+    zoom: int
+    codes: np.ndarray   # uint64 Morton codes of non-empty pixels
+    sums: np.ndarray    # float64 summed TOE per pixel
+    maxes: np.ndarray   # float32 brightest single contribution per pixel
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.codes.nbytes + self.sums.nbytes + self.maxes.nbytes)
+
+
+class MercatorPyramid:
+    """
+    Mipmapped TOE pyramid in Web Mercator
+    Level z holds the pixels of every zoom-z tile; level z-1 is built from
+    level z by 2x2 sum/max pooling, which in Morton order is a right shift
+    of the codes by two bits followed by a segmented reduction.
+    """
+
+    def __init__(self, max_zoom: int, tile_size: int = 256):
+        if tile_size <= 0 or tile_size & (tile_size - 1):
+            raise ValueError(f"tile_size must be a power of two, got {tile_size}")
+        self.max_zoom = max_zoom
+        self.tile_size = tile_size
+        self.tile_bits = tile_size.bit_length() - 1
+        self.levels: Dict[int, PyramidLevel] = {}
+        self.event_count = 0
+
+    @classmethod
+    def build(cls,
+              lats: np.ndarray,
+              lons: np.ndarray,
+              values: np.ndarray,
+              max_zoom: int,
+              tile_size: int = 256) -> 'MercatorPyramid':
+        """Aggregate point values into the base level and pool every coarser level"""
+        pyramid = cls(max_zoom=max_zoom, tile_size=tile_size)
+        values = np.asarray(values, dtype=np.float64)
+        pyramid.event_count = int(values.size)
+
+        if values.size == 0:
+            for z in range(max_zoom, -1, -1):
+                pyramid.levels[z] = PyramidLevel(
+                    zoom=z,
+                    codes=np.zeros(0, dtype=np.uint64),
+                    sums=np.zeros(0, dtype=np.float64),
+                    maxes=np.zeros(0, dtype=np.float32),
+                )
+            return pyramid
+
+        px, py = lonlat_to_mercator_pixels(lons, lats, max_zoom + pyramid.tile_bits)
+        return cls._build_from_base_pixels(pyramid, px, py, values)
+
+    @classmethod
+    def build_from_pixels(cls,
+                          px: np.ndarray,
+                          py: np.ndarray,
+                          level: int,
+                          values: np.ndarray,
+                          max_zoom: int,
+                          tile_size: int = 256) -> 'MercatorPyramid':
+        """Build from pixel coordinates at a finer pixel level (e.g. a PointIndex)"""
+        pyramid = cls(max_zoom=max_zoom, tile_size=tile_size)
+        base_level = max_zoom + pyramid.tile_bits
+        if level < base_level:
+            raise ValueError(f"Pixel level {level} coarser than pyramid base level {base_level}")
+        values = np.asarray(values, dtype=np.float64)
+        pyramid.event_count = int(values.size)
+        if values.size == 0:
+            return cls.build(np.zeros(0), np.zeros(0), values, max_zoom, tile_size)
+        drop = _U64(level - base_level)
+        px = np.asarray(px).astype(np.uint64) >> drop
+        py = np.asarray(py).astype(np.uint64) >> drop
+        return cls._build_from_base_pixels(pyramid, px, py, values)
+
+    @classmethod
+    def _build_from_base_pixels(cls, pyramid: 'MercatorPyramid', px: np.ndarray,
+                                py: np.ndarray, values: np.ndarray) -> 'MercatorPyramid':
+        """Sort base-level pixels by Morton code and pool every level"""
+        max_zoom = pyramid.max_zoom
+        codes = morton_encode(px, py)
+
+        order = np.argsort(codes, kind='stable')
+        codes = codes[order]
+        values = values[order]
+        level = cls._pool(codes, values, values.astype(np.float32), max_zoom)
+        pyramid.levels[max_zoom] = level
+
+        for z in range(max_zoom - 1, -1, -1):
+            level = cls._pool(level.codes >> _U64(2), level.sums, level.maxes, z)
+            pyramid.levels[z] = level
+
+        return pyramid
+
+    @staticmethod
+    def _pool(codes: np.ndarray, sums: np.ndarray, maxes: np.ndarray, zoom: int) -> PyramidLevel:
+        """Reduce runs of equal (sorted) codes with sum and max"""
+        starts = np.concatenate(([0], np.flatnonzero(codes[1:] != codes[:-1]) + 1))
+        return PyramidLevel(
+            zoom=zoom,
+            codes=codes[starts],
+            sums=np.add.reduceat(sums, starts),
+            maxes=np.maximum.reduceat(maxes, starts),
+        )
+
+    def tile(self, z: int, x: int, y: int, stat: str = 'sum') -> np.ndarray:
+        """
+        Dense (tile_size, tile_size) TOE array for tile z/x/y
+        The tile's pixels are one contiguous Morton range of level z.
+        """
+        return self.block(z, x, y, 1, stat=stat)
+
+    def block(self, z: int, mx: int, my: int, n: int, stat: str = 'sum') -> np.ndarray:
+        """
+        Dense (n*tile_size, n*tile_size) TOE array for an n x n metatile
+        Covers zoom-z tiles x in [mx*n, mx*n+n) and y in [my*n, my*n+n); n must
+        be a power of two no larger than 2**z, so the block is still a single
+        contiguous Morton range of level z.
+        """
+        if not 0 <= z <= self.max_zoom:
+            raise ValueError(f"Zoom {z} outside pyramid range 0-{self.max_zoom}")
+        if n <= 0 or n & (n - 1) or n > 2 ** z:
+            raise ValueError(f"Metatile size must be a power of two <= 2**{z}, got {n}")
+
+        size = self.tile_size * n
+        level = self.levels[z]
+        out = np.zeros((size, size), dtype=np.float32)
+        if level.codes.size == 0:
+            return out
+
+        shift = _U64(2 * (self.tile_bits + n.bit_length() - 1))
+        block_code = morton_encode(np.array([mx]), np.array([my]))[0]
+        lo = block_code << shift
+        hi = (block_code + _U64(1)) << shift
+        i0, i1 = np.searchsorted(level.codes, [lo, hi])
+        if i0 == i1:
+            return out
+
+        px, py = morton_decode(level.codes[i0:i1] - lo)
+        vals = level.sums[i0:i1] if stat == 'sum' else level.maxes[i0:i1]
+        out[py.astype(np.intp), px.astype(np.intp)] = vals
+        return out
+
+    @property
+    def nbytes(self) -> int:
+        return sum(level.nbytes for level in self.levels.values())
+
+
+class PointIndex:
+    """
+    Spatial index of point events sorted by Morton code at a fine pixel level
+    Events inside any tile (or aligned metatile) envelope are one contiguous
+    range, found with two binary searches instead of a scan.
+    """
+
+    def __init__(self, lats: np.ndarray, lons: np.ndarray, values: np.ndarray,
+                 level: int = 28, times: Optional[np.ndarray] = None):
+        self.level = level
+        values = np.asarray(values, dtype=np.float64)
+        px, py = lonlat_to_mercator_pixels(lons, lats, level)
+        codes = morton_encode(px, py)
+        order = np.argsort(codes, kind='stable')
+        self.codes = codes[order]
+        self.px = px[order]
+        self.py = py[order]
+        self.values = values[order]
+        self.times = None if times is None else np.asarray(times, dtype=np.int64)[order]
+
+    @classmethod
+    def from_sorted(cls, codes: np.ndarray, px: np.ndarray, py: np.ndarray, values: np.ndarray,
+                    level: int = 28, times: Optional[np.ndarray] = None) -> 'PointIndex':
+        """Wrap columns already sorted by Morton code (no copy, e.g. mapped from shared memory)"""
+        index = cls.__new__(cls)
+        index.level = level
+        index.codes = codes
+        index.px = px
+        index.py = py
+        index.values = values
+        index.times = times
+        return index
+
+    def merge(self, other: 'PointIndex') -> 'PointIndex':
+        """New index holding the events of both (the inputs are not modified)"""
+        if other.level != self.level:
+            raise ValueError("Cannot merge point indexes built at different levels")
+        merged = PointIndex.__new__(PointIndex)
+        merged.level = self.level
+        codes = np.concatenate((self.codes, other.codes))
+        order = np.argsort(codes, kind='stable')
+        merged.codes = codes[order]
+        merged.px = np.concatenate((self.px, other.px))[order]
+        merged.py = np.concatenate((self.py, other.py))[order]
+        merged.values = np.concatenate((self.values, other.values))[order]
+        if self.times is not None and other.times is not None:
+            merged.times = np.concatenate((self.times, other.times))[order]
+        else:
+            merged.times = None
+        return merged
+
+    def select(self, mask: np.ndarray) -> 'PointIndex':
+        """New index with only the events where mask is true (order is kept)"""
+        subset = PointIndex.__new__(PointIndex)
+        subset.level = self.level
+        subset.codes = self.codes[mask]
+        subset.px = self.px[mask]
+        subset.py = self.py[mask]
+        subset.values = self.values[mask]
+        subset.times = None if self.times is None else self.times[mask]
+        return subset
+
+    def __len__(self) -> int:
+        return int(self.codes.size)
+
+    def tile_range(self, z: int, x: int, y: int, n: int = 1) -> Tuple[int, int]:
+        """Index range of events inside the n x n block (x, y) at zoom z - log2(n)"""
+        zoom = z - (n.bit_length() - 1)
+        if zoom < 0 or zoom > self.level:
+            raise ValueError(f"Zoom {z} outside index range for level {self.level}")
+        shift = _U64(2 * (self.level - zoom))
+        tile_code = morton_encode(np.array([x]), np.array([y]))[0]
+        lo = tile_code << shift
+        hi = (tile_code + _U64(1)) << shift
+        i0, i1 = np.searchsorted(self.codes, [lo, hi])
+        return int(i0), int(i1)
+
+    def count(self, z: int, x: int, y: int, n: int = 1) -> int:
+        """Number of events inside a tile or metatile envelope"""
+        i0, i1 = self.tile_range(z, x, y, n)
+        return i1 - i0
+
+    def tile_points(self, z: int, x: int, y: int, tile_size: int = 256,
+                    n: int = 1) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Pixel coordinates (within the block) and values of the events inside it"""
+        i0, i1 = self.tile_range(z, x, y, n)
+        return self.block_pixels(z, x, y, i0, i1, tile_size=tile_size, n=n)
+
+    def block_pixels(self, z: int, x: int, y: int, i0: int, i1: int,
+                     tile_size: int = 256, n: int = 1) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Block-relative pixel coordinates and values for events i0..i1"""
+        pixel_level = z + tile_size.bit_length() - 1
+        if pixel_level > self.level:
+            raise ValueError(f"Pixel level {pixel_level} finer than index level {self.level}")
+        drop = _U64(self.level - pixel_level)
+        size = tile_size * n
+        px = (self.px[i0:i1] >> drop).astype(np.int64) - x * size
+        py = (self.py[i0:i1] >> drop).astype(np.int64) - y * size
+        return px, py, self.values[i0:i1]
+
+    @property
+    def nbytes(self) -> int:
+        total = self.codes.nbytes + self.px.nbytes + self.py.nbytes + self.values.nbytes
+        if self.times is not None:
+            total += self.times.nbytes
+        return int(total)
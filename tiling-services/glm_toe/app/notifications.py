@@ -0,0 +1,293 @@
+"""
+GLM TOE Object-Created Notifications
+Ingest driven by "new object" messages (bucket, key) instead of listing.
+NOAA's GOES buckets publish an SNS notification for every new object;
+subscribed to an SQS queue, those messages say exactly which granule
+landed. Sources here read them from SQS, from a local JSON-lines file, or
+from an in-process queue (offline use and tests). The consumer dedupes
+and batches them and hands granule keys to the ingest pipeline; periodic
+polling stays on as a reconciliation fallback for lost messages.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional
+from urllib.parse import unquote_plus
+
+logger = logging.getLogger(__name__)
+
+# Keys remembered for dedupe; about two days of one satellite's granules
+DEDUPE_KEYS = 10000
+
+
+class ObjectCreated(NamedTuple):
+    bucket: str
+    key: str
+
+
+def parse_notification(body: str) -> List[ObjectCreated]:
+    """
+    Objects named by one message body, or [] when it names none
+    Accepts S3 event notifications ({"Records": [...]}), the same wrapped
+    in an SNS envelope ({"Type": "Notification", "Message": "..."}), and
+    plain {"bucket": ..., "key": ...}.
+    """
+    try:
+        message = json.loads(body)
+    except (TypeError, ValueError):
+        logger.warning(f"Ignoring notification that is not JSON: {str(body)[:200]}")
+        return []
+    if not isinstance(message, dict):
+        return []
+    if message.get('Type') == 'Notification' and isinstance(message.get('Message'), str):
+        return parse_notification(message['Message'])
+    if 'bucket' in message and 'key' in message:
+        return [ObjectCreated(str(message['bucket']), str(message['key']))]
+
+    objects = []
+    for record in message.get('Records', []):
+        if not str(record.get('eventName', 'ObjectCreated')).startswith('ObjectCreated'):
+            continue
+        s3 = record.get('s3', {})
+        bucket = s3.get('bucket', {}).get('name')
+        key = s3.get('object', {}).get('key')
+        if bucket and key:
+            # S3 event keys are URL-encoded
+            objects.append(ObjectCreated(bucket, unquote_plus(key)))
+    return objects
+
+
+class NotificationSource(ABC):
+    """Where object-created messages arrive from"""
+
+    @abstractmethod
+    async def receive(self, timeout: float) -> List[ObjectCreated]:
+        """Messages available within timeout seconds (possibly none)"""
+
+    def close(self):
+        pass
+
+
+class InProcessQueue(NotificationSource):
+    """Messages put by this process; the offline stand-in for a real queue"""
+
+    def __init__(self):
+        self._queue: "asyncio.Queue[ObjectCreated]" = asyncio.Queue()
+
+    def put(self, bucket: str, key: str):
+        self._queue.put_nowait(ObjectCreated(bucket, key))
+
+    async def receive(self, timeout: float) -> List[ObjectCreated]:
+        try:
+            first = await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        objects = [first]
+        while not self._queue.empty():
+            objects.append(self._queue.get_nowait())
+        return objects
+
+
+class FileQueue(NotificationSource):
+    """
+    Messages appended to a local file, one JSON message body per line
+    Read from the end of the file at startup, so only new lines count.
+    A line is consumed once it ends with a newline.
+    """
+
+    def __init__(self, path: str, poll_interval: float = 0.25, from_start: bool = False):
+        self.path = path
+        self.poll_interval = poll_interval
+        self._offset = 0 if from_start or not os.path.exists(path) else os.path.getsize(path)
+
+    def _read_lines(self) -> List[str]:
+        try:
+            with open(self.path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size < self._offset:
+                    self._offset = 0  # Truncated or replaced: start over
+                f.seek(self._offset)
+                data = f.read()
+        except FileNotFoundError:
+            return []
+        complete = data.rfind(b'\n') + 1
+        self._offset += complete
+        return [line for line in data[:complete].decode('utf-8', 'replace').splitlines() if line.strip()]
+
+    async def receive(self, timeout: float) -> List[ObjectCreated]:
+        deadline = time.monotonic() + timeout
+        while True:
+            objects = [obj for line in self._read_lines() for obj in parse_notification(line)]
+            remaining = deadline - time.monotonic()
+            if objects or remaining <= 0:
+                return objects
+            await asyncio.sleep(min(self.poll_interval, remaining))
+
+
+class SQSQueue(NotificationSource):
+    """
+    An SQS queue subscribed to the bucket's SNS topic
+    Messages are deleted once received; anything lost after that is
+    picked up by the reconciliation poll.
+    """
+
+    def __init__(self, queue_url: str, client=None):
+        self.queue_url = queue_url
+        if client is None:
+            import boto3
+            # https://sqs.<region>.amazonaws.com/<account>/<name>
+            host = queue_url.split('/')[2]
+            region = host.split('.')[1] if host.startswith('sqs.') else 'us-east-1'
+            client = boto3.client('sqs', region_name=region)
+        self.client = client
+
+    def _receive_blocking(self, wait_seconds: int) -> List[ObjectCreated]:
+        response = self.client.receive_message(
+            QueueUrl=self.queue_url, MaxNumberOfMessages=10, WaitTimeSeconds=wait_seconds
+        )
+        messages = response.get('Messages', [])
+        if messages:
+            self.client.delete_message_batch(
+                QueueUrl=self.queue_url,
+                Entries=[{'Id': str(i), 'ReceiptHandle': m['ReceiptHandle']} for i, m in enumerate(messages)]
+            )
+        return [obj for m in messages for obj in parse_notification(m.get('Body', ''))]
+
+    async def receive(self, timeout: float) -> List[ObjectCreated]:
+        wait_seconds = max(0, min(20, int(timeout)))  # SQS long polls for at most 20 s
+        return await asyncio.get_running_loop().run_in_executor(None, self._receive_blocking, wait_seconds)
+
+
+def make_notification_source(spec: str) -> Optional[NotificationSource]:
+    """
+    Source for a GLM_S3_NOTIFICATIONS value: an SQS queue URL,
+    file:<path> (JSON lines), memory: (in-process), or '' for none
+    """
+    if not spec:
+        return None
+    if spec == 'memory:':
+        return InProcessQueue()
+    if spec.startswith('file:'):
+        return FileQueue(spec[len('file:'):])
+    if spec.startswith('https://sqs.') or spec.startswith('https://queue.amazonaws.com'):
+        return SQSQueue(spec)
+    raise ValueError(f"Unknown notification source: {spec}")
+
+
+class NotificationConsumer:
+    """
+    Turns object-created messages into ingest batches
+    Messages for other buckets, non-granule keys and keys already seen are
+    dropped; the rest are collected for up to batch_wait seconds after the
+    first (or until batch_size) and passed to ingest as one batch.
+    """
+
+    def __init__(self, source: NotificationSource, bucket: str,
+                 ingest: Callable[[List[str]], Awaitable[Dict[str, int]]],
+                 prefix: str = 'GLM-L2-LCFA/', batch_size: int = 15, batch_wait: float = 1.0,
+                 receive_timeout: float = 20.0):
+        self.source = source
+        self.bucket = bucket
+        self.ingest = ingest
+        self.prefix = prefix
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.receive_timeout = receive_timeout
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+        self.last_message_wall: Optional[float] = None
+
+        # Counters
+        self.received = 0
+        self.duplicates = 0
+        self.ignored = 0
+        self.batches = 0
+        self.handed_off = 0
+        self.reconciled = 0
+        self.errors = 0
+
+    def seen(self, key: str) -> bool:
+        return key in self._seen
+
+    def mark_seen(self, key: str):
+        self._seen[key] = None
+        self._seen.move_to_end(key)
+        while len(self._seen) > DEDUPE_KEYS:
+            self._seen.popitem(last=False)
+
+    def accept(self, objects: List[ObjectCreated]) -> List[str]:
+        """New granule keys among objects, in arrival order"""
+        keys = []
+        for obj in objects:
+            self.received += 1
+            name = obj.key.rsplit('/', 1)[-1]
+            if obj.bucket != self.bucket or not obj.key.startswith(self.prefix) or \
+                    not (name.startswith('OR_GLM-L2-LCFA_') and name.endswith('.nc')):
+                self.ignored += 1
+                continue
+            if self.seen(obj.key):
+                self.duplicates += 1
+                continue
+            self.mark_seen(obj.key)
+            keys.append(obj.key)
+        return keys
+
+    def record_reconciled(self, keys: List[str]):
+        """Granules the fallback poll ingested that no message announced"""
+        missed = [key for key in keys if not self.seen(key)]
+        for key in missed:
+            self.mark_seen(key)
+        self.reconciled += len(missed)
+        if missed:
+            logger.warning(f"Reconciliation poll found {len(missed)} granules without notifications")
+
+    async def next_batch(self) -> List[str]:
+        """Wait for messages, then collect a batch of new keys"""
+        keys = self.accept(await self.source.receive(self.receive_timeout))
+        if not keys:
+            return []
+        self.last_message_wall = time.time()
+        deadline = time.monotonic() + self.batch_wait
+        while len(keys) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            keys.extend(self.accept(await self.source.receive(remaining)))
+        return keys
+
+    async def run(self):
+        """Consume messages until cancelled"""
+        logger.info(f"Consuming object-created notifications for {self.bucket}")
+        while True:
+            try:
+                keys = await self.next_batch()
+                for start in range(0, len(keys), self.batch_size):
+                    batch = keys[start:start + self.batch_size]
+                    await self.ingest(batch)
+                    self.batches += 1
+                    self.handed_off += len(batch)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Error consuming notifications: {e}")
+                await asyncio.sleep(1.0)
+
+    def get_stats(self) -> Dict:
+        """Message, dedupe, batch and reconciliation counters"""
+        return {
+            'source': type(self.source).__name__,
+            'bucket': self.bucket,
+            'received': self.received,
+            'duplicates': self.duplicates,
+            'ignored': self.ignored,
+            'batches': self.batches,
+            'granules': self.handed_off,
+            'reconciled': self.reconciled,
+            'errors': self.errors,
+            'seconds_since_message': round(time.time() - self.last_message_wall, 1)
+            if self.last_message_wall else None
+        }
@@ -0,0 +1,77 @@
+"""
+GLM TOE Sampling Profiler
+Time-bounded wall-clock sampler over every thread of the running worker
+(event loop, render pool, encode pool, S3 poller). Output is in the
+collapsed-stack format ("frame;frame;frame count" per line) read by
+flamegraph.pl, speedscope and inferno.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+# Stacks deeper than this are truncated at the root end
+MAX_STACK_DEPTH = 128
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+class SamplingProfiler:
+    """
+    Samples sys._current_frames() at a fixed rate for a fixed duration
+    Only one capture runs at a time per process.
+    """
+
+    def __init__(self):
+        self._busy = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._busy.locked()
+
+    def capture(self, seconds: float, interval: float = 0.01) -> Optional[Dict[str, int]]:
+        """
+        Collapsed stack -> sample count over seconds, or None when a capture
+        is already running
+        Blocks the calling thread for the duration; call it off the event loop.
+        """
+        if not self._busy.acquire(blocking=False):
+            return None
+        try:
+            own = threading.get_ident()
+            names = {}
+            stacks: Counter = Counter()
+            deadline = time.perf_counter() + seconds
+            while True:
+                frames = sys._current_frames()
+                if any(ident not in names for ident in frames):
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for ident, frame in frames.items():
+                    if ident == own:
+                        continue
+                    labels = []
+                    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+                        labels.append(_frame_label(frame))
+                        frame = frame.f_back
+                    labels.append(names.get(ident, f"thread-{ident}"))
+                    stacks[';'.join(reversed(labels))] += 1
+                del frames
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                time.sleep(min(interval, remaining))
+            return dict(stacks)
+        finally:
+            self._busy.release()
+
+
+def format_collapsed(stacks: Dict[str, int]) -> str:
+    """Collapsed-stack text, heaviest stacks first"""
+    lines = [f"{stack} {count}" for stack, count in sorted(stacks.items(), key=lambda item: (-item[1], item[0]))]
+    return '\n'.join(lines) + ('\n' if lines else '')
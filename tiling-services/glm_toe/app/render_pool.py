@@ -0,0 +1,160 @@
+"""
+GLM TOE Render Pool
+Runs CPU-bound tile work (aggregation, colorizing, PNG encoding) on a
+dedicated, bounded thread pool so the asyncio event loop stays responsive.
+NumPy kernels and zlib release the GIL, so threads scale across cores.
+"""
+
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Optional
+
+import numpy as np
+
+from .metrics import record_stage
+
+logger = logging.getLogger(__name__)
+
+
+class RenderPoolSaturated(Exception):
+    """Raised when the render queue is full and new work is rejected"""
+    pass
+
+
+class RenderPool:
+    """
+    Bounded thread pool for render work with queue-depth and wait-time metrics
+    At most max_workers jobs run at once; at most max_queue jobs may wait
+    behind them before new submissions are rejected.
+    """
+
+    def __init__(self, max_workers: int = 4, max_queue: int = 64, sample_size: int = 1024):
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+        # Live gauges
+        self.queued = 0
+        self.active = 0
+
+        # Counters
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.max_queue_depth_seen = 0
+
+        # Recent samples (seconds) for percentiles
+        self._wait_samples: Deque[float] = deque(maxlen=sample_size)
+        self._run_samples: Deque[float] = deque(maxlen=sample_size)
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Create the executor on first use (and again after shutdown)"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="tile-render"
+                )
+            return self._executor
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run fn(*args, **kwargs) on the pool and await its result"""
+        with self._lock:
+            if self.queued + self.active >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise RenderPoolSaturated(
+                    f"Render queue full ({self.queued} waiting, {self.active} running)"
+                )
+            self.queued += 1
+            self.submitted += 1
+            self.max_queue_depth_seen = max(self.max_queue_depth_seen, self.queued)
+
+        executor = self._get_executor()
+        loop = asyncio.get_running_loop()
+        # Run in a copy of the caller's context so per-request stage timing follows the job
+        ctx = contextvars.copy_context()
+        job = executor.submit(ctx.run, self._invoke, time.perf_counter(), fn, args, kwargs)
+        job.add_done_callback(self._release_cancelled)
+        return await asyncio.wrap_future(job, loop=loop)
+
+    def _release_cancelled(self, job: Future):
+        """Free the queue slot of a job cancelled before it started (its awaiter went away)"""
+        if job.cancelled():
+            with self._lock:
+                self.queued -= 1
+
+    def _invoke(self, enqueued_at: float, fn: Callable[..., Any], args, kwargs) -> Any:
+        """Worker-side wrapper that records wait and run time"""
+        started = time.perf_counter()
+        wait = started - enqueued_at
+        with self._lock:
+            self.queued -= 1
+            self.active += 1
+            self._wait_samples.append(wait)
+            self._wait_total += wait
+            self._wait_max = max(self._wait_max, wait)
+
+        record_stage('render_wait', wait)
+
+        ok = False
+        try:
+            result = fn(*args, **kwargs)
+            ok = True
+            return result
+        finally:
+            elapsed = time.perf_counter() - started
+            record_stage('render', elapsed)
+            with self._lock:
+                self.active -= 1
+                self._run_samples.append(elapsed)
+                if ok:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+
+    @staticmethod
+    def _percentiles_ms(samples) -> Dict[str, Optional[float]]:
+        if not samples:
+            return {'p50': None, 'p95': None, 'p99': None}
+        p50, p95, p99 = np.percentile(np.fromiter(samples, dtype=np.float64), [50, 95, 99]) * 1000.0
+        return {'p50': round(float(p50), 3), 'p95': round(float(p95), 3), 'p99': round(float(p99), 3)}
+
+    def get_stats(self) -> Dict:
+        """Queue depth, throughput and wait/run time statistics"""
+        with self._lock:
+            waits = list(self._wait_samples)
+            runs = list(self._run_samples)
+            started = self.completed + self.failed + self.active
+            return {
+                'max_workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'queue_depth': self.queued,
+                'active': self.active,
+                'max_queue_depth_seen': self.max_queue_depth_seen,
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'wait_ms': {
+                    'mean': round(self._wait_total / started * 1000.0, 3) if started else None,
+                    'max': round(self._wait_max * 1000.0, 3),
+                    **self._percentiles_ms(waits)
+                },
+                'run_ms': self._percentiles_ms(runs)
+            }
+
+    def shutdown(self, wait: bool = False):
+        """Stop the executor; a later run() starts a fresh one"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
@@ -0,0 +1,258 @@
+"""
+GLM TOE Accelerated Replay
+Pushes an archived directory of granules through the live ingest path
+faster than real time. Granules are released in filename time order on a
+virtual clock running speedup times faster than the wall clock, so
+"now" (live windows, pruning, freshness) follows replay time. Sustained
+ingest rate and live-tile latency are recorded while it runs.
+
+Usage:
+    python -m app.replay /data/glm/2024-10-09 --speedup 60
+    python -m app.replay /data/glm/2024-10-09 --speedup 120 --serve --port 8000
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .event_index import datetime_to_ms
+
+logger = logging.getLogger(__name__)
+
+_TIME_RE = {
+    field: re.compile(rf'_{field}(\d{{4}})(\d{{3}})(\d{{2}})(\d{{2}})(\d{{2}})(\d)')
+    for field in ('s', 'e')
+}
+
+
+def _filename_time(name: str, field: str) -> Optional[datetime]:
+    match = _TIME_RE[field].search(name)
+    if match is None:
+        return None
+    year, doy, hour, minute, second, tenths = (int(g) for g in match.groups())
+    return datetime(year, 1, 1) + timedelta(days=doy - 1, hours=hour, minutes=minute,
+                                            seconds=second, milliseconds=100 * tenths)
+
+
+def granule_times(path: str) -> Optional[Tuple[datetime, datetime]]:
+    """(start, end) from a GLM granule filename, or None when it has none"""
+    name = os.path.basename(path)
+    start, end = _filename_time(name, 's'), _filename_time(name, 'e')
+    if start is None or end is None:
+        return None
+    return start, end
+
+
+def list_granules(directory: str) -> List[Tuple[datetime, datetime, str]]:
+    """Every .nc granule under directory as (start, end, path), in start time order"""
+    found = []
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if not name.endswith('.nc'):
+                continue
+            times = granule_times(name)
+            if times is None:
+                logger.warning(f"Skipping {name}: no start/end time in filename")
+                continue
+            found.append((times[0], times[1], os.path.join(root, name)))
+    found.sort()
+    return found
+
+
+class VirtualClock:
+    """Clock starting at origin and running speedup times faster than the wall clock"""
+
+    def __init__(self, origin: datetime, speedup: float, wall: Callable[[], float] = time.monotonic):
+        if speedup <= 0:
+            raise ValueError("speedup must be positive")
+        self.origin = origin
+        self.speedup = speedup
+        self._wall = wall
+        self._wall_origin = wall()
+
+    def now(self) -> datetime:
+        """Current replay time (naive UTC)"""
+        return self.origin + timedelta(seconds=(self._wall() - self._wall_origin) * self.speedup)
+
+    def timestamp(self) -> float:
+        """Current replay time as epoch seconds"""
+        return datetime_to_ms(self.now()) / 1000.0
+
+    def wall_until(self, when: datetime) -> float:
+        """Wall seconds until replay time reaches when (negative once past)"""
+        return (when - self.now()).total_seconds() / self.speedup
+
+
+def _percentiles_ms(samples: List[float]) -> Dict[str, object]:
+    if not samples:
+        return {'count': 0}
+    values = np.array(samples) * 1000.0
+    return {
+        'count': int(values.size),
+        'p50': round(float(np.percentile(values, 50)), 3),
+        'p95': round(float(np.percentile(values, 95)), 3),
+        'p99': round(float(np.percentile(values, 99)), 3),
+        'max': round(float(values.max()), 3)
+    }
+
+
+class GranuleReplayer:
+    """
+    Releases granules when the virtual clock passes their end time
+    Granules already due are ingested together, as one S3 poll would find
+    them. ingest(paths) returns a dict with 'processed', 'events' and
+    'failed'; probe(), if given, requests live tiles after each batch and
+    returns their latencies in seconds.
+    """
+
+    def __init__(self, granules: List[Tuple[datetime, datetime, str]], clock: VirtualClock,
+                 ingest: Callable[[List[str]], Awaitable[Dict[str, int]]],
+                 probe: Optional[Callable[[], Awaitable[List[float]]]] = None,
+                 max_batch: int = 15):
+        self.granules = granules
+        self.clock = clock
+        self.ingest = ingest
+        self.probe = probe
+        self.max_batch = max_batch
+
+        self.finished = False
+        self.started_wall: Optional[float] = None
+        self.finished_wall: Optional[float] = None
+        self.data_time: Optional[datetime] = None
+
+        # Counters
+        self.batches = 0
+        self.granules_ingested = 0
+        self.granules_failed = 0
+        self.events_ingested = 0
+        self.ingest_seconds = 0.0
+        self.max_batch_seconds = 0.0
+        self.behind_seconds = 0.0
+        self.tile_latencies: List[float] = []
+
+    async def run(self):
+        """Replay every granule, then mark the replay finished"""
+        self.started_wall = time.perf_counter()
+        pending = list(self.granules)
+        try:
+            while pending:
+                wait = self.clock.wall_until(pending[0][1])
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                self.behind_seconds = max(0.0, -self.clock.wall_until(pending[0][1]))
+
+                now = self.clock.now()
+                batch = []
+                while pending and pending[0][1] <= now and len(batch) < self.max_batch:
+                    batch.append(pending.pop(0))
+                if not batch:
+                    continue
+
+                start = time.perf_counter()
+                result = await self.ingest([path for _, _, path in batch])
+                elapsed = time.perf_counter() - start
+                self.batches += 1
+                self.ingest_seconds += elapsed
+                self.max_batch_seconds = max(self.max_batch_seconds, elapsed)
+                self.granules_ingested += result.get('processed', 0)
+                self.granules_failed += result.get('failed', 0)
+                self.events_ingested += result.get('events', 0)
+                self.data_time = batch[-1][1]
+
+                if self.probe is not None:
+                    self.tile_latencies.extend(await self.probe())
+        finally:
+            self.finished = True
+            self.finished_wall = time.perf_counter()
+            logger.info(f"Replay finished: {json.dumps(self.get_stats())}")
+
+    def get_stats(self) -> Dict:
+        """Progress, sustained ingest rate and live-tile latency"""
+        if self.started_wall is None:
+            wall = 0.0
+        else:
+            wall = (self.finished_wall or time.perf_counter()) - self.started_wall
+        first = self.granules[0][0] if self.granules else None
+        data_seconds = (self.data_time - first).total_seconds() if self.data_time and first else 0.0
+        return {
+            'finished': self.finished,
+            'speedup': self.clock.speedup,
+            'replay_time': self.clock.now().isoformat(),
+            'data_time': self.data_time.isoformat() if self.data_time else None,
+            'granules_total': len(self.granules),
+            'granules_ingested': self.granules_ingested,
+            'granules_failed': self.granules_failed,
+            'events_ingested': self.events_ingested,
+            'batches': self.batches,
+            'wall_seconds': round(wall, 3),
+            'achieved_speedup': round(data_seconds / wall, 2) if wall > 0 else None,
+            'ingest_rate': {
+                'granules_per_second': round(self.granules_ingested / wall, 3) if wall > 0 else None,
+                'events_per_second': round(self.events_ingested / wall, 1) if wall > 0 else None
+            },
+            # Share of wall time spent ingesting; near 1.0 the speedup is not sustainable
+            'ingest_busy_fraction': round(self.ingest_seconds / wall, 4) if wall > 0 else None,
+            'max_batch_seconds': round(self.max_batch_seconds, 3),
+            'behind_schedule_seconds': round(self.behind_seconds, 3),
+            'tile_latency_ms': _percentiles_ms(self.tile_latencies)
+        }
+
+
+async def _serve_until_done(server, service, report_path: Optional[str], keep_serving: bool):
+    serving = asyncio.create_task(server.serve())
+    while not serving.done():
+        replayer = service._replayer
+        if replayer is not None and replayer.finished:
+            break
+        await asyncio.sleep(0.25)
+
+    replayer = service._replayer
+    if replayer is not None:
+        report = json.dumps(replayer.get_stats(), indent=2)
+        print(report)
+        if report_path:
+            with open(report_path, 'w') as f:
+                f.write(report + '\n')
+    if not keep_serving:
+        server.should_exit = True
+    await serving
+
+
+def main(argv: Optional[List[str]] = None):
+    """Command-line entry point: run the tile service with replay as its ingest source"""
+    parser = argparse.ArgumentParser(description="Replay archived GLM granules through the live pipeline")
+    parser.add_argument('directory', help="Directory of granules (searched recursively)")
+    parser.add_argument('--speedup', type=float, default=60.0, help="Replay time per wall second (default 60)")
+    parser.add_argument('--probe-zooms', default='4,7,10',
+                        help="Zooms of the live tiles requested over the newest lightning after each batch")
+    parser.add_argument('--report', help="Also write the final report (JSON) here")
+    parser.add_argument('--serve', action='store_true', help="Keep serving tiles after the replay ends")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    import uvicorn
+    from . import main as service
+
+    service.GLM_REPLAY_DIR = args.directory
+    service.GLM_REPLAY_SPEEDUP = args.speedup
+    service.GLM_REPLAY_PROBE_ZOOMS = [int(z) for z in args.probe_zooms.split(',') if z]
+    server = uvicorn.Server(uvicorn.Config(service.app, host=args.host, port=args.port, log_level='warning'))
+    asyncio.run(_serve_until_done(server, service, args.report, args.serve))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+"""
+GLM TOE S3 Granule Downloads
+GETs granules from S3 so that one slow object cannot hold up ingest.
+Each GET has its own deadline; a GET still running after the recent p95
+download time gets a hedged duplicate, and whichever finishes first wins.
+Failed rounds are retried with exponential backoff and jitter, within an
+overall deadline per granule. Downloads are checked against head_object:
+the size always, and the MD5 when the ETag is one (single-part uploads).
+"""
+
+import hashlib
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger(__name__)
+
+_MD5_ETAG_RE = re.compile(r'^[0-9a-f]{32}$')
+
+
+class DownloadError(Exception):
+    """A granule could not be downloaded within its deadline and retries"""
+
+
+class DeadlineExceeded(DownloadError):
+    """A GET (or the whole download) ran past its deadline"""
+
+
+class VerificationError(DownloadError):
+    """Downloaded bytes do not match head_object's size or ETag"""
+
+
+class _Cancelled(Exception):
+    pass
+
+
+def _error_code(error: Exception) -> str:
+    if isinstance(error, ClientError):
+        return str(error.response.get('Error', {}).get('Code', ''))
+    return ''
+
+
+def is_permanent(error: Exception) -> bool:
+    """True for errors a retry cannot fix: missing keys and other 4xx client errors"""
+    if not isinstance(error, ClientError):
+        return False
+    if _error_code(error) in ('NoSuchKey', 'NotFound', 'NoSuchBucket', 'AccessDenied', '403', '404'):
+        return True
+    status = error.response.get('ResponseMetadata', {}).get('HTTPStatusCode', 0)
+    return 400 <= status < 500 and status not in (408, 429)
+
+
+class _Attempt:
+    """One GET writing to its own part file"""
+
+    def __init__(self, index: int, path: str, deadline: float):
+        self.index = index
+        self.path = path
+        self.deadline = deadline
+        self.cancelled = False
+        self.started = time.monotonic()
+
+
+class GranuleDownloader:
+    """
+    Deadline-bound, hedged, retried and verified GETs
+    client returns the boto3 S3 client to use (it is shared by the GET
+    threads; boto3 clients are thread-safe). Stats cover every download
+    since startup.
+    """
+
+    def __init__(self, client: Callable[[], object], deadline: float = 60.0, request_timeout: float = 15.0,
+                 retries: int = 3, backoff: float = 0.5, max_backoff: float = 8.0,
+                 hedge: bool = True, hedge_quantile: float = 0.95, hedge_default: float = 2.0,
+                 hedge_min: float = 0.2, min_samples: int = 10, history: int = 200,
+                 verify: bool = True, chunk_size: int = 256 * 1024,
+                 sleep: Callable[[float], None] = time.sleep):
+        self._client = client
+        self.deadline = deadline
+        self.request_timeout = request_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_default = hedge_default
+        self.hedge_min = hedge_min
+        self.min_samples = min_samples
+        self.verify = verify
+        self.chunk_size = chunk_size
+        self._sleep = sleep
+        self._get_seconds = deque(maxlen=history)  # Completed GETs, for the hedge delay
+        self._download_seconds = deque(maxlen=history)  # Whole downloads, for the report
+        self._lock = threading.Lock()
+
+        # Counters
+        self.downloads = 0
+        self.failed = 0
+        self.gets = 0
+        self.retried = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.deadlines_exceeded = 0
+        self.verification_failures = 0
+        self.bytes = 0
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def hedge_delay(self) -> float:
+        """Seconds a GET may run before it is hedged: the recent p95, or hedge_default until enough samples"""
+        with self._lock:
+            samples = sorted(self._get_seconds)
+        if len(samples) < self.min_samples:
+            delay = self.hedge_default
+        else:
+            delay = samples[min(len(samples) - 1, int(self.hedge_quantile * len(samples)))]
+        return min(max(delay, self.hedge_min), self.request_timeout)
+
+    def head(self, bucket: str, key: str) -> Tuple[int, Optional[str]]:
+        """(size, md5 hex or None) from head_object"""
+        response = self._client().head_object(Bucket=bucket, Key=key)
+        etag = str(response.get('ETag', '')).strip('"').lower()
+        return int(response['ContentLength']), etag if _MD5_ETAG_RE.match(etag) else None
+
+    def download(self, bucket: str, key: str, local_path: str):
+        """
+        Download s3://bucket/key to local_path or raise DownloadError
+        Missing keys and other permanent errors are raised at once.
+        """
+        start = time.monotonic()
+        deadline = start + self.deadline
+        self._count('downloads')
+        expected = None
+        delay = self.backoff
+        error: Optional[Exception] = None
+
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self._count('retried')
+                pause = min(random.uniform(delay / 2, delay), deadline - time.monotonic())
+                if pause > 0:
+                    self._sleep(pause)
+                delay = min(delay * 2, self.max_backoff)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                if self.verify and expected is None:
+                    expected = self.head(bucket, key)
+                self._hedged_get(bucket, key, local_path, expected, min(remaining, self.request_timeout))
+                with self._lock:
+                    self._download_seconds.append(time.monotonic() - start)
+                return
+            except Exception as e:
+                error = e
+                if isinstance(e, DeadlineExceeded):
+                    self._count('deadlines_exceeded')
+                elif isinstance(e, VerificationError):
+                    self._count('verification_failures')
+                    expected = None  # The object may have been replaced: HEAD again
+                if is_permanent(e):
+                    break
+                logger.warning(f"GET s3://{bucket}/{key} failed (try {attempt + 1}): {e}")
+
+        self._count('failed')
+        if isinstance(error, DownloadError) or error is None:
+            raise error or DeadlineExceeded(f"s3://{bucket}/{key}: deadline of {self.deadline} s passed")
+        raise DownloadError(f"s3://{bucket}/{key}: {error}") from error
+
+    def _hedged_get(self, bucket: str, key: str, local_path: str,
+                    expected: Optional[Tuple[int, Optional[str]]], timeout: float):
+        """One round: a GET, plus a hedge if it outlives the hedge delay; the first good copy wins"""
+        results: "queue.Queue[Tuple[_Attempt, Optional[Exception]]]" = queue.Queue()
+        attempts: List[_Attempt] = []
+        lock = threading.Lock()
+        end = time.monotonic() + timeout
+
+        def launch():
+            attempt = _Attempt(len(attempts), f"{local_path}.part{len(attempts)}", end)
+            attempts.append(attempt)
+            self._count('gets')
+            threading.Thread(target=self._get, args=(bucket, key, attempt, expected, results, lock),
+                             name=f"s3-get-{attempt.index}", daemon=True).start()
+
+        def abandon(winner: Optional[_Attempt] = None):
+            with lock:
+                for attempt in attempts:
+                    attempt.cancelled = attempt is not winner
+            # Copies that finished before being cancelled left their files behind
+            while True:
+                try:
+                    attempt, error = results.get_nowait()
+                except queue.Empty:
+                    break
+                if error is None and attempt is not winner:
+                    _remove(attempt.path)
+
+        launch()
+        hedge_at = time.monotonic() + self.hedge_delay() if self.hedge else float('inf')
+        running = 1
+        error: Optional[Exception] = None
+        try:
+            while True:
+                now = time.monotonic()
+                if now >= end:
+                    raise DeadlineExceeded(f"s3://{bucket}/{key}: GET took over {timeout:.1f} s")
+                if now >= hedge_at:
+                    hedge_at = float('inf')
+                    self._count('hedged')
+                    launch()
+                    running += 1
+                try:
+                    attempt, error = results.get(timeout=min(end, hedge_at) - now)
+                except queue.Empty:
+                    continue
+                running -= 1
+                if error is None:
+                    abandon(winner=attempt)
+                    os.replace(attempt.path, local_path)
+                    if attempt.index:
+                        self._count('hedge_wins')
+                    return
+                if running == 0 or is_permanent(error):
+                    raise error
+        except BaseException:
+            abandon()
+            raise
+
+    def _get(self, bucket: str, key: str, attempt: _Attempt, expected: Optional[Tuple[int, Optional[str]]],
+             results: queue.Queue, lock: threading.Lock):
+        """GET into attempt.path, checking the attempt's deadline and cancellation between chunks"""
+        error: Optional[Exception] = None
+        try:
+            response = self._client().get_object(Bucket=bucket, Key=key)
+            body = response['Body']
+            digest = hashlib.md5() if expected and expected[1] else None
+            size = 0
+            try:
+                with open(attempt.path, 'wb') as f:
+                    while True:
+                        if attempt.cancelled:
+                            raise _Cancelled()
+                        if time.monotonic() > attempt.deadline:
+                            raise DeadlineExceeded(f"s3://{bucket}/{key}: GET passed its deadline")
+                        chunk = body.read(self.chunk_size)
+                        if not chunk:
+                            break
+                        f.write(chunk)
+                        size += len(chunk)
+                        if digest is not None:
+                            digest.update(chunk)
+            finally:
+                body.close()
+
+            wanted = expected[0] if expected else response.get('ContentLength')
+            if wanted is not None and size != wanted:
+                raise VerificationError(f"s3://{bucket}/{key}: got {size} bytes, expected {wanted}")
+            if digest is not None and digest.hexdigest() != expected[1]:
+                raise VerificationError(f"s3://{bucket}/{key}: MD5 {digest.hexdigest()} does not match ETag")
+            self._count('bytes', size)
+            with self._lock:
+                self._get_seconds.append(time.monotonic() - attempt.started)
+        except Exception as e:
+            error = e
+
+        with lock:
+            if error is not None or attempt.cancelled:
+                _remove(attempt.path)
+            if not attempt.cancelled:
+                results.put((attempt, error))
+
+    def get_stats(self) -> Dict:
+        """Download counters, current hedge delay and download latency percentiles"""
+        with self._lock:
+            samples = sorted(self._download_seconds)
+
+        def quantile(q: float) -> Optional[float]:
+            if not samples:
+                return None
+            return round(samples[min(len(samples) - 1, int(q * len(samples)))] * 1000.0, 1)
+
+        return {
+            'downloads': self.downloads,
+            'failed': self.failed,
+            'gets': self.gets,
+            'retried': self.retried,
+            'hedged': self.hedged,
+            'hedge_wins': self.hedge_wins,
+            'deadlines_exceeded': self.deadlines_exceeded,
+            'verification_failures': self.verification_failures,
+            'bytes': self.bytes,
+            'hedge_delay_seconds': round(self.hedge_delay(), 3) if self.hedge else None,
+            'latency_ms': {'p50': quantile(0.5), 'p95': quantile(0.95), 'p99': quantile(0.99),
+                           'max': round(samples[-1] * 1000.0, 1) if samples else None}
+        }
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -5,17 +5,139 @@ as specified in the documentation.
 """
 
 import os
+import re
 import logging
-from typing import List, Dict, Optional, Tuple
-from datetime import datetime, timedelta
-import boto3
+import statistics
+from collections import deque
+from typing import Callable, Iterable, Iterator, List, Dict, Optional, Tuple
+from datetime import datetime, timedelta, timezone
 import fsspec
 from botocore.exceptions import ClientError, NoCredentialsError
 import asyncio
 from dataclasses import dataclass
 
+from .metrics import timed
+from .s3_download import GranuleDownloader
+from .s3_pool import S3ConnectionPool
+
 logger = logging.getLogger(__name__)
 
+# Polls in a row a listed granule may fail to ingest before the cursor moves past it
+MAX_INGEST_ATTEMPTS = 3
+
+_START_RE = re.compile(r'_s(\d{4})(\d{3})(\d{2})(\d{2})(\d{2})(\d)')
+_END_RE = re.compile(r'_e(\d{4})(\d{3})(\d{2})(\d{2})(\d{2})(\d)')
+
+
+def _key_time(pattern: re.Pattern, key: str) -> Optional[datetime]:
+    match = pattern.search(key.rsplit('/', 1)[-1])
+    if match is None:
+        return None
+    year, doy, hour, minute, second, tenths = (int(g) for g in match.groups())
+    return datetime(year, 1, 1) + timedelta(days=doy - 1, hours=hour, minutes=minute,
+                                            seconds=second, milliseconds=100 * tenths)
+
+
+def granule_start_time(key: str) -> Optional[datetime]:
+    """Start time (naive UTC, tenths of a second) from a GLM granule key, or None"""
+    return _key_time(_START_RE, key)
+
+
+def granule_end_time(key: str) -> Optional[datetime]:
+    """End time (naive UTC, tenths of a second) from a GLM granule key, or None"""
+    return _key_time(_END_RE, key)
+
+
+class ArrivalPredictor:
+    """
+    Predicts when a satellite's next granule will be published
+    Granules end on a fixed cadence and appear in S3 some seconds after
+    their end time. That offset is learned from observed publication times
+    (LastModified); the next probe is due once the next granule's end time
+    plus the learned offset (its quantile) has passed. While a granule is
+    late, probes back off exponentially up to max_delay.
+    """
+    
+    def __init__(self, cadence: float = 20.0, history: int = 30, quantile: float = 0.9,
+                 margin: float = 0.5, min_backoff: float = 1.0, max_delay: float = 60.0,
+                 now: Callable[[], datetime] = datetime.utcnow):
+        self.cadence = cadence
+        self.quantile = quantile
+        self.margin = margin
+        self.min_backoff = min_backoff
+        self.max_delay = max_delay
+        self._now = now
+        self._offsets = deque(maxlen=history)
+        self._intervals = deque(maxlen=history)
+        self.last_end: Optional[datetime] = None
+        self.misses = 0
+        
+        # Counters
+        self.observed = 0
+        self.probes = 0
+        self.late_probes = 0
+    
+    def observe(self, end: datetime, published: datetime):
+        """Record a granule ending at end that was first listed (or last modified) at published"""
+        self.observed += 1
+        self.misses = 0
+        self._offsets.append((published - end).total_seconds())
+        if self.last_end is not None and end > self.last_end:
+            self._intervals.append((end - self.last_end).total_seconds())
+        if self.last_end is None or end > self.last_end:
+            self.last_end = end
+    
+    def missed(self):
+        """Record a probe that found nothing new"""
+        self.misses += 1
+        self.late_probes += 1
+    
+    def offset(self) -> Optional[float]:
+        """Learned seconds from granule end to publication (the configured quantile)"""
+        if not self._offsets:
+            return None
+        ordered = sorted(self._offsets)
+        return ordered[min(len(ordered) - 1, int(self.quantile * len(ordered)))]
+    
+    def expected_cadence(self) -> float:
+        # Median of recent spacings; a single gap (a missing granule) does not move it
+        return statistics.median(self._intervals) if len(self._intervals) >= 3 else self.cadence
+    
+    def expected_arrival(self) -> Optional[datetime]:
+        """When the next granule should be listable, or None before anything was observed"""
+        offset = self.offset()
+        if self.last_end is None or offset is None:
+            return None
+        return self.last_end + timedelta(seconds=self.expected_cadence() + offset + self.margin)
+    
+    def next_delay(self) -> float:
+        """Seconds until the next probe"""
+        self.probes += 1
+        arrival = self.expected_arrival()
+        if arrival is None:
+            return self.max_delay
+        wait = (arrival - self._now()).total_seconds()
+        if wait > 0 and self.misses == 0:
+            return min(wait, self.max_delay)
+        # Late: back off 1, 2, 4 ... seconds
+        return min(self.min_backoff * 2 ** max(0, self.misses - 1), self.max_delay)
+    
+    def get_stats(self) -> Dict:
+        """Learned offset and cadence, next expected arrival and probe counters"""
+        offset = self.offset()
+        arrival = self.expected_arrival()
+        return {
+            'observed': self.observed,
+            'offset_seconds': round(offset, 3) if offset is not None else None,
+            'cadence_seconds': round(self.expected_cadence(), 3),
+            'last_end': self.last_end.isoformat() if self.last_end else None,
+            'expected_arrival': arrival.isoformat() if arrival else None,
+            'consecutive_misses': self.misses,
+            'probes': self.probes,
+            'late_probes': self.late_probes
+        }
+
+
 @dataclass
 class GLMBucketConfig:
     """Configuration for GLM S3 buckets"""
@@ -30,7 +152,10 @@ class GLMS3Fetcher:
     Implements the data source integration from documentation
     """
     
-    def __init__(self):
+    def __init__(self, download_deadline: float = 60.0, request_timeout: float = 15.0,
+                 download_retries: int = 3, hedge_downloads: bool = True, verify_downloads: bool = True,
+                 pool_size: int = 32, tcp_keepalive: bool = True, idle_timeout: float = 60.0,
+                 endpoint_url: Optional[str] = None):
         # Default bucket configurations per documentation
         self.buckets = {
             'goes-west': GLMBucketConfig(
@@ -47,31 +172,268 @@ class GLMS3Fetcher:
             )
         }
         
-        # Initialize S3 client (anonymous access)
+        # Initialize S3 client (anonymous access), shared by every operation and thread
         self.s3_client = None
-        self._setup_s3_client()
+        self.pool: Optional[S3ConnectionPool] = None
+        self._setup_s3_client(pool_size, tcp_keepalive, idle_timeout, request_timeout, endpoint_url)
+        
+        # Granule GETs: deadlines, hedging, retries and verification
+        self.downloader = GranuleDownloader(
+            lambda: self.s3_client,
+            deadline=download_deadline,
+            request_timeout=request_timeout,
+            retries=download_retries,
+            hedge=hedge_downloads,
+            verify=verify_downloads
+        )
         
         # Cache for recent granules
         self._granule_cache = {}
         self._cache_ttl = timedelta(minutes=5)
+        
+        # Incremental listing: last key seen per bucket, plus request counters
+        self._cursors: Dict[str, str] = {}
+        self._list_stats: Dict[str, Dict[str, int]] = {}
+        # Keys of the latest listing (all, and those returned) awaiting commit_cursor
+        self._pending: Dict[str, Tuple[List[str], set]] = {}
+        self._listed_max: Dict[str, str] = {}
+        self._failures: Dict[str, int] = {}
+        self._backlog: Dict[str, bool] = {}
+        
+        # Publication timing learned per satellite, for predictive polling
+        self._arrivals: Dict[str, ArrivalPredictor] = {}
     
-    def _setup_s3_client(self):
-        """Setup S3 client for anonymous access"""
+    def _setup_s3_client(self, pool_size: int, tcp_keepalive: bool, idle_timeout: float,
+                         request_timeout: float, endpoint_url: Optional[str]):
+        """Setup the shared S3 connection pool for anonymous access"""
         try:
-            # Use boto3 for better error handling and features
-            self.s3_client = boto3.client(
-                's3',
-                region_name='us-east-1',
-                config=boto3.session.Config(
-                    signature_version=boto3.session.UNSIGNED
-                )
+            # A stalled GET is abandoned by its deadline; the socket gives up soon after.
+            # Retries are the downloader's (and the next poll's), not botocore's.
+            self.pool = S3ConnectionPool(
+                pool_size=pool_size,
+                keepalive=tcp_keepalive,
+                idle_timeout=idle_timeout,
+                read_timeout=request_timeout,
+                endpoint_url=endpoint_url
             )
-            logger.info("S3 client initialized for anonymous access")
+            # Use boto3 for better error handling and features; fsspec when it is unavailable
+            self.s3_client = self.pool.client
+            if self.s3_client is not None:
+                logger.info(f"S3 client initialized for anonymous access ({pool_size} pooled connections)")
         except Exception as e:
-            logger.warning(f"Failed to initialize boto3 S3 client: {e}")
-            # Fallback to fsspec
+            logger.warning(f"Failed to initialize S3 connection pool: {e}")
             self.s3_client = None
     
+    def _filesystem(self):
+        """The shared s3fs filesystem for the fsspec fallback"""
+        if self.pool is not None:
+            return self.pool.filesystem()
+        return fsspec.filesystem('s3', anon=True)
+    
+    def _bucket_config(self, bucket_name: str) -> GLMBucketConfig:
+        for config in self.buckets.values():
+            if config.name == bucket_name:
+                return config
+        raise ValueError(f"Unknown bucket: {bucket_name}")
+    
+    @staticmethod
+    def _hour_prefix(config: GLMBucketConfig, when: datetime) -> str:
+        """Key prefix of one hour: GLM-L2-LCFA/<YYYY>/<DDD>/<HH>/"""
+        return f"{config.prefix}/{when.year}/{when.timetuple().tm_yday:03d}/{when.hour:02d}/"
+    
+    def _start_key(self, config: GLMBucketConfig, when: datetime) -> str:
+        """
+        A key sorting just before every granule starting at or after when
+        Granule keys sort by hour prefix, then by the _s time in the filename.
+        """
+        return f"{self._hour_prefix(config, when)}OR_GLM-L2-LCFA_{config.satellite_id}_s{when:%Y%j%H%M%S}0"
+    
+    @staticmethod
+    def _key_hour(config: GLMBucketConfig, key: str) -> Optional[datetime]:
+        """The hour a key's prefix names, or None for keys outside the product layout"""
+        parts = key.split('/')
+        if len(parts) < 5 or parts[0] != config.prefix:
+            return None
+        try:
+            return datetime(int(parts[1]), 1, 1) + timedelta(days=int(parts[2]) - 1, hours=int(parts[3]))
+        except ValueError:
+            return None
+    
+    def _count_list(self, bucket_name: str, requests: int = 0, keys: int = 0, polls: int = 0):
+        stats = self._list_stats.setdefault(bucket_name, {'polls': 0, 'requests': 0, 'keys': 0})
+        stats['polls'] += polls
+        stats['requests'] += requests
+        stats['keys'] += keys
+    
+    def _list_keys(self, bucket_name: str, prefix: str, start_after: Optional[str] = None) -> Iterator[str]:
+        """
+        Every key under prefix (after start_after, if given) in key order
+        Follows continuation tokens, so listings are not cut off at 1000 keys.
+        """
+        for obj in self._list_objects(bucket_name, prefix, start_after):
+            yield obj['Key']
+    
+    def _list_objects(self, bucket_name: str, prefix: str, start_after: Optional[str] = None) -> Iterator[Dict]:
+        """list_objects_v2 entries (Key, LastModified, Size, ...) for _list_keys"""
+        kwargs = {'Bucket': bucket_name, 'Prefix': prefix, 'MaxKeys': 1000}
+        if start_after:
+            kwargs['StartAfter'] = start_after
+        while True:
+            response = self.s3_client.list_objects_v2(**kwargs)
+            contents = response.get('Contents', [])
+            self._count_list(bucket_name, requests=1, keys=len(contents))
+            yield from contents
+            if not response.get('IsTruncated'):
+                return
+            kwargs['ContinuationToken'] = response['NextContinuationToken']
+    
+    def _list_objects_fsspec(self, bucket_name: str, config: GLMBucketConfig, start_after: str) -> List[Dict]:
+        """fsspec fallback for listing after a key: one listing per hour prefix up to now"""
+        fs = self._filesystem()
+        hour = self._key_hour(config, start_after) or datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+        end_hour = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+        objects = []
+        while hour <= end_hour:
+            try:
+                entries = fs.ls(f"{bucket_name}/{self._hour_prefix(config, hour)}", detail=True)
+            except FileNotFoundError:
+                entries = []
+            self._count_list(bucket_name, requests=1, keys=len(entries))
+            objects.extend(
+                {'Key': entry['name'][len(bucket_name) + 1:], 'LastModified': entry.get('LastModified')}
+                for entry in entries
+            )
+            hour += timedelta(hours=1)
+        return sorted((obj for obj in objects if obj['Key'] > start_after), key=lambda obj: obj['Key'])
+    
+    @staticmethod
+    def _is_granule_key(key: str) -> bool:
+        return key.endswith('.nc') and 'OR_GLM-L2-LCFA_' in key
+    
+    @timed('s3_list')
+    def list_new_granules(self,
+                          bucket_name: str,
+                          hours_back: int = 1,
+                          max_granules: Optional[int] = None) -> List[str]:
+        """
+        Granule keys after the bucket's cursor, oldest first
+        The cursor is passed as StartAfter, so one listing returns only new
+        granules across hour, day and year prefixes. The first call starts
+        hours_back ago. When more than max_granules are new, the oldest are
+        returned and the rest follow on the next polls. The cursor only moves
+        in commit_cursor, once the caller has ingested the keys.
+        """
+        try:
+            config = self._bucket_config(bucket_name)
+            cursor = self._cursors.get(bucket_name) or self._start_key(
+                config, datetime.utcnow() - timedelta(hours=hours_back)
+            )
+            if self.s3_client:
+                objects = self._list_objects(bucket_name, f"{config.prefix}/", cursor)
+            else:
+                objects = self._list_objects_fsspec(bucket_name, config, cursor)
+            objects = [obj for obj in objects if self._is_granule_key(obj['Key'])]
+            self._count_list(bucket_name, polls=1)
+            keys = [obj['Key'] for obj in objects]
+            
+            # Learn how long after its end time each granule was published
+            # (keys listed again after a failed ingest are not new arrivals)
+            arrivals = self.arrival_predictor(config.satellite_id)
+            listed_max = self._listed_max.get(bucket_name)
+            fresh = [obj for obj in objects if listed_max is None or obj['Key'] > listed_max]
+            for obj in fresh:
+                end = granule_end_time(obj['Key'])
+                published = obj.get('LastModified')
+                if end is not None and isinstance(published, datetime):
+                    if published.tzinfo is not None:
+                        published = published.astimezone(timezone.utc).replace(tzinfo=None)
+                    arrivals.observe(end, published)
+            if not fresh and listed_max is not None:
+                arrivals.missed()
+            if fresh:
+                self._listed_max[bucket_name] = fresh[-1]['Key']
+            
+            listed = keys
+            self._backlog[bucket_name] = max_granules is not None and len(keys) > max_granules
+            if self._backlog[bucket_name]:
+                logger.warning(f"{len(keys)} new granules in {bucket_name}; ingesting the oldest {max_granules}")
+                keys = keys[:max_granules]
+            self._pending[bucket_name] = (listed, set(keys))
+            logger.info(f"Found {len(keys)} new granules in {bucket_name} after {cursor}")
+            return keys
+            
+        except Exception as e:
+            logger.error(f"Error listing new granules: {e}")
+            return []
+    
+    def commit_cursor(self, bucket_name: str, done: Iterable[str]):
+        """
+        Move the bucket's cursor over the latest listing's keys that are done
+        done holds the keys now ingested (or already known). The cursor stops
+        at the first other key, so a granule that failed, or was held back by
+        max_granules, is listed again by the next poll. A granule that fails
+        MAX_INGEST_ATTEMPTS polls in a row is given up on.
+        """
+        listed, returned = self._pending.pop(bucket_name, ([], set()))
+        done = set(done)
+        cursor = self._cursors.get(bucket_name)
+        for key in listed:
+            if key not in done:
+                if key not in returned:
+                    break
+                attempts = self._failures.get(key, 0) + 1
+                if attempts < MAX_INGEST_ATTEMPTS:
+                    self._failures[key] = attempts
+                    break
+                logger.error(f"Giving up on {key} after {attempts} failed ingests")
+            self._failures.pop(key, None)
+            cursor = key
+        if cursor is not None:
+            self._cursors[bucket_name] = cursor
+    
+    def arrival_predictor(self, satellite_id: str) -> ArrivalPredictor:
+        predictor = self._arrivals.get(satellite_id)
+        if predictor is None:
+            predictor = self._arrivals[satellite_id] = ArrivalPredictor()
+        return predictor
+    
+    def next_poll_delay(self, bucket_name: str, max_delay: float) -> float:
+        """
+        Seconds until the bucket's next granule should be listable
+        Falls back to max_delay (the fixed poll interval) until an arrival
+        has been observed, and backs off toward it while a granule is late.
+        """
+        if self._backlog.get(bucket_name):
+            return 0.0  # Catching up: poll again at once
+        try:
+            predictor = self.arrival_predictor(self._bucket_config(bucket_name).satellite_id)
+        except ValueError:
+            return max_delay
+        predictor.max_delay = max_delay
+        return predictor.next_delay()
+    
+    def resume_after(self, bucket_name: str, keys: Iterable[str]):
+        """Move the bucket's cursor past already-ingested keys (e.g. after a restart)"""
+        try:
+            config = self._bucket_config(bucket_name)
+        except ValueError:
+            return
+        known = [key for key in keys if self._key_hour(config, key) is not None]
+        if known and max(known) > self._cursors.get(bucket_name, ''):
+            self._cursors[bucket_name] = max(known)
+    
+    def get_listing_stats(self) -> Dict[str, Dict]:
+        """Cursor and listing request counts per bucket"""
+        return {
+            bucket: {'cursor': self._cursors.get(bucket), **stats}
+            for bucket, stats in self._list_stats.items()
+        }
+    
+    def get_arrival_stats(self) -> Dict[str, Dict]:
+        """Learned publication timing per satellite"""
+        return {satellite: predictor.get_stats() for satellite, predictor in self._arrivals.items()}
+    
+    @timed('s3_list')
     def list_granules_for_time_window(self, 
                                      bucket_name: str,
                                      start_time: datetime,
@@ -82,80 +444,34 @@ class GLMS3Fetcher:
         Implements the file enumeration logic from documentation
         """
         try:
-            # Determine which bucket to use
-            bucket_config = None
-            for config in self.buckets.values():
-                if config.name == bucket_name:
-                    bucket_config = config
-                    break
-            
-            if not bucket_config:
-                raise ValueError(f"Unknown bucket: {bucket_name}")
+            bucket_config = self._bucket_config(bucket_name)
             
             granules = []
             
-            # Generate hour prefixes for the time window
-            current_time = start_time.replace(minute=0, second=0, microsecond=0)
-            end_hour = end_time.replace(minute=0, second=0, microsecond=0)
+            # Walk hour prefixes newest first; keys sort chronologically by their _s time
+            current_time = end_time.replace(minute=0, second=0, microsecond=0)
+            start_hour = start_time.replace(minute=0, second=0, microsecond=0)
             
-            while current_time <= end_hour:
-                # Format: GLM-L2-LCFA/<YYYY>/<DDD>/<HH>/
-                year = current_time.year
-                doy = current_time.timetuple().tm_yday  # Day of year
-                hour = current_time.hour
-                
-                prefix = f"{bucket_config.prefix}/{year}/{doy:03d}/{hour:02d}/"
+            while current_time >= start_hour:
+                prefix = self._hour_prefix(bucket_config, current_time)
                 
                 try:
                     if self.s3_client:
-                        # Use boto3 for listing
-                        response = self.s3_client.list_objects_v2(
-                            Bucket=bucket_name,
-                            Prefix=prefix,
-                            MaxKeys=1000  # Get as many as possible
-                        )
-                        
-                        if 'Contents' in response:
-                            # Sort by last modified (most recent first)
-                            objects = sorted(
-                                response['Contents'],
-                                key=lambda x: x['LastModified'],
-                                reverse=True
-                            )
-                            
-                            for obj in objects:
-                                key = obj['Key']
-                                if key.endswith('.nc') and 'OR_GLM-L2-LCFA_' in key:
-                                    granules.append(key)
-                                    if len(granules) >= max_granules:
-                                        break
+                        keys = [key for key in self._list_keys(bucket_name, prefix) if self._is_granule_key(key)]
                     else:
                         # Fallback to fsspec
-                        fs = fsspec.filesystem('s3', anon=True)
-                        files = fs.glob(f"s3://{bucket_name}/{prefix}OR_GLM-L2-LCFA_*.nc")
-                        
-                        # Sort by modification time if available
-                        files_with_time = []
-                        for file_path in files:
-                            try:
-                                stat = fs.stat(file_path)
-                                files_with_time.append((file_path, stat.get('mtime', 0)))
-                            except:
-                                files_with_time.append((file_path, 0))
-                        
-                        # Sort by time (most recent first)
-                        files_with_time.sort(key=lambda x: x[1], reverse=True)
-                        
-                        for file_path, _ in files_with_time:
-                            granules.append(file_path)
-                            if len(granules) >= max_granules:
-                                break
+                        fs = self._filesystem()
+                        paths = fs.glob(f"s3://{bucket_name}/{prefix}OR_GLM-L2-LCFA_*.nc")
+                        keys = sorted(path[len(bucket_name) + 1:] for path in paths)
+                    
+                    # Most recent first
+                    granules.extend(reversed(keys))
                 
                 except Exception as e:
                     logger.warning(f"Error listing granules for {prefix}: {e}")
                 
-                # Move to next hour
-                current_time += timedelta(hours=1)
+                # Move to previous hour
+                current_time -= timedelta(hours=1)
                 
                 if len(granules) >= max_granules:
                     break
@@ -190,6 +506,7 @@ class GLMS3Fetcher:
             logger.error(f"Error getting latest granules: {e}")
             return []
     
+    @timed('s3_download')
     def download_granule(self, bucket_name: str, key: str, local_path: str) -> bool:
         """
         Download a single GLM granule from S3
@@ -197,15 +514,11 @@ class GLMS3Fetcher:
         """
         try:
             if self.s3_client:
-                # Use boto3 for download
-                self.s3_client.download_file(
-                    bucket_name,
-                    key,
-                    local_path
-                )
+                # Hedged, retried and verified GET
+                self.downloader.download(bucket_name, key, local_path)
             else:
                 # Fallback to fsspec
-                fs = fsspec.filesystem('s3', anon=True)
+                fs = self._filesystem()
                 fs.get(f"s3://{bucket_name}/{key}", local_path)
             
             logger.info(f"Successfully downloaded {key} to {local_path}")
@@ -215,6 +528,18 @@ class GLMS3Fetcher:
             logger.error(f"Failed to download {key}: {e}")
             return False
     
+    def download_url(self, url: str, local_path: str):
+        """
+        Download an s3://bucket/key URL to local_path, raising on failure
+        The granule reader's download hook (GLMDataProcessor.s3_download).
+        """
+        bucket_name, _, key = url[len('s3://'):].partition('/')
+        if self.s3_client:
+            self.downloader.download(bucket_name, key, local_path)
+        else:
+            fs = self._filesystem()
+            fs.get(url, local_path)
+    
     def download_granules_batch(self, 
                                bucket_name: str,
                                keys: List[str],
@@ -244,6 +569,16 @@ class GLMS3Fetcher:
         logger.info(f"Downloaded {len(downloaded_paths)} of {len(keys)} granules")
         return downloaded_paths
     
+    def get_connection_stats(self) -> Dict:
+        """Shared pool settings, requests by operation and connection reuse"""
+        if self.pool is None:
+            return {'pool_size': None}
+        return self.pool.get_stats()
+    
+    def get_download_stats(self) -> Dict:
+        """Granule GET counters (retries, hedges, verification) and latency"""
+        return self.downloader.get_stats()
+    
     def get_granule_metadata(self, bucket_name: str, key: str) -> Optional[Dict]:
         """
         Get metadata for a specific granule
@@ -261,7 +596,7 @@ class GLMS3Fetcher:
                 }
             else:
                 # Fallback to fsspec
-                fs = fsspec.filesystem('s3', anon=True)
+                fs = self._filesystem()
                 stat = fs.stat(f"s3://{bucket_name}/{key}")
                 return {
                     'size': stat.get('size'),
@@ -294,7 +629,7 @@ class GLMS3Fetcher:
                 }
             else:
                 # Fallback to fsspec
-                fs = fsspec.filesystem('s3', anon=True)
+                fs = self._filesystem()
                 try:
                     # Try to list a few objects
                     files = fs.glob(f"s3://{bucket_name}/GLM-L2-LCFA/*/*/*/*.nc")
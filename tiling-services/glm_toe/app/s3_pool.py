@@ -0,0 +1,136 @@
+"""
+GLM TOE Shared S3 Connections
+One anonymous S3 client and one s3fs filesystem per process, shared by
+every fetcher operation (list, head, get) and every thread. Both keep a
+pool of up to pool_size connections per host alive between requests, so
+polls, metadata lookups and hedged GETs reuse TCP connections and TLS
+sessions instead of paying a handshake each. Connection reuse statistics
+show whether the pool is large enough for the concurrency it serves.
+"""
+
+import logging
+import threading
+from typing import Dict, Optional
+
+import boto3
+from botocore import UNSIGNED
+from botocore.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class S3ConnectionPool:
+    """
+    Shared boto3 client and s3fs filesystem with a tuned connection pool
+    The boto3 client is thread-safe; every caller uses self.client, which
+    is None when boto3 could not build one (the s3fs path still works).
+    keepalive turns on TCP keep-alive probes so idle pooled connections are
+    not silently dropped by NAT gateways; idle_timeout is how long s3fs
+    keeps an idle connection (urllib3 keeps them until the server closes).
+    Retries belong to callers, so each call is a single attempt.
+    """
+
+    def __init__(self, pool_size: int = 32, keepalive: bool = True, idle_timeout: float = 60.0,
+                 connect_timeout: float = 5.0, read_timeout: float = 15.0,
+                 region_name: str = 'us-east-1', endpoint_url: Optional[str] = None):
+        self.pool_size = pool_size
+        self.keepalive = keepalive
+        self.idle_timeout = idle_timeout
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.region_name = region_name
+        self.endpoint_url = endpoint_url
+        self._fs = None
+        self._lock = threading.Lock()
+
+        # Counters
+        self._requests: Dict[str, int] = {}
+        self._fs_requests: Dict[str, int] = {}
+
+        config = Config(
+            signature_version=UNSIGNED,
+            max_pool_connections=pool_size,
+            tcp_keepalive=keepalive,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            retries={'total_max_attempts': 1},
+            # Custom endpoints (MinIO, local fakes) are addressed by path
+            **({'s3': {'addressing_style': 'path'}} if endpoint_url else {})
+        )
+        try:
+            self.client = boto3.client('s3', region_name=region_name, endpoint_url=endpoint_url, config=config)
+            self.client.meta.events.register('before-call.s3', self._counter(self._requests))
+        except Exception as e:
+            logger.warning(f"Failed to initialize boto3 S3 client: {e}")
+            self.client = None
+
+    def _counter(self, counts: Dict[str, int]):
+        def count(model=None, **kwargs):
+            name = model.name if model is not None else 'unknown'
+            with self._lock:
+                counts[name] = counts.get(name, 0) + 1
+        return count
+
+    def filesystem(self):
+        """The shared s3fs filesystem (created on first use) with the same pool settings"""
+        with self._lock:
+            if self._fs is None:
+                import s3fs
+                client_kwargs = {'region_name': self.region_name}
+                if self.endpoint_url:
+                    client_kwargs['endpoint_url'] = self.endpoint_url
+                self._fs = s3fs.S3FileSystem(
+                    anon=True,
+                    skip_instance_cache=True,
+                    client_kwargs=client_kwargs,
+                    config_kwargs={
+                        'max_pool_connections': self.pool_size,
+                        'tcp_keepalive': self.keepalive,
+                        'connect_timeout': self.connect_timeout,
+                        'read_timeout': self.read_timeout,
+                        'connector_args': {'keepalive_timeout': self.idle_timeout},
+                        **({'s3': {'addressing_style': 'path'}} if self.endpoint_url else {})
+                    }
+                )
+                # s3fs creates its client lazily; create it now to count its calls
+                self._fs.connect()
+                self._fs.s3.meta.events.register('before-call.s3', self._counter(self._fs_requests))
+            return self._fs
+
+    def _connection_pools(self):
+        """urllib3 pools behind the boto3 client, one per host"""
+        if self.client is None:
+            return []
+        manager = getattr(getattr(self.client._endpoint, 'http_session', None), '_manager', None)
+        if manager is None:
+            return []
+        return [manager.pools[key] for key in list(manager.pools.keys())]
+
+    def get_stats(self) -> Dict:
+        """Pool settings, requests by operation and connection reuse"""
+        hosts = {}
+        opened = 0
+        served = 0
+        for pool in self._connection_pools():
+            idle = sum(1 for conn in list(pool.pool.queue) if conn is not None)
+            hosts[f"{pool.scheme}://{pool.host}:{pool.port}"] = {
+                'connections_opened': pool.num_connections,
+                'requests': pool.num_requests,
+                'idle': idle
+            }
+            opened += pool.num_connections
+            served += pool.num_requests
+        with self._lock:
+            requests = dict(self._requests)
+            fs_requests = dict(self._fs_requests)
+        return {
+            'pool_size': self.pool_size,
+            'tcp_keepalive': self.keepalive,
+            'requests': requests,
+            'connections_opened': opened,
+            # Requests that reused a pooled connection; each opened one paid a TCP (and TLS) handshake
+            'connections_reused': max(0, served - opened),
+            'reuse_ratio': round(1.0 - opened / served, 4) if served else None,
+            'hosts': hosts,
+            'fsspec': {'active': self._fs is not None, 'requests': fs_requests}
+        }
@@ -0,0 +1,317 @@
+"""
+GLM TOE Shared Event Store
+Publishes the columnar event index from one ingest owner process to
+memory-mapped segment files (under /dev/shm by default) so every uvicorn
+worker on the host serves the same data without ingesting it again.
+
+Each time bucket is written once to its own immutable segment; a small
+versioned manifest, replaced atomically, lists the segments that make up
+the current snapshot together with the ingest epoch. Readers map the
+segments read-only and wrap them in PointIndex objects without copying.
+"""
+
+import fcntl
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .event_index import EventIndex, datetime_to_ms
+from .mercator_pyramid import PointIndex
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+LOCK_NAME = 'owner.lock'
+FORMAT_VERSION = 1
+SEGMENT_MAGIC = b'GLMTOEB1'
+
+# Segment layout: header, then each column 64-byte aligned
+_SEGMENT_HEADER = np.dtype([
+    ('magic', 'S8'),
+    ('format', '<u4'),
+    ('level', '<u4'),
+    ('bucket_id', '<i8'),
+    ('count', '<u8'),
+])
+_COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ('codes', '<u8'),
+    ('px', '<u8'),
+    ('py', '<u8'),
+    ('values', '<f8'),
+    ('times', '<i8'),
+)
+_ALIGN = 64
+
+
+def default_shared_dir() -> str:
+    """tmpfs-backed directory when available, so segments never touch disk"""
+    base = '/dev/shm' if os.path.isdir('/dev/shm') else '/tmp'
+    return os.path.join(base, 'glm-toe')
+
+
+def _aligned(n: int) -> int:
+    return (n + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def _segment_layout(count: int) -> Tuple[Dict[str, int], int]:
+    """Byte offset of each column and the total segment size"""
+    offsets, offset = {}, _aligned(_SEGMENT_HEADER.itemsize)
+    for name, dtype in _COLUMNS:
+        offsets[name] = offset
+        offset += _aligned(count * np.dtype(dtype).itemsize)
+    return offsets, offset
+
+
+@dataclass
+class SharedSnapshot:
+    """One published state of the event store, mapped by a reader"""
+    version: int
+    index: EventIndex
+    ingest_epoch: Optional[datetime]
+    ingest_epoch_seq: int
+    ingest_epoch_wall: Optional[float]
+    granules: List[str] = field(default_factory=list)
+    freshness: Dict[str, Dict[str, float]] = field(default_factory=dict)  # Owner's stage times per granule
+
+
+class SharedEventStore:
+    """
+    Owner/reader handle on a shared store directory
+    The first process to take the directory's owner lock publishes; every
+    other process refreshes from the manifest. Lock ownership passes to a
+    reader automatically when the owner process exits.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.is_owner = False
+        self._lock_fd: Optional[int] = None
+        self._lock = threading.Lock()
+
+        # Owner: segment file currently published for each bucket id
+        self._published: Dict[int, Tuple[PointIndex, str]] = {}
+        self._retired: List[str] = []
+        self._version = 0
+
+        # Reader: mapped segments by file name, and the last manifest seen
+        self._mapped: Dict[str, PointIndex] = {}
+        self._manifest_stat: Optional[Tuple[int, int]] = None
+        self.loaded_version = 0
+
+        # Counters
+        self.publishes = 0
+        self.segments_written = 0
+        self.refreshes = 0
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.directory, MANIFEST_NAME)
+
+    def acquire_ownership(self) -> bool:
+        """Try (without blocking) to become the publishing owner"""
+        if self.is_owner:
+            return True
+        fd = os.open(os.path.join(self.directory, LOCK_NAME), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._lock_fd = fd
+        self.is_owner = True
+        manifest = self._read_manifest()
+        self._version = manifest['version'] if manifest else 0
+
+        # Files a previous owner wrote but never published or never got to remove
+        listed = {name for _, name, _ in manifest['buckets']} if manifest else set()
+        self._remove_files(
+            name for name in os.listdir(self.directory)
+            if (name.endswith('.seg') or name.endswith('.tmp')) and name not in listed
+        )
+        return True
+
+    def close(self):
+        """Release ownership (the published files stay for the next owner)"""
+        if self._lock_fd is not None:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+            os.close(self._lock_fd)
+            self._lock_fd = None
+        self.is_owner = False
+        self._mapped.clear()
+
+    def publish(self, index: EventIndex, ingest_epoch: Optional[datetime], ingest_epoch_seq: int,
+                ingest_epoch_wall: Optional[float], granules: Iterable[str] = (),
+                freshness: Optional[Dict[str, Dict[str, float]]] = None) -> int:
+        """
+        Publish the current index; returns the new manifest version
+        Only buckets replaced since the last publish are written again.
+        freshness carries the owner's stage times (FreshnessTracker.records)
+        so readers report the whole pipeline, not only publish and serve.
+        """
+        if not self.is_owner:
+            raise RuntimeError("Only the shared store owner can publish")
+
+        with self._lock:
+            self._version += 1
+            current: Dict[int, Tuple[PointIndex, str]] = {}
+            for bucket_id, bucket in index.buckets():
+                published = self._published.get(bucket_id)
+                if published is not None and published[0] is bucket:
+                    current[bucket_id] = published
+                else:
+                    current[bucket_id] = (bucket, self._write_segment(bucket_id, bucket))
+
+            manifest = {
+                'format': FORMAT_VERSION,
+                'version': self._version,
+                'owner_pid': os.getpid(),
+                'level': index.level,
+                'bucket_ms': index.bucket_ms,
+                'ingest_epoch_ms': datetime_to_ms(ingest_epoch) if ingest_epoch else None,
+                'ingest_epoch_seq': ingest_epoch_seq,
+                'ingest_epoch_wall': ingest_epoch_wall,
+                'buckets': [[bucket_id, name, len(bucket)] for bucket_id, (bucket, name) in sorted(current.items())],
+                'granules': sorted(granules),
+                'freshness': freshness or {}
+            }
+            tmp = self.manifest_path + f'.{os.getpid()}.tmp'
+            with open(tmp, 'w') as f:
+                json.dump(manifest, f)
+            os.replace(tmp, self.manifest_path)
+
+            # Segments dropped one publish ago can go now: a reader that saw the
+            # older manifest has had a full publish interval to map them
+            self._remove_files(self._retired)
+            live = {name for _, name in current.values()}
+            self._retired = [name for _, name in self._published.values() if name not in live]
+            self._published = current
+            self.publishes += 1
+            return self._version
+
+    def _write_segment(self, bucket_id: int, bucket: PointIndex) -> str:
+        """Write one bucket to a new immutable segment file; returns its name"""
+        count = len(bucket)
+        offsets, size = _segment_layout(count)
+        name = f'bucket-{bucket_id}-v{self._version}.seg'
+        path = os.path.join(self.directory, name)
+        tmp = path + '.tmp'
+
+        with open(tmp, 'wb') as f:
+            f.truncate(size)
+        buf = np.memmap(tmp, dtype=np.uint8, mode='r+', shape=(size,))
+        header = buf[:_SEGMENT_HEADER.itemsize].view(_SEGMENT_HEADER)
+        header[0] = (SEGMENT_MAGIC, FORMAT_VERSION, bucket.level, bucket_id, count)
+        times = bucket.times if bucket.times is not None else np.zeros(count, dtype=np.int64)
+        columns = {'codes': bucket.codes, 'px': bucket.px, 'py': bucket.py, 'values': bucket.values, 'times': times}
+        for name_, dtype in _COLUMNS:
+            start = offsets[name_]
+            buf[start:start + count * 8].view(dtype)[:] = columns[name_]
+        buf.flush()
+        del buf
+        os.replace(tmp, path)
+        self.segments_written += 1
+        return name
+
+    def _remove_files(self, names: Iterable[str]):
+        for name in names:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+
+    def _read_manifest(self) -> Optional[Dict]:
+        try:
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return None
+        if manifest.get('format') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported shared store format {manifest.get('format')}")
+        return manifest
+
+    def _map_segment(self, name: str) -> PointIndex:
+        """Read-only, zero-copy PointIndex over a segment file"""
+        buf = np.memmap(os.path.join(self.directory, name), dtype=np.uint8, mode='r')
+        header = buf[:_SEGMENT_HEADER.itemsize].view(_SEGMENT_HEADER)[0]
+        if header['magic'] != SEGMENT_MAGIC or header['format'] != FORMAT_VERSION:
+            raise ValueError(f"{name} is not a shared store segment")
+        count = int(header['count'])
+        offsets, _ = _segment_layout(count)
+        columns = {
+            name_: np.asarray(buf[offsets[name_]:offsets[name_] + count * 8].view(dtype))
+            for name_, dtype in _COLUMNS
+        }
+        return PointIndex.from_sorted(
+            columns['codes'], columns['px'], columns['py'], columns['values'],
+            level=int(header['level']), times=columns['times']
+        )
+
+    def refresh(self, force: bool = False) -> Optional[SharedSnapshot]:
+        """
+        Map the latest published snapshot
+        Returns None when nothing new was published since the last call.
+        """
+        try:
+            st = os.stat(self.manifest_path)
+        except FileNotFoundError:
+            return None
+        stamp = (st.st_mtime_ns, st.st_ino)
+        if not force and stamp == self._manifest_stat:
+            return None
+
+        manifest = self._read_manifest()
+        if manifest is None or (not force and manifest['version'] == self.loaded_version):
+            self._manifest_stat = stamp
+            return None
+
+        mapped, buckets = {}, {}
+        try:
+            for bucket_id, name, _ in manifest['buckets']:
+                # Segments are immutable: reuse every mapping we already hold (empty ones included)
+                bucket = self._mapped[name] if name in self._mapped else self._map_segment(name)
+                mapped[name] = bucket
+                buckets[int(bucket_id)] = bucket
+        except FileNotFoundError as e:
+            # The owner published twice meanwhile and removed a segment; retry next time
+            logger.debug(f"Shared store segment gone while mapping version {manifest['version']}: {e}")
+            return None
+
+        self._mapped = mapped
+        if self.is_owner:
+            # Adopted buckets are already published; only replaced ones get rewritten
+            self._published = {bucket_id: (buckets[int(bucket_id)], name) for bucket_id, name, _ in manifest['buckets']}
+        self._manifest_stat = stamp
+        self.loaded_version = manifest['version']
+        self.refreshes += 1
+
+        epoch_ms = manifest['ingest_epoch_ms']
+        return SharedSnapshot(
+            version=manifest['version'],
+            index=EventIndex.from_buckets(buckets, manifest['bucket_ms'], manifest['level']),
+            ingest_epoch=datetime.utcfromtimestamp(epoch_ms / 1000) if epoch_ms is not None else None,
+            ingest_epoch_seq=manifest['ingest_epoch_seq'],
+            ingest_epoch_wall=manifest['ingest_epoch_wall'],
+            granules=manifest.get('granules', []),
+            freshness=manifest.get('freshness', {})
+        )
+
+    def get_stats(self) -> Dict:
+        """Role, version and publish/refresh counters"""
+        return {
+            'directory': self.directory,
+            'role': 'owner' if self.is_owner else 'reader',
+            'version': self._version if self.is_owner else self.loaded_version,
+            'segments': len(self._published) if self.is_owner else len(self._mapped),
+            'publishes': self.publishes,
+            'segments_written': self.segments_written,
+            'refreshes': self.refreshes
+        }
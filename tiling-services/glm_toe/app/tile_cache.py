@@ -0,0 +1,183 @@
+"""
+GLM TOE Tile Cache
+Byte-budgeted LRU cache for encoded tiles with per-entry TTL and
+hit/miss/eviction statistics. Safe to share between the event loop and
+render pool threads.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Bookkeeping cost charged per entry on top of key and value bytes
+ENTRY_OVERHEAD_BYTES = 128
+
+
+def content_etag(data: bytes) -> str:
+    """Strong ETag (quoted) derived from the content bytes"""
+    return '"' + hashlib.blake2b(data, digest_size=16).hexdigest() + '"'
+
+
+class _Entry(NamedTuple):
+    value: bytes
+    size: int
+    expires_at: Optional[float]
+    etag: str
+
+
+class TileCache:
+    """
+    LRU cache bounded by total bytes rather than entry count
+    Entries expire after their TTL (None means no expiry) and are dropped
+    lazily on access or when the cache needs room.
+    """
+
+    def __init__(self, max_bytes: int, default_ttl: Optional[float] = None,
+                 purge_interval: float = 1.0, clock: Callable[[], float] = time.monotonic):
+        self.max_bytes = max(0, int(max_bytes))
+        self.default_ttl = default_ttl
+        self.purge_interval = purge_interval
+        self._clock = clock
+        self._next_purge = 0.0
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.inserts = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.rejected = 0
+
+    @staticmethod
+    def entry_size(key: str, value: bytes) -> int:
+        return len(value) + len(key) + ENTRY_OVERHEAD_BYTES
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and not self._expired(entry, self._clock())
+
+    def keys(self) -> List[str]:
+        with self._lock:
+            return list(self._entries)
+
+    def _expired(self, entry: _Entry, now: float) -> bool:
+        return entry.expires_at is not None and entry.expires_at <= now
+
+    def _drop(self, key: str) -> _Entry:
+        entry = self._entries.pop(key)
+        self.bytes -= entry.size
+        return entry
+
+    def get(self, key: str) -> Optional[bytes]:
+        entry = self.get_entry(key)
+        return entry[0] if entry is not None else None
+
+    def get_entry(self, key: str) -> Optional[Tuple[bytes, str]]:
+        """Cached (value, etag), or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if self._expired(entry, self._clock()):
+                self._drop(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            # Move to end (most recently used)
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.value, entry.etag
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None,
+            etag: Optional[str] = None) -> str:
+        """
+        Store value and return its ETag
+        ttl (seconds) overrides default_ttl; the ETag is hashed here unless given.
+        """
+        etag = etag or content_etag(value)
+        size = self.entry_size(key, value)
+        ttl = self.default_ttl if ttl is None else ttl
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            if size > self.max_bytes:
+                self.rejected += 1
+                return etag
+
+            now = self._clock()
+            if self.bytes + size > self.max_bytes:
+                self._make_room(size, now)
+
+            expires_at = now + ttl if ttl is not None else None
+            self._entries[key] = _Entry(value, size, expires_at, etag)
+            self.bytes += size
+            self.inserts += 1
+        return etag
+
+    def _make_room(self, size: int, now: float):
+        """Drop expired entries, then least recently used ones, until size fits"""
+        # A full scan for expired entries is O(n), so run it at most once per interval
+        if now >= self._next_purge:
+            self._next_purge = now + self.purge_interval
+            for key in [k for k, e in self._entries.items() if self._expired(e, now)]:
+                self._drop(key)
+                self.expirations += 1
+        while self._entries and self.bytes + size > self.max_bytes:
+            _, entry = self._entries.popitem(last=False)
+            self.bytes -= entry.size
+            self.evictions += 1
+
+    def remove_where(self, predicate: Callable[[str], bool]) -> int:
+        """Drop every entry whose key matches predicate; returns the number removed"""
+        with self._lock:
+            stale = [key for key in self._entries if predicate(key)]
+            for key in stale:
+                self._drop(key)
+            return len(stale)
+
+    def shrink(self, nbytes: int) -> int:
+        """Evict least recently used entries until nbytes are released; returns bytes released"""
+        with self._lock:
+            target = self.bytes - nbytes
+            released = 0
+            while self._entries and self.bytes > target:
+                _, entry = self._entries.popitem(last=False)
+                self.bytes -= entry.size
+                self.evictions += 1
+                released += entry.size
+            return released
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def get_stats(self) -> Dict:
+        """Size, budget and hit/miss/eviction counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+                'inserts': self.inserts,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'rejected': self.rejected
+            }
@@ -4,26 +4,40 @@ Implements the complete tile generation pipeline from TOE grids to PNG tiles
 as specified in the documentation.
 """
 
+import contextvars
 import logging
 import math
-from typing import Tuple, Optional, Dict, Any
+from typing import Tuple, Optional, Dict, Any, Iterable
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import numpy as np
 from PIL import Image, ImageDraw
 from pyproj import Transformer
 import io
+import struct
+import zlib
+
+from .metrics import stage_timer, timed
 
 logger = logging.getLogger(__name__)
 
+# Binary data tile header: magic, version, bits, width, height, log10 min, log10 max
+DATA_TILE_MAGIC = b'TOEQ'
+DATA_TILE_HEADER = struct.Struct('<4sBBHHff')
+
 class TOETileRenderer:
     """
     Renders TOE (Total Optical Energy) grids as PNG tiles for web maps
     Implements the tile generation pipeline from documentation
     """
     
-    def __init__(self, tile_size: int = 256):
+    def __init__(self, tile_size: int = 256, encode_workers: int = 4):
         self.tile_size = tile_size
         
+        # Parallel PNG encoding for metatiles (zlib releases the GIL)
+        self.encode_workers = max(1, encode_workers)
+        self._encode_pool: Optional[ThreadPoolExecutor] = None
+        
         # Initialize coordinate transformers
         self.wgs84_crs = None  # Will be set by processor
         self.web_mercator_crs = None  # Will be set by processor
@@ -32,6 +46,13 @@ class TOETileRenderer:
         # Color mapping configuration
         self.color_ramp = self._create_production_color_ramp()
         
+        # Vectorized lookup table matching _get_color_for_toe bins
+        self.toe_thresholds = np.array([50.0, 200.0, 500.0, 1000.0, 2000.0])
+        self.color_lut = np.array([
+            self.color_ramp[name]
+            for name in ('very_low', 'low', 'medium', 'high', 'very_high', 'extreme')
+        ], dtype=np.uint8)
+        
         # Tile metadata
         self.tile_metadata = {}
     
@@ -76,6 +97,271 @@ class TOETileRenderer:
         else:
             return self.color_ramp['extreme']
     
+    @timed('colorize')
+    def colorize_toe_array(self, toe: np.ndarray, glow: bool = True) -> np.ndarray:
+        """
+        Map a 2-D TOE array to an RGBA image array using the production ramp
+        Vectorized equivalent of _get_color_for_toe plus the glow effect
+        """
+        rgba = np.zeros(toe.shape + (4,), dtype=np.uint8)
+        mask = toe > 0
+        if not mask.any():
+            return rgba
+        
+        bins = np.digitize(toe[mask], self.toe_thresholds)
+        rgba[mask] = self.color_lut[bins]
+        
+        if glow:
+            self._apply_glow(rgba, np.where(mask, toe, 0.0))
+        return rgba
+    
+    def _apply_glow(self, rgba: np.ndarray, toe: np.ndarray, glow_radius: int = 2):
+        """
+        Spread a faint halo around high-opacity pixels into empty neighbours
+        Each empty pixel takes the color of its brightest glowing neighbour.
+        """
+        bright = np.where(rgba[..., 3] > 200, toe, 0.0)
+        if not bright.any():
+            return
+        
+        h, w = toe.shape
+        padded = np.pad(bright, glow_radius)
+        halo = np.zeros_like(bright)
+        for dy in range(-glow_radius, glow_radius + 1):
+            for dx in range(-glow_radius, glow_radius + 1):
+                if (dx == 0 and dy == 0) or dx * dx + dy * dy > glow_radius * glow_radius:
+                    continue
+                shifted = padded[glow_radius + dy:glow_radius + dy + h,
+                                 glow_radius + dx:glow_radius + dx + w]
+                np.maximum(halo, shifted, out=halo)
+        
+        targets = (rgba[..., 3] == 0) & (halo > 0)
+        if not targets.any():
+            return
+        colors = self.color_lut[np.digitize(halo[targets], self.toe_thresholds)].copy()
+        colors[:, 3] = np.maximum(colors[:, 3].astype(np.int16) - 100, 0).astype(np.uint8)
+        rgba[targets] = colors
+    
+    @timed('encode')
+    def encode_png(self, rgba: np.ndarray) -> bytes:
+        """Encode an RGBA array as PNG bytes"""
+        buf = io.BytesIO()
+        Image.fromarray(rgba).save(buf, format="PNG", optimize=True)
+        return buf.getvalue()
+    
+    def quantize_toe_array(self, toe: np.ndarray, bits: int = 16,
+                           log_min: float = -1.0, log_max: float = 6.0) -> np.ndarray:
+        """
+        Log-quantize TOE values (fJ) to unsigned integers
+        0 means no energy; 1..2**bits-1 map linearly onto log10(toe) in
+        [log_min, log_max], so clients decode with
+        toe = 10 ** (log_min + (q - 1) / (2**bits - 2) * (log_max - log_min)).
+        """
+        if bits not in (8, 16):
+            raise ValueError(f"bits must be 8 or 16, got {bits}")
+        dtype = np.uint8 if bits == 8 else np.uint16
+        qmax = (1 << bits) - 1
+        
+        q = np.zeros(toe.shape, dtype=dtype)
+        mask = toe > 0
+        if mask.any():
+            scaled = (np.log10(toe[mask]) - log_min) / (log_max - log_min)
+            q[mask] = (1 + np.rint(np.clip(scaled, 0.0, 1.0) * (qmax - 1))).astype(dtype)
+        return q
+    
+    @timed('encode')
+    def encode_data_tile(self, toe: np.ndarray, fmt: str = 'png', bits: int = 16,
+                         log_min: float = -1.0, log_max: float = 6.0) -> bytes:
+        """
+        Encode a TOE array as a raw data tile for client-side colorization
+        png: 8-bit grayscale, or 16-bit packed as R (high byte) / G (low byte)
+        bin: DATA_TILE_HEADER followed by zlib-compressed little-endian samples
+        """
+        q = self.quantize_toe_array(toe, bits=bits, log_min=log_min, log_max=log_max)
+        
+        if fmt == 'bin':
+            h, w = q.shape
+            header = DATA_TILE_HEADER.pack(DATA_TILE_MAGIC, 1, bits, w, h, log_min, log_max)
+            return header + zlib.compress(q.astype(q.dtype.newbyteorder('<')).tobytes(), 6)
+        
+        if fmt != 'png':
+            raise ValueError(f"Unknown data tile format: {fmt}")
+        
+        if bits == 8:
+            img = Image.fromarray(q)
+        else:
+            rgb = np.zeros(q.shape + (3,), dtype=np.uint8)
+            rgb[..., 0] = q >> 8
+            rgb[..., 1] = q & 0xFF
+            img = Image.fromarray(rgb)
+        buf = io.BytesIO()
+        img.save(buf, format="PNG", optimize=True)
+        return buf.getvalue()
+    
+    @timed('colorize')
+    def colorize_points(self, px: np.ndarray, py: np.ndarray, values: np.ndarray,
+                        size: Optional[int] = None, glow_radius: int = 2) -> np.ndarray:
+        """
+        Sparse equivalent of colorize_toe_array for a few points
+        Values landing in the same pixel are summed; only occupied pixels and
+        their glow neighbourhoods are touched instead of the whole tile.
+        """
+        size = size or self.tile_size
+        rgba = np.zeros((size, size, 4), dtype=np.uint8)
+        
+        inside = (px >= 0) & (px < size) & (py >= 0) & (py < size) & (values > 0)
+        if not inside.any():
+            return rgba
+        
+        lin = py[inside] * size + px[inside]
+        pixels, inverse = np.unique(lin, return_inverse=True)
+        sums = np.bincount(inverse, weights=values[inside])
+        colors = self.color_lut[np.digitize(sums, self.toe_thresholds)]
+        flat = rgba.reshape(-1, 4)
+        flat[pixels] = colors
+        
+        # Glow: every empty pixel near a bright one takes the brightest neighbour's color
+        bright = colors[:, 3] > 200
+        if not bright.any():
+            return rgba
+        offsets = [
+            (dx, dy)
+            for dy in range(-glow_radius, glow_radius + 1)
+            for dx in range(-glow_radius, glow_radius + 1)
+            if not (dx == 0 and dy == 0) and dx * dx + dy * dy <= glow_radius * glow_radius
+        ]
+        bx = pixels[bright] % size
+        by = pixels[bright] // size
+        bv = sums[bright]
+        tx = (bx[:, None] + np.array([o[0] for o in offsets])[None, :]).ravel()
+        ty = (by[:, None] + np.array([o[1] for o in offsets])[None, :]).ravel()
+        tv = np.repeat(bv, len(offsets))
+        ok = (tx >= 0) & (tx < size) & (ty >= 0) & (ty < size)
+        target = ty[ok] * size + tx[ok]
+        tv = tv[ok]
+        empty = flat[target, 3] == 0
+        target, tv = target[empty], tv[empty]
+        if target.size == 0:
+            return rgba
+        
+        order = np.lexsort((tv, target))
+        target, tv = target[order], tv[order]
+        last = np.concatenate((target[1:] != target[:-1], [True]))
+        glow = self.color_lut[np.digitize(tv[last], self.toe_thresholds)].copy()
+        glow[:, 3] = np.maximum(glow[:, 3].astype(np.int16) - 100, 0).astype(np.uint8)
+        flat[target[last]] = glow
+        return rgba
+    
+    def render_points_tile(self, px: np.ndarray, py: np.ndarray, values: np.ndarray) -> bytes:
+        """Render a sparse tile from event pixel coordinates and TOE values"""
+        return self.encode_png(self.colorize_points(px, py, values))
+    
+    def render_metatile(self, toe_block: np.ndarray, n: int) -> Dict[Tuple[int, int], bytes]:
+        """
+        Render an n x n block of tiles from one TOE array
+        The whole block is colorized in a single vectorized pass (so glow
+        crosses tile edges correctly), then sliced and encoded in parallel.
+        Returns PNG bytes keyed by (dx, dy) offset within the block.
+        """
+        ts = self.tile_size
+        if toe_block.shape != (n * ts, n * ts):
+            raise ValueError(f"Metatile array shape {toe_block.shape} != {(n * ts, n * ts)}")
+        
+        rgba = self.colorize_toe_array(toe_block)
+        occupied = rgba[..., 3].reshape(n, ts, n, ts).any(axis=(1, 3))
+        
+        tiles: Dict[Tuple[int, int], bytes] = {}
+        jobs = {}
+        empty_tile = None
+        for dy in range(n):
+            for dx in range(n):
+                if not occupied[dy, dx]:
+                    # All empty tiles share one encoding
+                    if empty_tile is None:
+                        empty_tile = self.encode_png(np.zeros((ts, ts, 4), dtype=np.uint8))
+                    tiles[(dx, dy)] = empty_tile
+                    continue
+                view = rgba[dy * ts:(dy + 1) * ts, dx * ts:(dx + 1) * ts]
+                jobs[(dx, dy)] = np.ascontiguousarray(view)
+        
+        if len(jobs) > 1 and self.encode_workers > 1:
+            for key, data in zip(jobs.keys(), self._map_encode_pool(self.encode_png, jobs.values())):
+                tiles[key] = data
+        else:
+            for key, view in jobs.items():
+                tiles[key] = self.encode_png(view)
+        
+        return tiles
+
+    def render_animation(self, frames: Iterable[np.ndarray], fmt: str = 'png',
+                         frame_ms: int = 250) -> bytes:
+        """
+        Encode TOE frames as an animated PNG, animated WebP or sprite sheet
+        Frames are colorized in parallel; the container is written in one pass.
+        A sprite sheet is a single PNG with the frames left to right; APNG and
+        WebP may merge identical consecutive frames (their durations add).
+        """
+        if fmt not in ('png', 'webp', 'sprite'):
+            raise ValueError(f"Unsupported animation format: {fmt}")
+
+        if self.encode_workers > 1:
+            rgba_frames = list(self._map_encode_pool(self.colorize_toe_array, frames))
+        else:
+            rgba_frames = [self.colorize_toe_array(frame) for frame in frames]
+        if not rgba_frames:
+            raise ValueError("Animation has no frames")
+
+        if fmt == 'sprite':
+            return self.encode_png(np.ascontiguousarray(np.concatenate(rgba_frames, axis=1)))
+
+        images = [Image.fromarray(rgba) for rgba in rgba_frames]
+        buf = io.BytesIO()
+        with stage_timer('encode'):
+            if fmt == 'png':
+                # Replace (not blend over) the previous frame so halos do not smear
+                images[0].save(buf, format="PNG", save_all=True, append_images=images[1:],
+                               duration=frame_ms, loop=0, disposal=1, blend=0)
+            else:
+                images[0].save(buf, format="WEBP", save_all=True, append_images=images[1:],
+                               duration=frame_ms, loop=0, lossless=True)
+        return buf.getvalue()
+
+    def _get_encode_pool(self) -> ThreadPoolExecutor:
+        """Lazily create the shared encode pool"""
+        if self._encode_pool is None:
+            self._encode_pool = ThreadPoolExecutor(
+                max_workers=self.encode_workers,
+                thread_name_prefix="tile-encode"
+            )
+        return self._encode_pool
+    
+    def _map_encode_pool(self, fn, items: Iterable) -> Iterable:
+        """pool.map that runs each call in a copy of the caller's context (per-request timing)"""
+        jobs = [(contextvars.copy_context(), item) for item in items]
+        return self._get_encode_pool().map(lambda job: job[0].run(fn, job[1]), jobs)
+    
+    def close(self):
+        """Release the encode pool"""
+        if self._encode_pool is not None:
+            self._encode_pool.shutdown(wait=False)
+            self._encode_pool = None
+    
+    def render_pyramid_tile(self, pyramid, z: int, x: int, y: int) -> bytes:
+        """
+        Render tile z/x/y from a MercatorPyramid
+        The tile is a direct slice of the pooled level, so every source event
+        contributes to exactly one pixel at every zoom.
+        """
+        try:
+            toe = pyramid.tile(z, x, y)
+            return self.encode_png(self.colorize_toe_array(toe))
+        except Exception as e:
+            logger.error(f"Error rendering pyramid tile {z}/{x}/{y}: {e}")
+            img = Image.new("RGBA", (self.tile_size, self.tile_size), self.color_ramp['background'])
+            buf = io.BytesIO()
+            img.save(buf, format="PNG")
+            return buf.getvalue()
+    
     def lonlat_to_tile_pixel(self, lon: float, lat: float, z: int, x: int, y: int) -> Tuple[float, float]:
         """
         Convert WGS84 coordinates to tile pixel coordinates
@@ -114,6 +400,7 @@ class TOETileRenderer:
         mpp_equator = 156543.03392804097
         return (mpp_equator * math.cos(math.radians(lat))) / (2 ** z)
     
+    @timed('reproject')
     def render_tile_from_grid(self, 
                              toe_grid: np.ndarray,
                              grid_bounds: Dict[str, float],
@@ -287,63 +574,57 @@ class TOETileRenderer:
                                end_time: Optional[datetime] = None) -> bytes:
         """
         Render tile directly from events (legacy method)
-        This method is kept for backward compatibility
+        This method is kept for backward compatibility; each event is
+        colored by its own energy, with later events drawn on top.
         """
         try:
-            # Create image
-            img = Image.new("RGBA", (self.tile_size, self.tile_size), self.color_ramp['background'])
-            pixels = img.load()
-            
             # Filter events by time window
             if end_time is None:
                 end_time = datetime.utcnow()
             start_time = end_time - timedelta(minutes=time_window_minutes)
             
-            window_events = [
-                e for e in events 
-                if hasattr(e, 'timestamp') and start_time <= e.timestamp <= end_time
-            ]
-            
-            # Process each event
-            for event in window_events:
-                try:
-                    # Get coordinates
-                    if hasattr(event, 'lat') and hasattr(event, 'lon'):
-                        lat = event.lat
-                        lon = event.lon
-                    elif hasattr(event, 'latitude') and hasattr(event, 'longitude'):
-                        lat = event.latitude
-                        lon = event.longitude
-                    else:
-                        continue
-                    
-                    # Get energy value
-                    if hasattr(event, 'energy_fj'):
-                        energy = event.energy_fj
-                    elif hasattr(event, 'energy_j'):
-                        energy = event.energy_j * 1e15
-                    else:
-                        continue
-                    
-                    # Convert to tile pixel coordinates
-                    px, py = self.lonlat_to_tile_pixel(lon, lat, z, x, y)
-                    
-                    # Check if pixel is within tile bounds
-                    if 0 <= px < self.tile_size and 0 <= py < self.tile_size:
-                        # Get color for energy value
-                        color = self._get_color_for_toe(energy)
-                        
-                        # Set pixel
-                        pixels[int(px), int(py)] = color
-                        
-                except Exception as e:
-                    logger.warning(f"Error processing event for tile: {e}")
+            lats, lons, energies = [], [], []
+            for event in events:
+                if not (hasattr(event, 'timestamp') and start_time <= event.timestamp <= end_time):
+                    continue
+                
+                # Get coordinates
+                if hasattr(event, 'lat') and hasattr(event, 'lon'):
+                    lat, lon = event.lat, event.lon
+                elif hasattr(event, 'latitude') and hasattr(event, 'longitude'):
+                    lat, lon = event.latitude, event.longitude
+                else:
+                    continue
+                
+                # Get energy value
+                if hasattr(event, 'energy_fj'):
+                    energy = event.energy_fj
+                elif hasattr(event, 'energy_j'):
+                    energy = event.energy_j * 1e15
+                else:
                     continue
+                
+                lats.append(lat)
+                lons.append(lon)
+                energies.append(energy)
             
-            # Convert to PNG bytes
-            buf = io.BytesIO()
-            img.save(buf, format="PNG", optimize=True)
-            return buf.getvalue()
+            rgba = np.zeros((self.tile_size, self.tile_size, 4), dtype=np.uint8)
+            if energies:
+                # Vectorized projection and tile bounds test
+                lat_arr = np.clip(np.asarray(lats, dtype=np.float64), -85.05112878, 85.05112878)
+                scale = self.tile_size * (2 ** z)
+                world_x = (np.asarray(lons, dtype=np.float64) + 180.0) / 360.0 * scale
+                sin_lat = np.sin(np.radians(lat_arr))
+                world_y = (0.5 - np.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)) * scale
+                px = np.floor(world_x - x * self.tile_size).astype(np.int64)
+                py = np.floor(world_y - y * self.tile_size).astype(np.int64)
+                
+                energy_arr = np.asarray(energies, dtype=np.float64)
+                inside = (px >= 0) & (px < self.tile_size) & (py >= 0) & (py < self.tile_size) & (energy_arr > 0)
+                colors = self.color_lut[np.digitize(energy_arr[inside], self.toe_thresholds)]
+                rgba[py[inside], px[inside]] = colors
+            
+            return self.encode_png(rgba)
             
         except Exception as e:
             logger.error(f"Error rendering tile from events: {e}")
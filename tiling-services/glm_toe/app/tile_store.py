@@ -0,0 +1,246 @@
+"""
+GLM TOE Disk Tile Store
+Persistent second cache tier in a single SQLite file (MBTiles-style
+key/blob table) in WAL mode, so every uvicorn worker on a host shares one
+store and it survives restarts. Reads are synchronous point lookups;
+writes and access-time updates are queued and applied in batches by a
+background writer thread (write-behind).
+"""
+
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tiles (
+    key TEXT PRIMARY KEY,
+    data BLOB NOT NULL,
+    etag TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tiles_accessed ON tiles (accessed);
+CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT);
+"""
+
+# Bumped when tiles already on disk may no longer be valid; older files are emptied on open
+FORMAT_VERSION = '2'
+
+_STOP = object()
+
+
+class DiskTileStore:
+    """
+    Size-capped SQLite tile store with write-behind
+    When the file holds more than max_bytes of tiles, the least recently
+    accessed rows are deleted down to low_watermark * max_bytes. The size is
+    a running total kept by the writer; it is recounted only when it crosses
+    the cap and every resync_seconds, to pick up other processes' writes.
+    """
+
+    def __init__(self, path: str, max_bytes: int, low_watermark: float = 0.9,
+                 batch_size: int = 256, busy_timeout_ms: int = 5000, resync_seconds: float = 60.0):
+        self.path = path
+        self.max_bytes = max(0, int(max_bytes))
+        self.low_watermark = low_watermark
+        self.batch_size = batch_size
+        self.busy_timeout_ms = busy_timeout_ms
+        self.resync_seconds = resync_seconds
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._local = threading.local()
+        self._queue: "queue.Queue" = queue.Queue()
+        self._stats_lock = threading.Lock()
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.errors = 0
+
+        conn = self._connect()
+        conn.executescript(_SCHEMA)
+        with conn:
+            row = conn.execute("SELECT value FROM metadata WHERE name = 'version'").fetchone()
+            if row is not None and row[0] != FORMAT_VERSION:
+                # Written under an older rule for which windows are complete
+                dropped = conn.execute("DELETE FROM tiles").rowcount
+                logger.info(f"Tile store format {row[0]} is not {FORMAT_VERSION}: dropped {dropped} tiles")
+            conn.execute(
+                "INSERT OR REPLACE INTO metadata (name, value) VALUES ('format', 'glm-toe-tiles'), ('version', ?)",
+                (FORMAT_VERSION,)
+            )
+        self._sync_bytes(conn)
+
+        self._writer = threading.Thread(target=self._write_loop, name="tile-store-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Per-thread connection (sqlite3 connections are not shared across threads)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Tuple[bytes, str]]:
+        """Stored (data, etag), or None"""
+        try:
+            row = self._connect().execute("SELECT data, etag FROM tiles WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Tile store read failed for {key}: {e}")
+            with self._stats_lock:
+                self.errors += 1
+            return None
+
+        with self._stats_lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        self._queue.put(('touch', key))
+        return bytes(row[0]), row[1]
+
+    def put(self, key: str, data: bytes, etag: str):
+        """Queue a tile for writing; returns immediately"""
+        if len(data) > self.max_bytes:
+            return
+        self._queue.put(('put', key, data, etag))
+
+    def flush(self, timeout: float = 10.0):
+        """Block until everything queued so far has been written"""
+        done = threading.Event()
+        self._queue.put(('flush', done))
+        done.wait(timeout)
+
+    def close(self):
+        """Write out the queue and stop the writer thread"""
+        if self._writer.is_alive():
+            self._queue.put(_STOP)
+            self._writer.join(timeout=10.0)
+
+    def _write_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = any(item is _STOP for item in batch)
+            try:
+                self._apply(batch)
+            except sqlite3.Error as e:
+                logger.error(f"Tile store write failed: {e}")
+                with self._stats_lock:
+                    self.errors += 1
+            finally:
+                for item in batch:
+                    if item is not _STOP and item[0] == 'flush':
+                        item[1].set()
+            if stop:
+                self._connect().close()
+                return
+
+    def _sync_bytes(self, conn: sqlite3.Connection):
+        """Recount the bytes of all tiles in the file (writer thread, or before it starts)"""
+        self._bytes = conn.execute("SELECT COALESCE(SUM(size), 0) FROM tiles").fetchone()[0]
+        self._bytes_synced = time.monotonic()
+
+    def _stored_sizes(self, conn: sqlite3.Connection, keys: List[str]) -> int:
+        """Bytes currently stored under keys (about to be replaced)"""
+        total = 0
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            total += conn.execute(
+                f"SELECT COALESCE(SUM(size), 0) FROM tiles WHERE key IN ({placeholders})", chunk
+            ).fetchone()[0]
+        return total
+
+    def _apply(self, batch: List):
+        now = time.time()
+        # The last put of a key in the batch wins
+        puts = list({
+            item[1]: (item[1], sqlite3.Binary(item[2]), item[3], len(item[2]), now, now)
+            for item in batch if item is not _STOP and item[0] == 'put'
+        }.values())
+        touches = [(now, item[1]) for item in batch if item is not _STOP and item[0] == 'touch']
+        if not puts and not touches:
+            return
+
+        conn = self._connect()
+        with conn:
+            if puts:
+                replaced = self._stored_sizes(conn, [put[0] for put in puts])
+                conn.executemany(
+                    "INSERT OR REPLACE INTO tiles (key, data, etag, size, created, accessed) VALUES (?, ?, ?, ?, ?, ?)",
+                    puts
+                )
+            if touches:
+                conn.executemany("UPDATE tiles SET accessed = ? WHERE key = ?", touches)
+        if puts:
+            self._bytes += sum(put[3] for put in puts) - replaced
+            with self._stats_lock:
+                self.writes += len(puts)
+            self._enforce_cap(conn)
+
+    def _enforce_cap(self, conn: sqlite3.Connection):
+        """Delete least recently accessed tiles while over the size cap"""
+        if self._bytes > self.max_bytes or time.monotonic() - self._bytes_synced >= self.resync_seconds:
+            self._sync_bytes(conn)
+        total = self._bytes
+        if total <= self.max_bytes:
+            return
+
+        target = int(self.max_bytes * self.low_watermark)
+        doomed, freed = [], 0
+        cursor = conn.execute("SELECT key, size FROM tiles ORDER BY accessed ASC")
+        for key, size in cursor:
+            if total - freed <= target:
+                break
+            doomed.append((key,))
+            freed += size
+        cursor.close()
+        with conn:
+            conn.executemany("DELETE FROM tiles WHERE key = ?", doomed)
+        self._bytes -= freed
+        with self._stats_lock:
+            self.evictions += len(doomed)
+        logger.info(f"Tile store over {self.max_bytes} bytes: evicted {len(doomed)} tiles ({freed} bytes)")
+
+    def get_stats(self) -> Dict:
+        """Size, budget and hit/miss/write counters"""
+        try:
+            entries, total = self._connect().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM tiles"
+            ).fetchone()
+        except sqlite3.Error:
+            entries, total = None, None
+        with self._stats_lock:
+            return {
+                'path': self.path,
+                'entries': entries,
+                'bytes': total,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'writes': self.writes,
+                'evictions': self.evictions,
+                'errors': self.errors,
+                'write_queue': self._queue.qsize()
+            }
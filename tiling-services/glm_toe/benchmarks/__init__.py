@@ -0,0 +1,3 @@
+"""
+GLM TOE benchmarks (run from the service root: python -m benchmarks.run)
+"""
@@ -0,0 +1,254 @@
+"""
+Fake S3 HTTP Server
+A local, path-style S3 endpoint over in-memory objects for exercising the
+real boto3 and s3fs paths: HEAD, GET (with Range) and ListObjectsV2,
+with faults injected per key. A fault can stall a response partway through its body (the slow
+object that holds up serial ingest), fail it with an HTTP status, or
+corrupt its bytes, for the next N requests. Accepted TCP connections are
+counted, so clients' connection reuse can be checked from the server side.
+
+Usage:
+    with FakeS3Server({'noaa-goes18': {key: data}}) as server:
+        server.stall(key, seconds=5.0)
+        client = server.client()
+"""
+
+import hashlib
+import re
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, unquote, urlsplit
+from xml.sax.saxutils import escape
+
+_RANGE_RE = re.compile(r'bytes=(\d+)-(\d*)')
+
+
+class _Fault:
+    def __init__(self, kind: str, times: int, seconds: float = 0.0, after_bytes: int = 0, status: int = 500):
+        self.kind = kind
+        self.times = times
+        self.seconds = seconds
+        self.after_bytes = after_bytes
+        self.status = status
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive, as S3 does
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        with self.server.fake._lock:
+            self.server.fake.connections += 1
+
+    def handle(self):
+        try:
+            super().handle()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The client closed the connection
+
+    def _object(self):
+        path = unquote(urlsplit(self.path).path).lstrip('/')
+        bucket, _, key = path.partition('/')
+        return bucket, key, self.server.fake.objects.get(bucket, {}).get(key)
+
+    def _not_found(self, key: str, head: bool):
+        body = b'' if head else (
+            f'<?xml version="1.0" encoding="UTF-8"?><Error><Code>NoSuchKey</Code>'
+            f'<Key>{key}</Key></Error>'.encode()
+        )
+        self.send_response(404)
+        self.send_header('Content-Type', 'application/xml')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_headers(self, status: int, data: bytes, etag: str, content_range: Optional[str] = None):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/x-netcdf')
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('ETag', f'"{etag}"')
+        self.send_header('Last-Modified', formatdate(self.server.fake.modified, usegmt=True))
+        if content_range:
+            self.send_header('Content-Range', content_range)
+        self.end_headers()
+
+    def _list(self, bucket: str, query: Dict[str, List[str]]):
+        """ListObjectsV2: Prefix, StartAfter, MaxKeys, ContinuationToken and Delimiter"""
+        fake = self.server.fake
+        fake.requests.append(('LIST', bucket))
+        arg = lambda name, default='': query.get(name, [default])[0]
+        prefix, delimiter = arg('prefix'), arg('delimiter')
+        after = arg('continuation-token') or arg('start-after')
+        max_keys = int(arg('max-keys', '1000'))
+
+        contents, prefixes = [], []
+        for key in sorted(fake.objects.get(bucket, {})):
+            if not key.startswith(prefix) or key <= after:
+                continue
+            rest = key[len(prefix):]
+            if delimiter and delimiter in rest:
+                common = prefix + rest.split(delimiter, 1)[0] + delimiter
+                if common not in prefixes:
+                    prefixes.append(common)
+                continue
+            contents.append(key)
+        page = contents[:max_keys]
+        truncated = len(contents) > max_keys
+
+        modified = time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime(fake.modified))
+        parts = [f'<?xml version="1.0" encoding="UTF-8"?><ListBucketResult>'
+                 f'<Name>{escape(bucket)}</Name><Prefix>{escape(prefix)}</Prefix>'
+                 f'<KeyCount>{len(page)}</KeyCount><MaxKeys>{max_keys}</MaxKeys>'
+                 f'<IsTruncated>{str(truncated).lower()}</IsTruncated>']
+        if truncated:
+            parts.append(f'<NextContinuationToken>{escape(page[-1])}</NextContinuationToken>')
+        for key in page:
+            data = fake.objects[bucket][key]
+            parts.append(f'<Contents><Key>{escape(key)}</Key><LastModified>{modified}</LastModified>'
+                         f'<ETag>&quot;{hashlib.md5(data).hexdigest()}&quot;</ETag>'
+                         f'<Size>{len(data)}</Size><StorageClass>STANDARD</StorageClass></Contents>')
+        for common in prefixes:
+            parts.append(f'<CommonPrefixes><Prefix>{escape(common)}</Prefix></CommonPrefixes>')
+        parts.append('</ListBucketResult>')
+        body = ''.join(parts).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/xml')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_HEAD(self):
+        bucket, key, data = self._object()
+        self.server.fake.requests.append(('HEAD', key))
+        if data is None:
+            return self._not_found(key, head=True)
+        self._send_headers(200, data, hashlib.md5(data).hexdigest())
+
+    def do_GET(self):
+        bucket, key, data = self._object()
+        fake = self.server.fake
+        if not key:
+            return self._list(bucket, parse_qs(urlsplit(self.path).query))
+        fake.requests.append(('GET', key))
+        if data is None:
+            return self._not_found(key, head=False)
+
+        etag = hashlib.md5(data).hexdigest()
+        fault = fake.take_fault(key)
+        if fault is not None and fault.kind == 'status':
+            body = f'<Error><Code>InternalError</Code><Key>{key}</Key></Error>'.encode()
+            self.send_response(fault.status)
+            self.send_header('Content-Type', 'application/xml')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if fault is not None and fault.kind == 'corrupt':
+            data = bytes(b ^ 0xFF for b in data[:16]) + data[16:]
+
+        match = _RANGE_RE.match(self.headers.get('Range', ''))
+        if match:
+            size = len(data)
+            first = int(match.group(1))
+            last = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+            data = data[first:last + 1]
+            self._send_headers(206, data, etag, f'bytes {first}-{last}/{size}')
+        else:
+            self._send_headers(200, data, etag)
+        try:
+            if fault is not None and fault.kind == 'stall':
+                self.wfile.write(data[:fault.after_bytes])
+                self.wfile.flush()
+                fake.closing.wait(fault.seconds)
+                data = data[fault.after_bytes:]
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The client gave up on this response
+
+
+class FakeS3Server:
+    """Path-style S3 endpoint on 127.0.0.1 serving objects[bucket][key] with injectable faults"""
+
+    def __init__(self, objects: Optional[Dict[str, Dict[str, bytes]]] = None):
+        self.objects = objects if objects is not None else {}
+        self.modified = time.time()
+        self.requests: List[tuple] = []
+        self.connections = 0  # TCP connections accepted
+        self.closing = threading.Event()
+        self._faults: Dict[str, List[_Fault]] = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.fake = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def endpoint_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def put(self, bucket: str, key: str, data: bytes):
+        self.objects.setdefault(bucket, {})[key] = data
+
+    def _add_fault(self, key: str, fault: _Fault):
+        with self._lock:
+            self._faults.setdefault(key, []).append(fault)
+
+    def stall(self, key: str, seconds: float, times: int = 1, after_bytes: int = 1024):
+        """Pause the next times GETs of key for seconds after sending after_bytes of the body"""
+        self._add_fault(key, _Fault('stall', times, seconds=seconds, after_bytes=after_bytes))
+
+    def fail(self, key: str, status: int = 500, times: int = 1):
+        """Answer the next times GETs of key with an error status"""
+        self._add_fault(key, _Fault('status', times, status=status))
+
+    def corrupt(self, key: str, times: int = 1):
+        """Flip the first bytes of the next times GETs of key (same length and ETag)"""
+        self._add_fault(key, _Fault('corrupt', times))
+
+    def take_fault(self, key: str) -> Optional[_Fault]:
+        with self._lock:
+            faults = self._faults.get(key)
+            if not faults:
+                return None
+            fault = faults[0]
+            fault.times -= 1
+            if fault.times <= 0:
+                faults.pop(0)
+            return fault
+
+    def gets(self, key: str) -> int:
+        """GET requests received for key"""
+        return sum(1 for method, k in self.requests if method == 'GET' and k == key)
+
+    def client(self, **config):
+        """Anonymous boto3 S3 client for this endpoint; config goes to botocore Config"""
+        import boto3
+        from botocore import UNSIGNED
+        from botocore.config import Config
+        return boto3.client(
+            's3', region_name='us-east-1', endpoint_url=self.endpoint_url,
+            config=Config(signature_version=UNSIGNED, s3={'addressing_style': 'path'}, **config)
+        )
+
+    def start(self) -> 'FakeS3Server':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        self.closing.set()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'FakeS3Server':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,415 @@
+"""
+GLM TOE Map Load Generator
+Drives the tile service with simulated map sessions and reports throughput,
+latency percentiles and cache hit rate per scenario.
+
+    python -m benchmarks.loadgen --output results/load.json
+    python -m benchmarks.loadgen --url http://localhost:8000 --center -97.5,35.5 --scenarios pan,live
+
+Without --url the app runs in this process on synthetic granules; new
+granules are ingested at granule cadence during the live scenario and the
+tile cache is cleared before each scenario, so runs are repeatable.
+
+Scenarios:
+    pan     viewports of 12-30 tiles panned by part of a screen per step
+    zoom    one zoom level in or out per step around a point in view
+    live    a fixed viewport re-requested (If-None-Match) at granule cadence
+    scrub   historical timeline scrubbing with t= in one-minute steps
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import httpx
+import numpy as np
+
+from benchmarks.run import SCHEMA_VERSION, environment
+from benchmarks.synthetic_glm import GRANULE_SECONDS, random_cells, write_sequence
+
+SCENARIOS = ('pan', 'zoom', 'live', 'scrub')
+# Viewport shapes (columns, rows) of 12-30 tiles, from a phone to a large monitor
+VIEWPORTS = ((4, 3), (5, 3), (4, 4), (5, 4), (6, 4), (5, 5), (6, 5))
+# Concurrent requests per session, as a browser allows per host over HTTP/1.1
+SESSION_CONNECTIONS = 6
+SYNTHETIC_START = datetime(2025, 7, 19, 12, 0, 0)
+
+logger = logging.getLogger(__name__)
+
+
+def lonlat_to_tile_float(lon: float, lat: float, zoom: int) -> Tuple[float, float]:
+    """Fractional tile coordinates of a point"""
+    n = 2 ** zoom
+    lat_rad = math.radians(max(-85.0511, min(85.0511, lat)))
+    x = (lon + 180.0) / 360.0 * n
+    y = (1.0 - math.log(math.tan(lat_rad) + 1 / math.cos(lat_rad)) / math.pi) / 2.0 * n
+    return x, y
+
+
+def viewport_tiles(cx: float, cy: float, zoom: int, cols: int, rows: int) -> List[Tuple[int, int, int]]:
+    """Tiles covering a cols x rows viewport centred on fractional tile (cx, cy)"""
+    n = 2 ** zoom
+    x0 = math.floor(cx - cols / 2.0)
+    y0 = math.floor(cy - rows / 2.0)
+    tiles = []
+    for y in range(y0, y0 + rows):
+        if 0 <= y < n:
+            tiles.extend((zoom, x % n, y) for x in range(x0, x0 + cols))
+    return list(dict.fromkeys(tiles))
+
+
+class ScenarioStats:
+    """Per-request latencies, status codes and X-Cache outcomes for one scenario"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies: List[float] = []
+        self.viewports: List[float] = []
+        self.statuses: Counter = Counter()
+        self.cache: Counter = Counter()
+        self.errors = 0
+
+    def record(self, seconds: float, status: Optional[int], cache: Optional[str]):
+        """One response; status None is a transport failure. Both it and 5xx count as errors"""
+        if status is None or status >= 500:
+            self.errors += 1
+        if status is None:
+            return
+        self.latencies.append(seconds)
+        self.statuses[status] += 1
+        if cache:
+            self.cache[cache] += 1
+
+    def summary(self, wall: float, sessions: int) -> Dict[str, object]:
+        hits = self.cache['HIT'] + self.cache['DISK']
+        lookups = hits + self.cache['MISS']
+        return {
+            'scenario': self.name,
+            'sessions': sessions,
+            'wall_seconds': round(wall, 3),
+            'requests': len(self.latencies),
+            'errors': self.errors,
+            'requests_per_second': round(len(self.latencies) / wall, 2) if wall > 0 else None,
+            'latency_ms': _percentiles_ms(self.latencies),
+            # Time until every tile of a viewport has arrived, as a user sees it
+            'viewport_ms': _percentiles_ms(self.viewports),
+            'status': {str(code): count for code, count in sorted(self.statuses.items())},
+            'cache': dict(self.cache),
+            'cache_hit_rate': round(hits / lookups, 4) if lookups else None
+        }
+
+
+def _percentiles_ms(samples: Sequence[float]) -> Dict[str, object]:
+    if not samples:
+        return {'count': 0}
+    values = np.array(samples) * 1000.0
+    return {
+        'count': int(values.size),
+        'mean': round(float(values.mean()), 3),
+        'p50': round(float(np.percentile(values, 50)), 3),
+        'p90': round(float(np.percentile(values, 90)), 3),
+        'p99': round(float(np.percentile(values, 99)), 3),
+        'max': round(float(values.max()), 3)
+    }
+
+
+class MapSession:
+    """
+    One simulated map view
+    Tiles already loaded for the current zoom and time are not requested
+    again, as a map client keeps them; a live refresh revalidates them with
+    their ETags instead.
+    """
+
+    def __init__(self, client: httpx.AsyncClient, stats: ScenarioStats, rng: random.Random,
+                 center: Tuple[float, float], zooms: Tuple[int, int], think: float,
+                 window: Optional[str]):
+        self.client = client
+        self.stats = stats
+        self.rng = rng
+        self.zooms = zooms
+        self.think = think
+        self.window = window
+        self.cols, self.rows = rng.choice(VIEWPORTS)
+        self.zoom = rng.randint(*zooms)
+        cx, cy = lonlat_to_tile_float(center[0], center[1], self.zoom)
+        # Start within about one screen of the storm
+        self.cx = cx + rng.uniform(-0.5, 0.5) * self.cols
+        self.cy = cy + rng.uniform(-0.5, 0.5) * self.rows
+        self.etags: Dict[Tuple[int, int, int], str] = {}
+        self._connections = asyncio.Semaphore(SESSION_CONNECTIONS)
+
+    def tiles(self) -> List[Tuple[int, int, int]]:
+        return viewport_tiles(self.cx, self.cy, self.zoom, self.cols, self.rows)
+
+    async def fetch(self, tile: Tuple[int, int, int], params: Dict[str, str], revalidate: bool):
+        z, x, y = tile
+        headers = {}
+        if revalidate and tile in self.etags:
+            headers['If-None-Match'] = self.etags[tile]
+        async with self._connections:
+            start = time.perf_counter()
+            try:
+                response = await self.client.get(f"/tiles/{z}/{x}/{y}.png", params=params, headers=headers)
+            except httpx.HTTPError as e:
+                logger.warning(f"Tile {z}/{x}/{y} failed: {e}")
+                self.stats.record(time.perf_counter() - start, None, None)
+                return
+            self.stats.record(time.perf_counter() - start, response.status_code, response.headers.get('X-Cache'))
+        if response.headers.get('ETag'):
+            self.etags[tile] = response.headers['ETag']
+
+    async def load(self, tiles: Sequence[Tuple[int, int, int]], t: Optional[str] = None,
+                   revalidate: bool = False):
+        """Request tiles concurrently and record how long the whole viewport took"""
+        if not tiles:
+            return
+        params = {}
+        if self.window:
+            params['window'] = self.window
+        if t:
+            params['t'] = t
+        start = time.perf_counter()
+        await asyncio.gather(*(self.fetch(tile, params, revalidate) for tile in tiles))
+        self.stats.viewports.append(time.perf_counter() - start)
+
+    async def pause(self, scale: float = 1.0):
+        await asyncio.sleep(self.think * scale * self.rng.uniform(0.5, 1.5))
+
+    async def pan(self, deadline: float):
+        loaded = set(self.tiles())
+        await self.load(sorted(loaded))
+        while time.monotonic() < deadline:
+            await self.pause()
+            angle = self.rng.uniform(0.0, 2.0 * math.pi)
+            distance = self.rng.uniform(0.25, 1.0)
+            self.cx += math.cos(angle) * distance * self.cols
+            self.cy = min(max(self.cy + math.sin(angle) * distance * self.rows, 0.0), float(2 ** self.zoom))
+            view = self.tiles()
+            await self.load([tile for tile in view if tile not in loaded])
+            loaded.update(view)
+
+    async def zoom_steps(self, deadline: float):
+        await self.load(self.tiles())
+        while time.monotonic() < deadline:
+            await self.pause()
+            low, high = self.zooms
+            if low == high:
+                step = 0
+            elif self.zoom <= low:
+                step = 1
+            elif self.zoom >= high:
+                step = -1
+            else:
+                step = self.rng.choice((-1, 1))
+            # Zoom about a point in view, as a scroll wheel does
+            px = self.cx + self.rng.uniform(-0.4, 0.4) * self.cols
+            py = self.cy + self.rng.uniform(-0.4, 0.4) * self.rows
+            factor = 2.0 ** step
+            self.cx = px * factor + (self.cx - px)
+            self.cy = py * factor + (self.cy - py)
+            self.zoom += step
+            await self.load(self.tiles())
+
+    async def live(self, deadline: float, cadence: float):
+        await self.load(self.tiles())
+        while time.monotonic() < deadline:
+            # Clients poll on the granule cadence, not in lockstep
+            await asyncio.sleep(cadence * self.rng.uniform(0.9, 1.1))
+            await self.load(self.tiles(), revalidate=True)
+
+    async def scrub(self, deadline: float, first: datetime, last: datetime):
+        span = max(0, int((last - first).total_seconds() // 60))
+        minute = self.rng.randint(0, span)
+        direction = self.rng.choice((-1, 1))
+        while time.monotonic() < deadline:
+            t = (first + timedelta(minutes=minute)).strftime('%Y-%m-%dT%H:%M:%SZ')
+            await self.load(self.tiles(), t=t)
+            # Timeline drags are faster than map moves and bounce off the ends
+            await self.pause(0.25)
+            if not 0 <= minute + direction <= span:
+                direction = -direction
+            minute = min(max(minute + direction, 0), span)
+
+
+async def run_scenario(client: httpx.AsyncClient, name: str, sessions: int, duration: float,
+                       center: Tuple[float, float], zooms: Tuple[int, int], think: float,
+                       window: Optional[str], cadence: float, scrub_range: Tuple[datetime, datetime],
+                       seed: int) -> Dict[str, object]:
+    """Run sessions concurrently for duration seconds; returns the scenario summary"""
+    stats = ScenarioStats(name)
+    deadline = time.monotonic() + duration
+    runners = []
+    for i in range(sessions):
+        session = MapSession(client, stats, random.Random(f"{seed}-{name}-{i}"), center, zooms, think, window)
+        if name == 'pan':
+            runners.append(session.pan(deadline))
+        elif name == 'zoom':
+            runners.append(session.zoom_steps(deadline))
+        elif name == 'live':
+            runners.append(session.live(deadline, cadence))
+        elif name == 'scrub':
+            runners.append(session.scrub(deadline, *scrub_range))
+        else:
+            raise ValueError(f"Unknown scenario: {name}")
+    start = time.perf_counter()
+    await asyncio.gather(*runners)
+    return stats.summary(time.perf_counter() - start, sessions)
+
+
+def print_summary(row: Dict[str, object]):
+    latency = row['latency_ms']
+    viewport = row['viewport_ms']
+    hit_rate = row['cache_hit_rate']
+    print(f"{row['scenario']:<6} {row['requests']:>6} req  {row['requests_per_second'] or 0:8.1f} req/s  "
+          f"p50={latency.get('p50', 0):8.2f} ms  p99={latency.get('p99', 0):8.2f} ms  "
+          f"viewport p99={viewport.get('p99', 0):8.2f} ms  "
+          f"hit={'-' if hit_rate is None else f'{hit_rate:.1%}'}  errors={row['errors']}", file=sys.stderr)
+
+
+async def _feed_granules(client: httpx.AsyncClient, paths: List[str], cadence: float):
+    """Ingest one granule per cadence, as the S3 poller would"""
+    for path in paths:
+        await asyncio.sleep(cadence)
+        response = await client.post('/ingest_files', json={'paths': [path]})
+        if response.status_code != 200:
+            logger.warning(f"Live ingest of {path} returned {response.status_code}")
+
+
+async def run_in_process(args, scenarios: List[str], zooms: Tuple[int, int], cadence: float,
+                         workdir: str) -> Tuple[List[Dict[str, object]], Dict[str, object]]:
+    """Serve the app in this process from synthetic granules and run every scenario against it"""
+    import app.main as main
+
+    # Repeatable runs: no external data sources
+    main.GLM_S3_POLL_ENABLED = False
+    main.GLM_REPLAY_DIR = ''
+
+    rng = np.random.default_rng(args.seed)
+    cells = random_cells(rng, 12)
+    densest = max(cells, key=lambda c: c.flashes_per_minute)
+    live_granules = int(math.ceil(args.duration / cadence)) + 1 if 'live' in scenarios else 0
+    paths = write_sequence(workdir, SYNTHETIC_START, args.granules + live_granules, args.events,
+                           seed=args.seed, cells=cells)
+    seeded, live = paths[:args.granules], paths[args.granules:]
+    first = SYNTHETIC_START
+    last = SYNTHETIC_START + timedelta(seconds=GRANULE_SECONDS * args.granules)
+    # Scrub over complete default (5 minute) windows of the seeded data
+    scrub_range = (min(first + timedelta(minutes=5), last), last)
+
+    results = []
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.app.router.lifespan_context(main.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadgen", timeout=60.0) as client:
+            response = await client.post('/ingest_files', json={'paths': seeded})
+            response.raise_for_status()
+            for name in scenarios:
+                main._tile_cache.clear()
+                feeder = asyncio.create_task(_feed_granules(client, live, cadence)) if name == 'live' else None
+                try:
+                    row = await run_scenario(
+                        client, name, args.sessions, args.duration, (densest.lon, densest.lat), zooms,
+                        args.think, args.window, cadence, scrub_range, args.seed
+                    )
+                finally:
+                    if feeder is not None:
+                        feeder.cancel()
+                print_summary(row)
+                results.append(row)
+    data = {'granules': args.granules, 'events_per_granule': args.events,
+            'center': [densest.lon, densest.lat]}
+    return results, data
+
+
+async def run_remote(args, scenarios: List[str], zooms: Tuple[int, int],
+                     cadence: float) -> List[Dict[str, object]]:
+    """Run every scenario against a running service"""
+    lon, lat = (float(v) for v in args.center.split(','))
+    last = datetime.utcnow().replace(second=0, microsecond=0) - timedelta(minutes=1)
+    scrub_range = (last - timedelta(minutes=args.scrub_minutes), last)
+    results = []
+    async with httpx.AsyncClient(base_url=args.url, timeout=60.0,
+                                 limits=httpx.Limits(max_connections=args.sessions * SESSION_CONNECTIONS)) as client:
+        for name in scenarios:
+            row = await run_scenario(client, name, args.sessions, args.duration, (lon, lat), zooms,
+                                     args.think, args.window, cadence, scrub_range, args.seed)
+            print_summary(row)
+            results.append(row)
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="GLM TOE map-client load generator")
+    parser.add_argument('--url', help="Service to load (default: run the app in-process on synthetic data)")
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help="Comma separated, run in order")
+    parser.add_argument('--sessions', type=int, default=8, help="Concurrent map sessions per scenario")
+    parser.add_argument('--duration', type=float, default=60.0, help="Seconds per scenario")
+    parser.add_argument('--think', type=float, default=1.0, help="Mean seconds between map moves")
+    parser.add_argument('--zooms', default='4-10', help="Zoom range sessions move within (e.g. 4-10)")
+    parser.add_argument('--window', help="Time window sent with every tile (default: the service's)")
+    parser.add_argument('--cadence', type=float, help="Live refresh interval in seconds (default: granule cadence)")
+    parser.add_argument('--center', default='-97.5,35.5', help="lon,lat sessions start near (with --url)")
+    parser.add_argument('--scrub-minutes', type=int, default=60, help="Minutes of history scrubbed (with --url)")
+    parser.add_argument('--granules', type=int, default=30, help="Synthetic granules ingested before the run")
+    parser.add_argument('--events', type=int, default=5000, help="Events per synthetic granule")
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--quick', action='store_true', help="4 sessions, 10 s per scenario, 3 s cadence")
+    parser.add_argument('--output', help="Write JSON results here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    scenarios = [name for name in args.scenarios.split(',') if name]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    low, _, high = args.zooms.partition('-')
+    zooms = (int(low), int(high or low))
+    if args.quick:
+        args.sessions, args.duration = 4, 10.0
+        args.cadence = args.cadence or 3.0
+        args.granules, args.events = min(args.granules, 18), min(args.events, 2000)
+    if args.cadence is None:
+        if args.url:
+            args.cadence = float(GRANULE_SECONDS)
+        else:
+            import app.main as service
+            args.cadence = float(service.GLM_GRANULE_CADENCE_SECONDS)
+
+    config = {'scenarios': scenarios, 'sessions': args.sessions, 'duration_seconds': args.duration,
+              'think_seconds': args.think, 'zooms': list(zooms), 'window': args.window,
+              'cadence_seconds': args.cadence, 'target': args.url or 'in-process'}
+    if args.url:
+        results = asyncio.run(run_remote(args, scenarios, zooms, args.cadence))
+    else:
+        with tempfile.TemporaryDirectory(prefix='glm-load-') as workdir:
+            results, data = asyncio.run(run_in_process(args, scenarios, zooms, args.cadence, workdir))
+        config['data'] = data
+
+    report = {
+        'schema': SCHEMA_VERSION,
+        'environment': environment(),
+        'config': config,
+        'results': results
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return 1 if any(row['errors'] for row in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
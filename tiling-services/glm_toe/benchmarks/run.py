@@ -0,0 +1,247 @@
+"""
+GLM TOE Benchmark Runner
+Times the pipeline stages on synthetic granules at several event densities
+and zooms, and writes machine-readable results for comparison across commits.
+
+    python -m benchmarks.run --output results/$(git rev-parse --short HEAD).json
+    python -m benchmarks.run --quick --compare results/main.json
+
+Cases:
+    decode      read_glm_granule on one 20 s granule (NetCDF open + extract)
+    ingest      EventIndex.add_events for the decoded events
+    aggregate   compute_block_toe for the metatile over the densest storm cell
+    render      colorize_toe_array for that metatile
+    encode      encode_png for every non-empty tile of the metatile (one thread)
+    metatile    render_metatile end to end (colorize + parallel encode)
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from benchmarks.synthetic_glm import GRANULE_SECONDS, random_cells, write_granule
+
+SCHEMA_VERSION = 1
+DEFAULT_DENSITIES = (1000, 10000, 50000)
+DEFAULT_ZOOMS = (4, 7, 10)
+
+
+def lonlat_to_tile(lon: float, lat: float, zoom: int):
+    n = 2 ** zoom
+    xtile = int((lon + 180.0) / 360.0 * n)
+    lat_rad = math.radians(lat)
+    ytile = int((1.0 - math.log(math.tan(lat_rad) + 1 / math.cos(lat_rad)) / math.pi) / 2.0 * n)
+    return xtile, ytile
+
+
+def measure(fn: Callable[[], object], repeat: int, warmup: int = 1,
+            setup: Optional[Callable[[], None]] = None) -> Dict[str, float]:
+    """Wall-clock statistics (milliseconds) over repeat calls of fn"""
+    for _ in range(warmup):
+        if setup:
+            setup()
+        fn()
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000.0)
+    samples.sort()
+    return {
+        'repeat': repeat,
+        'min_ms': round(samples[0], 4),
+        'median_ms': round(statistics.median(samples), 4),
+        'mean_ms': round(statistics.fmean(samples), 4),
+        'p95_ms': round(samples[min(len(samples) - 1, int(0.95 * len(samples)))], 4),
+        'stdev_ms': round(statistics.stdev(samples), 4) if len(samples) > 1 else 0.0
+    }
+
+
+def environment() -> Dict[str, object]:
+    """Where and on what the results were produced"""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, timeout=10,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': datetime.utcnow().isoformat() + 'Z',
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count()
+    }
+
+
+def run_benchmarks(densities, zooms, repeat: int, metatile: int, window_minutes: int,
+                   workdir: str, seed: int = 7) -> List[Dict[str, object]]:
+    """Run every case; returns one result row per (case, density, zoom)"""
+    import app.main as main
+    from app.event_index import EventIndex
+    from app.glm_processor import GLMDataProcessor
+    from app.tile_renderer import TOETileRenderer
+
+    processor = GLMDataProcessor(use_abi_grid=True)
+    renderer = TOETileRenderer(tile_size=256, encode_workers=main.GLM_TILE_ENCODE_WORKERS)
+    # compute_block_toe reads the service's index and renderer; restored afterwards
+    saved = main._event_index, main._renderer
+    main._renderer = renderer
+    results = []
+
+    def record(case: str, density: int, zoom: Optional[int], stats: Dict[str, float], **extra):
+        row = {'case': case, 'events': density, 'zoom': zoom, **stats, **extra}
+        if density and stats['median_ms'] > 0:
+            row['events_per_second'] = round(density / (stats['median_ms'] / 1000.0))
+        results.append(row)
+        print(f"{case:<10} events={density:<7} zoom={'-' if zoom is None else zoom:<3} "
+              f"median={stats['median_ms']:9.3f} ms  p95={stats['p95_ms']:9.3f} ms", file=sys.stderr)
+
+    try:
+        for density in densities:
+            rng = np.random.default_rng(seed)
+            cells = random_cells(rng, 12)
+            start = datetime(2025, 7, 19, 12, 0, 0)
+            path = write_granule(workdir, start, density, cells=cells, seed=seed)
+            end_time = start + timedelta(seconds=GRANULE_SECONDS)
+
+            granule = processor.read_glm_granule(path)
+            record('decode', density, None, measure(lambda: processor.read_glm_granule(path), repeat))
+            record('ingest', density, None, measure(
+                lambda: EventIndex(bucket_seconds=main.GLM_EVENT_INDEX_BUCKET_SECONDS).add_events(granule.events),
+                repeat
+            ))
+
+            main._event_index = EventIndex(bucket_seconds=main.GLM_EVENT_INDEX_BUCKET_SECONDS)
+            main._event_index.add_events(granule.events)
+            densest = max(cells, key=lambda c: c.flashes_per_minute)
+
+            for zoom in zooms:
+                n = min(metatile, 2 ** zoom)
+                x, y = lonlat_to_tile(densest.lon, densest.lat, zoom)
+                mx, my = x // n, y // n
+
+                def aggregate():
+                    return main.compute_block_toe(zoom, mx, my, n, window_minutes, end_time, False)
+
+                # Pyramids (low zooms) are cached per event version; time the build, not the cache
+                record('aggregate', density, zoom, measure(aggregate, repeat, setup=main.mark_events_changed),
+                       metatile=n)
+
+                block = aggregate()
+                record('render', density, zoom, measure(lambda: renderer.colorize_toe_array(block), repeat),
+                       metatile=n)
+
+                rgba = renderer.colorize_toe_array(block)
+                ts = renderer.tile_size
+                tiles = [
+                    np.ascontiguousarray(rgba[dy * ts:(dy + 1) * ts, dx * ts:(dx + 1) * ts])
+                    for dy in range(n) for dx in range(n)
+                    if rgba[dy * ts:(dy + 1) * ts, dx * ts:(dx + 1) * ts, 3].any()
+                ]
+                record('encode', density, zoom, measure(lambda: [renderer.encode_png(t) for t in tiles], repeat),
+                       metatile=n, tiles=len(tiles))
+                record('metatile', density, zoom, measure(lambda: renderer.render_metatile(block, n), repeat),
+                       metatile=n)
+    finally:
+        main._event_index, main._renderer = saved
+        main.mark_events_changed()
+        renderer.close()
+    return results
+
+
+def compare(baseline: Dict, current: Dict, threshold: float) -> Tuple[List[str], int]:
+    """
+    Human-readable comparison against a baseline report
+    Rows slower than baseline by more than threshold count as regressions.
+    """
+    def key(row):
+        return row['case'], row['events'], row['zoom']
+
+    old = {key(row): row for row in baseline['results']}
+    lines, regressions = [], 0
+    for row in current['results']:
+        before = old.get(key(row))
+        if before is None or not before['median_ms']:
+            continue
+        ratio = row['median_ms'] / before['median_ms']
+        flag = ''
+        if ratio > 1.0 + threshold:
+            flag = '  REGRESSION'
+            regressions += 1
+        elif ratio < 1.0 - threshold:
+            flag = '  faster'
+        lines.append(
+            f"{row['case']:<10} events={row['events']:<7} zoom={'-' if row['zoom'] is None else row['zoom']:<3} "
+            f"{before['median_ms']:9.3f} -> {row['median_ms']:9.3f} ms  x{ratio:5.2f}{flag}"
+        )
+    lines.append(f"{regressions} regression(s) beyond {threshold:.0%}")
+    return lines, regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="GLM TOE pipeline benchmarks")
+    parser.add_argument('--densities', default=','.join(map(str, DEFAULT_DENSITIES)),
+                        help="Events per granule, comma separated")
+    parser.add_argument('--zooms', default=','.join(map(str, DEFAULT_ZOOMS)), help="Zoom levels, comma separated")
+    parser.add_argument('--repeat', type=int, default=5, help="Timed repetitions per case")
+    parser.add_argument('--metatile', type=int, default=8, help="Metatile size (tiles per side)")
+    parser.add_argument('--window', type=int, default=5, help="Time window in minutes")
+    parser.add_argument('--quick', action='store_true', help="One small density and zoom, 2 repetitions")
+    parser.add_argument('--output', help="Write JSON results here (default: stdout)")
+    parser.add_argument('--compare', help="Baseline JSON results to compare against")
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help="Relative slowdown flagged as a regression (default 0.15)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    densities = [int(v) for v in args.densities.split(',') if v]
+    zooms = [int(v) for v in args.zooms.split(',') if v]
+    repeat = args.repeat
+    if args.quick:
+        densities, zooms, repeat = [min(densities)], [max(zooms)], 2
+
+    with tempfile.TemporaryDirectory(prefix='glm-bench-') as workdir:
+        results = run_benchmarks(densities, zooms, repeat, args.metatile, args.window, workdir)
+
+    report = {
+        'schema': SCHEMA_VERSION,
+        'environment': environment(),
+        'config': {'densities': densities, 'zooms': zooms, 'repeat': repeat,
+                   'metatile': args.metatile, 'window_minutes': args.window},
+        'results': results
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            lines, regressions = compare(json.load(f), report, args.threshold)
+        print('\n'.join(lines), file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,231 @@
+"""
+Synthetic GLM L2 LCFA Granules
+Writes NetCDF4 files laid out like NOAA's GLM-L2-LCFA product: packed
+unsigned 16-bit event/group/flash variables with the operational scale
+factors and offsets, event_time_offset relative to time_coverage_start,
+and OR_GLM-L2-LCFA_G??_s..._e..._c....nc filenames.
+
+Events come from clustered storm cells: each cell produces flashes, each
+flash a few groups, each group a few events within one ~8 km GLM pixel,
+with lognormal energies. Output is deterministic for a given seed.
+"""
+
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from netCDF4 import Dataset
+
+GRANULE_SECONDS = 20
+
+# Sub-satellite longitudes of the operational GOES-R slots
+SATELLITE_LON0 = {'G16': -75.2, 'G17': -137.2, 'G18': -137.0, 'G19': -75.2}
+
+# Packing of the operational product: value = packed * scale_factor + add_offset
+LAT_PACKING = (0.00203128, -66.56)
+LON_SCALE = 0.00203128
+ENERGY_PACKING = (1.9024e-17, 2.8515e-16)
+TIME_PACKING = (0.0003814756, -5.0)
+AREA_PACKING = (152601.86, 0.0)
+
+
+@dataclass
+class StormCell:
+    lat: float
+    lon: float
+    radius_km: float
+    flashes_per_minute: float
+
+
+def glm_timestamp(value: datetime) -> str:
+    """sYYYYJJJHHMMSSs-style timestamp used in GLM filenames (tenths of a second)"""
+    return f"{value:%Y}{value.timetuple().tm_yday:03d}{value:%H%M%S}{value.microsecond // 100000}"
+
+
+def granule_filename(start: datetime, satellite: str = 'G18', created: Optional[datetime] = None) -> str:
+    end = start + timedelta(seconds=GRANULE_SECONDS)
+    created = created or end + timedelta(seconds=2)
+    return (
+        f"OR_GLM-L2-LCFA_{satellite}_s{glm_timestamp(start)}_e{glm_timestamp(end)}"
+        f"_c{glm_timestamp(created)}.nc"
+    )
+
+
+def random_cells(rng: np.random.Generator, count: int, satellite: str = 'G18',
+                 lat_range: Tuple[float, float] = (10.0, 45.0)) -> List[StormCell]:
+    """Storm cells scattered over the satellite's field of view"""
+    lon0 = SATELLITE_LON0[satellite]
+    return [
+        StormCell(
+            lat=float(rng.uniform(*lat_range)),
+            lon=float(np.clip(rng.uniform(lon0 - 40.0, lon0 + 40.0), -179.0, 179.0)),
+            radius_km=float(rng.uniform(5.0, 40.0)),
+            flashes_per_minute=float(rng.lognormal(2.5, 0.8))
+        )
+        for _ in range(count)
+    ]
+
+
+def _pack(values: np.ndarray, scale: float, offset: float) -> np.ndarray:
+    packed = np.clip(np.round((values - offset) / scale), 0, 65534).astype(np.uint16)
+    return packed.view(np.int16)
+
+
+def _add_packed(nc: Dataset, name: str, dim: str, values: np.ndarray, scale: float, offset: float,
+                units: str, long_name: str):
+    var = nc.createVariable(name, 'i2', (dim,), fill_value=np.int16(-1), zlib=True)
+    var.set_auto_maskandscale(False)
+    var.setncatts({
+        '_Unsigned': 'true', 'scale_factor': np.float32(scale), 'add_offset': np.float32(offset),
+        'units': units, 'long_name': long_name
+    })
+    var[:] = _pack(values, scale, offset)
+
+
+def synthesize_events(rng: np.random.Generator, cells: Sequence[StormCell], n_events: int):
+    """
+    Event, group and flash arrays for n_events events spread over cells
+    Returns (events, groups, flashes) dicts of numpy arrays.
+    """
+    weights = np.array([c.flashes_per_minute for c in cells])
+    weights /= weights.sum()
+
+    # ~4 groups per flash, ~3 events per group (typical GLM ratios)
+    n_groups = max(1, n_events // 3)
+    n_flashes = max(1, n_groups // 4)
+
+    flash_cell = rng.choice(len(cells), size=n_flashes, p=weights)
+    cell_lat = np.array([c.lat for c in cells])[flash_cell]
+    cell_lon = np.array([c.lon for c in cells])[flash_cell]
+    radius_deg = np.array([c.radius_km for c in cells])[flash_cell] / 111.0
+    flash_lat = cell_lat + rng.normal(0.0, 1.0, n_flashes) * radius_deg
+    flash_lon = cell_lon + rng.normal(0.0, 1.0, n_flashes) * radius_deg / np.cos(np.radians(cell_lat))
+    flash_start = rng.uniform(0.0, GRANULE_SECONDS - 1.0, n_flashes)
+
+    group_flash = np.sort(np.concatenate([np.arange(n_flashes), rng.integers(0, n_flashes, n_groups - n_flashes)]))
+    group_lat = flash_lat[group_flash] + rng.normal(0.0, 0.03, n_groups)
+    group_lon = flash_lon[group_flash] + rng.normal(0.0, 0.03, n_groups)
+    group_time = flash_start[group_flash] + rng.exponential(0.15, n_groups)
+
+    event_group = np.sort(np.concatenate([np.arange(n_groups), rng.integers(0, n_groups, n_events - n_groups)]))
+    event_lat = group_lat[event_group] + rng.uniform(-0.04, 0.04, n_events)
+    event_lon = group_lon[event_group] + rng.uniform(-0.04, 0.04, n_events)
+    event_time = group_time[event_group]
+    event_energy = np.clip(rng.lognormal(np.log(2e-15), 1.0, n_events), 3e-16, 1.2e-12)
+
+    group_energy = np.bincount(event_group, weights=event_energy, minlength=n_groups)
+    flash_energy = np.bincount(group_flash, weights=group_energy, minlength=n_flashes)
+    group_area = np.bincount(event_group, minlength=n_groups) * 6.4e7
+    flash_area = np.bincount(group_flash, weights=group_area, minlength=n_flashes)
+    flash_end = np.maximum.reduceat(group_time, np.searchsorted(group_flash, np.arange(n_flashes)))
+
+    events = {'lat': np.clip(event_lat, -66.0, 66.0), 'lon': np.clip(event_lon, -180.0, 180.0),
+              'energy': event_energy, 'time': np.clip(event_time, 0.0, GRANULE_SECONDS), 'parent': event_group}
+    groups = {'lat': group_lat, 'lon': group_lon, 'energy': group_energy, 'time': group_time,
+              'area': group_area, 'parent': group_flash}
+    flashes = {'lat': flash_lat, 'lon': flash_lon, 'energy': flash_energy, 'start': flash_start,
+               'end': flash_end, 'area': flash_area}
+    return events, groups, flashes
+
+
+def write_granule(directory: str, start: datetime, n_events: int, satellite: str = 'G18',
+                  cells: Optional[Sequence[StormCell]] = None, seed: int = 0,
+                  created: Optional[datetime] = None) -> str:
+    """
+    Write one 20 s granule with n_events events starting at start (naive UTC)
+    Returns the file path.
+    """
+    rng = np.random.default_rng(seed)
+    cells = cells or random_cells(rng, 12, satellite)
+    events, groups, flashes = synthesize_events(rng, cells, n_events)
+    end = start + timedelta(seconds=GRANULE_SECONDS)
+    lon_offset = SATELLITE_LON0[satellite] - 66.56
+    epoch = f"seconds since {start:%Y-%m-%d %H:%M:%S}.000"
+
+    path = os.path.join(directory, granule_filename(start, satellite, created))
+    with Dataset(path, 'w', format='NETCDF4') as nc:
+        nc.setncatts({
+            'title': 'GLM L2 Lightning Detection: event, group and flash',
+            'dataset_name': os.path.basename(path),
+            'platform_ID': satellite,
+            'orbital_slot': 'GOES-West' if SATELLITE_LON0[satellite] < -100 else 'GOES-East',
+            'production_site': 'SYNTHETIC',
+            'time_coverage_start': f"{start:%Y-%m-%dT%H:%M:%S}.0Z",
+            'time_coverage_end': f"{end:%Y-%m-%dT%H:%M:%S}.0Z",
+        })
+        nc.createDimension('number_of_events', len(events['lat']))
+        nc.createDimension('number_of_groups', len(groups['lat']))
+        nc.createDimension('number_of_flashes', len(flashes['lat']))
+
+        event_id = nc.createVariable('event_id', 'i4', ('number_of_events',))
+        event_id[:] = np.arange(1, len(events['lat']) + 1, dtype=np.int32)
+        _add_packed(nc, 'event_time_offset', 'number_of_events', events['time'], *TIME_PACKING,
+                    epoch, "GLM L2+ Lightning Detection: event's time of occurrence")
+        _add_packed(nc, 'event_lat', 'number_of_events', events['lat'], *LAT_PACKING,
+                    'degrees_north', 'GLM L2+ Lightning Detection: event latitude')
+        _add_packed(nc, 'event_lon', 'number_of_events', events['lon'], LON_SCALE, lon_offset,
+                    'degrees_east', 'GLM L2+ Lightning Detection: event longitude')
+        _add_packed(nc, 'event_energy', 'number_of_events', events['energy'], *ENERGY_PACKING,
+                    'J', 'GLM L2+ Lightning Detection: event radiant energy')
+        parent = nc.createVariable('event_parent_group_id', 'i4', ('number_of_events',))
+        parent[:] = events['parent'].astype(np.int32)
+
+        group_id = nc.createVariable('group_id', 'i4', ('number_of_groups',))
+        group_id[:] = np.arange(len(groups['lat']), dtype=np.int32)
+        _add_packed(nc, 'group_time_offset', 'number_of_groups', groups['time'], *TIME_PACKING,
+                    epoch, "GLM L2+ Lightning Detection: mean time of group's constituent events' times of occurrence")
+        group_lat = nc.createVariable('group_lat', 'f4', ('number_of_groups',))
+        group_lat[:] = groups['lat']
+        group_lon = nc.createVariable('group_lon', 'f4', ('number_of_groups',))
+        group_lon[:] = groups['lon']
+        _add_packed(nc, 'group_area', 'number_of_groups', groups['area'], *AREA_PACKING,
+                    'm2', 'GLM L2+ Lightning Detection: group area coverage')
+        _add_packed(nc, 'group_energy', 'number_of_groups', groups['energy'], *ENERGY_PACKING,
+                    'J', 'GLM L2+ Lightning Detection: group radiant energy')
+        group_qc = nc.createVariable('group_quality_flag', 'i2', ('number_of_groups',))
+        group_qc[:] = 0
+        group_parent = nc.createVariable('group_parent_flash_id', 'i2', ('number_of_groups',))
+        group_parent[:] = groups['parent'].astype(np.int16)
+
+        flash_id = nc.createVariable('flash_id', 'i2', ('number_of_flashes',))
+        flash_id[:] = np.arange(len(flashes['lat']), dtype=np.int16)
+        _add_packed(nc, 'flash_time_offset_of_first_event', 'number_of_flashes', flashes['start'], *TIME_PACKING,
+                    epoch, "GLM L2+ Lightning Detection: time of occurrence of first constituent event in flash")
+        _add_packed(nc, 'flash_time_offset_of_last_event', 'number_of_flashes', flashes['end'], *TIME_PACKING,
+                    epoch, "GLM L2+ Lightning Detection: time of occurrence of last constituent event in flash")
+        flash_lat = nc.createVariable('flash_lat', 'f4', ('number_of_flashes',))
+        flash_lat[:] = flashes['lat']
+        flash_lon = nc.createVariable('flash_lon', 'f4', ('number_of_flashes',))
+        flash_lon[:] = flashes['lon']
+        _add_packed(nc, 'flash_area', 'number_of_flashes', flashes['area'], *AREA_PACKING,
+                    'm2', 'GLM L2+ Lightning Detection: flash area coverage')
+        _add_packed(nc, 'flash_energy', 'number_of_flashes', flashes['energy'], *ENERGY_PACKING,
+                    'J', 'GLM L2+ Lightning Detection: flash radiant energy')
+        flash_qc = nc.createVariable('flash_quality_flag', 'i2', ('number_of_flashes',))
+        flash_qc[:] = 0
+
+        product_time = nc.createVariable('product_time', 'f8')
+        product_time.units = 'seconds since 2000-01-01 12:00:00'
+        product_time[...] = (start - datetime(2000, 1, 1, 12)).total_seconds()
+
+    return path
+
+
+def write_sequence(directory: str, start: datetime, granules: int, events_per_granule: int,
+                   satellite: str = 'G18', seed: int = 0, drift_kmh: float = 40.0,
+                   cells: Optional[List[StormCell]] = None) -> List[str]:
+    """
+    Consecutive granules from one set of storm cells drifting east
+    Cells are drawn from seed unless given. Returns the file paths in time order.
+    """
+    if cells is None:
+        cells = random_cells(np.random.default_rng(seed), 12, satellite)
+    paths = []
+    for i in range(granules):
+        shift = drift_kmh * GRANULE_SECONDS * i / 3600.0 / 111.0
+        moved = [StormCell(c.lat, min(c.lon + shift, 179.0), c.radius_km, c.flashes_per_minute) for c in cells]
+        paths.append(write_granule(directory, start + timedelta(seconds=GRANULE_SECONDS * i),
+                                   events_per_granule, satellite, moved, seed=seed + i + 1))
+    return paths
@@ -90,7 +90,7 @@ setup_environment() {
     # Set defaults if not already set
     export GLM_USE_ABI_GRID=${GLM_USE_ABI_GRID:-"true"}
     export GLM_ABI_LON0=${GLM_ABI_LON0:-"-75.0"}
-    export GLM_TILE_CACHE_SIZE=${GLM_TILE_CACHE_SIZE:-"128"}
+    export GLM_TILE_CACHE_MB=${GLM_TILE_CACHE_MB:-"256"}
     export GLM_S3_POLL_ENABLED=${GLM_S3_POLL_ENABLED:-"false"}
     export GLM_S3_POLL_INTERVAL=${GLM_S3_POLL_INTERVAL:-"60"}
     export GLM_S3_BUCKET=${GLM_S3_BUCKET:-"noaa-goes18"}
@@ -100,7 +100,7 @@ setup_environment() {
     print_success "Environment variables configured:"
     echo "  GLM_USE_ABI_GRID: $GLM_USE_ABI_GRID"
     echo "  GLM_ABI_LON0: $GLM_ABI_LON0"
-    echo "  GLM_TILE_CACHE_SIZE: $GLM_TILE_CACHE_SIZE"
+    echo "  GLM_TILE_CACHE_MB: $GLM_TILE_CACHE_MB"
     echo "  GLM_S3_POLL_ENABLED: $GLM_S3_POLL_ENABLED"
     echo "  GLM_S3_BUCKET: $GLM_S3_BUCKET"
     echo "  PORT: $PORT"
@@ -168,7 +168,7 @@ show_usage() {
     echo "Environment Variables:"
     echo "  GLM_USE_ABI_GRID     Use ABI fixed grid (default: true)"
     echo "  GLM_ABI_LON0         ABI grid longitude center (default: -75.0)"
-    echo "  GLM_TILE_CACHE_SIZE  Maximum cached tiles (default: 128)"
+    echo "  GLM_TILE_CACHE_MB    Tile cache memory budget in MiB (default: 256)"
     echo "  GLM_S3_POLL_ENABLED  Enable S3 polling (default: false)"
     echo "  GLM_S3_BUCKET        S3 bucket name (default: noaa-goes18)"
     echo ""
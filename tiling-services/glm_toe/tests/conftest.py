@@ -1,8 +1,51 @@
 import os
 import sys
 
+import pytest
+
 # Ensure the service package (app) is importable when running pytest directly
 THIS_DIR = os.path.dirname(__file__)
 SERVICE_ROOT = os.path.abspath(os.path.join(THIS_DIR, '..'))
 if SERVICE_ROOT not in sys.path:
     sys.path.insert(0, SERVICE_ROOT)
+
+
+@pytest.fixture
+def register_granules(monkeypatch):
+    """Register count contiguous granules spanning [start, end] with app.main (metadata only)"""
+    import app.main as main
+    from app.glm_processor import GLMGranule
+
+    def register(start, end, count=1):
+        step = (end - start) / count
+        for i in range(count):
+            begin = start + i * step
+            granule = GLMGranule(path=f'granule-{i}', satellite='G18', start_time=begin,
+                                 end_time=begin + step, creation_time=begin + step, events=[])
+            monkeypatch.setitem(main._ingested_granules, granule.path, granule)
+        monkeypatch.setattr(main, '_granule_coverage', None)
+    return register
+
+
+@pytest.fixture
+def reset_main(monkeypatch):
+    """
+    app.main with empty ingest state (event index, granules, epoch time, replay, freshness)
+    Startup and ingest replace these globals; monkeypatch restores them afterwards.
+    The epoch sequence keeps counting so live cache keys never repeat.
+    """
+    import app.main as main
+    from app.event_index import EventIndex
+    from app.freshness import FreshnessTracker
+
+    monkeypatch.setattr(main, '_event_index', EventIndex(bucket_seconds=main.GLM_EVENT_INDEX_BUCKET_SECONDS))
+    monkeypatch.setattr(main, '_ingested_granules', {})
+    monkeypatch.setattr(main, '_shared_granules', set())
+    monkeypatch.setattr(main, '_granule_coverage', None)
+    monkeypatch.setattr(main, '_ingest_epoch', None)
+    monkeypatch.setattr(main, '_ingest_epoch_seq', main._ingest_epoch_seq)
+    monkeypatch.setattr(main, '_ingest_epoch_wall', main._ingest_epoch_wall)
+    monkeypatch.setattr(main, '_freshness', FreshnessTracker())
+    monkeypatch.setattr(main, '_clock', None)
+    monkeypatch.setattr(main, '_replayer', None)
+    return main
@@ -0,0 +1,138 @@
+"""
+Tests for time-lapse animation tiles
+"""
+
+import io
+import math
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image, ImageSequence, features
+
+from app.event_index import EventIndex, datetime_to_ms
+from app.tile_renderer import TOETileRenderer
+
+
+def lonlat_to_tile(lon: float, lat: float, zoom: int):
+    n = 2 ** zoom
+    xtile = int((lon + 180.0) / 360.0 * n)
+    lat_rad = math.radians(lat)
+    ytile = int((1.0 - math.log(math.tan(lat_rad) + 1 / math.cos(lat_rad)) / math.pi) / 2.0 * n)
+    return xtile, ytile
+
+
+class TestIncrementalFrames:
+    """Incremental frames must equal independent per-window aggregation"""
+
+    @pytest.fixture
+    def now(self):
+        return datetime(2025, 7, 4, 18, 0, 0)
+
+    @pytest.fixture
+    def index(self, now):
+        rng = np.random.default_rng(5)
+        size = 4000
+        lats = 28.0 + rng.normal(0, 0.2, size)
+        lons = -82.0 + rng.normal(0, 0.2, size)
+        values = rng.uniform(10, 2500, size)
+        times_ms = datetime_to_ms(now) - (rng.uniform(0, 40 * 60, size) * 1000).astype(np.int64)
+        index = EventIndex()
+        index.add(lats, lons, values, times_ms)
+        return index
+
+    @pytest.mark.parametrize('step, window', [(1, 5), (2, 3), (5, 2)])
+    def test_frames_match_direct(self, index, now, step, window):
+        z = 8
+        x, y = lonlat_to_tile(-82.0, 28.0, z)
+        first_end = now - timedelta(minutes=20)
+        frames = list(index.tile_frames(
+            z, x, y, first_end=first_end, frames=6,
+            step=timedelta(minutes=step), window=timedelta(minutes=window)
+        ))
+        assert len(frames) == 6
+
+        for k, frame in enumerate(frames):
+            end = first_end + timedelta(minutes=k * step)
+            # Window (end - window, end]
+            start = end - timedelta(minutes=window) + timedelta(milliseconds=1)
+            px, py, vals = index.tile_points(start, end, z, x, y)
+            direct = np.bincount(py * 256 + px, weights=vals, minlength=256 * 256).reshape(256, 256)
+            assert np.array_equal(frame > 0, direct > 0)
+            assert np.allclose(frame, direct, rtol=1e-5)
+
+
+class TestRenderAnimation:
+    """Test animation containers"""
+
+    @pytest.fixture
+    def frames(self):
+        frames = []
+        for k in range(3):
+            toe = np.zeros((256, 256), dtype=np.float32)
+            toe[50 + 20 * k, 60] = 1500.0
+            frames.append(toe)
+        return frames
+
+    def test_apng(self, frames):
+        renderer = TOETileRenderer(tile_size=256)
+        img = Image.open(io.BytesIO(renderer.render_animation(frames, fmt='png', frame_ms=200)))
+        decoded = [np.array(f.convert('RGBA')) for f in ImageSequence.Iterator(img)]
+        assert len(decoded) == 3
+        for frame, rgba in zip(frames, decoded):
+            assert np.array_equal(rgba, renderer.colorize_toe_array(frame))
+        renderer.close()
+
+    def test_sprite(self, frames):
+        renderer = TOETileRenderer(tile_size=256, encode_workers=1)
+        img = Image.open(io.BytesIO(renderer.render_animation(frames, fmt='sprite')))
+        assert img.size == (3 * 256, 256)
+
+    @pytest.mark.skipif(not features.check('webp'), reason="Pillow built without WebP")
+    def test_webp(self, frames):
+        renderer = TOETileRenderer(tile_size=256)
+        img = Image.open(io.BytesIO(renderer.render_animation(frames, fmt='webp')))
+        assert img.format == 'WEBP'
+        assert getattr(img, 'n_frames', 1) == 3
+        renderer.close()
+
+
+def test_anim_endpoint():
+    from app.main import app
+
+    now = datetime.utcnow().replace(microsecond=0)
+    with TestClient(app) as client:
+        client.post('/ingest', json=[
+            {"lat": 5.0, "lon": 20.0, "energy_j": 1500e-15,
+             "timestamp": (now - timedelta(minutes=m)).isoformat()}
+            for m in (1, 6)
+        ])
+        z = 7
+        x, y = lonlat_to_tile(20.0, 5.0, z)
+        start = (now - timedelta(minutes=9)).isoformat()
+        query = f'start={start}&end={now.isoformat()}&step=1m&window=2m&fps=5'
+        r = client.get(f'/tiles/{z}/{x}/{y}/anim?{query}')
+        assert r.status_code == 200
+        assert r.headers['content-type'] == 'image/apng'
+        assert r.headers['x-anim-frames'] == '10'
+        # Identical consecutive frames are merged, so check total play time
+        img = Image.open(io.BytesIO(r.content))
+        assert sum(f.info['duration'] for f in ImageSequence.Iterator(img)) == 10 * 200
+
+        r = client.get(f'/tiles/{z}/{x}/{y}/anim?{query}&format=sprite')
+        sprite = np.array(Image.open(io.BytesIO(r.content)).convert('RGBA'))
+        lit = [sprite[:, k * 256:(k + 1) * 256, 3].any() for k in range(10)]
+        # Each event is visible in the two frames whose 2 minute window holds it
+        assert lit == [False, False, False, True, True, False, False, False, True, True]
+
+        assert client.get(f'/tiles/{z}/{x}/{y}/anim?format=gif').status_code == 400
+        assert client.get(f'/tiles/{z}/{x}/{y}/anim?step=1m&start=2020-01-01T00:00:00').status_code == 400
+
+        # Offsets mix with naive times; unparseable times are rejected
+        aware = f'start={start}Z&end={(now - timedelta(minutes=1)).isoformat()}&step=1m&window=2m'
+        r = client.get(f'/tiles/{z}/{x}/{y}/anim?{aware}')
+        assert r.status_code == 200 and r.headers['x-anim-frames'] == '9'
+        assert r.headers['x-anim-start'] == start
+        assert client.get(f'/tiles/{z}/{x}/{y}/anim?start=yesterday').status_code == 400
+        assert client.get(f'/tiles/{z}/{x}/{y}/anim?end=soon').status_code == 400
@@ -22,3 +22,11 @@ def test_tiles_png():
     assert r.headers['content-type'].startswith('image/png')
     assert len(r.content) > 200
 
+
+
+def test_tiles_outside_the_pyramid_are_rejected():
+    with TestClient(app) as client:
+        for path in ('/tiles/40/0/0.png', '/tiles/21/0/0/data.png', '/tiles/-1/0/0.png',
+                     '/tiles/3/8/0.png', '/tiles/3/0/-1/data.png', '/tiles/25/0/0/anim'):
+            assert client.get(path).status_code == 400, path
+        assert client.get('/tiles/3/7/7.png').status_code == 200
@@ -0,0 +1,113 @@
+"""
+Tests for the synthetic granule generator and benchmark runner
+"""
+
+import json
+from datetime import datetime, timedelta
+
+import numpy as np
+import xarray as xr
+
+from app.freshness import granule_creation_time
+from app.glm_processor import GLMDataProcessor
+from benchmarks import loadgen, run
+from benchmarks.synthetic_glm import StormCell, write_granule, write_sequence
+
+START = datetime(2025, 7, 19, 12, 0, 0)
+
+
+class TestSyntheticGranule:
+    """Test that generated granules look like GLM L2 LCFA and decode correctly"""
+
+    def test_decodes_with_packed_variables(self, tmp_path):
+        cell = StormCell(lat=27.0, lon=-90.0, radius_km=20.0, flashes_per_minute=30.0)
+        path = write_granule(str(tmp_path), START, 3000, satellite='G16', cells=[cell], seed=3)
+        assert path.endswith('OR_GLM-L2-LCFA_G16_s20252001200000_e20252001200200_c20252001200220.nc')
+        assert granule_creation_time(path) == START + timedelta(seconds=22)
+
+        with xr.open_dataset(path, mask_and_scale=False, decode_times=False) as raw:
+            assert raw['event_lat'].dtype == np.int16
+            assert raw['event_energy'].attrs['_Unsigned'] == 'true'
+            assert raw['event_time_offset'].attrs['units'].startswith('seconds since 2025-07-19 12:00:00')
+            assert {'group_energy', 'flash_area', 'event_parent_group_id', 'product_time'} <= set(raw.variables)
+
+        granule = GLMDataProcessor().read_glm_granule(path)
+        assert len(granule.events) == 3000
+        lats = np.array([e.lat for e in granule.events])
+        lons = np.array([e.lon for e in granule.events])
+        assert abs(np.median(lats) - 27.0) < 0.5 and abs(np.median(lons) + 90.0) < 0.5
+        assert all(START <= e.timestamp <= START + timedelta(seconds=20) for e in granule.events)
+        assert all(3e-16 <= e.energy_j <= 1.3e-12 for e in granule.events)
+
+    def test_sequence_is_deterministic(self, tmp_path):
+        (tmp_path / 'a').mkdir()
+        (tmp_path / 'b').mkdir()
+        first = write_sequence(str(tmp_path / 'a'), START, 3, 200, seed=5)
+        second = write_sequence(str(tmp_path / 'b'), START, 3, 200, seed=5)
+        assert [p.rsplit('/', 1)[1] for p in first] == [p.rsplit('/', 1)[1] for p in second]
+        processor = GLMDataProcessor()
+        assert processor.read_glm_granule(first[2]).events == processor.read_glm_granule(second[2]).events
+
+
+def test_benchmark_report_and_compare(tmp_path):
+    output = tmp_path / 'results.json'
+    assert run.main(['--densities', '300', '--zooms', '9', '--repeat', '1', '--metatile', '2',
+                     '--output', str(output)]) == 0
+
+    report = json.loads(output.read_text())
+    assert report['schema'] == run.SCHEMA_VERSION
+    cases = {(row['case'], row['zoom']) for row in report['results']}
+    assert cases == {('decode', None), ('ingest', None), ('aggregate', 9), ('render', 9), ('encode', 9), ('metatile', 9)}
+
+    slower = json.loads(output.read_text())
+    for row in slower['results']:
+        row['median_ms'] *= 2
+    lines, regressions = run.compare(report, slower, threshold=0.15)
+    assert regressions == len(report['results'])
+    assert lines[-1].startswith(f"{regressions} regression(s)")
+
+
+class TestLoadGenerator:
+    """Test viewport geometry and a short in-process load run"""
+
+    def test_viewports_hold_12_to_30_tiles(self):
+        for cols, rows in loadgen.VIEWPORTS:
+            assert 12 <= cols * rows <= 30
+        tiles = loadgen.viewport_tiles(8.0, 8.0, 4, 6, 5)
+        assert len(tiles) == 30 and all(z == 4 for z, _, _ in tiles)
+        # Wraps across the antimeridian and clips at the poles
+        wrapped = loadgen.viewport_tiles(0.5, 0.5, 4, 4, 3)
+        assert {x for _, x, _ in wrapped} == {14, 15, 0, 1}
+        assert {y for _, _, y in wrapped} == {0, 1}
+
+    def test_stats_summary(self):
+        stats = loadgen.ScenarioStats('pan')
+        for cache in ('HIT', 'HIT', 'DISK', 'MISS'):
+            stats.record(0.01, 200, cache)
+        stats.record(0.5, None, None)
+        row = stats.summary(2.0, sessions=1)
+        assert row['requests'] == 4 and row['errors'] == 1
+        assert row['requests_per_second'] == 2.0
+        assert row['cache_hit_rate'] == 0.75
+        assert row['latency_ms']['p50'] == 10.0
+
+    def test_in_process_run(self, tmp_path, monkeypatch, reset_main):
+        main = reset_main
+        monkeypatch.setattr(main, 'GLM_S3_POLL_ENABLED', main.GLM_S3_POLL_ENABLED)
+        monkeypatch.setattr(main, 'GLM_REPLAY_DIR', main.GLM_REPLAY_DIR)
+        output = tmp_path / 'load.json'
+        status = loadgen.main([
+            '--scenarios', 'pan,live,scrub', '--sessions', '2', '--duration', '1', '--think', '0.1',
+            '--cadence', '0.4', '--zooms', '6-8', '--granules', '3', '--events', '300',
+            '--output', str(output)
+        ])
+        assert status == 0
+        report = json.loads(output.read_text())
+        assert [row['scenario'] for row in report['results']] == ['pan', 'live', 'scrub']
+        for row in report['results']:
+            assert row['requests'] > 0 and row['errors'] == 0
+            assert set(row['latency_ms']) >= {'p50', 'p99'}
+            assert row['cache_hit_rate'] is not None
+        live = report['results'][1]
+        assert set(live['status']) <= {'200', '304'}
+        assert report['config']['data']['granules'] == 3
@@ -0,0 +1,96 @@
+"""
+Tests for raw (quantized) TOE data tiles
+"""
+
+import io
+import math
+import zlib
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from app.tile_renderer import DATA_TILE_HEADER, DATA_TILE_MAGIC, TOETileRenderer
+
+
+def lonlat_to_tile(lon: float, lat: float, zoom: int):
+    n = 2 ** zoom
+    xtile = int((lon + 180.0) / 360.0 * n)
+    lat_rad = math.radians(lat)
+    ytile = int((1.0 - math.log(math.tan(lat_rad) + 1 / math.cos(lat_rad)) / math.pi) / 2.0 * n)
+    return xtile, ytile
+
+
+def dequantize(q, bits, log_min, log_max):
+    qmax = (1 << bits) - 1
+    out = np.zeros(q.shape, dtype=np.float64)
+    mask = q > 0
+    out[mask] = 10 ** (log_min + (q[mask].astype(np.float64) - 1) / (qmax - 1) * (log_max - log_min))
+    return out
+
+
+class TestQuantization:
+    """Test log quantization and encodings"""
+
+    @pytest.fixture
+    def renderer(self):
+        return TOETileRenderer(tile_size=256)
+
+    @pytest.fixture
+    def toe(self):
+        toe = np.zeros((256, 256), dtype=np.float32)
+        toe[10, 20] = 1.0
+        toe[100, 200] = 1500.0
+        toe[255, 0] = 2e5
+        return toe
+
+    def test_zero_stays_zero(self, renderer, toe):
+        q = renderer.quantize_toe_array(toe, bits=16)
+        assert q.dtype == np.uint16
+        assert q[0, 0] == 0
+        assert (q > 0).sum() == 3
+
+    @pytest.mark.parametrize('bits, rel', [(8, 0.04), (16, 1e-3)])
+    def test_roundtrip_precision(self, renderer, toe, bits, rel):
+        q = renderer.quantize_toe_array(toe, bits=bits)
+        back = dequantize(q, bits, -1.0, 6.0)
+        mask = toe > 0
+        assert np.allclose(back[mask], toe[mask], rtol=rel)
+
+    def test_png_16bit_packing(self, renderer, toe):
+        data = renderer.encode_data_tile(toe, fmt='png', bits=16)
+        rgb = np.array(Image.open(io.BytesIO(data)).convert('RGB')).astype(np.uint16)
+        q = (rgb[..., 0] << 8) | rgb[..., 1]
+        assert np.array_equal(q, renderer.quantize_toe_array(toe, bits=16))
+
+    def test_binary_header(self, renderer, toe):
+        data = renderer.encode_data_tile(toe, fmt='bin', bits=16, log_min=-1.0, log_max=6.0)
+        magic, version, bits, w, h, log_min, log_max = DATA_TILE_HEADER.unpack_from(data)
+        assert (magic, version, bits, w, h) == (DATA_TILE_MAGIC, 1, 16, 256, 256)
+        assert (log_min, log_max) == (-1.0, 6.0)
+        q = np.frombuffer(zlib.decompress(data[DATA_TILE_HEADER.size:]), dtype='<u2').reshape(h, w)
+        assert np.array_equal(q, renderer.quantize_toe_array(toe, bits=16))
+
+
+@pytest.mark.parametrize('z', [4, 9])
+def test_data_tile_endpoint(z):
+    from app.main import app
+
+    with TestClient(app) as client:
+        r = client.post('/ingest', json=[{"lat": 12.0, "lon": -70.0, "energy_j": 900e-15}])
+        assert r.status_code == 200
+
+        x, y = lonlat_to_tile(-70.0, 12.0, z)
+        r = client.get(f'/tiles/{z}/{x}/{y}/data.png?window=5m&bits=8')
+        assert r.status_code == 200
+        assert r.headers['content-type'].startswith('image/png')
+        assert r.headers['x-toe-encoding'] == 'log10-uint8'
+
+        q = np.array(Image.open(io.BytesIO(r.content)))
+        log_min = float(r.headers['x-toe-log-min'])
+        log_max = float(r.headers['x-toe-log-max'])
+        assert dequantize(q, 8, log_min, log_max).max() >= 900.0 * 0.9
+
+        assert client.get(f'/tiles/{z}/{x}/{y}/data.png?bits=12').status_code == 400
+
@@ -0,0 +1,148 @@
+"""
+Tests for the spatio-temporal event index
+"""
+
+import math
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.event_index import EventIndex, datetime_to_ms
+from app.glm_processor import GLMEvent
+from app.mercator_pyramid import MercatorPyramid, lonlat_to_mercator_pixels
+
+
+def lonlat_to_tile(lon: float, lat: float, zoom: int):
+    n = 2 ** zoom
+    xtile = int((lon + 180.0) / 360.0 * n)
+    lat_rad = math.radians(lat)
+    ytile = int((1.0 - math.log(math.tan(lat_rad) + 1 / math.cos(lat_rad)) / math.pi) / 2.0 * n)
+    return xtile, ytile
+
+
+class TestEventIndex:
+    """Test range lookups against a brute-force scan"""
+
+    @pytest.fixture
+    def now(self):
+        return datetime(2025, 6, 1, 12, 0, 0)
+
+    @pytest.fixture
+    def data(self, now):
+        rng = np.random.default_rng(11)
+        size = 3000
+        lats = 35.0 + rng.normal(0, 0.3, size)
+        lons = -97.0 + rng.normal(0, 0.3, size)
+        values = rng.uniform(10, 1500, size)
+        # Spread over 10 minutes, so windows cut through buckets
+        offsets = rng.uniform(0, 600, size)
+        times_ms = datetime_to_ms(now) - (offsets * 1000).astype(np.int64)
+        return lats, lons, values, times_ms
+
+    @pytest.fixture
+    def index(self, data):
+        index = EventIndex(bucket_seconds=60)
+        lats, lons, values, times_ms = data
+        # Two batches exercise bucket merging
+        half = len(values) // 2
+        index.add(lats[:half], lons[:half], values[:half], times_ms[:half])
+        index.add(lats[half:], lons[half:], values[half:], times_ms[half:])
+        return index
+
+    def scan(self, data, start, end):
+        lats, lons, values, times_ms = data
+        return (times_ms >= datetime_to_ms(start)) & (times_ms <= datetime_to_ms(end))
+
+    def test_buckets(self, index, data):
+        stats = index.get_stats()
+        assert stats['events'] == len(data[2])
+        assert 10 <= stats['buckets'] <= 11
+
+    @pytest.mark.parametrize('z', [6, 9, 12])
+    def test_count_matches_scan(self, index, data, now, z):
+        lats, lons, values, _ = data
+        start = now - timedelta(seconds=250)
+        in_window = self.scan(data, start, now)
+        x, y = lonlat_to_tile(-97.0, 35.0, z)
+        px, py = lonlat_to_mercator_pixels(lons, lats, z + 8)
+        in_tile = (px // 256 == x) & (py // 256 == y)
+        assert index.count(start, now, z, x, y) == int((in_window & in_tile).sum())
+
+    def test_tile_points_sum(self, index, data, now):
+        lats, lons, values, _ = data
+        start = now - timedelta(seconds=130)
+        z = 8
+        x, y = lonlat_to_tile(-97.0, 35.0, z)
+        px, py, vals = index.tile_points(start, now, z, x, y)
+        assert px.min() >= 0 and px.max() < 256 and py.min() >= 0 and py.max() < 256
+
+        tx, ty = lonlat_to_mercator_pixels(lons, lats, z + 8)
+        expected = self.scan(data, start, now) & (tx // 256 == x) & (ty // 256 == y)
+        assert vals.sum() == pytest.approx(values[expected].sum())
+
+    def test_pyramid_from_window_points(self, index, data, now):
+        lats, lons, values, _ = data
+        start = now - timedelta(minutes=5)
+        mask = self.scan(data, start, now)
+        px, py, vals = index.window_points(start, now)
+        from_index = MercatorPyramid.build_from_pixels(px, py, index.level, vals, max_zoom=5)
+        direct = MercatorPyramid.build(lats[mask], lons[mask], values[mask], max_zoom=5)
+        for z in (0, 3, 5):
+            assert np.array_equal(from_index.levels[z].codes, direct.levels[z].codes)
+            assert np.allclose(from_index.levels[z].sums, direct.levels[z].sums)
+
+    def test_bbox_events(self, index, data, now):
+        lats, lons, values, _ = data
+        start = now - timedelta(minutes=3)
+        box = (-97.2, 34.9, -96.9, 35.3)
+        found = index.bbox_events(*box, start, now)
+        expected = (
+            self.scan(data, start, now) &
+            (lons >= box[0]) & (lons <= box[2]) & (lats >= box[1]) & (lats <= box[3])
+        )
+        # Pixel snapping can move an event sitting on the edge by ~1 m
+        assert abs(found['energy_fj'].size - int(expected.sum())) <= 2
+        assert found['energy_fj'].sum() == pytest.approx(values[expected].sum(), rel=1e-2)
+        assert np.all((found['lon'] >= box[0] - 1e-5) & (found['lon'] <= box[2] + 1e-5))
+
+        newest = index.bbox_events(*box, start, now, limit=5)
+        assert newest['time_ms'].size == 5
+        assert np.all(np.diff(newest['time_ms']) <= 0)
+
+    def test_prune(self, index, data, now):
+        cutoff = now - timedelta(seconds=270)
+        removed = index.prune(cutoff)
+        assert removed == int((data[3] < datetime_to_ms(cutoff)).sum())
+        assert len(index) == len(data[2]) - removed
+
+    def test_add_events_window_is_inclusive(self, now):
+        events = [
+            GLMEvent(lat=20.0, lon=-80.0, energy_j=500e-15, timestamp=now - timedelta(minutes=m))
+            for m in range(8)
+        ]
+        index = EventIndex()
+        assert index.add_events(events) == 8
+        # Both window ends are included, as in GLMDataProcessor.aggregate_toe_grid
+        _, _, vals = index.window_points(now - timedelta(minutes=5), now)
+        assert vals.size == 6
+
+
+def test_events_endpoint():
+    from app.main import app
+
+    with TestClient(app) as client:
+        client.post('/ingest', json=[
+            {"lat": -12.0, "lon": 130.0, "energy_j": 700e-15},
+            {"lat": -12.01, "lon": 130.01, "energy_j": 300e-15},
+            {"lat": -30.0, "lon": 130.0, "energy_j": 700e-15},
+        ])
+        r = client.get('/events?bbox=129.9,-12.1,130.1,-11.9&window=5m')
+        assert r.status_code == 200
+        body = r.json()
+        assert body['count'] == 2
+        assert sorted(round(e['energy_fj']) for e in body['events']) == [300, 700]
+
+        assert client.get('/events?bbox=1,2,3').status_code == 400
+        assert client.get('/events?bbox=3,2,1,4').status_code == 400
@@ -0,0 +1,115 @@
+"""
+Tests for granule freshness tracking
+"""
+
+import math
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+
+from app.event_index import datetime_to_ms
+from app.freshness import FreshnessTracker, granule_creation_time
+from app.glm_processor import GLMEvent, GLMGranule
+
+KEY = 'GLM-L2-LCFA/2025/200/12/OR_GLM-L2-LCFA_G18_s20252001200000_e20252001200200_c20252001200220.nc'
+
+
+def lonlat_to_tile(lon: float, lat: float, zoom: int):
+    n = 2 ** zoom
+    xtile = int((lon + 180.0) / 360.0 * n)
+    lat_rad = math.radians(lat)
+    ytile = int((1.0 - math.log(math.tan(lat_rad) + 1 / math.cos(lat_rad)) / math.pi) / 2.0 * n)
+    return xtile, ytile
+
+
+class FakeClock:
+    def __init__(self, start: float):
+        self.now = start
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestFreshnessTracker:
+    """Test stage tracking and lag statistics"""
+
+    def test_creation_time_from_key(self):
+        assert granule_creation_time(KEY) == datetime(2025, 7, 19, 12, 0, 22)
+        assert granule_creation_time('events.nc') is None
+
+    def test_stage_lags(self):
+        created = datetime_to_ms(datetime(2025, 7, 19, 12, 0, 22)) / 1000.0
+        clock = FakeClock(created + 5)
+        tracker = FreshnessTracker(clock=clock)
+
+        tracker.mark(KEY, 'listed')
+        clock.now += 3
+        tracker.mark(KEY, 'decoded')
+        clock.now += 1
+        tracker.mark(KEY, 'aggregated')
+        tracker.mark(KEY, 'aggregated')  # Recorded once
+        tracker.mark('no-creation-time.nc', 'listed')  # Ignored
+        clock.now += 2
+        assert tracker.mark_served() == 1
+        assert tracker.mark_served() == 0
+
+        clock.now += 10
+        stats = tracker.get_stats()
+        assert stats['tracked'] == 1
+        assert stats['latest_served_granule'] == KEY
+        assert stats['latest_stage_lag_seconds'] == {'listed': 5, 'decoded': 8, 'aggregated': 9, 'served': 11}
+        assert stats['current_lag_seconds'] == 21
+        assert stats['lag_seconds']['served']['count'] == 1
+
+    def test_records_restore_in_another_tracker(self):
+        created = datetime_to_ms(datetime(2025, 7, 19, 12, 0, 22)) / 1000.0
+        owner = FreshnessTracker(clock=FakeClock(created + 4))
+        owner.mark(KEY, 'listed')
+        owner.mark(KEY, 'aggregated')
+        assert owner.records([KEY, 'other.nc']) == {KEY: {'created': created, 'listed': created + 4,
+                                                          'aggregated': created + 4}}
+
+        reader = FreshnessTracker(clock=FakeClock(created + 6))
+        reader.restore(KEY, owner.records([KEY])[KEY])
+        reader.mark(KEY, 'published')
+        assert reader.mark_served() == 1
+        assert reader.get_stats()['latest_stage_lag_seconds'] == {
+            'listed': 4, 'aggregated': 4, 'published': 6, 'served': 6
+        }
+
+    def test_bounded(self):
+        tracker = FreshnessTracker(max_tracked=2)
+        for minute in range(4):
+            tracker.mark(f'OR_GLM-L2-LCFA_G18_s1_e1_c202520012{minute:02d}00.nc', 'listed')
+        assert tracker.get_stats()['tracked'] == 2
+
+
+def test_freshness_on_status_path(monkeypatch):
+    import app.main as main
+
+    now = datetime.utcnow().replace(microsecond=0)
+    doy = now.timetuple().tm_yday
+    path = f'/data/OR_GLM-L2-LCFA_G18_s{now.year}{doy:03d}{now:%H%M%S}_e{now.year}{doy:03d}{now:%H%M%S}_c{now.year}{doy:03d}{now:%H%M%S}.nc'
+
+    def fake_read(file_path, on_stage=None):
+        on_stage('decoded')
+        event = GLMEvent(lat=-10.0, lon=-60.0, energy_j=1e-12, timestamp=now)
+        return GLMGranule(path=file_path, satellite='G18', start_time=now, end_time=now,
+                          creation_time=now, events=[event])
+
+    with TestClient(main.app) as client:
+        monkeypatch.setattr(main._processor, 'read_glm_granule', fake_read)
+        assert client.post('/ingest_files', json={"paths": [path]}).json()['processed_files'] == 1
+
+        z = 6
+        x, y = lonlat_to_tile(-60.0, -10.0, z)
+        # A historical tile does not show the new granule
+        client.get(f'/tiles/{z}/{x}/{y}.png?window=29m&t=2020-01-01T00:00:00Z')
+        assert 'served' not in main._freshness.records([path])[path]
+        client.get(f'/tiles/{z}/{x}/{y}.png?window=29m')
+
+        stats = main._freshness.get_stats()
+        assert stats['latest_served_granule'] == path
+        assert set(stats['latest_stage_lag_seconds']) == {'listed', 'decoded', 'aggregated', 'served'}
+        assert stats['current_lag_seconds'] >= 0
+        assert 'glm_freshness_lag_seconds_count{stage="served"}' in client.get('/metrics').text
@@ -0,0 +1,155 @@
+"""
+Tests for the standalone ingest worker
+"""
+
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.glm_processor import GLMEvent, GLMGranule
+from app.ingest_worker import IngestWorker
+from app.shared_store import SharedEventStore
+
+
+class FakeProcessor:
+    """Decodes every path to one event at the path's fixed location and time (default now)"""
+
+    def __init__(self, now: datetime, lat: float = 40.0, lon: float = -100.0):
+        self.now = now
+        self.lat = lat
+        self.lon = lon
+        self.times = {}
+        self.reads = []
+
+    def read_glm_granule(self, path: str, on_stage=None) -> GLMGranule:
+        self.reads.append(path)
+        if 'corrupt' in path:
+            raise ValueError("bad granule")
+        when = self.times.get(path, self.now)
+        event = GLMEvent(lat=self.lat, lon=self.lon, energy_j=1e-12, timestamp=when)
+        return GLMGranule(path=path, satellite='G18', start_time=when - timedelta(seconds=20),
+                          end_time=when, creation_time=when, events=[event])
+
+
+class FakeFetcher:
+    """Lists the keys after the committed cursor, as GLMS3Fetcher.list_new_granules does"""
+
+    def __init__(self, keys):
+        self.keys = keys
+        self.listed = 0
+
+    def list_new_granules(self, bucket_name, hours_back=1, max_granules=None):
+        return self.keys[self.listed:]
+
+    def commit_cursor(self, bucket_name, done):
+        while self.listed < len(self.keys) and self.keys[self.listed] in set(done):
+            self.listed += 1
+
+    def resume_after(self, bucket_name, keys):
+        known = [i + 1 for i, key in enumerate(self.keys) if key in set(keys)]
+        self.listed = max([self.listed, *known])
+
+
+class TestIngestWorker:
+    """Test ingest, publishing and restart"""
+
+    @pytest.fixture
+    def now(self):
+        return datetime.utcnow().replace(microsecond=0)
+
+    def test_poll_publishes_new_granules_once(self, tmp_path, now):
+        processor = FakeProcessor(now)
+        fetcher = FakeFetcher(['a.nc', 'corrupt.nc', 'b.nc'])
+        worker = IngestWorker(SharedEventStore(str(tmp_path)), processor, fetcher, bucket_name='bkt')
+        worker.start()
+
+        assert worker.poll_s3() == 2
+        # The failed granule is listed and read again; nothing new is published
+        assert worker.poll_s3() == 0
+        assert processor.reads == ['s3://bkt/a.nc', 's3://bkt/corrupt.nc', 's3://bkt/b.nc', 's3://bkt/corrupt.nc']
+        assert fetcher.listed == 1
+        assert worker.store.publishes == 1
+
+        reader = SharedEventStore(str(tmp_path))
+        snapshot = reader.refresh()
+        assert len(snapshot.index) == 2
+        assert snapshot.ingest_epoch == now
+        assert snapshot.ingest_epoch_seq == 1
+        assert snapshot.granules == ['a.nc', 'b.nc']
+        worker.close()
+
+    def test_restart_resumes_and_lock_is_exclusive(self, tmp_path, now):
+        first = IngestWorker(SharedEventStore(str(tmp_path)), FakeProcessor(now))
+        first.start()
+        first.ingest_paths(['x.nc'])
+
+        second = IngestWorker(SharedEventStore(str(tmp_path)), FakeProcessor(now))
+        with pytest.raises(RuntimeError):
+            second.start()
+        first.close()
+
+        second.start()
+        assert (len(second.index), second.ingest_epoch_seq, set(second.granules)) == (1, 1, {'x.nc'})
+        assert second.ingest_paths(['x.nc', 'y.nc']) == 1
+        assert second.ingest_epoch_seq == 2
+        second.close()
+
+    def test_manifest_carries_stage_times(self, tmp_path, now):
+        key = 'OR_GLM-L2-LCFA_G18_s20252001200000_e20252001200200_c20252001200220.nc'
+        worker = IngestWorker(SharedEventStore(str(tmp_path)), FakeProcessor(now))
+        worker.start()
+        worker.ingest_paths([key])
+
+        stages = SharedEventStore(str(tmp_path)).refresh().freshness[key]
+        assert {'created', 'listed', 'aggregated'} <= set(stages)
+        worker.close()
+
+    def test_expired_granules_are_pruned(self, tmp_path, now):
+        processor = FakeProcessor(now)
+        processor.times = {'old.nc': now - timedelta(hours=3)}
+        worker = IngestWorker(SharedEventStore(str(tmp_path)), processor, retention=timedelta(hours=2))
+        worker.start()
+
+        worker.ingest_paths(['old.nc', 'new.nc'])
+        assert (len(worker.index), list(worker.granules)) == (1, ['new.nc'])
+        assert SharedEventStore(str(tmp_path)).refresh().granules == ['new.nc']
+        worker.close()
+
+    def test_memory_budget_drops_the_oldest_buckets(self, tmp_path, now):
+        processor = FakeProcessor(now)
+        paths = [f"{minute}.nc" for minute in range(30)]
+        processor.times = {path: now - timedelta(minutes=30 - i) for i, path in enumerate(paths)}
+        worker = IngestWorker(SharedEventStore(str(tmp_path)), processor, memory_budget_mb=1)
+        worker.memory.max_bytes = 1  # Anything but the newest bucket is over budget
+        worker.start()
+
+        worker.ingest_paths(paths)
+        assert len(worker.index) == 1 and list(worker.granules) == ['29.nc']
+        worker.close()
+
+
+def test_external_mode_server_follows_worker(monkeypatch, tmp_path, reset_main):
+    main = reset_main
+
+    now = datetime.utcnow().replace(microsecond=0)
+    monkeypatch.setattr(main, 'GLM_INGEST_MODE', 'external')
+    monkeypatch.setattr(main, 'GLM_SHARED_STORE_DIR', str(tmp_path))
+    monkeypatch.setattr(main, 'GLM_SHARED_STORE_POLL_MS', 20)
+
+    worker = IngestWorker(SharedEventStore(str(tmp_path)), FakeProcessor(now, lat=-33.0, lon=151.0))
+    worker.start()
+
+    with TestClient(main.app) as client:
+        assert not main._shared_store.is_owner
+        assert client.post('/ingest', json=[{"lat": 1.0, "lon": 1.0, "energy_j": 1e-12}]).status_code == 409
+
+        worker.ingest_paths(['syd.nc'])
+        deadline = time.time() + 5
+        while main._shared_store.loaded_version < 1 and time.time() < deadline:
+            time.sleep(0.02)
+        assert main._ingest_epoch == now
+        assert client.get('/events?bbox=150,-34,152,-32&window=5m').json()['count'] == 1
+
+    worker.close()
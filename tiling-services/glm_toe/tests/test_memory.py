@@ -0,0 +1,113 @@
+"""
+Tests for memory accounting and the global memory budget
+"""
+
+import math
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.memory import MemoryBudget, MemoryBudgetExceeded
+from app.tile_cache import TileCache
+
+
+def lonlat_to_tile(lon: float, lat: float, zoom: int):
+    n = 2 ** zoom
+    xtile = int((lon + 180.0) / 360.0 * n)
+    lat_rad = math.radians(lat)
+    ytile = int((1.0 - math.log(math.tan(lat_rad) + 1 / math.cos(lat_rad)) / math.pi) / 2.0 * n)
+    return xtile, ytile
+
+
+class Pool:
+    """Evictable component holding a number of bytes"""
+
+    def __init__(self, nbytes: int):
+        self.nbytes = nbytes
+
+    def evict(self, nbytes: int) -> int:
+        freed = min(nbytes, self.nbytes)
+        self.nbytes -= freed
+        return freed
+
+
+class TestMemoryBudget:
+    """Test accounting, ordered eviction and reservations"""
+
+    def test_evicts_in_order_to_low_watermark(self):
+        tiles, grids, events = Pool(300), Pool(300), Pool(600)
+        budget = MemoryBudget(max_bytes=1000, low_watermark=0.5)
+        budget.register('tiles', lambda: tiles.nbytes, tiles.evict)
+        budget.register('grids', lambda: grids.nbytes, grids.evict)
+        budget.register('registry', lambda: 50)
+        budget.register('events', lambda: events.nbytes, events.evict)
+
+        assert budget.usage() == {'tiles': 300, 'grids': 300, 'registry': 50, 'events': 600}
+        released = budget.enforce()
+        assert released == {'tiles': 300, 'grids': 300, 'events': 150}
+        assert sum(budget.usage().values()) == 500
+        assert budget.enforce() == {}
+        assert budget.get_stats()['evicted_bytes'] == {'tiles': 300, 'grids': 300, 'events': 150}
+
+    def test_report_only_without_budget(self):
+        tiles = Pool(10 ** 9)
+        budget = MemoryBudget(max_bytes=0)
+        budget.register('tiles', lambda: tiles.nbytes, tiles.evict)
+        assert budget.enforce() == {}
+        assert budget.get_stats()['used_bytes'] == 10 ** 9
+
+    def test_reserve_makes_room_or_raises(self):
+        tiles, events = Pool(400), Pool(400)
+        budget = MemoryBudget(max_bytes=1000, low_watermark=1.0)
+        budget.register('tiles', lambda: tiles.nbytes, tiles.evict)
+        budget.register('grids', lambda: budget.reserved('grids'))
+        budget.register('events', lambda: events.nbytes, events.evict)
+
+        with budget.reserve('grids', 500, only=('tiles',)):
+            assert tiles.nbytes == 100 and events.nbytes == 400
+            assert budget.usage()['grids'] == 500
+        assert budget.reserved('grids') == 0
+
+        with pytest.raises(MemoryBudgetExceeded):
+            with budget.reserve('grids', 700, only=('tiles',)):
+                pass
+        assert budget.reserved('grids') == 0 and events.nbytes == 400
+
+    def test_tile_cache_shrink(self):
+        cache = TileCache(max_bytes=10 ** 6)
+        for i in range(10):
+            cache.set(f'k{i}', b'x' * 1000)
+        entry = cache.entry_size('k0', b'x' * 1000)
+        assert cache.shrink(2 * entry + 1) == 3 * entry
+        assert 'k2' not in cache and 'k3' in cache
+
+
+def test_accounting_and_event_eviction(monkeypatch, reset_main):
+    main = reset_main
+
+    now = datetime.utcnow()
+    with TestClient(main.app) as client:
+        client.post('/ingest', json=[
+            {"lat": 61.0, "lon": -150.0, "energy_j": 1e-12, "timestamp": (now - timedelta(hours=5)).isoformat()},
+            {"lat": 61.0, "lon": -150.0, "energy_j": 1e-12, "timestamp": now.isoformat()}
+        ])
+        z = 7
+        x, y = lonlat_to_tile(-150.0, 61.0, z)
+        assert client.get(f'/tiles/{z}/{x}/{y}.png?window=31m').status_code == 200
+
+        memory = main._memory.get_stats()
+        assert memory['budget_bytes'] is None
+        assert set(memory['components']) == {'tile_cache', 'grid_cache', 'render_grids', 'event_store', 'granule_registry'}
+        assert memory['components']['event_store'] > 0
+
+        # A budget below everything but the newest events drops tiles, grids and then old events
+        old = main._event_index.get_stats()['oldest_bucket']
+        monkeypatch.setattr(main._memory, 'max_bytes', 1)
+        released = main._memory.enforce()
+        assert list(released) == [k for k in ('tile_cache', 'grid_cache', 'event_store') if k in released]
+        assert 'tile_cache' in released and 'event_store' in released
+        assert len(main._tile_cache) == 0
+        assert main._event_index.get_stats()['oldest_bucket'] > old
+        assert len(main._event_index.window_points(now - timedelta(days=1), now - timedelta(minutes=2))[2]) == 0
+        assert 'glm_memory_bytes{component="event_store"}' in client.get('/metrics').text
@@ -0,0 +1,229 @@
+"""
+Tests for the Web Mercator TOE pyramid
+"""
+
+import io
+import math
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.event_index import EventIndex
+from app.glm_processor import GLMEvent
+from app.mercator_pyramid import (
+    MercatorPyramid,
+    PointIndex,
+    lonlat_to_mercator_pixels,
+    morton_decode,
+    morton_encode,
+)
+from app.tile_renderer import TOETileRenderer
+
+
+def lonlat_to_tile(lon: float, lat: float, zoom: int):
+    n = 2 ** zoom
+    xtile = int((lon + 180.0) / 360.0 * n)
+    lat_rad = math.radians(lat)
+    ytile = int((1.0 - math.log(math.tan(lat_rad) + 1 / math.cos(lat_rad)) / math.pi) / 2.0 * n)
+    return xtile, ytile
+
+
+class TestMorton:
+    """Test Morton code helpers"""
+
+    def test_roundtrip(self):
+        rng = np.random.default_rng(0)
+        x = rng.integers(0, 2 ** 20, size=1000)
+        y = rng.integers(0, 2 ** 20, size=1000)
+        dx, dy = morton_decode(morton_encode(x, y))
+        assert np.array_equal(dx, x)
+        assert np.array_equal(dy, y)
+
+    def test_parent_is_right_shift(self):
+        codes = morton_encode(np.array([5, 6]), np.array([9, 3]))
+        px, py = morton_decode(codes >> np.uint64(2))
+        assert list(px) == [2, 3]
+        assert list(py) == [4, 1]
+
+
+class TestMercatorPyramid:
+    """Test pyramid construction and tile slicing"""
+
+    @pytest.fixture
+    def cluster(self):
+        rng = np.random.default_rng(42)
+        lats = 32.0 + rng.normal(0, 0.5, 500)
+        lons = -100.0 + rng.normal(0, 0.5, 500)
+        values = rng.uniform(10, 1000, 500)
+        return lats, lons, values
+
+    def test_sum_is_conserved_across_levels(self, cluster):
+        lats, lons, values = cluster
+        pyramid = MercatorPyramid.build(lats, lons, values, max_zoom=5)
+        for z in range(0, 6):
+            assert pyramid.levels[z].sums.sum() == pytest.approx(values.sum())
+
+    def test_max_pooling(self, cluster):
+        lats, lons, values = cluster
+        pyramid = MercatorPyramid.build(lats, lons, values, max_zoom=5)
+        assert pyramid.levels[0].maxes.max() == pytest.approx(values.max(), rel=1e-6)
+
+    def test_levels_shrink(self, cluster):
+        lats, lons, values = cluster
+        pyramid = MercatorPyramid.build(lats, lons, values, max_zoom=5)
+        sizes = [pyramid.levels[z].codes.size for z in range(0, 6)]
+        assert sizes == sorted(sizes)
+
+    def test_tile_slice_contains_events(self, cluster):
+        lats, lons, values = cluster
+        pyramid = MercatorPyramid.build(lats, lons, values, max_zoom=5)
+        z = 3
+        x, y = lonlat_to_tile(-100.0, 32.0, z)
+        tile = pyramid.tile(z, x, y)
+        assert tile.shape == (256, 256)
+        assert tile.sum() == pytest.approx(values.sum(), rel=1e-4)
+        # A neighbouring tile is empty
+        assert not pyramid.tile(z, x + 2, y).any()
+
+    def test_empty_pyramid(self):
+        pyramid = MercatorPyramid.build(np.array([]), np.array([]), np.array([]), max_zoom=3)
+        assert not pyramid.tile(2, 1, 1).any()
+        with pytest.raises(ValueError):
+            pyramid.tile(4, 0, 0)
+
+
+class TestPyramidRendering:
+    """Test rendering pyramid tiles built from an event index window, as the service does"""
+
+    def test_render_pyramid_tile(self):
+        renderer = TOETileRenderer(tile_size=256)
+        now = datetime.utcnow()
+        index = EventIndex()
+        index.add_events([
+            GLMEvent(lat=10.0, lon=-75.0, energy_j=1500e-15, timestamp=now),
+            GLMEvent(lat=10.0, lon=-75.0, energy_j=800e-15, timestamp=now),
+            GLMEvent(lat=10.0, lon=-75.0, energy_j=800e-15, timestamp=now - timedelta(minutes=10)),
+        ])
+        px, py, values = index.window_points(now - timedelta(minutes=5), now)
+        pyramid = MercatorPyramid.build_from_pixels(px, py, index.level, values, max_zoom=5)
+        assert pyramid.event_count == 2
+
+        z = 4
+        x, y = lonlat_to_tile(-75.0, 10.0, z)
+        img = Image.open(io.BytesIO(renderer.render_pyramid_tile(pyramid, z, x, y))).convert('RGBA')
+        alpha = np.array(img)[..., 3]
+        # One summed pixel in the 'very_high' bin plus its glow
+        assert alpha.max() == 255
+        assert (alpha > 0).sum() > 1
+
+
+class TestMetatiles:
+    """Test metatile blocks and rendering"""
+
+    def test_block_matches_tiles(self):
+        rng = np.random.default_rng(7)
+        lats = 30.0 + rng.normal(0, 3.0, 2000)
+        lons = -95.0 + rng.normal(0, 3.0, 2000)
+        values = rng.uniform(10, 3000, 2000)
+        pyramid = MercatorPyramid.build(lats, lons, values, max_zoom=5)
+
+        z, n = 5, 4
+        x, y = lonlat_to_tile(-95.0, 30.0, z)
+        mx, my = x // n, y // n
+        block = pyramid.block(z, mx, my, n)
+        assert block.shape == (n * 256, n * 256)
+        for dy in range(n):
+            for dx in range(n):
+                expected = pyramid.tile(z, mx * n + dx, my * n + dy)
+                assert np.array_equal(block[dy * 256:(dy + 1) * 256, dx * 256:(dx + 1) * 256], expected)
+
+    def test_block_size_validation(self):
+        pyramid = MercatorPyramid.build(np.array([0.0]), np.array([0.0]), np.array([1.0]), max_zoom=3)
+        with pytest.raises(ValueError):
+            pyramid.block(1, 0, 0, 4)
+        with pytest.raises(ValueError):
+            pyramid.block(3, 0, 0, 3)
+
+    def test_render_metatile_slices_match_single_tiles(self):
+        renderer = TOETileRenderer(tile_size=256, encode_workers=4)
+        n = 2
+        block = np.zeros((n * 256, n * 256), dtype=np.float32)
+        block[100, 300] = 1500.0
+        block[400, 50] = 60.0
+        tiles = renderer.render_metatile(block, n)
+        assert set(tiles) == {(0, 0), (1, 0), (0, 1), (1, 1)}
+
+        rgba = renderer.colorize_toe_array(block)
+        for (dx, dy), data in tiles.items():
+            decoded = np.array(Image.open(io.BytesIO(data)).convert('RGBA'))
+            assert np.array_equal(decoded, rgba[dy * 256:(dy + 1) * 256, dx * 256:(dx + 1) * 256])
+        renderer.close()
+
+
+class TestPointRendering:
+    """Test the indexed point path against the dense grid path"""
+
+    @pytest.fixture
+    def events(self):
+        rng = np.random.default_rng(3)
+        lats = 40.0 + rng.normal(0, 0.02, 300)
+        lons = -90.0 + rng.normal(0, 0.02, 300)
+        values = rng.uniform(10, 900, 300)
+        return lats, lons, values
+
+    def test_index_count_matches_scan(self, events):
+        lats, lons, values = events
+        index = PointIndex(lats, lons, values)
+        z = 12
+        x, y = lonlat_to_tile(-90.0, 40.0, z)
+        px, py = lonlat_to_mercator_pixels(lons, lats, z + 8)
+        inside = (px // 256 == x) & (py // 256 == y)
+        assert index.count(z, x, y) == int(inside.sum())
+
+    def test_point_render_matches_grid_render(self, events):
+        lats, lons, values = events
+        renderer = TOETileRenderer(tile_size=256)
+        index = PointIndex(lats, lons, values)
+        z = 12
+        x, y = lonlat_to_tile(-90.0, 40.0, z)
+
+        px, py, vals = index.tile_points(z, x, y)
+        sparse = renderer.colorize_points(px, py, vals)
+
+        dense_toe = np.bincount(py * 256 + px, weights=vals, minlength=256 * 256).reshape(256, 256)
+        dense = renderer.colorize_toe_array(dense_toe)
+        assert (sparse[..., 3] > 0).any()
+        assert np.array_equal(sparse, dense)
+
+    def test_legacy_event_render_vectorized(self):
+        renderer = TOETileRenderer(tile_size=256)
+        now = datetime.utcnow()
+        events = [
+            GLMEvent(lat=10.0, lon=-75.0, energy_j=1500e-15, timestamp=now),
+            GLMEvent(lat=-40.0, lon=100.0, energy_j=1500e-15, timestamp=now),
+        ]
+        z = 6
+        x, y = lonlat_to_tile(-75.0, 10.0, z)
+        img = Image.open(io.BytesIO(renderer.render_tile_from_events(events, z, x, y, end_time=now)))
+        alpha = np.array(img.convert('RGBA'))[..., 3]
+        assert (alpha > 0).sum() == 1
+
+
+@pytest.mark.parametrize('count, path', [(3, 'point'), (40, 'grid')])
+def test_render_path_header(monkeypatch, count, path):
+    from fastapi.testclient import TestClient
+    import app.main as main
+
+    monkeypatch.setattr(main, 'GLM_POINT_RENDER_MAX_EVENTS', 10)
+    with TestClient(main.app) as client:
+        client.post('/ingest', json=[
+            {"lat": 45.0 + i * 1e-4, "lon": float(count), "energy_j": 600e-15} for i in range(count)
+        ])
+        z = 12
+        x, y = lonlat_to_tile(float(count), 45.0, z)
+        r = client.get(f'/tiles/{z}/{x}/{y}.png?window=9m')
+        assert r.status_code == 200
+        assert r.headers['x-render-path'].startswith(f'{path}; events={count}')
+        assert 'max_events=10' in r.headers['x-render-path']
@@ -0,0 +1,79 @@
+"""
+Tests for Prometheus metrics
+"""
+
+import math
+
+from fastapi.testclient import TestClient
+
+from app.metrics import CallbackMetric, Counter, Histogram, Registry, timed, STAGE_SECONDS
+
+
+def lonlat_to_tile(lon: float, lat: float, zoom: int):
+    n = 2 ** zoom
+    xtile = int((lon + 180.0) / 360.0 * n)
+    lat_rad = math.radians(lat)
+    ytile = int((1.0 - math.log(math.tan(lat_rad) + 1 / math.cos(lat_rad)) / math.pi) / 2.0 * n)
+    return xtile, ytile
+
+
+class TestExposition:
+    """Test the text exposition format"""
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = Registry()
+        hist = registry.register(Histogram('t_seconds', 'Test', ['stage'], buckets=(0.1, 1.0)))
+        for value in (0.05, 0.5, 0.5, 5.0):
+            hist.labels('a').observe(value)
+
+        text = registry.render()
+        assert '# TYPE t_seconds histogram' in text
+        assert 't_seconds_bucket{stage="a",le="0.1"} 1' in text
+        assert 't_seconds_bucket{stage="a",le="1"} 3' in text
+        assert 't_seconds_bucket{stage="a",le="+Inf"} 4' in text
+        assert 't_seconds_count{stage="a"} 4' in text
+        assert 't_seconds_sum{stage="a"} 6.05' in text
+
+    def test_counter_and_callback(self):
+        registry = Registry()
+        counter = registry.register(Counter('t_total', 'Test', ['path']))
+        counter.labels('a"b').inc()
+        counter.labels('a"b').inc(2)
+        registry.register(CallbackMetric('t_gauge', 'Test', lambda: 7))
+        registry.register(CallbackMetric('t_broken', 'Test', lambda: 1 / 0))
+
+        text = registry.render()
+        assert 't_total{path="a\\"b"} 3' in text
+        assert 't_gauge 7' in text
+        assert '# TYPE t_broken gauge' in text  # A failing callback only drops its samples
+
+    def test_timed_decorator(self):
+        @timed('test_stage')
+        def work(x):
+            return x * 2
+
+        child = STAGE_SECONDS.labels('test_stage')
+        before = sum(child.counts)
+        assert work(21) == 42
+        assert sum(child.counts) == before + 1
+
+
+def test_metrics_endpoint():
+    from app.main import app
+
+    with TestClient(app) as client:
+        client.post('/ingest', json=[{"lat": -45.0, "lon": 170.0, "energy_j": 800e-15}])
+        z = 9
+        x, y = lonlat_to_tile(170.0, -45.0, z)
+        client.get(f'/tiles/{z}/{x}/{y}.png?window=23m')
+        client.get(f'/tiles/{z}/{x}/{y}.png?window=23m')
+
+        r = client.get('/metrics')
+        assert r.status_code == 200
+        assert r.headers['content-type'].startswith('text/plain; version=0.0.4')
+        text = r.text
+        for stage in ('cache_lookup', 'window_slice', 'aggregate', 'colorize', 'encode', 'render', 'index'):
+            assert f'glm_stage_duration_seconds_count{{stage="{stage}"}}' in text
+        assert 'glm_tile_responses_total{kind="tile",cache="HIT",status="200"}' in text
+        assert 'glm_tile_responses_total{kind="tile",cache="MISS",status="200"}' in text
+        assert 'glm_events_indexed ' in text
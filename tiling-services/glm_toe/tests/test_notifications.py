@@ -0,0 +1,225 @@
+"""
+Tests for notification-driven ingest
+"""
+
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.glm_processor import GLMEvent, GLMGranule
+from app.notifications import (FileQueue, InProcessQueue, NotificationConsumer, NotificationSource,
+                               ObjectCreated, make_notification_source, parse_notification)
+
+BUCKET = 'noaa-goes18'
+
+
+def granule_key(second: int) -> str:
+    return (f"GLM-L2-LCFA/2025/200/12/OR_GLM-L2-LCFA_G18_s20252001200{second:02d}0_"
+            f"e20252001200{second + 1:02d}0_c20252001200{second + 2:02d}0.nc")
+
+
+def s3_event(key: str, bucket: str = BUCKET, event: str = 'ObjectCreated:Put') -> str:
+    return json.dumps({'Records': [{'eventName': event, 's3': {'bucket': {'name': bucket}, 'object': {'key': key}}}]})
+
+
+class TestParseNotification:
+    """Test the accepted message formats"""
+
+    def test_formats(self):
+        key = granule_key(0)
+        assert parse_notification(s3_event(key.replace('_', '%5F'))) == [ObjectCreated(BUCKET, key)]
+        envelope = json.dumps({'Type': 'Notification', 'Message': s3_event(key)})
+        assert parse_notification(envelope) == [ObjectCreated(BUCKET, key)]
+        assert parse_notification(json.dumps({'bucket': BUCKET, 'key': key})) == [ObjectCreated(BUCKET, key)]
+
+    def test_ignores_other_events_and_garbage(self):
+        assert parse_notification(s3_event(granule_key(0), event='ObjectRemoved:Delete')) == []
+        assert parse_notification('not json') == []
+        assert parse_notification('[1, 2]') == []
+        assert parse_notification(json.dumps({'Type': 'SubscriptionConfirmation'})) == []
+
+    def test_sources_by_spec(self, tmp_path):
+        assert make_notification_source('') is None
+        assert isinstance(make_notification_source('memory:'), InProcessQueue)
+        assert isinstance(make_notification_source(f'file:{tmp_path}/q.jsonl'), FileQueue)
+        with pytest.raises(ValueError):
+            make_notification_source('kafka://broker')
+
+    def test_sources_must_implement_receive(self):
+        class Incomplete(NotificationSource):
+            pass
+
+        with pytest.raises(TypeError):
+            Incomplete()
+
+
+class TestConsumer:
+    """Test dedupe, filtering and batching"""
+
+    def test_dedupes_filters_and_batches(self):
+        async def scenario():
+            batches = []
+
+            async def ingest(keys):
+                batches.append(keys)
+                return {'processed': len(keys), 'failed': 0, 'events': 0}
+
+            queue = InProcessQueue()
+            consumer = NotificationConsumer(queue, BUCKET, ingest, batch_size=3, batch_wait=0.05,
+                                            receive_timeout=0.05)
+            for second in (0, 2, 0, 4, 6):
+                queue.put(BUCKET, granule_key(second))
+            queue.put('noaa-goes16', granule_key(8))
+            queue.put(BUCKET, 'GLM-L2-LCFA/2025/200/12/index.html')
+            queue.put(BUCKET, 'ABI-L2-CMIPF/2025/200/12/OR_GLM-L2-LCFA_G18_x.nc')
+
+            task = asyncio.create_task(consumer.run())
+            await asyncio.sleep(0.3)
+            queue.put(BUCKET, granule_key(2))  # Redelivered
+            queue.put(BUCKET, granule_key(10))
+            await asyncio.sleep(0.3)
+            task.cancel()
+            return batches, consumer.get_stats()
+
+        batches, stats = asyncio.run(scenario())
+        assert batches == [[granule_key(0), granule_key(2), granule_key(4)], [granule_key(6)], [granule_key(10)]]
+        assert stats['received'] == 10
+        assert stats['duplicates'] == 2 and stats['ignored'] == 3
+        assert stats['batches'] == 3 and stats['granules'] == 5
+
+    def test_reconciled_keys_are_not_ingested_again(self):
+        consumer = NotificationConsumer(InProcessQueue(), BUCKET, None)
+        assert consumer.accept([ObjectCreated(BUCKET, granule_key(0))]) == [granule_key(0)]
+        consumer.record_reconciled([granule_key(0), granule_key(2)])
+        assert consumer.reconciled == 1
+        assert consumer.accept([ObjectCreated(BUCKET, granule_key(2))]) == []
+
+
+class TestFileQueue:
+    """Test the local JSON-lines stand-in"""
+
+    def test_reads_only_new_complete_lines(self, tmp_path):
+        path = tmp_path / 'queue.jsonl'
+        path.write_text(s3_event(granule_key(0)) + '\n')
+        queue = FileQueue(str(path), poll_interval=0.01)
+
+        async def receive():
+            return await queue.receive(0.05)
+
+        assert asyncio.run(receive()) == []  # Lines written before startup are history
+        with open(path, 'a') as f:
+            f.write(s3_event(granule_key(2)) + '\n' + json.dumps({'bucket': BUCKET, 'key': granule_key(4)}))
+        assert asyncio.run(receive()) == [ObjectCreated(BUCKET, granule_key(2))]
+        with open(path, 'a') as f:
+            f.write('\n')
+        assert asyncio.run(receive()) == [ObjectCreated(BUCKET, granule_key(4))]
+
+
+class FakeProcessor:
+    def read_glm_granule(self, path, on_stage=None):
+        now = datetime.utcnow().replace(microsecond=0)
+        event = GLMEvent(lat=40.0, lon=-100.0, energy_j=1e-12, timestamp=now)
+        return GLMGranule(path=path, satellite='G18', start_time=now - timedelta(seconds=20),
+                          end_time=now, creation_time=now, events=[event])
+
+
+class FakeFetcher:
+    """Reconciliation listing: nothing at startup, then one granule no message announced"""
+
+    def __init__(self, **download_options):
+        self.polls = 0
+
+    def download_url(self, url, local_path):
+        raise AssertionError("FakeProcessor reads nothing")
+
+    def list_new_granules(self, bucket_name, hours_back=1, max_granules=None):
+        self.polls += 1
+        return [granule_key(0), granule_key(30)] if self.polls == 2 else []
+
+    def resume_after(self, bucket_name, keys):
+        pass
+
+    def commit_cursor(self, bucket_name, done):
+        pass
+
+
+def test_service_ingests_notified_granules(monkeypatch, reset_main):
+    main = reset_main
+
+    monkeypatch.setattr(main, 'GLM_S3_NOTIFICATIONS', 'memory:')
+    monkeypatch.setattr(main, 'GLMS3Fetcher', FakeFetcher)
+
+    with TestClient(main.app) as client:
+        monkeypatch.setattr(main, '_processor', FakeProcessor())
+        consumer = main._notifications
+        assert main.next_s3_poll_delay() == main.GLM_S3_RECONCILE_INTERVAL
+
+        client.portal.call(consumer.source.put, main.GLM_S3_BUCKET, granule_key(0))
+        client.portal.call(consumer.source.put, main.GLM_S3_BUCKET, granule_key(2))
+        deadline = time.monotonic() + 10
+        while consumer.handed_off < 2 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert set(main._ingested_granules) == {granule_key(0), granule_key(2)}
+
+        # The fallback poll picks up a granule whose message was lost; its late message is a duplicate
+        result = client.portal.call(main.poll_s3, main.GLM_S3_BUCKET)
+        assert result['processed'] == 1
+        client.portal.call(consumer.source.put, main.GLM_S3_BUCKET, granule_key(30))
+        while consumer.received < 3 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        stats = consumer.get_stats()
+        assert stats['reconciled'] == 1 and stats['duplicates'] == 1 and stats['granules'] == 2
+        assert len(main._event_index) == 3
+
+    assert main._notifications is None
+
+
+def test_ingest_decodes_off_the_event_loop(monkeypatch, reset_main):
+    main = reset_main
+
+    class SlowProcessor(FakeProcessor):
+        def read_glm_granule(self, path, on_stage=None):
+            time.sleep(0.5)
+            return super().read_glm_granule(path, on_stage)
+
+    monkeypatch.setattr(main, '_processor', SlowProcessor())
+
+    async def scenario():
+        start = time.perf_counter()
+        ingest = asyncio.ensure_future(main.notified_ingest([granule_key(0), granule_key(2)]))
+        # The loop keeps running while the batch decodes
+        await asyncio.sleep(0.05)
+        stalled = time.perf_counter() - start
+        return stalled, await ingest
+
+    stalled, result = asyncio.run(scenario())
+    assert stalled < 0.25
+    assert result['processed'] == 2 and len(main._event_index) == 2
+
+
+def test_s3_listing_runs_off_the_event_loop(monkeypatch, reset_main):
+    main = reset_main
+
+    class SlowListing(FakeFetcher):
+        def list_new_granules(self, bucket_name, hours_back=1, max_granules=None):
+            time.sleep(0.5)
+            return [granule_key(0)]
+
+    monkeypatch.setattr(main, '_processor', FakeProcessor())
+    monkeypatch.setattr(main, '_s3_fetcher', SlowListing())
+
+    async def scenario():
+        start = time.perf_counter()
+        poll = asyncio.ensure_future(main.poll_s3(main.GLM_S3_BUCKET))
+        # The loop keeps running while the bucket is listed
+        await asyncio.sleep(0.05)
+        stalled = time.perf_counter() - start
+        return stalled, await poll
+
+    stalled, result = asyncio.run(scenario())
+    assert stalled < 0.25
+    assert result['processed'] == 1
@@ -0,0 +1,115 @@
+"""
+Tests for per-request timing and the sampling profiler
+"""
+
+import contextvars
+import math
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+from app.metrics import begin_request_timing, current_request_timing, stage_timer
+from app.profiler import SamplingProfiler, format_collapsed
+
+
+def lonlat_to_tile(lon: float, lat: float, zoom: int):
+    n = 2 ** zoom
+    xtile = int((lon + 180.0) / 360.0 * n)
+    lat_rad = math.radians(lat)
+    ytile = int((1.0 - math.log(math.tan(lat_rad) + 1 / math.cos(lat_rad)) / math.pi) / 2.0 * n)
+    return xtile, ytile
+
+
+def _busy_wait(stop: threading.Event):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+class TestRequestTiming:
+    """Test stage collection into the Server-Timing header"""
+
+    def test_stages_accumulate_in_context(self):
+        def run():
+            timing = begin_request_timing()
+            with stage_timer('colorize'):
+                pass
+            with stage_timer('colorize'):
+                pass
+            with stage_timer('encode'):
+                pass
+            return timing
+
+        timing = contextvars.copy_context().run(run)
+        header = timing.server_timing()
+        assert [part.split(';')[0] for part in header.split(', ')] == ['colorize', 'encode', 'total']
+        assert current_request_timing() is None  # Nothing leaks outside the request context
+
+
+class TestSamplingProfiler:
+    """Test stack sampling and collapsed output"""
+
+    def test_capture_sees_busy_thread(self):
+        stop = threading.Event()
+        worker = threading.Thread(target=_busy_wait, args=(stop,), name='busy-worker')
+        worker.start()
+        try:
+            stacks = SamplingProfiler().capture(0.2, interval=0.005)
+        finally:
+            stop.set()
+            worker.join()
+
+        busy = [stack for stack in stacks if stack.startswith('busy-worker;')]
+        assert busy and all('_busy_wait (test_profiling.py:' in stack for stack in busy)
+        assert not any('capture (profiler.py' in stack for stack in stacks)  # Sampler excludes itself
+
+        text = format_collapsed({'a;b': 2, 'a;c': 5})
+        assert text == 'a;c 5\na;b 2\n'
+
+    def test_one_capture_at_a_time(self):
+        profiler = SamplingProfiler()
+        results = []
+        first = threading.Thread(target=lambda: results.append(profiler.capture(0.3)))
+        first.start()
+        time.sleep(0.05)
+        assert profiler.capture(0.01) is None
+        first.join()
+        assert results[0] is not None
+
+
+def test_debug_timing_header(monkeypatch):
+    import app.main as main
+
+    with TestClient(main.app) as client:
+        client.post('/ingest', json=[{"lat": 52.0, "lon": 5.0, "energy_j": 600e-15}])
+        z = 8
+        x, y = lonlat_to_tile(5.0, 52.0, z)
+        url = f'/tiles/{z}/{x}/{y}.png?window=17m'
+
+        # Disabled by default: the header is ignored
+        assert 'server-timing' not in client.get(url, headers={'X-Debug-Timing': '1'}).headers
+
+        monkeypatch.setattr(main, 'GLM_DEBUG_TIMING_ENABLED', True)
+        r = client.get(f'/tiles/{z}/{x}/{y}.png?window=18m', headers={'X-Debug-Timing': '1'})
+        assert r.status_code == 200
+        stages = {part.split(';')[0] for part in r.headers['server-timing'].split(', ')}
+        assert {'cache_lookup', 'window_slice', 'aggregate', 'render', 'colorize', 'encode', 'total'} <= stages
+
+        hit = client.get(f'/tiles/{z}/{x}/{y}.png?window=18m', headers={'X-Debug-Timing': '1'})
+        assert hit.headers['x-cache'] == 'HIT'
+        assert 'render' not in hit.headers['server-timing']
+        assert 'server-timing' not in client.get(f'/tiles/{z}/{x}/{y}.png?window=18m').headers
+
+
+def test_profile_endpoint(monkeypatch):
+    import app.main as main
+
+    with TestClient(main.app) as client:
+        assert client.get('/admin/profile?seconds=0.1').status_code == 404
+
+        monkeypatch.setattr(main, 'GLM_PROFILER_ENABLED', True)
+        assert client.get('/admin/profile?seconds=600').status_code == 400
+        r = client.get('/admin/profile?seconds=0.2&hz=200')
+        assert r.status_code == 200
+        assert r.headers['content-disposition'].endswith('.folded"')
+        assert all(line.rsplit(' ', 1)[1].isdigit() for line in r.text.splitlines())
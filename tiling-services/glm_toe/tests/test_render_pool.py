@@ -0,0 +1,112 @@
+"""
+Tests for the render pool that keeps tile work off the event loop
+"""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.render_pool import RenderPool, RenderPoolSaturated
+
+
+def test_run_records_wait_and_run_times():
+    pool = RenderPool(max_workers=1, max_queue=4)
+
+    async def main():
+        return await asyncio.gather(*(pool.run(time.sleep, 0.05) for _ in range(3)))
+
+    asyncio.run(main())
+    stats = pool.get_stats()
+    assert stats['completed'] == 3
+    assert stats['queue_depth'] == 0
+    assert stats['max_queue_depth_seen'] >= 2
+    # The last job waited behind two 50 ms jobs on a single worker
+    assert stats['wait_ms']['max'] >= 80.0
+    assert stats['run_ms']['p50'] >= 45.0
+    pool.shutdown()
+
+
+def test_saturated_pool_rejects():
+    pool = RenderPool(max_workers=1, max_queue=1)
+
+    async def main():
+        return await asyncio.gather(*(pool.run(time.sleep, 0.05) for _ in range(3)),
+                                    return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert sum(isinstance(r, RenderPoolSaturated) for r in results) == 1
+    assert pool.get_stats()['rejected'] == 1
+    pool.shutdown()
+
+
+def test_failures_are_counted():
+    pool = RenderPool(max_workers=2)
+
+    def boom():
+        raise RuntimeError("render failed")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(pool.run(boom))
+    assert pool.get_stats()['failed'] == 1
+    pool.shutdown()
+
+
+def test_cancelled_queued_job_releases_its_slot():
+    pool = RenderPool(max_workers=1, max_queue=1)
+
+    async def main():
+        running = asyncio.ensure_future(pool.run(time.sleep, 0.1))
+        queued = asyncio.ensure_future(pool.run(time.sleep, 0.1))
+        await asyncio.sleep(0.02)
+        queued.cancel()
+        await asyncio.gather(running, queued, return_exceptions=True)
+        # The freed slot takes new work instead of being rejected
+        await pool.run(time.sleep, 0)
+
+    asyncio.run(main())
+    stats = pool.get_stats()
+    assert stats['queue_depth'] == 0
+    assert stats['active'] == 0
+    assert stats['rejected'] == 0
+    pool.shutdown()
+
+
+def test_health_latency_flat_under_render_load(monkeypatch):
+    import app.main as main
+
+    async def scenario():
+        await main.startup_event()
+
+        slow_render = main._renderer.render_metatile
+
+        def slow(toe_block, n):
+            time.sleep(0.5)
+            return slow_render(toe_block, n)
+
+        monkeypatch.setattr(main._renderer, 'render_metatile', slow)
+
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+            renders = [
+                asyncio.ensure_future(client.get(f'/tiles/9/{x}/100.png?window=7m'))
+                for x in range(0, 64, 8)
+            ]
+            await asyncio.sleep(0.05)
+
+            latencies = []
+            for _ in range(5):
+                t0 = time.perf_counter()
+                r = await client.get('/health')
+                latencies.append(time.perf_counter() - t0)
+                assert r.status_code == 200
+
+            tiles = await asyncio.gather(*renders)
+
+        await main.shutdown_event()
+        return latencies, tiles
+
+    latencies, tiles = asyncio.run(scenario())
+    assert all(t.status_code == 200 for t in tiles)
+    assert max(latencies) < 0.25
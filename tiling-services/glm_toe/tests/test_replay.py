@@ -0,0 +1,93 @@
+"""
+Tests for accelerated replay of archived granules
+"""
+
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.replay import VirtualClock, granule_times, list_granules
+from benchmarks.synthetic_glm import write_sequence
+
+START = datetime(2025, 7, 19, 12, 0, 0)
+
+
+class FakeWall:
+    def __init__(self):
+        self.t = 100.0
+
+    def __call__(self):
+        return self.t
+
+
+class TestVirtualClock:
+    """Test replay time against a controlled wall clock"""
+
+    def test_runs_speedup_times_faster(self):
+        wall = FakeWall()
+        clock = VirtualClock(START, 60.0, wall=wall)
+        assert clock.now() == START
+        wall.t += 2.0
+        assert clock.now() == START + timedelta(minutes=2)
+        assert clock.wall_until(START + timedelta(minutes=3)) == pytest.approx(1.0)
+        assert clock.wall_until(START) == pytest.approx(-2.0)
+        assert clock.timestamp() == pytest.approx((START + timedelta(minutes=2) - datetime(1970, 1, 1)).total_seconds())
+
+    def test_rejects_non_positive_speedup(self):
+        with pytest.raises(ValueError):
+            VirtualClock(START, 0)
+
+
+class TestListGranules:
+    """Test discovery and filename time ordering"""
+
+    def test_orders_by_filename_time(self, tmp_path):
+        later = tmp_path / 'b'
+        earlier = tmp_path / 'a' / 'nested'
+        later.mkdir()
+        earlier.mkdir(parents=True)
+        late = write_sequence(str(later), START + timedelta(minutes=1), 2, 50)
+        early = write_sequence(str(earlier), START, 2, 50)
+        (tmp_path / 'notes.txt').write_text('not a granule')
+        (tmp_path / 'unnamed.nc').write_bytes(b'')
+
+        granules = list_granules(str(tmp_path))
+        assert [path for _, _, path in granules] == early + late
+        assert granules[0][:2] == (START, START + timedelta(seconds=20))
+
+    def test_granule_times_tenths(self):
+        start, end = granule_times('OR_GLM-L2-LCFA_G18_s20252001200005_e20252001200203_c20252001200223.nc')
+        assert start == START + timedelta(milliseconds=500)
+        assert end == START + timedelta(seconds=20, milliseconds=300)
+        assert granule_times('glm.nc') is None
+
+
+def test_replay_through_service(tmp_path, monkeypatch, reset_main):
+    main = reset_main
+
+    write_sequence(str(tmp_path), START, 6, 300)
+    monkeypatch.setattr(main, 'GLM_REPLAY_DIR', str(tmp_path))
+    monkeypatch.setattr(main, 'GLM_REPLAY_SPEEDUP', 3600.0)
+    monkeypatch.setattr(main, 'GLM_REPLAY_PROBE_ZOOMS', [4, 7])
+
+    with TestClient(main.app) as client:
+        deadline = time.monotonic() + 30
+        while not main._replayer.finished and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+        stats = client.get('/replay/status').json()
+        assert stats['finished']
+        assert stats['granules_total'] == 6 and stats['granules_ingested'] == 6
+        assert stats['events_ingested'] == 6 * 300
+        assert stats['data_time'] == (START + timedelta(minutes=2)).isoformat()
+        assert stats['ingest_rate']['events_per_second'] > 0
+        assert stats['tile_latency_ms']['count'] > 0
+
+        # "now" follows replay time: live windows end at the replayed data, not the wall clock
+        assert main.service_now() >= START + timedelta(minutes=2)
+        assert main.service_now() < START + timedelta(hours=1)
+        assert main.live_end_time() == START + timedelta(minutes=2)
+        assert len(main._event_index) == 6 * 300
+        assert main._freshness.get_stats()['tracked'] == 6
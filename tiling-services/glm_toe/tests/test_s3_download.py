@@ -0,0 +1,138 @@
+"""
+Tests for hedged, retried and verified granule downloads against a local fake S3
+"""
+
+import os
+import time
+from datetime import datetime
+
+import pytest
+
+from app.glm_processor import GLMDataProcessor
+from app.s3_download import DeadlineExceeded, DownloadError, GranuleDownloader
+from app.s3_fetcher import GLMS3Fetcher
+from benchmarks.fake_s3 import FakeS3Server
+from benchmarks.synthetic_glm import write_sequence
+
+BUCKET = 'noaa-goes18'
+KEY = 'GLM-L2-LCFA/2025/200/12/OR_GLM-L2-LCFA_G18_s20252001200000_e20252001200200_c20252001200220.nc'
+DATA = bytes(range(256)) * 2048  # 512 KiB
+
+
+@pytest.fixture
+def server():
+    with FakeS3Server({BUCKET: {KEY: DATA}}) as server:
+        yield server
+
+
+def downloader_for(server, **options) -> GranuleDownloader:
+    client = server.client(retries={'total_max_attempts': 1})
+    options.setdefault('sleep', lambda seconds: None)
+    return GranuleDownloader(lambda: client, **options)
+
+
+def leftovers(directory) -> list:
+    return [name for name in os.listdir(directory) if '.part' in name]
+
+
+class TestGranuleDownloader:
+    """Test deadlines, hedging, retries and verification"""
+
+    def test_downloads_and_verifies(self, server, tmp_path):
+        downloader = downloader_for(server)
+        path = str(tmp_path / 'granule.nc')
+        downloader.download(BUCKET, KEY, path)
+
+        assert open(path, 'rb').read() == DATA
+        stats = downloader.get_stats()
+        assert stats['downloads'] == 1 and stats['gets'] == 1 and stats['bytes'] == len(DATA)
+        assert stats['hedged'] == 0 and stats['retried'] == 0
+        assert ('HEAD', KEY) in server.requests
+
+    def test_hedge_beats_a_stalled_get(self, server, tmp_path):
+        downloader = downloader_for(server, hedge_default=0.2)
+        server.stall(KEY, seconds=10.0)
+        path = str(tmp_path / 'granule.nc')
+
+        start = time.monotonic()
+        downloader.download(BUCKET, KEY, path)
+        assert time.monotonic() - start < 5.0
+
+        assert open(path, 'rb').read() == DATA
+        assert server.gets(KEY) == 2
+        stats = downloader.get_stats()
+        assert stats['hedged'] == 1 and stats['hedge_wins'] == 1
+        # The abandoned GET removes its part file once it returns
+        server.closing.set()
+        deadline = time.monotonic() + 5.0
+        while leftovers(tmp_path) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert leftovers(tmp_path) == []
+
+    def test_hedge_delay_follows_p95(self, server):
+        downloader = downloader_for(server, hedge_default=2.0, hedge_min=0.01, min_samples=10)
+        assert downloader.hedge_delay() == 2.0
+        downloader._get_seconds.extend([0.1] * 19 + [1.0])
+        assert downloader.hedge_delay() == 1.0
+        downloader._get_seconds.extend([0.1] * 20)
+        assert downloader.hedge_delay() == pytest.approx(0.1)
+
+    def test_retries_server_errors_with_backoff(self, server, tmp_path):
+        pauses = []
+        downloader = downloader_for(server, backoff=0.5, sleep=pauses.append)
+        server.fail(KEY, status=503, times=2)
+        downloader.download(BUCKET, KEY, str(tmp_path / 'granule.nc'))
+
+        assert server.gets(KEY) == 3
+        assert downloader.get_stats()['retried'] == 2
+        # Jittered between half and all of 0.5 s, then 1 s
+        assert 0.25 <= pauses[0] <= 0.5 and 0.5 <= pauses[1] <= 1.0
+
+    def test_rejects_corrupt_bytes_and_retries(self, server, tmp_path):
+        downloader = downloader_for(server)
+        server.corrupt(KEY)
+        path = str(tmp_path / 'granule.nc')
+        downloader.download(BUCKET, KEY, path)
+
+        assert open(path, 'rb').read() == DATA
+        assert downloader.get_stats()['verification_failures'] == 1
+        assert leftovers(tmp_path) == []
+
+    def test_missing_key_is_not_retried(self, server, tmp_path):
+        downloader = downloader_for(server)
+        with pytest.raises(DownloadError):
+            downloader.download(BUCKET, KEY.replace('G18', 'G19'), str(tmp_path / 'missing.nc'))
+        assert downloader.get_stats()['retried'] == 0
+        assert downloader.get_stats()['failed'] == 1
+
+    def test_gives_up_at_the_deadline(self, server, tmp_path):
+        downloader = downloader_for(server, hedge=False, request_timeout=0.3, retries=1)
+        server.stall(KEY, seconds=10.0, times=2, after_bytes=0)
+
+        start = time.monotonic()
+        with pytest.raises(DeadlineExceeded):
+            downloader.download(BUCKET, KEY, str(tmp_path / 'granule.nc'))
+        assert time.monotonic() - start < 2.0
+        stats = downloader.get_stats()
+        assert stats['deadlines_exceeded'] == 2 and stats['failed'] == 1
+
+
+def test_slow_object_does_not_dominate_serial_ingest(server, tmp_path):
+    paths = write_sequence(str(tmp_path), datetime(2025, 7, 19, 12, 0, 0), 4, 50)
+    keys = [f"GLM-L2-LCFA/2025/200/12/{os.path.basename(path)}" for path in paths]
+    for key, path in zip(keys, paths):
+        server.put(BUCKET, key, open(path, 'rb').read())
+    server.stall(keys[1], seconds=10.0)
+
+    fetcher = GLMS3Fetcher(endpoint_url=server.endpoint_url)
+    fetcher.downloader.hedge_default = 0.2
+    processor = GLMDataProcessor(use_abi_grid=False)
+    processor.s3_download = fetcher.download_url
+
+    start = time.monotonic()
+    granules = [processor.read_glm_granule(f"s3://{BUCKET}/{key}") for key in keys]
+    assert time.monotonic() - start < 5.0
+
+    assert [len(granule.events) for granule in granules] == [50] * 4
+    stats = fetcher.get_download_stats()
+    assert stats['downloads'] == 4 and stats['hedge_wins'] == 1
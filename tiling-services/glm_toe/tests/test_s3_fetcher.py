@@ -0,0 +1,211 @@
+"""
+Tests for S3 granule listing
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.s3_fetcher import MAX_INGEST_ATTEMPTS, ArrivalPredictor, GLMS3Fetcher, granule_end_time
+from benchmarks.synthetic_glm import granule_filename
+
+
+def granule_key(start: datetime, satellite: str = 'G18') -> str:
+    doy = start.timetuple().tm_yday
+    return f"GLM-L2-LCFA/{start.year}/{doy:03d}/{start.hour:02d}/{granule_filename(start, satellite)}"
+
+
+class FakeS3:
+    """list_objects_v2 over an in-memory bucket: key order, StartAfter, MaxKeys and continuation tokens"""
+
+    def __init__(self, keys, modified=None):
+        self.keys = sorted(keys)
+        self.modified = modified or {}
+        self.calls = []
+
+    def list_objects_v2(self, Bucket, Prefix='', MaxKeys=1000, StartAfter=None, ContinuationToken=None):
+        self.calls.append({'Prefix': Prefix, 'StartAfter': StartAfter, 'ContinuationToken': ContinuationToken})
+        keys = [key for key in self.keys if key.startswith(Prefix)]
+        if ContinuationToken is not None:
+            keys = [key for key in keys if key > ContinuationToken]
+        elif StartAfter:
+            keys = [key for key in keys if key > StartAfter]
+        page = keys[:MaxKeys]
+        response = {'KeyCount': len(page), 'IsTruncated': len(keys) > MaxKeys}
+        if page:
+            response['Contents'] = [
+                {'Key': key, **({'LastModified': self.modified[key]} if key in self.modified else {})}
+                for key in page
+            ]
+        if response['IsTruncated']:
+            response['NextContinuationToken'] = page[-1]
+        return response
+
+
+@pytest.fixture
+def fetcher():
+    fetcher = GLMS3Fetcher()
+    fetcher.s3_client = FakeS3([])
+    return fetcher
+
+
+class TestIncrementalListing:
+    """Test the per-bucket StartAfter cursor"""
+
+    def test_polls_return_only_new_keys_across_rollovers(self, fetcher):
+        start = datetime(2024, 12, 31, 23, 59, 0)
+        keys = [granule_key(start + timedelta(seconds=20 * i)) for i in range(6)]
+        fetcher.s3_client = FakeS3(keys[:3] + ['GLM-L2-LCFA/index.html'])
+        fetcher.resume_after('noaa-goes18', keys[:1])
+
+        assert fetcher.list_new_granules('noaa-goes18') == keys[1:3]
+        fetcher.commit_cursor('noaa-goes18', keys[1:3])
+        fetcher.s3_client.keys = sorted(fetcher.s3_client.keys + keys[3:])
+        # The next poll crosses the hour, day and year prefixes in one request
+        assert fetcher.list_new_granules('noaa-goes18') == keys[3:]
+        fetcher.commit_cursor('noaa-goes18', keys[3:])
+        assert '/2025/001/00/' in keys[-1]
+        assert fetcher.list_new_granules('noaa-goes18') == []
+
+        calls = fetcher.s3_client.calls
+        assert len(calls) == 3
+        assert [call['StartAfter'] for call in calls] == [keys[0], keys[2], keys[5]]
+        assert all(call['Prefix'] == 'GLM-L2-LCFA/' for call in calls)
+        # The cursor stays on the last granule, so the non-granule key sorting after the years is listed each time
+        stats = fetcher.get_listing_stats()['noaa-goes18']
+        assert stats == {'cursor': keys[5], 'polls': 3, 'requests': 3, 'keys': 8}
+
+    def test_first_poll_starts_hours_back(self, fetcher):
+        now = datetime.utcnow().replace(microsecond=0)
+        old = granule_key(now - timedelta(hours=3))
+        recent = [granule_key(now - timedelta(minutes=30)), granule_key(now - timedelta(minutes=1))]
+        fetcher.s3_client = FakeS3([old] + recent)
+        assert fetcher.list_new_granules('noaa-goes18', hours_back=1) == recent
+
+    def test_follows_continuation_and_drains_a_backlog_oldest_first(self, fetcher):
+        start = datetime(2025, 7, 19, 12, 0, 0)
+        keys = [granule_key(start + timedelta(seconds=i)) for i in range(2500)]
+        fetcher.s3_client = FakeS3(keys)
+        fetcher.resume_after('noaa-goes18', [granule_key(start - timedelta(minutes=1))])
+
+        assert fetcher.list_new_granules('noaa-goes18', max_granules=10) == keys[:10]
+        assert len(fetcher.s3_client.calls) == 3
+        assert fetcher.next_poll_delay('noaa-goes18', 60.0) == 0.0  # More are waiting
+        fetcher.commit_cursor('noaa-goes18', keys[:10])
+        # The held-back keys come next, not skipped
+        assert fetcher.list_new_granules('noaa-goes18', max_granules=10) == keys[10:20]
+        fetcher.commit_cursor('noaa-goes18', keys[10:20])
+        assert fetcher.get_listing_stats()['noaa-goes18']['cursor'] == keys[19]
+
+    def test_failed_granule_is_listed_again_until_given_up(self, fetcher):
+        start = datetime(2025, 7, 19, 12, 0, 0)
+        keys = [granule_key(start + timedelta(seconds=20 * i)) for i in range(3)]
+        fetcher.s3_client = FakeS3(keys)
+        fetcher.resume_after('noaa-goes18', [granule_key(start - timedelta(minutes=1))])
+
+        listed = keys
+        for _ in range(MAX_INGEST_ATTEMPTS - 1):
+            assert fetcher.list_new_granules('noaa-goes18') == listed
+            # keys[1] failed: the cursor stops before it, so keys[2] is listed again too
+            fetcher.commit_cursor('noaa-goes18', [keys[0], keys[2]])
+            assert fetcher.get_listing_stats()['noaa-goes18']['cursor'] == keys[0]
+            listed = keys[1:]
+        assert fetcher.list_new_granules('noaa-goes18') == listed
+        fetcher.commit_cursor('noaa-goes18', [keys[2]])
+        assert fetcher.get_listing_stats()['noaa-goes18']['cursor'] == keys[2]
+        assert fetcher.list_new_granules('noaa-goes18') == []
+
+    def test_resume_ignores_unknown_and_older_keys(self, fetcher):
+        key = granule_key(datetime(2025, 7, 19, 12, 0, 0))
+        fetcher.resume_after('noaa-goes18', [key, '/tmp/local.nc'])
+        fetcher.resume_after('noaa-goes18', [granule_key(datetime(2025, 7, 19, 11, 0, 0))])
+        fetcher.resume_after('unknown-bucket', [key])
+        assert fetcher._cursors == {'noaa-goes18': key}
+
+
+class TestTimeWindowListing:
+    """Test hour-prefix listing"""
+
+    def test_lists_past_1000_keys_newest_first(self, fetcher):
+        start = datetime(2025, 7, 19, 12, 0, 0)
+        keys = [granule_key(start + timedelta(seconds=i)) for i in range(2500)]
+        fetcher.s3_client = FakeS3(keys)
+        listed = fetcher.list_granules_for_time_window('noaa-goes18', start, start + timedelta(minutes=50),
+                                                       max_granules=5000)
+        assert listed == keys[::-1]
+
+    def test_latest_come_from_the_newest_hour(self, fetcher):
+        start = datetime(2025, 7, 19, 10, 0, 0)
+        keys = [granule_key(start + timedelta(minutes=20 * i)) for i in range(9)]
+        fetcher.s3_client = FakeS3(keys)
+        listed = fetcher.list_granules_for_time_window('noaa-goes18', start, start + timedelta(hours=2, minutes=50),
+                                                       max_granules=4)
+        assert listed == keys[::-1][:4]
+
+
+class Clock:
+    def __init__(self, now: datetime):
+        self.now = now
+
+    def __call__(self) -> datetime:
+        return self.now
+
+
+class TestArrivalPredictor:
+    """Test learned publication offsets and late back-off"""
+
+    def test_probes_just_after_expected_arrival(self):
+        start = datetime(2025, 7, 19, 12, 0, 0)
+        clock = Clock(start)
+        predictor = ArrivalPredictor(cadence=20.0, margin=0.5, max_delay=60.0, now=clock)
+        assert predictor.next_delay() == 60.0  # Nothing learned yet: the fixed interval
+
+        for i, lag in enumerate([24.0, 25.0, 26.0, 25.0, 30.0]):
+            end = start + timedelta(seconds=20 * (i + 1))
+            predictor.observe(end, end + timedelta(seconds=lag))
+        last_end = start + timedelta(seconds=100)
+        assert predictor.offset() == 30.0  # 90th percentile of five
+        assert predictor.expected_cadence() == 20.0
+
+        clock.now = last_end + timedelta(seconds=30)
+        assert predictor.next_delay() == pytest.approx(20.5)
+        assert predictor.get_stats()['expected_arrival'] == (last_end + timedelta(seconds=50.5)).isoformat()
+
+    def test_backs_off_while_late(self):
+        start = datetime(2025, 7, 19, 12, 0, 0)
+        clock = Clock(start)
+        predictor = ArrivalPredictor(cadence=20.0, min_backoff=1.0, max_delay=10.0, now=clock)
+        predictor.observe(start, start + timedelta(seconds=20))
+        clock.now = start + timedelta(seconds=41)
+
+        delays = []
+        for _ in range(6):
+            delays.append(predictor.next_delay())
+            predictor.missed()
+        assert delays == [1.0, 1.0, 2.0, 4.0, 8.0, 10.0]
+
+        predictor.observe(start + timedelta(seconds=20), clock.now)
+        assert predictor.misses == 0
+        assert predictor.next_delay() == 10.0  # Due in 20.5 s, capped at max_delay
+
+    def test_fetcher_learns_from_last_modified(self, fetcher):
+        start = datetime.utcnow().replace(microsecond=0) - timedelta(minutes=5)
+        keys = [granule_key(start + timedelta(seconds=20 * i)) for i in range(6)]
+        modified = {
+            key: (granule_end_time(key) + timedelta(seconds=22)).replace(tzinfo=timezone.utc) for key in keys
+        }
+        fetcher.s3_client = FakeS3(keys, modified)
+        assert fetcher.list_new_granules('noaa-goes18') == keys
+        fetcher.commit_cursor('noaa-goes18', keys)
+
+        stats = fetcher.get_arrival_stats()['G18']
+        assert stats['observed'] == 6
+        assert stats['offset_seconds'] == 22.0 and stats['cadence_seconds'] == 20.0
+        # The next granule is long overdue, so the next probe comes quickly
+        assert fetcher.next_poll_delay('noaa-goes18', 60.0) == 1.0
+
+        assert fetcher.list_new_granules('noaa-goes18') == []
+        assert fetcher.get_arrival_stats()['G18']['consecutive_misses'] == 1
+        assert fetcher.next_poll_delay('noaa-goes18', 60.0) == 1.0
+        assert fetcher.list_new_granules('noaa-goes18') == []
+        assert fetcher.next_poll_delay('noaa-goes18', 60.0) == 2.0
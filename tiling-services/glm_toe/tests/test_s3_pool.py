@@ -0,0 +1,82 @@
+"""
+Tests for the shared S3 connection pool against a local fake S3
+"""
+
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.s3_fetcher import GLMS3Fetcher
+from app.s3_pool import S3ConnectionPool
+from benchmarks.fake_s3 import FakeS3Server
+from benchmarks.synthetic_glm import granule_filename
+
+BUCKET = 'noaa-goes18'
+
+
+def granule_key(start: datetime) -> str:
+    doy = start.timetuple().tm_yday
+    return f"GLM-L2-LCFA/{start.year}/{doy:03d}/{start.hour:02d}/{granule_filename(start, 'G18')}"
+
+
+@pytest.fixture
+def server():
+    now = datetime.utcnow().replace(microsecond=0)
+    keys = [granule_key(now - timedelta(minutes=10) + timedelta(seconds=20 * i)) for i in range(3)]
+    with FakeS3Server({BUCKET: {key: bytes([i]) * 4096 for i, key in enumerate(keys)}}) as server:
+        server.keys = keys
+        yield server
+
+
+def get_concurrently(pool: S3ConnectionPool, key: str, threads: int, rounds: int):
+    def work():
+        for _ in range(rounds):
+            pool.client.get_object(Bucket=BUCKET, Key=key)['Body'].read()
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+class TestS3ConnectionPool:
+    """Test connection reuse across operations, threads and both client paths"""
+
+    def test_fetcher_operations_share_one_connection(self, server, tmp_path):
+        fetcher = GLMS3Fetcher(endpoint_url=server.endpoint_url)
+        assert fetcher.list_new_granules(BUCKET) == server.keys
+        assert fetcher.get_granule_metadata(BUCKET, server.keys[0])['size'] == 4096
+        assert fetcher.download_granule(BUCKET, server.keys[1], str(tmp_path / 'granule.nc'))
+
+        stats = fetcher.get_connection_stats()
+        # The downloader HEADs before its GET
+        assert stats['requests'] == {'ListObjectsV2': 1, 'HeadObject': 2, 'GetObject': 1}
+        assert stats['connections_opened'] == 1 and server.connections == 1
+        assert stats['connections_reused'] == 3 and stats['reuse_ratio'] == 0.75
+
+    def test_concurrent_threads_reuse_pooled_connections(self, server):
+        key = server.keys[0]
+        server.stall(key, seconds=0.2, times=24, after_bytes=0)
+        pool = S3ConnectionPool(pool_size=8, endpoint_url=server.endpoint_url)
+        get_concurrently(pool, key, threads=8, rounds=3)
+
+        stats = pool.get_stats()
+        assert stats['requests'] == {'GetObject': 24}
+        assert stats['connections_opened'] <= 8
+        assert stats['connections_reused'] >= 16
+        assert list(stats['hosts'].values())[0]['idle'] == stats['connections_opened']
+
+    def test_fsspec_path_uses_one_shared_filesystem(self, server, tmp_path):
+        fetcher = GLMS3Fetcher(endpoint_url=server.endpoint_url)
+        fetcher.s3_client = None  # As when boto3 cannot build a client
+        assert fetcher._filesystem() is fetcher._filesystem()
+
+        assert fetcher.list_new_granules(BUCKET) == server.keys
+        for i, key in enumerate(server.keys):
+            assert fetcher.download_granule(BUCKET, key, str(tmp_path / f"{i}.nc"))
+        assert (tmp_path / '2.nc').read_bytes() == bytes([2]) * 4096
+
+        stats = fetcher.get_connection_stats()['fsspec']
+        assert stats['active'] and stats['requests']['GetObject'] == 3
+        assert server.connections == 1
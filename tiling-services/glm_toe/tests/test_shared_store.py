@@ -0,0 +1,162 @@
+"""
+Tests for the shared-memory event store
+"""
+
+import math
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.event_index import EventIndex, datetime_to_ms
+from app.shared_store import SharedEventStore
+
+
+def lonlat_to_tile(lon: float, lat: float, zoom: int):
+    n = 2 ** zoom
+    xtile = int((lon + 180.0) / 360.0 * n)
+    lat_rad = math.radians(lat)
+    ytile = int((1.0 - math.log(math.tan(lat_rad) + 1 / math.cos(lat_rad)) / math.pi) / 2.0 * n)
+    return xtile, ytile
+
+
+class TestSharedEventStore:
+    """Test publishing, zero-copy mapping and ownership"""
+
+    @pytest.fixture
+    def now(self):
+        return datetime(2025, 8, 1, 12, 0, 0)
+
+    @pytest.fixture
+    def index(self, now):
+        rng = np.random.default_rng(11)
+        size = 3000
+        index = EventIndex()
+        index.add(
+            35.0 + rng.normal(0, 0.3, size),
+            -97.0 + rng.normal(0, 0.3, size),
+            rng.uniform(10, 2000, size),
+            datetime_to_ms(now) - (rng.uniform(0, 10 * 60, size) * 1000).astype(np.int64)
+        )
+        return index
+
+    def test_reader_sees_published_index(self, tmp_path, index, now):
+        owner = SharedEventStore(str(tmp_path))
+        reader = SharedEventStore(str(tmp_path))
+        assert owner.acquire_ownership()
+        assert not reader.acquire_ownership()
+
+        owner.publish(index, now, 7, 1234.5, granules=['g1'])
+        snapshot = reader.refresh()
+        assert snapshot.version == 1
+        assert (snapshot.ingest_epoch, snapshot.ingest_epoch_seq, snapshot.granules) == (now, 7, ['g1'])
+        assert reader.refresh() is None  # Nothing new
+
+        z = 9
+        x, y = lonlat_to_tile(-97.0, 35.0, z)
+        start = now - timedelta(minutes=4)
+        assert snapshot.index.count(start, now, z, x, y) == index.count(start, now, z, x, y)
+        for a, b in zip(snapshot.index.tile_points(start, now, z, x, y), index.tile_points(start, now, z, x, y)):
+            assert np.array_equal(a, b)
+
+        # Mapped, not copied, and read-only
+        bucket = snapshot.index.buckets()[0][1]
+        assert not bucket.codes.flags.writeable
+        assert isinstance(bucket.codes.base, np.memmap)
+        owner.close()
+        reader.close()
+
+    def test_only_changed_buckets_are_rewritten(self, tmp_path, index, now):
+        owner = SharedEventStore(str(tmp_path))
+        owner.acquire_ownership()
+        owner.publish(index, now, 1, None)
+        written = owner.segments_written
+        assert written == len(index.buckets())
+
+        index.add(np.array([35.0]), np.array([-97.0]), np.array([500.0]), np.array([datetime_to_ms(now)]))
+        owner.publish(index, now, 2, None)
+        assert owner.segments_written == written + 1
+
+        # The replaced segment is removed one publish later
+        owner.publish(index, now, 3, None)
+        segments = [name for name in os.listdir(tmp_path) if name.endswith('.seg')]
+        assert len(segments) == len(index.buckets())
+        owner.close()
+
+    def test_reader_maps_each_segment_once(self, tmp_path, index, now, monkeypatch):
+        # An empty bucket (len() == 0) must not be remapped on every refresh either
+        bucket_id, bucket = index.buckets()[0]
+        index._buckets[bucket_id] = bucket.select(np.zeros(len(bucket), dtype=bool))
+        owner = SharedEventStore(str(tmp_path))
+        reader = SharedEventStore(str(tmp_path))
+        owner.acquire_ownership()
+        owner.publish(index, now, 1, None)
+
+        mapped = []
+        map_segment = reader._map_segment
+        monkeypatch.setattr(reader, '_map_segment', lambda name: mapped.append(name) or map_segment(name))
+        reader.refresh()
+        assert len(mapped) == len(index.buckets())
+
+        index.add(np.array([35.0]), np.array([-97.0]), np.array([500.0]), np.array([datetime_to_ms(now)]))
+        owner.publish(index, now, 2, None)
+        reader.refresh()
+        assert len(mapped) == len(set(mapped)) == len(index.buckets())
+        owner.close()
+        reader.close()
+
+    def test_ownership_passes_on_close(self, tmp_path, index, now):
+        first = SharedEventStore(str(tmp_path))
+        second = SharedEventStore(str(tmp_path))
+        first.acquire_ownership()
+        first.publish(index, now, 1, None)
+        assert not second.acquire_ownership()
+        first.close()
+
+        assert second.acquire_ownership()
+        snapshot = second.refresh(force=True)
+        # An adopted snapshot publishes without rewriting its segments
+        written = second.segments_written
+        assert second.publish(snapshot.index, now, 2, None) == 2
+        assert second.segments_written == written
+        second.close()
+
+
+def test_reader_worker_serves_owner_data(monkeypatch, tmp_path, reset_main):
+    main = reset_main
+
+    now = datetime.utcnow().replace(microsecond=0)
+    index = EventIndex()
+    index.add(np.array([-20.0, 30.0]), np.array([130.0, -90.0]), np.array([1200.0, 1200.0]),
+              np.array([datetime_to_ms(now)] * 2))
+    owner = SharedEventStore(str(tmp_path))
+    owner.acquire_ownership()
+    owner.publish(index, now, 4242, None)
+
+    reader = SharedEventStore(str(tmp_path))
+    monkeypatch.setattr(main, '_shared_store', reader)
+
+    with TestClient(main.app) as client:
+        main.adopt_shared_snapshot(reader.refresh())
+        assert main._ingest_epoch_seq == 4242
+
+        r = client.get('/events?bbox=129,-21,131,-19&window=5m')
+        assert r.json()['count'] == 1
+
+        # The dense-grid path (no metatiles, above the pyramid) aggregates the mapped index too
+        grids = []
+        monkeypatch.setattr(main, 'GLM_METATILE_SIZE', 1)
+        monkeypatch.setattr(main._renderer, 'render_tile_from_grid',
+                            lambda toe_grid, **kwargs: grids.append(float(toe_grid.sum())) or b'')
+        z = 7
+        x, y = lonlat_to_tile(-90.0, 30.0, z)
+        r = client.get(f'/tiles/{z}/{x}/{y}.png?window=5m')
+        assert r.headers['x-render-path'].startswith('grid')
+        assert grids == [pytest.approx(1200.0e-15)]
+
+        assert client.post('/ingest', json=[{"lat": -20.0, "lon": 130.0, "energy_j": 1e-12}]).status_code == 409
+
+    owner.close()
+    reader.close()
@@ -0,0 +1,261 @@
+"""
+Tests for tile caching across the tile endpoints
+"""
+
+import math
+import threading
+from datetime import timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.tile_cache import TileCache
+
+
+def lonlat_to_tile(lon: float, lat: float, zoom: int):
+    n = 2 ** zoom
+    xtile = int((lon + 180.0) / 360.0 * n)
+    lat_rad = math.radians(lat)
+    ytile = int((1.0 - math.log(math.tan(lat_rad) + 1 / math.cos(lat_rad)) / math.pi) / 2.0 * n)
+    return xtile, ytile
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTileCache:
+    """Test byte budget, TTL and statistics"""
+
+    def test_byte_budget_evicts_lru(self):
+        size = TileCache.entry_size('a', b'x' * 1000)
+        cache = TileCache(max_bytes=3 * size)
+        for key in 'abc':
+            cache.set(key, b'x' * 1000)
+        assert cache.get('a') is not None  # 'b' is now least recently used
+        cache.set('d', b'x' * 1000)
+        assert 'b' not in cache
+        assert all(k in cache for k in 'acd')
+        stats = cache.get_stats()
+        assert stats['bytes'] == 3 * size <= stats['max_bytes']
+        assert stats['evictions'] == 1
+
+    def test_large_value_evicts_several(self):
+        cache = TileCache(max_bytes=10_000)
+        for i in range(8):
+            cache.set(f'small{i}', b'x' * 1000)
+        cache.set('big', b'x' * 6000)
+        assert cache.bytes <= cache.max_bytes
+        assert 'big' in cache and 'small7' in cache and 'small0' not in cache
+
+    def test_oversized_value_rejected(self):
+        cache = TileCache(max_bytes=1000)
+        cache.set('big', b'x' * 2000)
+        assert len(cache) == 0 and cache.bytes == 0
+        assert cache.get_stats()['rejected'] == 1
+
+    def test_ttl(self):
+        clock = FakeClock()
+        cache = TileCache(max_bytes=1 << 20, clock=clock)
+        cache.set('live', b'a', ttl=10)
+        cache.set('historical', b'b', ttl=3600)
+        clock.now += 11
+        assert cache.get('live') is None
+        assert cache.get('historical') == b'b'
+        stats = cache.get_stats()
+        assert (stats['hits'], stats['misses'], stats['expirations']) == (1, 1, 1)
+        assert stats['hit_ratio'] == 0.5
+        assert stats['bytes'] == TileCache.entry_size('historical', b'b')
+
+    def test_concurrent_access_keeps_accounting(self):
+        cache = TileCache(max_bytes=50_000)
+
+        def worker(seed):
+            for i in range(2000):
+                key = f'k{(i * seed) % 97}'
+                if cache.get(key) is None:
+                    cache.set(key, b'x' * (100 + (i % 7) * 300))
+
+        threads = [threading.Thread(target=worker, args=(s,)) for s in (1, 3, 5, 7)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        expected = sum(TileCache.entry_size(k, cache.get(k)) for k in cache.keys())
+        assert cache.bytes == expected <= cache.max_bytes
+
+
+def test_metatile_populates_neighbour_cache():
+    import app.main as main
+
+    with TestClient(main.app) as client:
+        r = client.post('/ingest', json=[{"lat": -20.0, "lon": 40.0, "energy_j": 1500e-15}])
+        assert r.status_code == 200
+
+        z = 7
+        x, y = lonlat_to_tile(40.0, -20.0, z)
+        first = client.get(f'/tiles/{z}/{x}/{y}.png?window=15m')
+        assert first.status_code == 200
+        assert first.headers['x-cache'] == 'MISS'
+        assert first.headers['x-metatile'] == '8x8'
+
+        # The neighbour in the same metatile was rendered by the first request
+        nx = x ^ 1
+        neighbour = client.get(f'/tiles/{z}/{nx}/{y}.png?window=15m')
+        assert neighbour.headers['x-cache'] == 'HIT'
+
+        stats = main._tile_cache.get_stats()
+        assert stats['hits'] >= 1 and stats['entries'] >= 1
+        assert 0 < stats['bytes'] <= stats['max_bytes']
+
+
+def test_grid_type_is_ignored():
+    import app.main as main
+
+    with TestClient(main.app) as client:
+        client.post('/ingest', json=[{"lat": -22.0, "lon": 44.0, "energy_j": 1500e-15}])
+        z = 7
+        x, y = lonlat_to_tile(44.0, -22.0, z)
+        plain = client.get(f'/tiles/{z}/{x}/{y}.png?window=16m')
+        overridden = client.get(f'/tiles/{z}/{x}/{y}.png?window=16m&grid_type=geodetic')
+        assert overridden.headers['x-cache'] == 'HIT'
+        assert overridden.headers['etag'] == plain.headers['etag']
+        assert 'x-grid-type' not in overridden.headers
+
+
+@pytest.mark.parametrize('size', [0, 6])
+def test_metatile_size_must_be_a_power_of_two(monkeypatch, size):
+    import app.main as main
+
+    monkeypatch.setattr(main, 'GLM_METATILE_SIZE', size)
+    with pytest.raises(ValueError):
+        with TestClient(main.app):
+            pass
+
+
+def test_live_tiles_roll_with_ingest_epoch(register_granules):
+    import app.main as main
+
+    with TestClient(main.app) as client:
+        client.post('/ingest', json=[{"lat": -33.0, "lon": 151.0, "energy_j": 300e-15}])
+        z = 9
+        x, y = lonlat_to_tile(151.0, -33.0, z)
+        url = f'/tiles/{z}/{x}/{y}.png?window=11m'
+
+        assert client.get(url).headers['x-cache'] == 'MISS'
+        assert client.get(url).headers['x-cache'] == 'HIT'
+        live_keys = [k for k in main._tile_cache.keys() if '&t=epoch-' in k]
+        assert live_keys
+
+        # New data rolls the epoch: the old live tiles are evicted, not served
+        r = client.post('/ingest', json=[{"lat": -33.0, "lon": 151.0, "energy_j": 1500e-15}])
+        assert r.status_code == 200
+        assert not any(k in main._tile_cache for k in live_keys)
+        assert client.get(url).headers['x-cache'] == 'MISS'
+        assert client.get(url).headers['x-cache'] == 'HIT'
+
+        # Explicit end times before the epoch, covered by ingested granules, are complete and immutable
+        register_granules(main._ingest_epoch - timedelta(hours=1), main._ingest_epoch, 180)
+        t = (main._ingest_epoch - timedelta(minutes=1)).isoformat()
+        assert client.get(f'{url}&t={t}').headers['cache-control'] == (
+            f'public, max-age={main.GLM_TILE_CACHE_HISTORICAL_TTL}, immutable'
+        )
+        live = client.get(url).headers['cache-control']
+        assert live.startswith('public, max-age=')
+        assert f'stale-while-revalidate={main.live_update_interval()}' in live
+
+
+def test_incomplete_windows_are_not_immutable(register_granules):
+    import app.main as main
+
+    with TestClient(main.app) as client:
+        client.post('/ingest', json=[{"lat": 40.0, "lon": -100.0, "energy_j": 700e-15}])
+        epoch = main._ingest_epoch
+        z = 7
+        x, y = lonlat_to_tile(-100.0, 40.0, z)
+        t = (epoch - timedelta(minutes=2)).isoformat()
+        endpoints = [f'/tiles/{z}/{x}/{y}.png', f'/tiles/{z}/{x}/{y}/data.png']
+
+        def cache_control(path: str, window: str) -> str:
+            r = client.get(f'{path}?window={window}&t={t}')
+            assert r.status_code == 200
+            return r.headers['cache-control']
+
+        # Ended before the epoch, but no granule has been ingested for it
+        for path in endpoints:
+            assert 'immutable' not in cache_control(path, '1m')
+
+        register_granules(epoch - timedelta(minutes=10), epoch, 30)
+        main._tile_cache.clear()
+        for path in endpoints:
+            assert 'immutable' in cache_control(path, '1m')
+            # Starts before the oldest ingested granule
+            assert 'immutable' not in cache_control(path, '15m')
+
+        # A late granule leaves a hole in the window
+        del main._ingested_granules['granule-20']
+        main.invalidate_granule_coverage()
+        main._tile_cache.clear()
+        for path in endpoints:
+            control = cache_control(path, '5m')
+            assert 'immutable' not in control and 'stale-while-revalidate' in control
+        anim = client.get(f'/tiles/{z}/{x}/{y}/anim?start={t}&end={t}&window=5m')
+        assert 'immutable' not in anim.headers['cache-control']
+
+
+def test_incomplete_explicit_window_rerenders_after_ingest():
+    import app.main as main
+
+    with TestClient(main.app) as client:
+        client.post('/ingest', json=[{"lat": 35.0, "lon": 139.0, "energy_j": 400e-15}])
+        epoch = main._ingest_epoch
+        z = 8
+        x, y = lonlat_to_tile(139.0, 35.0, z)
+        url = f'/tiles/{z}/{x}/{y}.png?window=11m&t={(epoch + timedelta(minutes=2)).isoformat()}'
+
+        first = client.get(url)
+        assert first.headers['x-cache'] == 'MISS'
+        assert 'immutable' not in first.headers['cache-control']
+        assert client.get(url).headers['x-cache'] == 'HIT'
+
+        # A later granule lands inside the window: the tile is rendered again, not served stale
+        late = (epoch + timedelta(minutes=1)).isoformat()
+        client.post('/ingest', json=[{"lat": 35.0, "lon": 139.0, "energy_j": 9000e-15, "timestamp": late}])
+        second = client.get(url)
+        assert second.headers['x-cache'] == 'MISS'
+        assert second.headers['etag'] != first.headers['etag']
+
+
+def test_etag_and_not_modified(monkeypatch):
+    import app.main as main
+
+    with TestClient(main.app) as client:
+        client.post('/ingest', json=[{"lat": 51.5, "lon": -0.1, "energy_j": 900e-15}])
+        z = 6
+        x, y = lonlat_to_tile(-0.1, 51.5, z)
+        url = f'/tiles/{z}/{x}/{y}.png?window=13m'
+
+        first = client.get(url)
+        etag = first.headers['etag']
+        assert etag.startswith('"') and first.headers['x-cache'] == 'MISS'
+
+        # Revalidation of a cached tile never reaches the renderer
+        def fail(*args, **kwargs):
+            raise AssertionError("renderer called for a 304")
+        monkeypatch.setattr(main, '_render_metatile', fail)
+
+        r = client.get(url, headers={'If-None-Match': etag})
+        assert r.status_code == 304
+        assert r.content == b''
+        assert r.headers['etag'] == etag
+        assert client.get(url, headers={'If-None-Match': f'"other", W/{etag}'}).status_code == 304
+        assert client.get(url, headers={'If-None-Match': '"other"'}).status_code == 200
+
+        r = client.get(f'/tiles/{z}/{x}/{y}/data.png?window=13m')
+        assert r.status_code == 200
+        r = client.get(f'/tiles/{z}/{x}/{y}/data.png?window=13m', headers={'If-None-Match': r.headers['etag']})
+        assert r.status_code == 304
@@ -0,0 +1,165 @@
+"""
+Tests for the disk-backed tile store
+"""
+
+import math
+from datetime import timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.tile_store import FORMAT_VERSION, DiskTileStore
+
+
+def lonlat_to_tile(lon: float, lat: float, zoom: int):
+    n = 2 ** zoom
+    xtile = int((lon + 180.0) / 360.0 * n)
+    lat_rad = math.radians(lat)
+    ytile = int((1.0 - math.log(math.tan(lat_rad) + 1 / math.cos(lat_rad)) / math.pi) / 2.0 * n)
+    return xtile, ytile
+
+
+class TestDiskTileStore:
+    """Test persistence, sharing and the size cap"""
+
+    @pytest.fixture
+    def path(self, tmp_path):
+        return str(tmp_path / 'tiles.mbtiles')
+
+    def test_write_behind_and_read(self, path):
+        store = DiskTileStore(path, max_bytes=1 << 20)
+        store.put('a', b'tile-a', '"etag-a"')
+        store.flush()
+        assert store.get('a') == (b'tile-a', '"etag-a"')
+        assert store.get('missing') is None
+        stats = store.get_stats()
+        assert (stats['entries'], stats['writes'], stats['hits'], stats['misses']) == (1, 1, 1, 1)
+        store.close()
+
+    def test_survives_restart_and_is_shared(self, path):
+        first = DiskTileStore(path, max_bytes=1 << 20)
+        second = DiskTileStore(path, max_bytes=1 << 20)
+        first.put('k', b'data', '"e"')
+        first.flush()
+        assert second.get('k') == (b'data', '"e"')
+        first.close()
+        second.close()
+
+        reopened = DiskTileStore(path, max_bytes=1 << 20)
+        assert reopened.get('k') == (b'data', '"e"')
+        reopened.close()
+
+    def test_size_cap_evicts_least_recently_accessed(self, path):
+        store = DiskTileStore(path, max_bytes=10_000, low_watermark=0.5)
+        for i in range(5):
+            store.put(f'old{i}', b'x' * 1500, '"e"')
+        store.flush()
+        store.get('old0')  # Touch, so it outlives its neighbours
+        store.flush()
+        for i in range(4):
+            store.put(f'new{i}', b'x' * 1500, '"e"')
+        store.flush()
+
+        stats = store.get_stats()
+        assert stats['bytes'] <= 5_000
+        assert stats['evictions'] >= 1
+        assert store.get('new3') is not None
+        assert store.get('old1') is None
+        store.close()
+
+    def test_running_size_follows_replacements_and_evictions(self, path):
+        store = DiskTileStore(path, max_bytes=10_000, low_watermark=0.5, resync_seconds=3600)
+        store.put('a', b'x' * 3000, '"e"')
+        store.put('a', b'x' * 1000, '"e"')  # In the same batch or the next, the last put wins
+        store.put('b', b'x' * 2000, '"e"')
+        store.flush()
+        store.put('b', b'x' * 500, '"e"')  # Replaces a stored tile
+        store.flush()
+        assert store._bytes == store.get_stats()['bytes'] == 1500
+
+        for i in range(6):
+            store.put(f'c{i}', b'x' * 1500, '"e"')
+        store.flush()
+        assert store._bytes == store.get_stats()['bytes'] <= 5_000
+        store.close()
+
+    def test_older_format_is_emptied_on_open(self, path):
+        store = DiskTileStore(path, max_bytes=1 << 20)
+        store.put('k', b'data', '"e"')
+        store.flush()
+        store._connect().execute("UPDATE metadata SET value = '1' WHERE name = 'version'").connection.commit()
+        store.close()
+
+        reopened = DiskTileStore(path, max_bytes=1 << 20)
+        assert reopened.get('k') is None
+        version = reopened._connect().execute("SELECT value FROM metadata WHERE name = 'version'").fetchone()
+        assert version == (FORMAT_VERSION,)
+        reopened.close()
+
+
+def test_historical_tiles_are_read_through_from_disk(monkeypatch, tmp_path, register_granules):
+    import app.main as main
+
+    store = DiskTileStore(str(tmp_path / 'tiles.mbtiles'), max_bytes=1 << 24)
+    monkeypatch.setattr(main, '_tile_store', store)
+
+    with TestClient(main.app) as client:
+        client.post('/ingest', json=[{"lat": 64.0, "lon": -150.0, "energy_j": 900e-15}])
+        z = 5
+        x, y = lonlat_to_tile(-150.0, 64.0, z)
+        register_granules(main._ingest_epoch - timedelta(hours=1), main._ingest_epoch, 180)
+
+        # A covered window that ended before the ingest epoch is immutable and goes to disk
+        t = (main._ingest_epoch - timedelta(seconds=1)).isoformat()
+        url = f'/tiles/{z}/{x}/{y}.png?window=17m&t={t}'
+        first = client.get(url)
+        assert first.headers['x-cache'] == 'MISS'
+        store.flush()
+
+        # Lost from memory (restart, another worker): served from disk, never re-rendered
+        main._tile_cache.clear()
+        with monkeypatch.context() as m:
+            m.setattr(main, '_render_metatile', lambda *a, **k: pytest.fail("re-rendered"))
+            second = client.get(url)
+            assert second.headers['x-cache'] == 'DISK'
+            assert second.content == first.content
+            assert second.headers['etag'] == first.headers['etag']
+            assert client.get(url).headers['x-cache'] == 'HIT'
+
+        # Live tiles stay in memory only
+        client.get(f'/tiles/{z}/{x}/{y}.png?window=17m')
+        store.flush()
+        assert all('&t=epoch-' not in key for key, in store._connect().execute("SELECT key FROM tiles"))
+
+
+def test_windows_with_missing_granules_stay_off_disk(monkeypatch, tmp_path, register_granules):
+    import app.main as main
+
+    store = DiskTileStore(str(tmp_path / 'tiles.mbtiles'), max_bytes=1 << 24)
+    monkeypatch.setattr(main, '_tile_store', store)
+
+    with TestClient(main.app) as client:
+        client.post('/ingest', json=[{"lat": 64.0, "lon": -150.0, "energy_j": 900e-15}])
+        epoch = main._ingest_epoch
+        z = 5
+        x, y = lonlat_to_tile(-150.0, 64.0, z)
+        t = (epoch - timedelta(minutes=5)).isoformat()
+
+        # Nothing ingested before the window: it may still be backfilled
+        register_granules(epoch - timedelta(minutes=10), epoch, 30)
+        r = client.get(f'/tiles/{z}/{x}/{y}.png?window=20m&t={t}')
+        assert r.status_code == 200 and 'immutable' not in r.headers['cache-control']
+
+        # A granule in the middle of the window is missing (late or failed)
+        del main._ingested_granules['granule-10']
+        main.invalidate_granule_coverage()
+        assert not main.is_window_covered(epoch - timedelta(minutes=10), epoch - timedelta(minutes=5))
+        assert main.is_window_covered(epoch - timedelta(minutes=6), epoch - timedelta(minutes=5))
+        assert client.get(f'/tiles/{z}/{x}/{y}.png?window=5m&t={t}').status_code == 200
+
+        # Gapless windows still go to disk
+        r = client.get(f'/tiles/{z}/{x}/{y}.png?window=1m&t={t}')
+        assert 'immutable' in r.headers['cache-control']
+        store.flush()
+        keys = [key for key, in store._connect().execute("SELECT key FROM tiles")]
+        assert keys and all('?w=1&' in key for key in keys)